@@ -2,6 +2,8 @@ import random
 from typing import List, Dict, Optional
 from datetime import datetime
 
+from server import procedural
+
 # ==========================================
 # 1. 데이터 모델 (DB 스키마와 매핑)
 # ==========================================
@@ -15,11 +17,16 @@ class UserProfile:
         self.current_concepts: List[str] = []  # 현재 배우고 있는 진도
 
 class Problem:
-    def __init__(self, topic: str, difficulty: str, question: str, type: str = 'multiple_choice'):
+    def __init__(self, topic: str, difficulty: str, question: str, type: str = 'multiple_choice',
+                 options: Optional[List[str]] = None, answer: str = '', explanation: str = '', source: str = 'llm'):
         self.topic = topic
         self.difficulty = difficulty  # 'easy', 'medium', 'hard'
         self.question = question
         self.type = type
+        self.options = options or []
+        self.answer = answer
+        self.explanation = explanation
+        self.source = source
 
 # ==========================================
 # 2. 동적 난이도 조절 (CAT) 로직
@@ -79,24 +86,27 @@ GENERATE {count} PROBLEMS NOW.
     return prompt.strip()
 
 # ==========================================
-# 4. LLM 모의 호출 (Mock)
+# 4. 문제 생성 (절차적 생성기 → 템플릿이 없으면 LLM 자리 표시)
 # ==========================================
 
-def call_llm_mock(topic: str, difficulty: str, count: int) -> List[Problem]:
+DIFFICULTY_LEVEL = {'easy': 1, 'medium': 2, 'hard': 3}
+
+def generate_problems(topic: str, difficulty: str, count: int) -> List[Problem]:
     """
-    실제 LLM 호출 대신 더미 문제를 반환하는 함수
+    단원 템플릿이 있으면 server/procedural.py 로 실제 문제(보기/정답/풀이 포함)를 바로 생성.
+    템플릿이 없는 주제는 LLM 으로 만들 자리만 표시 (프롬프트: generate_llm_prompt)
     """
-    # 실제로는 여기서 OpenAI API 등을 호출하여 prompt를 전송하고 응답을 파싱함
-    # prompt = generate_llm_prompt(topic, difficulty, count)
-    
+    if procedural.supports(topic):
+        return [
+            Problem(topic, difficulty, p['question'], options=p['options'], answer=p['answer'],
+                    explanation=p['explanation'], source='procedural')
+            for p in procedural.generate(topic, DIFFICULTY_LEVEL.get(difficulty, 2), count)
+        ]
+
     problems = []
-    scenarios = ["마트에서", "게임 아이템 상점에서", "요리할 때", "친구들과 피자를 나눌 때"]
-    
     for i in range(count):
-        scenario = random.choice(scenarios)
-        question = f"[{topic}] {difficulty.upper()} 난이도: {scenario} 발생하는 수학 문제입니다. ({i+1})"
+        question = f"[{topic}] {difficulty.upper()} 난이도 문제 (LLM 생성 필요) ({i+1})"
         problems.append(Problem(topic, difficulty, question))
-        
     return problems
 
 # ==========================================
@@ -136,7 +146,7 @@ def generate_daily_worksheet(user: UserProfile, total_questions: int = 10) -> Li
             prompt = generate_llm_prompt(topic, diff, 1)
             # print(f"[System] Prompt for Review:\n{prompt}\n") # 디버그용
             
-            generated = call_llm_mock(topic, diff, 1)
+            generated = generate_problems(topic, diff, 1)
             worksheet.extend(generated)
     else:
         # 취약점이 없으면 현행 학습으로 대체
@@ -158,7 +168,7 @@ def generate_daily_worksheet(user: UserProfile, total_questions: int = 10) -> Li
             else:
                 diff = 'hard'
                 
-            generated = call_llm_mock(topic, diff, 1)
+            generated = generate_problems(topic, diff, 1)
             worksheet.extend(generated)
 
     # 5. [도전] 심화 (Challenge)
@@ -168,7 +178,7 @@ def generate_daily_worksheet(user: UserProfile, total_questions: int = 10) -> Li
     
     for _ in range(challenge_count):
         # 도전은 무조건 Hard
-        generated = call_llm_mock(challenge_topic, 'hard', 1)
+        generated = generate_problems(challenge_topic, 'hard', 1)
         worksheet.extend(generated)
 
     return worksheet
@@ -186,7 +196,7 @@ if __name__ == "__main__":
     print("=== User A Worksheet Generation ===")
     worksheet_a = generate_daily_worksheet(user_a)
     for idx, p in enumerate(worksheet_a):
-        print(f"{idx+1}. [{p.topic}] ({p.difficulty.upper()}) {p.question}")
+        print(f"{idx+1}. [{p.topic}] ({p.difficulty.upper()}) {p.question}" + (f"  → {p.answer}" if p.answer else ""))
     
     print("\n" + "="*40 + "\n")
 
@@ -198,4 +208,4 @@ if __name__ == "__main__":
     print("=== User B Worksheet Generation ===")
     worksheet_b = generate_daily_worksheet(user_b)
     for idx, p in enumerate(worksheet_b):
-        print(f"{idx+1}. [{p.topic}] ({p.difficulty.upper()}) {p.question}")
+        print(f"{idx+1}. [{p.topic}] ({p.difficulty.upper()}) {p.question}" + (f"  → {p.answer}" if p.answer else ""))
@@ -1,47 +1,183 @@
 import os
 import subprocess
-import threading
 import webbrowser
 import time
 import sys
+import json
+import urllib.request
+import urllib.error
 
-def run_backend():
-    print("🚀 Starting Backend...")
-    os.chdir("server")
-    subprocess.run(["python", "-m", "uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8000"], shell=True)
+# 준비 상태 확인 주소 (/healthz 는 GPT 를 호출하지 않는 가벼운 엔드포인트)
+BACKEND_HEALTH_URL = "http://127.0.0.1:8000/healthz"
+FRONTEND_URL = "http://127.0.0.1:3000"
+APP_URL = "http://localhost:3000"
 
-def run_frontend():
-    print("🚀 Starting Frontend...")
+POLL_INTERVAL = 0.2
+# 죽은 프로세스 재시작 대기: 1, 2, 4 ... 최대 30초. 이만큼 살아 있었으면 대기 시간 초기화
+RESTART_BACKOFF_MAX = 30.0
+RESTART_RESET_AFTER = 60.0
+
+
+def backend_command(workers=1):
+    if workers > 1:
+        # 운영 모드: 워커 N 개 + 시작 작업 1회 + 워커 공유 캐시 (server/serve.py)
+        return ["python", "-m", "server.serve", "--workers", str(workers), "--port", "8000"], "."
+    return ["python", "-m", "uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8000"], "server"
+
+
+def frontend_command():
     # Using npx next start if built, or next dev
-    subprocess.run(["npx", "next", "dev", "-H", "0.0.0.0", "-p", "3000"], shell=True)
+    return ["npx", "next", "dev", "-H", "0.0.0.0", "-p", "3000"], "."
 
-if __name__ == "__main__":
+
+def probe(url, any_status=False):
+    """
+    준비되었으면 응답 본문(dict 또는 빈 dict), 아니면 None.
+    any_status: 서버가 응답만 하면 준비로 간주 (프론트엔드)
+    """
+    try:
+        with urllib.request.urlopen(url, timeout=2) as res:
+            body = res.read()
+            try:
+                return json.loads(body) if body else {}
+            except ValueError:
+                return {}
+    except urllib.error.HTTPError as e:
+        return {} if any_status and e.code < 500 else None
+    except (urllib.error.URLError, OSError):
+        return None
+
+
+class Child:
+    """
+    감시 대상 프로세스 하나 (죽으면 대기 후 재시작)
+    """
+
+    def __init__(self, name, command, cwd, health_url, any_status=False):
+        self.name = name
+        self.command = command
+        self.cwd = cwd
+        self.health_url = health_url
+        self.any_status = any_status
+        self.proc = None
+        self.started_at = None
+        self.ready_at = None
+        self.health = None
+        self.restarts = 0
+        self.backoff = 1.0
+        self.restart_at = None
+
+    def start(self):
+        print(f"🚀 Starting {self.name}...")
+        # Windows 는 npx/python 을 셸로 찾아야 함
+        self.proc = subprocess.Popen(self.command, cwd=self.cwd, shell=(os.name == "nt"))
+        self.started_at = time.perf_counter()
+        self.ready_at = None
+        self.restart_at = None
+
+    def check_ready(self):
+        if self.ready_at is not None or self.proc is None or self.proc.poll() is not None:
+            return self.ready_at is not None
+        health = probe(self.health_url, self.any_status)
+        if health is None:
+            return False
+        self.ready_at = time.perf_counter()
+        self.health = health
+        print(f"✅ {self.name} ready in {self.ready_at - self.started_at:.2f}s")
+        return True
+
+    def supervise(self):
+        """
+        죽었으면 재시작 예약, 예약 시각이 되면 재시작
+        """
+        now = time.perf_counter()
+        if self.restart_at is not None:
+            if now >= self.restart_at:
+                self.restarts += 1
+                self.start()
+            return
+        code = self.proc.poll()
+        if code is None:
+            return
+        alive = now - self.started_at
+        if alive >= RESTART_RESET_AFTER:
+            self.backoff = 1.0
+        print(f"💥 {self.name} exited with code {code} after {alive:.1f}s — restarting in {self.backoff:.0f}s")
+        self.restart_at = now + self.backoff
+        self.backoff = min(RESTART_BACKOFF_MAX, self.backoff * 2)
+
+    def stop(self):
+        if self.proc is None or self.proc.poll() is not None:
+            return
+        if os.name == "nt":
+            # shell=True 라서 cmd 아래 node/python 까지 같이 종료
+            subprocess.run(["taskkill", "/T", "/F", "/PID", str(self.proc.pid)], capture_output=True)
+            return
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+def report_timings(launched, children, opened_at):
+    print("\n⏱️ Startup timings")
+    for child in children:
+        print(f"   {child.name:<9} ready {child.ready_at - launched:6.2f}s")
+        startup = (child.health or {}).get("startup") or {}
+        if startup:
+            print(f"     └ import {startup.get('import_s')}s, bootstrap {startup.get('bootstrap_s')}s")
+    print(f"   browser   open  {opened_at - launched:6.2f}s")
+
+
+def main():
     print("========================================")
     print("   MathDaily Desktop Launcher")
     print("========================================")
-    
-    # 1. Start Backend in thread
-    backend_thread = threading.Thread(target=run_backend, daemon=True)
-    backend_thread.start()
-    
-    # 2. Wait a bit for backend
-    time.sleep(3)
-    
-    # 3. Start Frontend in thread
-    frontend_thread = threading.Thread(target=run_frontend, daemon=True)
-    frontend_thread.start()
-    
-    # 4. Open Browser
-    print("🌐 Opening browser at http://localhost:3000...")
-    time.sleep(2)
-    webbrowser.open("http://localhost:3000")
-    
-    print("\n[INFO] App is running. Do not close this window.")
-    print("[INFO] Press Ctrl+C to stop.")
-    
+
+    # --workers N (또는 MATHDAILY_WORKERS=N) 이면 멀티 워커로 실행
+    workers = int(os.getenv("MATHDAILY_WORKERS", "1") or 1)
+    if "--workers" in sys.argv:
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+    no_browser = "--no-browser" in sys.argv
+
+    backend_cmd, backend_cwd = backend_command(workers)
+    frontend_cmd, frontend_cwd = frontend_command()
+    children = [
+        Child("Backend", backend_cmd, backend_cwd, BACKEND_HEALTH_URL),
+        Child("Frontend", frontend_cmd, frontend_cwd, FRONTEND_URL, any_status=True),
+    ]
+
+    # 1. 백엔드/프론트엔드 동시에 시작 (고정 대기 없음)
+    launched = time.perf_counter()
+    for child in children:
+        child.start()
+
+    opened = False
     try:
         while True:
-            time.sleep(1)
+            for child in children:
+                child.supervise()
+                child.check_ready()
+
+            # 2. 둘 다 준비되는 순간 브라우저 열기 (한 번만)
+            if not opened and all(child.ready_at is not None for child in children):
+                opened = True
+                if not no_browser:
+                    print(f"🌐 Opening browser at {APP_URL}...")
+                    webbrowser.open(APP_URL)
+                report_timings(launched, children, time.perf_counter())
+                print("\n[INFO] App is running. Do not close this window.")
+                print("[INFO] Press Ctrl+C to stop.")
+
+            time.sleep(POLL_INTERVAL)
     except KeyboardInterrupt:
         print("\n👋 Shutting down...")
-        sys.exit(0)
+    finally:
+        for child in children:
+            child.stop()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
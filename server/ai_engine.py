@@ -1,11 +1,31 @@
 import os
 import json
+import time
 import asyncio
-from typing import List, Dict, Any
+import hashlib
+from typing import List, Dict, Any, Optional, Callable
 from sqlalchemy.orm import Session
 from .models import UserKnowledge, Question, WeaknessLog, User, Chapter, Unit
 from openai import AsyncOpenAI
 import openai # 에러 클래스 사용을 위해
+from .cassette import cassette_mode, wrap_client
+from .ai_service import ModelType
+from .breaker import CircuitOpenError, breaker
+from .chunking import planner
+from .model_router import router
+from .metrics import LLM_RETRIES, LLM_SECONDS, MISSING_SLOTS, WORKSHEETS, track_llm, track_stage
+from .resilience import LatencyTracker, backoff_delay, hedged
+from . import fastjson, weakness
+from .shared_cache import cache as shared_cache, local as local_cache
+from .stream_json import ProblemStreamParser
+from .tracing import event, span
+from .validation import is_repairable, validate_problem
+from .prompts import (
+    CompiledPrompt,
+    TUTOR_SYSTEM_PROMPT,
+    get_prompt,
+    record_usage,
+)
 
 # 환경 변수 로드
 from dotenv import load_dotenv
@@ -13,10 +33,29 @@ load_dotenv()
 
 # 전역 client 제거 후, 함수 내에서 동적 로드 (핫 리로드 지원)
 def get_openai_client():
+    # 재생(replay) 모드: 녹화된 응답만 사용하므로 API 키/네트워크 불필요
+    if cassette_mode() == "replay":
+        return wrap_client(None)
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY 환경 변수가 설정되지 않았습니다. .env 파일을 확인하세요.")
-    return AsyncOpenAI(api_key=api_key)
+    # OPENAI_BASE_URL 지정 시 해당 서버로 요청 (예: 부하 테스트용 스텁 server/llm_stub.py)
+    base_url = os.getenv("OPENAI_BASE_URL") or None
+    # LLM_CASSETTE_MODE=record 이면 응답을 cassette 에 녹화
+    return wrap_client(AsyncOpenAI(api_key=api_key, base_url=base_url))
+
+async def probe_upstream():
+    """
+    완성(completion) 토큰을 쓰지 않는 가벼운 연결 확인 (모델 목록 조회)
+    """
+    client = get_openai_client()
+    models = getattr(client, "models", None)
+    if models is None:
+        # 녹화 재생 클라이언트 등은 업스트림이 없으므로 항상 정상
+        return None
+    return await client.with_options(max_retries=0, timeout=5.0).models.list()
+
+breaker.set_probe(probe_upstream)
 
 async def plan_daily_worksheet(user_id: str, db: Session, total_questions: int = 10, school_level: str = None, grade: int = None) -> List[Dict[str, Any]]:
     # 1. 사용자 정보 및 레벨 확정
@@ -33,14 +72,21 @@ async def plan_daily_worksheet(user_id: str, db: Session, total_questions: int =
         Chapter.grade == grade
     ).all()
 
-    # 단원이 없으면 기본값 (데모용)
-    if not target_units:
-        topics = ["수와 연산", "도형", "측정", "변화와 관계", "데이터와 가능성"]
-    else:
-        import random
-        selected_units = random.sample(target_units, min(3, len(target_units)))
-        topics = [u.name for u in selected_units]
-    
+    return build_daily_plan(pick_topics(target_units), total_questions)
+
+# 단원이 없을 때 쓰는 기본 주제 (데모용)
+DEFAULT_TOPICS = ["수와 연산", "도형", "측정", "변화와 관계", "데이터와 가능성"]
+
+def pick_topics(units: List[Unit]) -> List[str]:
+    """
+    학년 단원 중 최대 3개를 무작위로 골라 (복습, 현행, 도전) 주제로 사용
+    """
+    if not units:
+        return DEFAULT_TOPICS
+    import random
+    return [u.name for u in random.sample(units, min(3, len(units)))]
+
+def build_daily_plan(topics: List[str], total_questions: int = 10) -> List[Dict[str, Any]]:
     plan = []
     
     # 순서대로 주제 배분
@@ -60,150 +106,282 @@ async def plan_daily_worksheet(user_id: str, db: Session, total_questions: int =
         
     return plan
 
+# ── 청크 단위 복원력 설정 ──
+CHUNK_MAX_ATTEMPTS = max(1, int(os.getenv("CHUNK_MAX_ATTEMPTS", "3")))  # 0 이하로 줘도 한 번은 시도
+CHUNK_TIMEOUT = float(os.getenv("CHUNK_TIMEOUT", "60"))
+# 최근 청크 지연의 이 백분위수를 넘기면 헤지 요청 발사 (0 이면 헤지 끔)
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.9"))
+HEDGE_DEFAULT_AFTER = float(os.getenv("HEDGE_DEFAULT_AFTER", "25"))
+HEDGE_MIN_AFTER = 2.0
+
+_chunk_latency = LatencyTracker()
+
+class ChunkGenerationError(Exception):
+    pass
+
+# 검증을 통과한 문제를 (문제, 해당 계획 항목) 으로 하나씩 받는 콜백 (예: 즉시 DB 저장)
+ProblemCallback = Callable[[Dict[str, Any], Dict[str, Any]], None]
+
 async def generate_problems_with_gpt(plan: List[Dict[str, Any]], school_level: str = "elementary", grade: int = 3) -> List[Dict[str, Any]]:
-    # 학년 설명 동적 생성
-    if school_level == "elementary":
-        user_grade_level = f"초등학교 {grade}학년"
-        level_desc = "기초 연산, 도형의 기초, 분수/소수"
-    elif school_level == "middle":
-        user_grade_level = f"중학교 {grade}학년"
-        level_desc = "방정식, 함수, 기하, 확률"
-    elif school_level == "high":
-        # 고등학교 학년별 상세 교육과정 반영
-        if grade == 1:
-            user_grade_level = "고등학교 1학년 (공통수학1, 2)"
-            level_desc = "다항식, 방정식과 부등식, 도형의 방정식, 집합과 명제, 함수, 경우의 수"
-        elif grade == 2:
-            user_grade_level = "고등학교 2학년 (수학I, 수학II)"
-            level_desc = "지수함수와 로그함수, 삼각함수, 수열, 함수의 극한과 연속, 미분, 적분"
-        elif grade == 3:
-            user_grade_level = "고등학교 3학년 (미적분/확통/기하)"
-            level_desc = "수능 연계 심화 문제, 미적분, 확률과 통계, 공간도형"
-        else:
-            user_grade_level = f"고등학교 {grade}학년"
-            level_desc = "고등 심화 수학"
-    else:
-        user_grade_level = "학년 미상"
-        level_desc = "일반 상식 수학"
-
-    system_prompt = f"""
-당신은 대한민국 '최상위권 수학' 전문 출제 위원입니다.
-현재 대상 학년은 **[{user_grade_level}]** 입니다.
-주요 토픽 예시: {level_desc}
-
-단순 연산이나 너무 쉬운 문제는 **절대 출제하지 마세요.**
-학생이 문제를 읽고 **논리적으로 추론(Reasoning)하고, 조건을 분석해야만** 풀 수 있는 고품질 문제를 만들어야 합니다.
-
-[대상 학년: {user_grade_level}]
-- 해당 학년의 교과 과정을 철저히 준수하세요.
-- 고등학생에게 초등 수준의 덧셈/뺄셈 문제를 내면 **해고**됩니다.
-- 유치한 문제는 🚫절대 금지🚫입니다.
-
-[출제 지침]
-1. **복합 사고력(Multi-step Reasoning)**: 한 번의 계산으로 끝나는 문제가 아니라, 2단계 이상의 사고가 필요한 문제를 내세요.
-2. **실생활 응용 & 문해력**: 텍스트를 읽고 식을 세우는 능력을 평가하세요.
-3. **오답 유도(Distractors)**: 보기는 단순한 숫자의 나열이 아니라, 학생이 흔히 범하는 실수(계산 실수, 조건 누락)를 반영한 매력적인 오답으로 구성하세요.
-4. **상세한 해설(Step-by-Step Explanation)**: 해설(`explanation`)은 단순히 정답을 알려주는 것이 아니라, 어떤 개념을 사용해야 하는지부터 시작하여 정답을 도출하는 논리적 단계를 1, 2, 3단계로 나누어 구체적으로 작성하세요. 학생이 교사와 함께 공부하는 느낌을 받도록 친절하게 서술하세요.
-5. **객관식 4지선다**: 모든 문제는 반드시 4개의 보기(`options`)를 포함해야 합니다. 정답 1개 + 오답 3개로 구성하세요.
-
-[수학 기호 규칙 (절대 준수)]
-- **거듭제곱**: `^` 기호를 절대 사용하지 마세요. 반드시 유니코드 상첨자를 사용하세요: ² ³ ⁴ ⁵ ⁶ ⁷ ⁸ ⁹
-  - 예시: x² (O), x^2 (X), 2³ (O), 2^3 (X)
-- **곱셈**: `*` 대신 `×` 를 사용하세요.
-- **나눗셈**: `/` 대신 `÷` 를 사용할 수 있습니다 (분수 표현 제외).
-- 문제, 보기, 정답, 해설 모든 필드에 동일하게 유니코드 기호를 적용하세요.
-
-[SVG 생성 지침 (절대 준수)]
-1. **모든 도형, 기하 문제**는 반드시 `svg` 필드에 시각 자료 코드를 포함해야 합니다. (선택 아님)
-   - `<svg viewBox="0 0 300 250" ...>` 태그로 시작하고 닫아야 합니다.
-   - 배경색은 투명, 선 색은 검정(#000) 또는 파랑(#3b82f6) 등을 사용하세요.
-2. 기하 문제가 아니어서 그림이 필요 없다면 `svg`: "" (빈 문자열)로 남기세요.
-3. "삼각형", "사각형", "원", "그래프", "함수" 등의 단어가 문제에 나오면 무조건 그리세요.
-
-[JSON 형식]
-{{
-  "problems": [
-    {{
-      "topic": "주제",
-      "difficulty": 1,
-      "type": "drill",
-      "question": "문제 지문",
-      "svg": "<svg ...>...</svg>", 
-      "options": ["오답", "오답", "정답", "오답"],
-      "answer": "정답",
-      "explanation": "해설"
-    }}
-  ]
-}}
-"""
-    
-    import asyncio
-    
-    # 10개 이상이면 끊어서 요청 (안정성 확보 및 속도 향상)
-    # 3개씩 병렬로 요청하면 훨씬 빠름
-    chunk_size = 3
-    if len(plan) > chunk_size:
-        print(f"⚠️ Splitting request into chunks of {chunk_size} (Parallel)...")
-        chunks = [plan[i:i + chunk_size] for i in range(0, len(plan), chunk_size)]
-        
-        # 각 청크에 대해 재귀 호출 (병렬 실행)
-        # 중요: 재귀 호출 시에도 school_level, grade 정보를 전달해야 함
-        tasks = [generate_problems_with_gpt(chunk, school_level, grade) for chunk in chunks]
+    result = await generate_problems_detailed(plan, school_level, grade)
+    return result["problems"]
+
+async def generate_problems_detailed(plan: List[Dict[str, Any]], school_level: str = "elementary", grade: int = 3, on_problem: Optional[ProblemCallback] = None) -> Dict[str, Any]:
+    """
+    청크별 재시도/헤지 후 생성된 문제와 끝내 채우지 못한 계획 항목(missing)을 함께 반환.
+    일부 청크가 실패해도 나머지 결과는 버리지 않는다.
+    on_problem 을 주면 검증을 통과한 문제가 스트림에서 완성되는 즉시 하나씩 넘겨준다.
+    """
+    # 업스트림 장애로 브레이커가 열려 있으면 청크를 만들지 않고 바로 실패 (호출한 쪽이 은행으로 대체)
+    if breaker.is_open():
+        raise CircuitOpenError("LLM circuit is open")
+
+    # 학년별 시스템 프롬프트는 레지스트리에서 미리 컴파일된 것을 재사용 (프리픽스 캐시 적중)
+    prompt = get_prompt("generate", school_level, grade)
+
+    # 청크 수는 최근 관측된 (청크 크기 → 지연) 모델과 레이트리밋 여유로 결정
+    chunk_plan = planner.choose(plan, school_level, grade)
+    chunks = planner.split(plan, chunk_plan["chunks"])
+    plan_key = chunk_plan["key"]
+
+    with span("generate_problems", problems=len(plan), chunks=len(chunks), chunk_size=chunk_plan["size"],
+              expected_seconds=round(chunk_plan["expected_seconds"], 3), school_level=school_level, grade=grade):
+        tasks = [_generate_chunk(chunk, prompt, school_level, grade, idx, plan_key, on_problem) for idx, chunk in enumerate(chunks)]
         results = await asyncio.gather(*tasks)
-        
-        final_problems = []
-        for res in results:
-            final_problems.extend(res)
-        return final_problems
-
-    # --- 분할 요청 처리 ---
-    # 해설 퀄리티 강화 지침 추가
-    system_prompt = system_prompt + "\n[해설 지침] 모든 문제의 해설(explanation)은 정답에 이르는 과정을 단계별(Step-by-step)로 상세하게 설명하세요. 단순히 수식만 나열하지 말고, 어떤 개념이 적용되었는지와 풀이의 논리적 흐름을 초심자도 이해할 수 있도록 친절하고 구체적으로 작성해야 합니다."
-    
-    user_prompt = f"다음 계획에 맞춰 총 {len(plan)}개의 수학 문제를 생성해줘:\n{json.dumps(plan, ensure_ascii=False, indent=2)}"
 
-    try:
-        print(f"🚀 Calling GPT-4o-mini for {len(plan)} problems (Batch)...")
-        
-        # 동적 Client 생성
-        client = get_openai_client()
-        
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.6, # 창의성 조금 줄여서 속도/안정성 향상
-            timeout=60.0 # 60초 내에 안 오면 끊음 (3개니까 충분)
-        )
-        content = response.choices[0].message.content
-        print(f"✅ GPT Response Length: {len(content)}")
-        
-        # 마크다운 코드 블록 제거 (```json ... ```)
-        cleaned_content = content.replace("```json", "").replace("```", "").strip()
+    final_problems = []
+    missing = []
+    errors = []
+    for problems, chunk_missing, error in results:
+        final_problems.extend(problems)
+        missing.extend(chunk_missing)
+        if error is not None:
+            errors.append(error)
+
+    if missing:
+        MISSING_SLOTS.inc(len(missing))
+    WORKSHEETS.inc(outcome="failed" if not final_problems else ("partial" if missing else "complete"))
+
+    # 전부 실패했고 원인이 쿼터/인증이면 그대로 올려서 429/401 로 응답하게 함
+    if not final_problems:
+        for error in errors:
+            if isinstance(error, (openai.RateLimitError, openai.AuthenticationError, CircuitOpenError)):
+                raise error
+
+    return {"problems": final_problems, "missing": missing}
 
+async def _generate_chunk(plan: List[Dict[str, Any]], prompt: CompiledPrompt, school_level: str, grade: int, chunk_index: int = 0, plan_key=None, on_problem: Optional[ProblemCallback] = None):
+    """
+    한 청크를 최대 CHUNK_MAX_ATTEMPTS 번 시도. 재시도 때는 아직 못 채운 항목만 다시 요청.
+    스트림에서 이미 넘겨준 문제는 시도가 실패해도 채운 것으로 기록 → 재시도에서 다시 요청/저장하지 않음.
+    반환: (문제 목록, 남은 계획 항목, 마지막 오류)
+    """
+    filled: Dict[int, Dict[str, Any]] = {}      # 계획 위치 → 문제 (시도 사이에 유지)
+    remaining = list(range(len(plan)))
+    last_error: Optional[BaseException] = None
+
+    with span("generate_chunk", chunk=chunk_index, problems=len(plan)) as chunk_span:
+        for attempt in range(CHUNK_MAX_ATTEMPTS):
+            if attempt > 0:
+                LLM_RETRIES.inc(task="generate_chunk")
+                delay = backoff_delay(attempt - 1, error=last_error)
+                event("chunk_retry", attempt=attempt, delay=round(delay, 3), error=type(last_error).__name__ if last_error else "short")
+                await asyncio.sleep(delay)
+
+            slots = remaining
+
+            def on_slot(i: int, p: Dict[str, Any], slots=slots):
+                k = slots[i]
+                if k in filled:
+                    return
+                filled[k] = p
+                if on_problem is not None:
+                    on_problem(p, plan[k])
+
+            try:
+                await _route_chunk([plan[k] for k in slots], prompt, school_level, grade, plan_key, on_slot)
+            except openai.AuthenticationError:
+                raise
+            except CircuitOpenError as e:
+                # 브레이커가 열렸으면 재시도 대기 없이 바로 포기
+                last_error = e
+                break
+            except Exception as e:
+                if isinstance(e, openai.RateLimitError):
+                    planner.note_rate_limited()
+                last_error = e
+                print(f"❌ Chunk {chunk_index} attempt {attempt + 1} failed: {type(e).__name__}: {e}")
+                continue
+            finally:
+                remaining = [k for k in slots if k not in filled]
+
+            if not remaining:
+                last_error = None
+                break
+
+        if chunk_span is not None:
+            chunk_span.set(returned=len(filled), missing=len(remaining), attempts=attempt + 1)
+    problems = [filled[k] for k in sorted(filled)]
+    return problems, [plan[k] for k in remaining], last_error
+
+async def _route_chunk(items: List[Dict[str, Any]], prompt: CompiledPrompt, school_level: str, grade: int, plan_key=None, on_slot: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> List[Optional[Dict[str, Any]]]:
+    """
+    모델 캐스케이드: 빠른 모델 결과 중 로컬 검증에 실패한 문제만 상위 모델로 다시 요청.
+    스트림에서 문제가 하나 완성될 때마다 바로 검증 → SVG 보정 → on_slot(items 위치, 문제) 호출.
+    반환 리스트는 items 와 같은 순서이며, 끝내 못 채운 자리는 None.
+    """
+    difficulty = max((int(item.get("difficulty", 2) or 2) for item in items), default=2)
+    cascade = router.cascade("generate", difficulty)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    pending = list(range(len(items)))
+    last_error: Optional[BaseException] = None
+
+    for level, model in enumerate(cascade):
+        is_last = level == len(cascade) - 1
+        sub = list(pending)
+        seen = set()
+        escalate = set()
+        tally = {"accepted": 0, "rejected": 0}
+
+        def handle(j: int, p: Any, model=model, is_last=is_last, sub=sub, seen=seen, escalate=escalate, tally=tally):
+            # 헤지로 같은 요청이 두 번 가면 먼저 도착한 결과만 사용
+            if j >= len(sub) or j in seen:
+                return
+            seen.add(j)
+            i = sub[j]
+            if results[i] is not None:
+                return
+            issues = validate_problem(p, items[i])
+            # 시각 자료 필수 항목의 SVG 문제는 상위 모델로, 마지막 모델이면 대체 SVG 로 보정
+            if not issues or is_repairable(issues, None if is_last else items[i]):
+                _repair_svg(p)
+                results[i] = p
+                tally["accepted"] += 1
+                if on_slot is not None:
+                    on_slot(i, p)
+            elif is_last:
+                tally["rejected"] += 1
+                event("cascade_reject", model=model.value, issues=",".join(issues))
+            else:
+                escalate.add(i)
+                event("cascade_escalate", model=model.value, reason=",".join(issues))
+
+        hedge_after = None
+        if HEDGE_PERCENTILE > 0:
+            # 첫 단계는 청크 지연 기록, 에스컬레이션 단계는 해당 모델의 지연 기록 기준
+            if level == 0:
+                hedge_after = _chunk_latency.percentile(HEDGE_PERCENTILE, HEDGE_DEFAULT_AFTER)
+            else:
+                hedge_after = router.expected_latency("generate", model, HEDGE_PERCENTILE)
+            hedge_after = max(HEDGE_MIN_AFTER, hedge_after)
         try:
-            data = json.loads(cleaned_content)
-            problems = data.get("problems", [])
-            
-            for p in problems:
-                # SVG가 없거나 빈 경우, 백엔드에서 강제 생성
-                if "svg" not in p or not p["svg"].strip():
-                    print(f"⚠️ Problem '{p.get('topic')}' missing SVG. Generating fallback...")
-                    p["svg"] = generate_fallback_svg(p.get("topic", ""), p.get("question", ""))
-                else:
-                    print(f"✅ SVG found for '{p.get('topic')}'")
-
-            return problems
-        except json.JSONDecodeError:
-             print(f"❌ JSON Decode Error. Raw content: {content[:200]}...")
-             return []
+            await hedged(
+                lambda: _call_chunk([items[i] for i in sub], prompt, school_level, grade, plan_key if level == 0 else None, model, handle),
+                hedge_after, task="generate_chunk",
+            )
+        except ChunkGenerationError as e:
+            # JSON 자체가 깨진 경우 → 청크 전체를 다음 모델로
+            last_error = e
+            router.record_outcome("generate", difficulty, model, escalated=0 if is_last else len(sub), rejected=len(sub) if is_last else 0)
+            event("cascade_escalate", model=model.value, reason="bad_json", problems=len(sub))
+            continue
+
+        # 스트림이 중간에 끊겨서 못 받은 자리는 None 으로 남겨 재시도 루프에서 다시 요청
+        pending = sorted(i for i in escalate if results[i] is None)
+        router.record_outcome("generate", difficulty, model, accepted=tally["accepted"], escalated=len(pending), rejected=tally["rejected"])
+        if not pending:
+            break
+
+    if last_error is not None and all(p is None for p in results):
+        raise last_error
+    return results
+
+def _repair_svg(p: Dict[str, Any]):
+    # SVG가 없거나 깨진 경우, 백엔드에서 강제 생성
+    svg = p.get("svg") or ""
+    if not isinstance(svg, str) or not svg.strip() or "<svg" not in svg:
+        with span("svg_fallback", topic=p.get("topic", "")), track_stage("svg_fallback"):
+            p["svg"] = generate_fallback_svg(p.get("topic", ""), p.get("question", ""))
+    else:
+        event("svg_found", topic=p.get("topic", ""))
 
-    except Exception as e:
-        print(f"❌ Error generating problems: {e}")
-        return []
+async def _call_chunk(plan: List[Dict[str, Any]], prompt: CompiledPrompt, school_level: str, grade: int, plan_key=None, model: ModelType = ModelType.FAST, on_item: Optional[Callable[[int, Any], None]] = None) -> List[Any]:
+    """
+    단일 시도 (스트리밍). 배열 안의 문제 객체가 닫힐 때마다 on_item(위치, 문제) 호출.
+    실패(타임아웃, API 오류, 완성된 문제가 하나도 없음)는 예외로 올린다.
+    뒤쪽이 잘리거나 깨져도 이미 완성된 문제는 그대로 반환 (깨진 객체 자리는 None).
+    """
+    user_prompt = f"다음 계획에 맞춰 총 {len(plan)}개의 수학 문제를 생성해줘:\n{json.dumps(plan, ensure_ascii=False, indent=2)}"
+
+    # 동적 Client 생성 (재시도는 여기서 직접 하므로 SDK 자체 재시도는 끔)
+    client = get_openai_client().with_options(max_retries=0)
+
+    parser = ProblemStreamParser()
+    problems: List[Any] = []
+    usage = None
+    chars = 0
+
+    def emit(p: Any):
+        idx = len(problems)
+        if isinstance(p, dict) and idx < len(plan):
+            p["model"] = model.value
+        problems.append(p)
+        if p is None:
+            return
+        LLM_SECONDS.observe(time.perf_counter() - start, task="generate_problem", model=model.value)
+        if on_item is not None:
+            on_item(idx, p)
+
+    start = time.perf_counter()
+    planner.acquire()
+    try:
+        with span("llm_call", model=model.value) as llm_span, breaker.guard(), track_llm("generate_chunk", model.value):
+            stream = await client.chat.completions.create(
+                model=model.value,
+                messages=[
+                    prompt.system_message(),
+                    {"role": "user", "content": user_prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.6, # 창의성 조금 줄여서 속도/안정성 향상
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=CHUNK_TIMEOUT
+            )
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if not text:
+                    continue
+                chars += len(text)
+                with track_stage("json_parse"):
+                    finished = parser.feed(text)
+                for p in finished:
+                    emit(p)
+            cached_tokens = record_usage(prompt, usage)
+            if llm_span is not None:
+                llm_span.set(response_chars=chars, cached_tokens=cached_tokens, problems=parser.count, truncated=parser.truncated)
+    finally:
+        planner.release()
+    latency = time.perf_counter() - start
+    router.record_call("generate", model, latency, usage)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    planner.spend(prompt_tokens + completion_tokens)
+    if plan_key is not None:
+        _chunk_latency.add(latency)
+        planner.observe(plan_key, len(plan), latency, completion_tokens, prompt_tokens)
+
+    if not any(p is not None for p in problems):
+        raise ChunkGenerationError(f"No complete problem in response ({chars} chars, {parser.errors} malformed)")
+    if parser.truncated or parser.errors:
+        event("stream_truncated", problems=parser.count, malformed=parser.errors)
+        print(f"⚠️ Truncated/malformed stream: kept {parser.count - parser.errors} complete problems ({len(plan)} requested)")
+
+    return problems
 
 def generate_fallback_svg(topic: str, question: str) -> str:
     """
@@ -343,30 +521,40 @@ async def adjust_difficulty_level(user_id: str, accuracy: float, db: Session) ->
         "message": message
     }
 
+ANALYSIS_CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL", "604800"))
+
+
+async def _cache_get(ns: str, key: str) -> Optional[Any]:
+    # 공유 캐시가 꺼져 있으면(단일 프로세스) 프로세스 안 캐시 → 브레이커가 열려도 같은 입력은 캐시로 응답
+    if shared_cache.enabled:
+        return await shared_cache.aget(ns, key)
+    return local_cache.get(ns, key)
+
+
+async def _cache_set(ns: str, key: str, value: Any, ttl: float):
+    if shared_cache.enabled:
+        await shared_cache.aset(ns, key, value, ttl)
+    else:
+        local_cache.set(ns, key, value, ttl)
+
+
 async def analyze_error(user_id: str, problem_id: str, user_answer: str, correct_answer: str, question_text: str, db: Session):
-    prompt = f"""
-    학생이 수학 문제를 틀렸습니다.
+    prompt = get_prompt("analyze")
+    user_message = f"""
     문제: {question_text}
     정답: {correct_answer}
     학생 답: {user_answer}
-
-    이 오답의 원인을 분석해주세요. (단순 계산 실수, 개념 부족, 문제 해석 오류 등)
-    그리고 학생에게 줄 맞춤형 조언을 한 문장으로 작성해주세요.
-    응답은 JSON 형식으로 주세요: {{"error_type": "...", "reasoning": "...", "advice": "..."}}
     """
     
+    # 같은 문제/같은 오답 분석은 워커 간 공유 (브레이커가 열려 있을 때도 캐시된 분석은 제공)
+    cache_key = hashlib.sha1(f"{prompt.fingerprint}\n{user_message}".encode("utf-8")).hexdigest()
     try:
-        # 동적 Client 생성
-        client = get_openai_client()
-        
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            timeout=60.0
-        )
-        content = response.choices[0].message.content
-        analysis = json.loads(content)
+        analysis = await _cache_get("analysis", cache_key)
+        if analysis is None:
+            if breaker.is_open():
+                return {"error": "Analysis temporarily unavailable", "degraded": True}
+            analysis = await _analyze_with_cascade(prompt, user_message)
+            await _cache_set("analysis", cache_key, analysis, ANALYSIS_CACHE_TTL)
         
         log = WeaknessLog(
             id=f"log-{os.urandom(4).hex()}",
@@ -379,7 +567,10 @@ async def analyze_error(user_id: str, problem_id: str, user_answer: str, correct
             severity=3
         )
         db.add(log)
-        db.commit()
+        # 사용자 × 단원 × 유형 취약점 색인도 같은 트랜잭션에서 갱신
+        weakness.record(db, user_id, problem_id, log.error_type, log.severity, advice=log.ai_advice)
+        with track_stage("db_commit"):
+            db.commit()
         
         return analysis
     except Exception as e:
@@ -387,30 +578,82 @@ async def analyze_error(user_id: str, problem_id: str, user_answer: str, correct
         return {"error": "Analysis failed"}
 
 
-async def rewrite_problem(original_text: str) -> str:
-    prompt = f"""
-    다음 수학 문제를 '초등학생이 이해하기 쉬운 문장'으로 바꿔주세요.
-    수치는 절대 바꾸지 마세요. 문체만 친절하게 바꾸세요.
-    
-    문제: {original_text}
+async def _analyze_with_cascade(prompt: CompiledPrompt, user_message: str) -> Dict[str, Any]:
+    """
+    FAST 모델 분석이 JSON 이 아니거나 error_type/advice 가 비면 다음 모델로 재요청
     """
+    # 동적 Client 생성
+    client = get_openai_client()
+    cascade = router.cascade("analyze")
+    last_error: Optional[BaseException] = None
+
+    for level, model in enumerate(cascade):
+        is_last = level == len(cascade) - 1
+        start = time.perf_counter()
+        with breaker.guard(), track_llm("analyze", model.value):
+            response = await client.chat.completions.create(
+                model=model.value,
+                messages=[
+                    prompt.system_message(),
+                    {"role": "user", "content": user_message}
+                ],
+                response_format={"type": "json_object"},
+                timeout=60.0
+            )
+        usage = getattr(response, "usage", None)
+        record_usage(prompt, usage)
+        router.record_call("analyze", model, time.perf_counter() - start, usage)
+
+        try:
+            analysis = fastjson.loads(response.choices[0].message.content or "")
+        except fastjson.JSONDecodeError as e:
+            analysis, last_error = None, e
+        if isinstance(analysis, dict) and analysis.get("error_type") and analysis.get("advice"):
+            router.record_outcome("analyze", 2, model, accepted=1)
+            return analysis
+
+        router.record_outcome("analyze", 2, model, escalated=0 if is_last else 1, rejected=1 if is_last else 0)
+        event("cascade_escalate", model=model.value, reason="bad_analysis")
+        # 마지막 모델의 불완전한 분석이라도 dict 면 그대로 사용 (기본값으로 채워 저장)
+        if is_last and isinstance(analysis, dict):
+            return analysis
+
+    raise last_error or ValueError("Analysis failed")
+
+
+# 같은 지문 재작성 결과는 워커 간 공유 (프롬프트 지문이 바뀌면 키도 바뀜)
+REWRITE_CACHE_TTL = float(os.getenv("REWRITE_CACHE_TTL", "86400"))
+
+async def rewrite_problem(original_text: str) -> str:
+    prompt = get_prompt("rewrite")
+    cache_key = hashlib.sha1(f"{prompt.fingerprint}\n{original_text}".encode("utf-8")).hexdigest()
+    cached = await _cache_get("rewrite", cache_key)
+    if cached is not None:
+        return cached
+    if breaker.is_open():
+        return original_text
     try:
         # 동적 Client 생성
         client = get_openai_client()
         
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            timeout=30.0
-        )
-        return response.choices[0].message.content
+        model = router.cascade("rewrite")[0]
+        start = time.perf_counter()
+        with breaker.guard(), track_llm("rewrite", model.value):
+            response = await client.chat.completions.create(
+                model=model.value,
+                messages=[
+                    prompt.system_message(),
+                    {"role": "user", "content": f"문제: {original_text}"}
+                ],
+                timeout=30.0
+            )
+        usage = getattr(response, "usage", None)
+        record_usage(prompt, usage)
+        router.record_call("rewrite", model, time.perf_counter() - start, usage)
+        rewritten = response.choices[0].message.content
+        if rewritten:
+            await _cache_set("rewrite", cache_key, rewritten, REWRITE_CACHE_TTL)
+        return rewritten
     except Exception as e:
         print(f"Rewrite failed: {e}")
         return original_text
-
-TUTOR_SYSTEM_PROMPT = """
-당신은 친절하고 지혜로운 AI 수학 선생님입니다.
-학생이 모르는 것을 물어볼 때, 정답을 바로 알려주지 말고 소크라테스 문답법으로 스스로 깨우치도록 유도하세요.
-설명은 쉽고 간결하게, 이모지를 적절히 사용하여 친근하게 대화하세요.
-수식은 LaTeX 형식($...$)을 사용하세요.
-"""
@@ -1,14 +1,19 @@
 import os
 import json
+import asyncio
+import uuid
 from enum import Enum
-from typing import Optional, Dict, Any
-from openai import OpenAI
+from typing import Optional, Dict, Any, List, Tuple
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Boolean, text
+from sqlalchemy import create_engine, func, Column, String, Integer, DateTime, Boolean, UniqueConstraint, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 
+from . import fastjson
+from .breaker import CircuitOpenError, breaker
+
 # 환경 변수 로드 (.env 파일 필요)
 load_dotenv()
 
@@ -23,6 +28,8 @@ Base = declarative_base()
 
 class WeaknessLog(Base):
     __tablename__ = 'WeaknessLog'
+    # 같은 학생의 같은 단원/오류 유형은 한 행 (다시 틀리면 repeatCount 증가)
+    __table_args__ = (UniqueConstraint('userId', 'topic', 'errorType', name='WeaknessLog_userId_topic_errorType_key'),)
 
     id = Column(String, primary_key=True)  # CUID or UUID
     userId = Column(String, nullable=False)
@@ -37,10 +44,21 @@ class WeaknessLog(Base):
     createdAt = Column(DateTime, default=datetime.utcnow)
     updatedAt = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class WeaknessLogResponse(Base):
+    # 이미 반영한 응답 ID (WeaknessLog.responseId 는 행마다 마지막 응답만 남으므로 재전송 판별용으로 따로 보관)
+    __tablename__ = 'WeaknessLogResponse'
+
+    responseId = Column(String, primary_key=True)
+    userId = Column(String, nullable=False)
+    createdAt = Column(DateTime, default=datetime.utcnow)
+
 # DB 세션 생성기
 engine = create_engine(DATABASE_URL) if DATABASE_URL else None
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) if engine else None
 
+# 동시에 보내는 분석 요청 수 (OpenAI 분당 한도 안에서)
+ANALYZE_CONCURRENCY = int(os.getenv("ANALYZE_CONCURRENCY", "8"))
+
 
 # ==========================================
 # 2. OpenAI Service 클래스
@@ -51,13 +69,27 @@ class ModelType(Enum):
     SMART = "gpt-4o"          # 더 똑똑함
     REASONING = "o1-preview"  # 복잡한 수학 추론
 
+
+# 분석 실패 시 기본값 (저장하지 않음)
+FALLBACK_ERROR_TYPE = "기타"
+
+
+def normalize_error_type(value: Any) -> str:
+    """
+    "[계산 실수]", " 계산 실수 " → "계산 실수" (같은 유형이 다른 행으로 쌓이지 않도록)
+    """
+    text_value = str(value or "").strip().strip("[]").strip()
+    return text_value or FALLBACK_ERROR_TYPE
+
+
 class OpenAIService:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, concurrency: int = ANALYZE_CONCURRENCY):
         if not api_key:
             api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key)
+        self.client = AsyncOpenAI(api_key=api_key)
+        self.concurrency = concurrency
 
-    def analyze_wrong_answer(
+    async def analyze_wrong_answer(
         self, 
         question: str, 
         correct_answer: str, 
@@ -117,79 +149,255 @@ class OpenAIService:
             # o1 모델의 경우 max_tokens가 아니라 max_completion_tokens 등을 사용해야 함
             # 여기서는 gpt-4o를 기본으로 가정
             
-            response = self.client.chat.completions.create(
-                model=model.value,
-                messages=messages,
-                temperature=0.2, # 분석은 엄밀하게
-                response_format={"type": "json_object"}
-            )
+            with breaker.guard():
+                response = await self.client.chat.completions.create(
+                    model=model.value,
+                    messages=messages,
+                    temperature=0.2, # 분석은 엄밀하게
+                    response_format={"type": "json_object"}
+                )
 
             content = response.choices[0].message.content
-            return json.loads(content)
+            return fastjson.loads(content)
 
         except Exception as e:
-            print(f"OpenAI API Error: {e}")
+            if not isinstance(e, CircuitOpenError):
+                print(f"OpenAI API Error: {e}")
             # 에러 발생 시 기본값 반환
             return {
-                "error_type": "기타",
+                "error_type": FALLBACK_ERROR_TYPE,
                 "reasoning": f"분석 중 오류 발생: {str(e)}",
                 "feedback": "다시 한 번 풀어보세요.",
-                "severity": 1
+                "severity": 1,
+                "failed": True,
             }
 
+    async def analyze_many(self, items: List[Dict[str, Any]], model: ModelType = ModelType.FAST) -> List[Dict[str, Any]]:
+        """
+        오답 여러 개를 동시에 분석 (동시 요청 수는 concurrency 이하). 결과 순서는 입력 순서.
+        item: {"userId", "responseId", "topic", "question", "correctAnswer", "userAnswer"}
+        """
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+
+        async def one(item):
+            async with semaphore:
+                return await self.analyze_wrong_answer(
+                    item["question"], item["correctAnswer"], item["userAnswer"], item["topic"], model
+                )
+
+        return await asyncio.gather(*(one(item) for item in items))
+
+    async def analyze_and_save(self, items: List[Dict[str, Any]], model: ModelType = ModelType.FAST) -> Dict[str, int]:
+        """
+        분석 후 한 번의 upsert 로 저장. 분석에 실패한 항목은 저장하지 않는다.
+        """
+        results = await self.analyze_many(items, model)
+        records = [
+            {"userId": item["userId"], "responseId": item["responseId"], "topic": item["topic"],
+             "subtopic": item.get("subtopic"), "analysis": result}
+            for item, result in zip(items, results) if not result.get("failed")
+        ]
+        # DB 드라이버는 동기 → 이벤트 루프를 막지 않도록 스레드에서
+        saved = await asyncio.to_thread(save_analyses, records)
+        return {"analyzed": len(items), "failed": len(items) - len(records), "saved": saved}
+
     # ==========================================
     # 3. DB 저장 로직
     # ==========================================
     
     def save_analysis_to_db(self, user_id: str, response_id: str, analysis_result: Dict[str, Any], topic: str):
         """
-        분석 결과를 WeaknessLog 테이블에 저장
+        분석 결과 하나를 WeaknessLog 에 저장 (save_analyses 참고)
         """
-        if not SessionLocal:
-            print("DB connection not configured.")
-            return
+        save_analyses([{"userId": user_id, "responseId": response_id, "topic": topic, "analysis": analysis_result}])
 
-        session = SessionLocal()
+
+def _collapse(records: List[Dict[str, Any]], now: datetime) -> List[Dict[str, Any]]:
+    """
+    배치 안에서 (userId, topic, errorType) 별로 합침. 같은 responseId 는 한 번만 센다.
+    """
+    rows: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+    seen = set()
+    for r in records:
+        if r["responseId"] in seen:
+            continue
+        seen.add(r["responseId"])
+        analysis = r.get("analysis") or {}
+        key = (r["userId"], r["topic"], normalize_error_type(analysis.get("error_type")))
         try:
-            # ID 생성 로직 필요 (여기선 임시로 response_id + _log)
-            # 실제로는 CUID 라이브러리 등을 사용 권장
-            import uuid
-            new_id = str(uuid.uuid4())
-
-            weakness_log = WeaknessLog(
-                id=new_id,
-                userId=user_id,
-                responseId=response_id,
-                errorType=analysis_result.get("error_type", "기타"),
-                topic=topic,
-                severity=analysis_result.get("severity", 1),
-                description=analysis_result.get("feedback", ""),
-                isResolved=False,
-                repeatCount=1
-            )
-            
-            session.add(weakness_log)
+            severity = int(analysis.get("severity", 1))
+        except (TypeError, ValueError):
+            severity = 1
+        row = rows.get(key)
+        if row is None:
+            rows[key] = {
+                "id": str(uuid.uuid4()), "userId": key[0], "topic": key[1], "errorType": key[2],
+                "responseId": r["responseId"], "subtopic": r.get("subtopic"), "severity": severity,
+                "description": analysis.get("feedback", ""), "isResolved": False, "repeatCount": 1,
+                "createdAt": now, "updatedAt": now,
+            }
+            continue
+        # 나중 응답의 조언/응답 ID 를 남기고, 심각도는 큰 쪽
+        row["repeatCount"] += 1
+        row["responseId"] = r["responseId"]
+        row["description"] = analysis.get("feedback", row["description"])
+        row["severity"] = max(row["severity"], severity)
+    return list(rows.values())
+
+
+def save_analyses(records: List[Dict[str, Any]], session_factory=None) -> int:
+    """
+    분석 결과를 WeaknessLog 에 한 번에 upsert.
+    (userId, topic, errorType) 행이 이미 있으면 repeatCount 를 더하고 updatedAt/조언/응답 ID 를 갱신, 심각도는 큰 쪽,
+    다시 틀렸으므로 isResolved 는 False 로. 저장한 (합쳐진) 행 수를 반환.
+    반영한 responseId 는 WeaknessLogResponse 에 남겨서 같은 응답이 다시 오면 (예전 응답이라도) 건너뜀.
+    DB 오류는 그대로 올린다.
+    record: {"userId", "responseId", "topic", "subtopic"?, "analysis": {...}}
+    """
+    session_factory = session_factory or SessionLocal
+    if not session_factory:
+        print("DB connection not configured.")
+        return 0
+    table = WeaknessLog.__table__
+    session = session_factory()
+    try:
+        _prepare(session.get_bind())
+        now = datetime.utcnow()
+        dialect = session.get_bind().dialect.name
+        # 응답 ID 를 먼저 선점 → 이미 반영한 응답(예전 것 포함)과 동시에 들어온 같은 응답은 한 번만 센다.
+        # 같은 트랜잭션이라 upsert 가 실패하면 선점도 되돌아간다
+        first = {}
+        for r in records:
+            first.setdefault(r["responseId"], r)
+        claims = [{"responseId": rid, "userId": r["userId"], "createdAt": now} for rid, r in first.items()]
+        if not claims:
+            return 0
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            claimed = set(session.execute(
+                insert(WeaknessLogResponse.__table__).values(claims)
+                .on_conflict_do_nothing(index_elements=["responseId"])
+                .returning(WeaknessLogResponse.__table__.c.responseId)
+            ).scalars())
+        else:
+            known = {row[0] for row in session.query(WeaknessLogResponse.responseId)
+                     .filter(WeaknessLogResponse.responseId.in_(list(first)))}
+            claimed = set(first) - known
+            session.add_all(WeaknessLogResponse(**c) for c in claims if c["responseId"] in claimed)
+        rows = _collapse([r for r in first.values() if r["responseId"] in claimed], now)
+        if not rows:
             session.commit()
-            print(f"WeaknessLog saved: {new_id}")
-            
-        except Exception as e:
-            session.rollback()
-            print(f"DB Error: {e}")
-        finally:
-            session.close()
+            return 0
+        if dialect in ("sqlite", "postgresql"):
+            stmt = insert(table).values(rows)
+            # 심각도는 기존 값과 새 값 중 큰 쪽 (배치 안에서 합칠 때와 같은 규칙)
+            if dialect == "postgresql":
+                severity = func.greatest(table.c.severity, stmt.excluded.severity)
+            else:
+                severity = func.max(func.coalesce(table.c.severity, stmt.excluded.severity), stmt.excluded.severity)
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=["userId", "topic", "errorType"],
+                set_={
+                    "repeatCount": table.c.repeatCount + stmt.excluded.repeatCount,
+                    "updatedAt": stmt.excluded.updatedAt,
+                    "responseId": stmt.excluded.responseId,
+                    "description": stmt.excluded.description,
+                    "severity": severity,
+                    "isResolved": False,
+                },
+            ))
+        else:
+            for row in rows:
+                existing = session.query(WeaknessLog).filter_by(
+                    userId=row["userId"], topic=row["topic"], errorType=row["errorType"]
+                ).first()
+                if existing is None:
+                    session.add(WeaknessLog(**row))
+                    continue
+                existing.repeatCount = (existing.repeatCount or 0) + row["repeatCount"]
+                existing.updatedAt = row["updatedAt"]
+                existing.responseId = row["responseId"]
+                existing.description = row["description"]
+                existing.severity = max(existing.severity or 0, row["severity"])
+                existing.isResolved = False
+        session.commit()
+        print(f"WeaknessLog upserted: {len(rows)} rows from {len(records)} analyses")
+        return len(rows)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+_prepared = set()
+
+
+def _prepare(bind):
+    """
+    처음 저장할 때 한 번: 테이블이 없으면 만들고, 기존 테이블엔 upsert 용 유니크 인덱스를 추가.
+    이미 반영된 행의 마지막 응답 ID 는 처리한 응답으로 옮겨 둔다.
+    """
+    engine_ = getattr(bind, "engine", bind)
+    if id(engine_) in _prepared:
+        return
+    Base.metadata.create_all(engine_)
+    ensure_upsert_index(engine_)
+    with engine_.begin() as conn:
+        conn.execute(text(
+            'INSERT INTO "WeaknessLogResponse" ("responseId", "userId", "createdAt") '
+            'SELECT "responseId", "userId", "updatedAt" FROM "WeaknessLog" '
+            'WHERE "responseId" NOT IN (SELECT "responseId" FROM "WeaknessLogResponse")'
+        ))
+    _prepared.add(id(engine_))
+
+
+def ensure_upsert_index(bind=None):
+    """
+    기존 테이블에 (userId, topic, errorType) 유니크 인덱스 추가 (upsert 대상).
+    이미 쌓인 중복 행은 먼저 가장 최근 행 하나로 합친다 (repeatCount 합산).
+    """
+    bind = bind or engine
+    if bind is None:
+        return
+    with bind.begin() as conn:
+        dupes = conn.execute(text(
+            'SELECT "userId", "topic", "errorType" FROM "WeaknessLog" '
+            'GROUP BY "userId", "topic", "errorType" HAVING count(*) > 1'
+        )).all()
+        for user_id, topic, error_type in dupes:
+            rows = conn.execute(text(
+                'SELECT "id", "repeatCount" FROM "WeaknessLog" '
+                'WHERE "userId" = :u AND "topic" = :t AND "errorType" = :e ORDER BY "updatedAt" DESC'
+            ), {"u": user_id, "t": topic, "e": error_type}).all()
+            keep, total = rows[0][0], sum(r[1] or 1 for r in rows)
+            conn.execute(text('UPDATE "WeaknessLog" SET "repeatCount" = :n WHERE "id" = :id'), {"n": total, "id": keep})
+            conn.execute(WeaknessLog.__table__.delete().where(
+                WeaknessLog.__table__.c.id.in_([r[0] for r in rows[1:]])
+            ))
+        conn.execute(text(
+            'CREATE UNIQUE INDEX IF NOT EXISTS "WeaknessLog_userId_topic_errorType_key" '
+            'ON "WeaknessLog" ("userId", "topic", "errorType")'
+        ))
+    if dupes:
+        print(f"WeaknessLog: merged {len(dupes)} duplicate groups")
+
 
-# 사용 예시
+# 사용 예시 (python -m server.ai_service)
 if __name__ == "__main__":
     # 테스트
     service = OpenAIService()
     
     # 임의의 오답 상황
-    test_result = service.analyze_wrong_answer(
+    test_result = asyncio.run(service.analyze_wrong_answer(
         question="반지름이 3cm인 원의 넓이는? (원주율: 3.14)",
         correct_answer="28.26",
         user_answer="18.84", # 2 * 3.14 * 3 (원주를 구함 -> 개념 오적용)
         topic="원의 넓이"
-    )
+    ))
     
     print("=== 분석 결과 ===")
     print(json.dumps(test_result, indent=2, ensure_ascii=False))
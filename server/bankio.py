@@ -0,0 +1,514 @@
+"""
+문제 은행 / 오답 로그 컬럼 형식 내보내기·가져오기
+
+    # 마지막 워터마크 이후 추가된 행만 내보내기 (학교급/학년별 파티션)
+    python -m server.bankio export --out exports --format parquet
+    python -m server.bankio export --out exports --format jsonl.zst --full
+
+    # 다른 DB(예: 운영 Postgres)로 일괄 적재. 단원 ID 는 (학교급, 학년, 단원명)으로 다시 매핑
+    # 대상 DB 에 없는 단원은 (학교급, 학년, 대단원명) 아래에 새로 만든다
+    python -m server.bankio import --src exports --database-url postgresql://user:pw@host/mathdaily
+
+    python -m server.bankio stats --src exports   # 파티션별 행 수
+
+형식
+- parquet   : pyarrow 필요 (pip install pyarrow). 읽을 때 memory map 사용
+- jsonl.zst : zstandard 필요 (pip install zstandard)
+- jsonl.gz  : 추가 패키지 없이 사용 가능
+
+디렉터리 구조: {out}/{table}/school_level=middle/grade=1/part-{stamp}-{pid}{random}-{n}.{format}
+(같은 초에 여러 프로세스가 내보내거나 보관해도 파일 이름이 겹치지 않음)
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import secrets
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.engine import Engine
+
+from . import fastjson
+from .models import Chapter, Question, Unit, WeaknessLog
+from .shared_cache import cache as shared_cache
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # 선택 의존성
+    pa = None
+    pq = None
+
+try:
+    import zstandard
+except ImportError:  # 선택 의존성
+    zstandard = None
+
+FORMATS = ("parquet", "jsonl.zst", "jsonl.gz")
+DEFAULT_FORMAT = "parquet" if pa is not None else "jsonl.gz"
+BATCH_ROWS = 50_000
+WATERMARK_FILE = "_watermark.json"
+
+# Question.content 에서 컬럼으로 꺼낼 필드 (나머지는 content_extra JSON 문자열로 보존)
+# prompt_version/cache_key 는 예전에 생성된 문제에만 있음 (기존 내보내기 파일과 스키마 호환)
+_CONTENT_COLUMNS = ("topic", "question", "options", "answer", "explanation", "svg",
+                    "prompt_version", "cache_key", "model", "source", "qhash")
+
+# 테이블별 컬럼 타입 (string | int | list<string> | timestamp)
+SCHEMAS: Dict[str, List[Tuple[str, str]]] = {
+    "questions": [
+        ("id", "string"), ("unit_id", "int"), ("unit_name", "string"), ("chapter_name", "string"),
+        ("school_level", "string"), ("grade", "int"),
+        ("difficulty", "int"), ("type", "string"),
+        ("topic", "string"), ("question", "string"), ("options", "list<string>"),
+        ("answer", "string"), ("explanation", "string"), ("svg", "string"),
+        ("prompt_version", "string"), ("cache_key", "string"), ("model", "string"),
+        ("source", "string"), ("qhash", "string"), ("content_extra", "string"),
+        ("created_at", "timestamp"),
+    ],
+    "weakness_logs": [
+        ("id", "string"), ("user_id", "string"), ("problem_id", "string"),
+        ("school_level", "string"), ("grade", "int"),
+        ("user_answer", "string"), ("error_type", "string"),
+        ("reasoning_process", "string"), ("ai_advice", "string"),
+        ("severity", "int"), ("created_at", "timestamp"),
+    ],
+}
+TABLES = tuple(SCHEMAS)
+
+
+def _check_format(fmt: str):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt} (choose from {', '.join(FORMATS)})")
+    if fmt == "parquet" and pa is None:
+        raise RuntimeError("parquet format requires pyarrow (pip install pyarrow)")
+    if fmt == "jsonl.zst" and zstandard is None:
+        raise RuntimeError("jsonl.zst format requires zstandard (pip install zstandard)")
+
+
+def _arrow_schema(table: str):
+    types = {"string": pa.string(), "int": pa.int32(), "list<string>": pa.list_(pa.string()),
+             "timestamp": pa.timestamp("us")}
+    return pa.schema([(name, types[kind]) for name, kind in SCHEMAS[table]])
+
+
+# ==========================================
+# DB → 행 (Core select 로 스트리밍, ORM 객체 생성 없음)
+# ==========================================
+
+def _question_rows(engine: Engine, since: Optional[datetime], where=None) -> Iterator[Dict[str, Any]]:
+    q, u, c = Question.__table__, Unit.__table__, Chapter.__table__
+    stmt = (
+        select(q, u.c.name.label("unit_name"), c.c.name.label("chapter_name"), c.c.school_level, c.c.grade)
+        .select_from(q.outerjoin(u, q.c.unit_id == u.c.id).outerjoin(c, u.c.chapter_id == c.c.id))
+        .order_by(q.c.created_at, q.c.id)
+    )
+    if since is not None:
+        stmt = stmt.where(q.c.created_at >= since)
+    if where is not None:
+        stmt = stmt.where(where)
+    with engine.connect() as conn:
+        for r in conn.execution_options(stream_results=True).execute(stmt):
+            content = dict(r.content or {})
+            row = {
+                "id": r.id, "unit_id": r.unit_id, "unit_name": r.unit_name, "chapter_name": r.chapter_name,
+                "school_level": r.school_level, "grade": r.grade,
+                "difficulty": r.difficulty, "type": r.type, "created_at": r.created_at,
+            }
+            for key in _CONTENT_COLUMNS:
+                value = content.pop(key, None)
+                if key == "options":
+                    row[key] = [str(o) for o in value] if isinstance(value, list) else None
+                else:
+                    row[key] = None if value is None else str(value)
+            row["content_extra"] = json.dumps(content, ensure_ascii=False) if content else None
+            yield row
+
+
+def _weakness_rows(engine: Engine, since: Optional[datetime], where=None) -> Iterator[Dict[str, Any]]:
+    w, q, u, c = WeaknessLog.__table__, Question.__table__, Unit.__table__, Chapter.__table__
+    stmt = (
+        select(w, c.c.school_level, c.c.grade)
+        .select_from(
+            w.outerjoin(q, w.c.problem_id == q.c.id)
+            .outerjoin(u, q.c.unit_id == u.c.id)
+            .outerjoin(c, u.c.chapter_id == c.c.id)
+        )
+        .order_by(w.c.created_at, w.c.id)
+    )
+    if since is not None:
+        stmt = stmt.where(w.c.created_at >= since)
+    if where is not None:
+        stmt = stmt.where(where)
+    with engine.connect() as conn:
+        for r in conn.execution_options(stream_results=True).execute(stmt):
+            yield {name: getattr(r, name) for name, _ in SCHEMAS["weakness_logs"]}
+
+
+_ROW_SOURCES = {"questions": _question_rows, "weakness_logs": _weakness_rows}
+
+
+# ==========================================
+# 파일 쓰기/읽기
+# ==========================================
+
+def _partition_dir(root: str, table: str, row: Dict[str, Any]) -> str:
+    level = row.get("school_level") or "unknown"
+    grade = row.get("grade") if row.get("grade") is not None else 0
+    return os.path.join(root, table, f"school_level={level}", f"grade={grade}")
+
+
+def _to_json(row: Dict[str, Any]) -> str:
+    return json.dumps(
+        {k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in row.items()},
+        ensure_ascii=False, separators=(",", ":"),
+    )
+
+
+def _write_part(path: str, table: str, rows: List[Dict[str, Any]], fmt: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    if fmt == "parquet":
+        # 파티션 컬럼(school_level, grade)도 파일 안에 그대로 둔다 (파일 하나만 읽어도 완전한 행)
+        pq.write_table(pa.Table.from_pylist(rows, schema=_arrow_schema(table)), tmp, compression="zstd")
+    else:
+        data = ("\n".join(_to_json(r) for r in rows) + "\n").encode("utf-8")
+        if fmt == "jsonl.zst":
+            data = zstandard.ZstdCompressor(level=10).compress(data)
+        else:
+            data = gzip.compress(data)
+        with open(tmp, "wb") as f:
+            f.write(data)
+    # 쓰기 도중 중단돼도 반쪽 파일이 읽히지 않도록 완성 후 이름 변경
+    os.replace(tmp, path)
+
+
+def _part_stamp() -> str:
+    return f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}{secrets.token_hex(3)}"
+
+
+def _read_watermarks(root: str) -> Dict[str, Dict[str, Any]]:
+    """
+    {table: {"at": 마지막 created_at, "ids": 그 시각에 내보낸 id}} (이전 형식의 문자열 값도 읽음)
+    """
+    path = os.path.join(root, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        marks = json.load(f)
+    return {t: (m if isinstance(m, dict) else {"at": m, "ids": []}) for t, m in marks.items()}
+
+
+def _write_watermarks(root: str, marks: Dict[str, Dict[str, Any]]):
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, WATERMARK_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(marks, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def export_tables(engine: Engine, out: str, fmt: str = DEFAULT_FORMAT, tables=TABLES, full: bool = False) -> Dict[str, int]:
+    """
+    워터마크(마지막으로 내보낸 created_at) 이후 행만 파티션별 파일로 내보낸다. 테이블별 행 수 반환.
+    같은 시각에 늦게 들어온 행을 놓치지 않도록 워터마크 시각부터 읽고, 그 시각에 이미 내보낸 id 는 건너뜀.
+    """
+    _check_format(fmt)
+    marks = {} if full else _read_watermarks(out)
+    stamp = _part_stamp()
+    counts = {}
+    for table in tables:
+        mark = marks.get(table) or {}
+        since = datetime.fromisoformat(mark["at"]) if mark.get("at") else None
+        done = set(mark.get("ids") or [])
+        buffers: Dict[str, List[Dict[str, Any]]] = {}
+        parts: Dict[str, int] = {}
+        latest = since
+        latest_ids = set(done)
+        total = 0
+
+        def flush(directory: str):
+            rows = buffers.pop(directory, [])
+            if not rows:
+                return
+            n = parts.get(directory, 0)
+            parts[directory] = n + 1
+            _write_part(os.path.join(directory, f"part-{stamp}-{n:04d}.{fmt}"), table, rows, fmt)
+
+        for row in _ROW_SOURCES[table](engine, since):
+            if row["created_at"] == since and row["id"] in done:
+                continue
+            directory = _partition_dir(out, table, row)
+            buffers.setdefault(directory, []).append(row)
+            if len(buffers[directory]) >= BATCH_ROWS:
+                flush(directory)
+            if row["created_at"] is not None:
+                if latest is None or row["created_at"] > latest:
+                    latest, latest_ids = row["created_at"], set()
+                if row["created_at"] == latest:
+                    latest_ids.add(row["id"])
+            total += 1
+        for directory in list(buffers):
+            flush(directory)
+
+        counts[table] = total
+        if latest is not None:
+            marks[table] = {"at": latest.isoformat(), "ids": sorted(latest_ids)}
+    _write_watermarks(out, marks)
+    return counts
+
+
+def archive_rows(engine: Engine, out: str, table: str, ids: List[str], fmt: str = DEFAULT_FORMAT) -> Tuple[int, int]:
+    """
+    지정한 id 의 행만 내보내기와 같은 디렉터리 구조로 저장 (보존 정책의 보관 단계). (행 수, 파일 바이트) 반환.
+    워터마크는 건드리지 않음. 보관한 파일은 import 로 그대로 되살릴 수 있음.
+    """
+    _check_format(fmt)
+    target = Question.__table__ if table == "questions" else WeaknessLog.__table__
+    stamp = _part_stamp()
+    buffers: Dict[str, List[Dict[str, Any]]] = {}
+    for start in range(0, len(ids), 500):
+        for row in _ROW_SOURCES[table](engine, None, target.c.id.in_(ids[start:start + 500])):
+            buffers.setdefault(_partition_dir(out, table, row), []).append(row)
+    total = size = 0
+    for directory, rows in buffers.items():
+        for n, start in enumerate(range(0, len(rows), BATCH_ROWS)):
+            path = os.path.join(directory, f"part-archive-{stamp}-{n:04d}.{fmt}")
+            _write_part(path, table, rows[start:start + BATCH_ROWS], fmt)
+            size += os.path.getsize(path)
+        total += len(rows)
+    return total, size
+
+
+def _part_files(src: str, table: str) -> List[str]:
+    files = []
+    for dirpath, _, names in os.walk(os.path.join(src, table)):
+        for name in names:
+            if name.startswith("part-") and name.endswith(FORMATS):
+                files.append(os.path.join(dirpath, name))
+    return sorted(files)
+
+
+def _parse_row(table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    for name, kind in SCHEMAS[table]:
+        value = row.get(name)
+        if kind == "timestamp" and isinstance(value, str):
+            row[name] = datetime.fromisoformat(value)
+    return row
+
+
+def iter_rows(src: str, table: str, batch_rows: int = BATCH_ROWS) -> Iterator[List[Dict[str, Any]]]:
+    """
+    내보낸 파일을 배치 단위로 읽는다. parquet 은 memory map 으로 열어서 필요한 배치만 읽음.
+    """
+    for path in _part_files(src, table):
+        if path.endswith(".parquet"):
+            _check_format("parquet")
+            parquet = pq.ParquetFile(path, memory_map=True)
+            for batch in parquet.iter_batches(batch_size=batch_rows):
+                yield batch.to_pylist()
+            continue
+        if path.endswith(".zst"):
+            _check_format("jsonl.zst")
+            stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        else:
+            stream = gzip.open(path, "rb")
+        with io.TextIOWrapper(stream, encoding="utf-8") as f:
+            batch = []
+            for line in f:
+                if line.strip():
+                    batch.append(_parse_row(table, json.loads(line)))
+                if len(batch) >= batch_rows:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+
+def read_table(src: str, table: str):
+    """
+    분석용: parquet 내보내기 전체를 memory map 으로 열어 pyarrow Table 로 반환
+    """
+    _check_format("parquet")
+    files = [p for p in _part_files(src, table) if p.endswith(".parquet")]
+    if not files:
+        return _arrow_schema(table).empty_table()
+    return pa.concat_tables([pq.read_table(p, memory_map=True) for p in files])
+
+
+# ==========================================
+# 파일 → DB (Core 다중 행 INSERT, 이미 있는 id 는 건너뜀)
+# ==========================================
+
+def _insert_ignore(engine: Engine, table):
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table).on_conflict_do_nothing(index_elements=["id"])
+    if engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(table).on_conflict_do_nothing(index_elements=["id"])
+    return table.insert()
+
+
+def _unit_map(engine: Engine) -> Dict[Tuple[str, int, str], int]:
+    u, c = Unit.__table__, Chapter.__table__
+    with engine.connect() as conn:
+        rows = conn.execute(select(u.c.id, u.c.name, c.c.school_level, c.c.grade).outerjoin(c, u.c.chapter_id == c.c.id))
+        return {(r.school_level, r.grade, r.name): r.id for r in rows}
+
+
+def _ensure_units(engine: Engine, batch: List[Dict[str, Any]], units: Dict[Tuple[str, int, str], int]) -> int:
+    """
+    대상 DB 에 없는 단원을 (학교급, 학년, 대단원명) 아래에 만들고 units 에 추가. 만든 단원 수 반환.
+    """
+    missing: Dict[Tuple[str, int, str], Optional[str]] = {}
+    for row in batch:
+        key = (row.get("school_level"), row.get("grade"), row.get("unit_name"))
+        if key[2] and key not in units:
+            missing.setdefault(key, row.get("chapter_name"))
+    if not missing:
+        return 0
+    u, c = Unit.__table__, Chapter.__table__
+    with engine.begin() as conn:
+        for (level, grade, name), chapter_name in missing.items():
+            chapter_id = None
+            if level is not None:
+                # 예전 내보내기에는 대단원명이 없음 → 단원명으로 대단원을 만듦
+                chapter_name = chapter_name or name
+                chapter_id = conn.execute(select(c.c.id).where(
+                    c.c.school_level == level, c.c.grade == grade, c.c.name == chapter_name,
+                )).scalar()
+                if chapter_id is None:
+                    chapter_id = conn.execute(c.insert().values(school_level=level, grade=grade, name=chapter_name)).inserted_primary_key[0]
+            units[(level, grade, name)] = conn.execute(u.insert().values(chapter_id=chapter_id, name=name)).inserted_primary_key[0]
+    return len(missing)
+
+
+def _question_record(row: Dict[str, Any], units: Dict[Tuple[str, int, str], int]) -> Dict[str, Any]:
+    content = json.loads(row["content_extra"]) if row.get("content_extra") else {}
+    for key in _CONTENT_COLUMNS:
+        if row.get(key) is not None:
+            content[key] = row[key]
+    # 단원 ID 는 DB 마다 다를 수 있으므로 (학교급, 학년, 단원명)으로 대상 DB 의 ID 를 찾는다
+    unit_id = units.get((row.get("school_level"), row.get("grade"), row.get("unit_name")))
+    return {
+        "id": row["id"], "unit_id": unit_id, "difficulty": row.get("difficulty"),
+        "type": row.get("type"), "content": content, "created_at": row.get("created_at"),
+    }
+
+
+def import_tables(engine: Engine, src: str, tables=TABLES) -> Dict[str, int]:
+    from sqlalchemy.orm import Session
+
+    from .curriculum_data import seed_curriculum
+    from .models import Base
+
+    # 빈 DB 로 옮기는 경우에도 단원 매핑이 되도록 테이블/커리큘럼 먼저 준비
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        seed_curriculum(db)
+    # 실행 중인 서버 워커들의 커리큘럼 캐시도 갱신되도록
+    shared_cache.invalidate("curriculum")
+    units = _unit_map(engine)
+    counts = {}
+    created = unmapped = 0
+    for table in tables:
+        target = Question.__table__ if table == "questions" else WeaknessLog.__table__
+        columns = {c.name for c in target.columns}
+        stmt = _insert_ignore(engine, target)
+        total = 0
+        for batch in iter_rows(src, table):
+            if table == "questions":
+                created += _ensure_units(engine, batch, units)
+                records = [_question_record(r, units) for r in batch]
+                # 원본에서 단원이 있었는데 대상 DB 에서 못 찾은 행 (단원명이 없는 내보내기 등)
+                unmapped += sum(1 for r, rec in zip(batch, records) if r.get("unit_id") is not None and rec["unit_id"] is None)
+            else:
+                records = [{k: v for k, v in r.items() if k in columns} for r in batch]
+            # 배치마다 커밋 (중단 후 다시 실행해도 이미 들어간 id 는 건너뜀)
+            with engine.begin() as conn:
+                conn.execute(stmt, records)
+            total += len(records)
+        counts[table] = total
+    if created:
+        counts["units_created"] = created
+        # 새 단원이 생겼으므로 커리큘럼 캐시 다시 비움
+        shared_cache.invalidate("curriculum")
+    if unmapped:
+        counts["unmapped"] = unmapped
+        print(f"⚠️ {unmapped} questions lost their unit (no unit name in the export)")
+    return counts
+
+
+# ==========================================
+# CLI
+# ==========================================
+
+def _engine(url: Optional[str]) -> Engine:
+    if url:
+        connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+        return create_engine(url, connect_args=connect_args,
+                             json_serializer=fastjson.dumps_str, json_deserializer=fastjson.loads)
+    from server.main import engine
+    return engine
+
+
+def _stats(args):
+    for table in TABLES:
+        per_dir: Dict[str, int] = {}
+        for path in _part_files(args.src, table):
+            per_dir.setdefault(os.path.relpath(os.path.dirname(path), args.src), 0)
+        total = 0
+        for batch in iter_rows(args.src, table):
+            total += len(batch)
+        print(f"📦 {table}: {total} rows in {len(per_dir)} partitions")
+        for directory in sorted(per_dir):
+            print(f"   {directory}")
+    marks = _read_watermarks(args.src)
+    if marks:
+        print(f"🔖 watermarks: {marks}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="문제 은행/오답 로그 내보내기·가져오기")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("export", help="DB → 파티션 파일 (워터마크 이후 증분)")
+    p.add_argument("--out", required=True)
+    p.add_argument("--format", choices=FORMATS, default=DEFAULT_FORMAT)
+    p.add_argument("--tables", default=",".join(TABLES))
+    p.add_argument("--full", action="store_true", help="워터마크 무시하고 전체 내보내기")
+    p.add_argument("--database-url", help="기본: 서버 설정(DATABASE_URL / mathdaily.db)")
+
+    p = sub.add_parser("import", help="파티션 파일 → DB (다중 행 INSERT, 중복 id 건너뜀)")
+    p.add_argument("--src", required=True)
+    p.add_argument("--tables", default=",".join(TABLES))
+    p.add_argument("--database-url", help="기본: 서버 설정(DATABASE_URL / mathdaily.db)")
+
+    p = sub.add_parser("stats", help="내보낸 파일 요약")
+    p.add_argument("--src", required=True)
+
+    args = parser.parse_args()
+    if args.command == "stats":
+        _stats(args)
+        return
+
+    tables = [t.strip() for t in args.tables.split(",") if t.strip()]
+    unknown = set(tables) - set(TABLES)
+    if unknown:
+        parser.error(f"unknown tables: {', '.join(sorted(unknown))}")
+    engine = _engine(args.database_url)
+    start = time.perf_counter()
+    if args.command == "export":
+        counts = export_tables(engine, args.out, args.format, tables, args.full)
+        print(f"📤 Exported {counts} to {args.out} ({time.perf_counter() - start:.2f}s)")
+    else:
+        counts = import_tables(engine, args.src, tables)
+        print(f"📥 Imported {counts} from {args.src} ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
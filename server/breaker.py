@@ -0,0 +1,209 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .metrics import LLM_BREAKER_STATE, LLM_BREAKER_TRANSITIONS
+
+# ==========================================
+# LLM 호출 서킷 브레이커
+# - closed   : 정상. 최근 호출의 오류율/느린 호출 비율을 관찰
+# - open     : 임계값 초과 → LLM 호출 즉시 거절 (CircuitOpenError), 학습지는 은행에서 제공
+#              백그라운드에서 완성(completion) 없이 가벼운 호출(모델 목록)로 업스트림 확인
+# - half_open: 확인 성공 → 실제 호출 하나만 시험으로 통과, 성공하면 closed / 실패하면 다시 open
+# ==========================================
+
+LLM_BREAKER_ENABLED = os.getenv("LLM_BREAKER", "1") != "0"
+BREAKER_WINDOW = float(os.getenv("LLM_BREAKER_WINDOW", "60"))             # 관찰 구간 (초)
+BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))           # 판단에 필요한 최소 호출 수
+BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+BREAKER_SLOW_SECONDS = float(os.getenv("LLM_BREAKER_SLOW_SECONDS", "40"))
+BREAKER_SLOW_RATE = float(os.getenv("LLM_BREAKER_SLOW_RATE", "0.5"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "15"))         # open 후 첫 확인까지 (실패할 때마다 2배)
+BREAKER_COOLDOWN_MAX = float(os.getenv("LLM_BREAKER_COOLDOWN_MAX", "120"))
+
+_STATE_VALUE = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpenError(Exception):
+    """
+    브레이커가 열려 있어서 LLM 호출을 보내지 않음
+    """
+
+
+class CircuitBreaker:
+    def __init__(self, name: str = "openai"):
+        self.name = name
+        self.state = "closed"
+        self._calls = deque()          # (시각, 성공 여부, 느린 호출 여부)
+        self._lock = threading.Lock()
+        self._opened_at: Optional[float] = None
+        self._cooldown = BREAKER_COOLDOWN
+        self._trial_inflight = False
+        self._probe_task: Optional[asyncio.Task] = None
+        self._probe: Optional[Callable[[], Awaitable[Any]]] = None
+        self.last_success: Optional[float] = None
+        self.last_failure: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.reason: Optional[str] = None
+        LLM_BREAKER_STATE.set(0, name=name)
+
+    def set_probe(self, probe: Callable[[], Awaitable[Any]]):
+        """
+        open 상태에서 주기적으로 부를 가벼운 확인 호출 (예외가 없으면 성공)
+        """
+        self._probe = probe
+
+    # ── 상태 전이 ──
+    def _transition(self, state: str, reason: Optional[str] = None):
+        if state == self.state:
+            return
+        print(f"🔌 LLM breaker {self.state} → {state}" + (f" ({reason})" if reason else ""))
+        self.state = state
+        self.reason = reason
+        LLM_BREAKER_STATE.set(_STATE_VALUE[state], name=self.name)
+        LLM_BREAKER_TRANSITIONS.inc(name=self.name, state=state)
+        if state == "open":
+            self._opened_at = time.monotonic()
+            self._calls.clear()
+            self._start_probe()
+        elif state == "closed":
+            self._cooldown = BREAKER_COOLDOWN
+            self._calls.clear()
+
+    def _start_probe(self):
+        if self._probe is None or (self._probe_task is not None and not self._probe_task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 이벤트 루프 밖(스레드 등)에서 열린 경우: 쿨다운이 지나면 allow() 가 half_open 으로 전환
+            return
+        self._probe_task = loop.create_task(self._probe_loop())
+
+    async def _probe_loop(self):
+        while self.state == "open":
+            await asyncio.sleep(self._cooldown)
+            try:
+                await self._probe()
+            except Exception as e:
+                with self._lock:
+                    self.last_error = f"probe: {type(e).__name__}: {e}"[:300]
+                    self._cooldown = min(BREAKER_COOLDOWN_MAX, self._cooldown * 2)
+                continue
+            with self._lock:
+                if self.state == "open":
+                    self._transition("half_open", "probe ok")
+
+    def _evaluate(self, now: float):
+        while self._calls and self._calls[0][0] < now - BREAKER_WINDOW:
+            self._calls.popleft()
+        n = len(self._calls)
+        if n < BREAKER_MIN_CALLS:
+            return
+        errors = sum(1 for _, ok, _ in self._calls if not ok)
+        slow = sum(1 for _, ok, is_slow in self._calls if ok and is_slow)
+        if errors / n >= BREAKER_ERROR_RATE:
+            self._transition("open", f"error rate {errors}/{n}")
+        elif slow / n >= BREAKER_SLOW_RATE:
+            self._transition("open", f"slow calls {slow}/{n} over {BREAKER_SLOW_SECONDS:.0f}s")
+
+    # ── 호출 쪽 API ──
+    def is_open(self) -> bool:
+        return LLM_BREAKER_ENABLED and self.state == "open"
+
+    def allow(self) -> bool:
+        if not LLM_BREAKER_ENABLED:
+            return True
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                # 확인 호출을 못 돌리는 환경이면 쿨다운 후 실제 호출 하나로 확인
+                if self._probe_task is None and self._opened_at is not None \
+                        and time.monotonic() - self._opened_at >= self._cooldown:
+                    self._transition("half_open", "cooldown elapsed")
+                else:
+                    return False
+            if self._trial_inflight:
+                return False
+            self._trial_inflight = True
+            return True
+
+    def record(self, ok: bool, seconds: float, error: Optional[BaseException] = None):
+        if not LLM_BREAKER_ENABLED:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if ok:
+                self.last_success = time.time()
+            else:
+                self.last_failure = time.time()
+                self.last_error = f"{type(error).__name__}: {error}"[:300] if error else None
+            if self.state == "half_open":
+                self._trial_inflight = False
+                if ok and seconds < BREAKER_SLOW_SECONDS:
+                    self._transition("closed", "trial call ok")
+                else:
+                    self._cooldown = min(BREAKER_COOLDOWN_MAX, self._cooldown * 2)
+                    self._transition("open", "trial call failed")
+                return
+            if self.state != "closed":
+                return
+            self._calls.append((now, ok, seconds >= BREAKER_SLOW_SECONDS))
+            self._evaluate(now)
+
+    @contextmanager
+    def guard(self):
+        """
+        LLM 호출 구간을 감싼다. 열려 있으면 CircuitOpenError, 결과(성공/실패/지연)는 자동 기록.
+        취소(헤지 패자, 클라이언트 종료)는 기록하지 않는다.
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"LLM circuit is {self.state}: {self.reason or ''}".strip())
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.record(not counts_as_failure(e), time.perf_counter() - start, e)
+            raise
+        except BaseException:
+            with self._lock:
+                if self.state == "half_open":
+                    self._trial_inflight = False
+            raise
+        self.record(True, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            n = len(self._calls)
+            errors = sum(1 for _, ok, _ in self._calls if not ok)
+            return {
+                "enabled": LLM_BREAKER_ENABLED,
+                "state": self.state,
+                "reason": self.reason,
+                "window_calls": n,
+                "window_errors": errors,
+                "cooldown_s": self._cooldown,
+                "open_for_s": round(time.monotonic() - self._opened_at, 1) if self.state != "closed" and self._opened_at else None,
+                "last_success": self.last_success,
+                "last_failure": self.last_failure,
+                "last_error": self.last_error,
+            }
+
+
+def counts_as_failure(error: BaseException) -> bool:
+    """
+    업스트림 장애로 볼 오류만 실패로 센다 (응답 내용이 이상한 경우 등은 제외)
+    """
+    from .ai_engine import ChunkGenerationError
+
+    if isinstance(error, (ChunkGenerationError, CircuitOpenError, ValueError)):
+        return False
+    return True
+
+
+breaker = CircuitBreaker()
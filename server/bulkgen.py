@@ -0,0 +1,322 @@
+"""
+문제 은행 야간 대량 생성
+
+    # 전체 커리큘럼(단원 × 난이도)을 작업으로 펼치고 실행. 중단 후 다시 실행하면 이어서 진행
+    python -m server.bulkgen run --per-slot 30 --difficulties 1,2,3 --tpm 150000 --rpm 300
+
+    python -m server.bulkgen status            # 작업 진행 현황
+    python -m server.bulkgen run --level middle --retry-failed
+
+- 작업 테이블(generation_jobs)에 단원/난이도별 목표와 진행 수를 저장 → 크래시 후 재개
+- 문제 저장과 작업 진행 갱신을 한 트랜잭션으로 커밋 → 재개해도 중복 저장 없음
+- 저장 전 검증(validate_problem) + 지문 해시 중복 제거
+- 요청/토큰 분당 예산(rpm, tpm) 안에서만 호출
+"""
+import argparse
+import asyncio
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .metrics import LLM_TOKENS
+
+MAX_JOB_ATTEMPTS = 5
+_DEFAULT_TOKENS_PER_PROBLEM = 600.0
+
+
+class RateBudget:
+    """
+    분당 요청 수/토큰 수 토큰 버킷. 예산이 찰 때까지 대기.
+    """
+
+    def __init__(self, rpm: float, tpm: float):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = rpm
+        self._tokens = tpm
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last
+        self._last = now
+        if self.rpm > 0:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm > 0:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, requests: int, tokens: float):
+        # 한 번에 버킷보다 큰 요청은 버킷 크기로 잘라서 무한 대기 방지
+        requests = min(requests, self.rpm) if self.rpm > 0 else 0
+        tokens = min(tokens, self.tpm) if self.tpm > 0 else 0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= requests and self._tokens >= tokens:
+                    self._requests -= requests
+                    self._tokens -= tokens
+                    return
+                wait = 0.0
+                if requests and self._requests < requests:
+                    wait = max(wait, (requests - self._requests) * 60 / self.rpm)
+                if tokens and self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+                await asyncio.sleep(min(wait, 5.0))
+
+
+def _generation_tokens() -> float:
+    return LLM_TOKENS.value(task="generate", kind="prompt") + LLM_TOKENS.value(task="generate", kind="completion")
+
+
+class Stats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.tokens_start = _generation_tokens()
+        self.inserted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.jobs_done = 0
+        self.jobs_failed = 0
+
+    def tokens(self) -> float:
+        return _generation_tokens() - self.tokens_start
+
+    def tokens_per_problem(self) -> Optional[float]:
+        return self.tokens() / self.inserted if self.inserted else None
+
+    def line(self) -> str:
+        minutes = max(1e-9, (time.monotonic() - self.started) / 60)
+        tpp = self.tokens_per_problem()
+        return (f"{self.inserted} problems, {self.inserted / minutes:.1f} problems/min, "
+                f"{'-' if tpp is None else f'{tpp:.0f}'} tokens/problem, "
+                f"dup {self.duplicates}, rejected {self.rejected}, "
+                f"jobs done {self.jobs_done} failed {self.jobs_failed}")
+
+
+# ==========================================
+# 작업 펼치기
+# ==========================================
+
+def expand_jobs(db, per_slot: int, difficulties: List[int], level: Optional[str] = None) -> int:
+    """
+    커리큘럼 단원 × 난이도를 작업 테이블에 추가 (이미 있으면 목표만 갱신). 추가/갱신 수 반환.
+    """
+    from .curriculum_data import seed_curriculum
+    from .models import Chapter, GenerationJob, Unit
+
+    seed_curriculum(db)
+    query = db.query(Unit, Chapter).join(Chapter, Unit.chapter_id == Chapter.id)
+    if level:
+        query = query.filter(Chapter.school_level == level)
+    existing = {job.id: job for job in db.query(GenerationJob).all()}
+
+    changed = 0
+    for unit, _ in query.all():
+        for difficulty in difficulties:
+            job_id = f"{unit.id}:{difficulty}"
+            job = existing.get(job_id)
+            if job is None:
+                db.add(GenerationJob(id=job_id, unit_id=unit.id, difficulty=difficulty, target=per_slot,
+                                     produced=0, duplicates=0, rejected=0, attempts=0, status="pending"))
+                changed += 1
+            elif job.target != per_slot:
+                job.target = per_slot
+                if job.status == "done" and job.produced < per_slot:
+                    job.status = "pending"
+                changed += 1
+    db.commit()
+    return changed
+
+
+def _recover(db, retry_failed: bool):
+    from .models import GenerationJob
+
+    # 이전 실행이 도중에 죽어서 running 으로 남은 작업 → 다시 대기열로
+    db.query(GenerationJob).filter(GenerationJob.status == "running").update({"status": "pending"})
+    if retry_failed:
+        db.query(GenerationJob).filter(GenerationJob.status == "failed").update({"status": "pending", "attempts": 0})
+    db.commit()
+
+
+# ==========================================
+# 작업 실행
+# ==========================================
+
+async def run_job(job_id: str, session_factory, budget: RateBudget, stats: Stats, batch_size: int):
+    from .ai_engine import generate_problems_detailed
+    from .chunking import planner
+    from .models import Chapter, GenerationJob, Question, Unit
+    from .question_bank import known_hashes, question_hash
+    from .validation import VISUAL_KEYWORDS, validate_problem
+
+    db = session_factory()
+    try:
+        job = db.get(GenerationJob, job_id)
+        unit = db.get(Unit, job.unit_id)
+        chapter = db.get(Chapter, unit.chapter_id) if unit else None
+        if unit is None or chapter is None:
+            job.status, job.last_error = "failed", "unit not found"
+            db.commit()
+            stats.jobs_failed += 1
+            return
+
+        job.status = "running"
+        db.commit()
+        seen = known_hashes(db, unit.id)
+        require_visual = any(k in unit.name for k in VISUAL_KEYWORDS)
+
+        while job.produced < job.target:
+            if job.attempts >= MAX_JOB_ATTEMPTS:
+                job.status = "failed"
+                db.commit()
+                stats.jobs_failed += 1
+                print(f"❌ Job {job_id} ({unit.name}) failed: {job.last_error}")
+                return
+
+            count = min(batch_size, job.target - job.produced)
+            plan = [{"topic": unit.name, "difficulty": job.difficulty, "type": "drill",
+                     "require_visual": require_visual} for _ in range(count)]
+
+            # 토큰 예상치는 이번 실행에서 관측된 저장 문제당 토큰(중복/탈락분 포함)으로 계속 보정
+            tpp = stats.tokens_per_problem() or _DEFAULT_TOKENS_PER_PROBLEM
+            await budget.acquire(math.ceil(count / planner.max_chunk_size), tpp * count)
+
+            job.attempts += 1
+            try:
+                generation = await generate_problems_detailed(plan, school_level=chapter.school_level, grade=chapter.grade)
+            except Exception as e:
+                job.last_error = f"{type(e).__name__}: {e}"[:500]
+                db.commit()
+                await asyncio.sleep(min(60, 2 ** job.attempts))
+                continue
+
+            rows = []
+            duplicates = rejected = 0
+            for p in generation["problems"]:
+                if validate_problem(p, plan[0]):
+                    rejected += 1
+                    continue
+                qhash = question_hash(p)
+                if qhash in seen:
+                    duplicates += 1
+                    continue
+                seen.add(qhash)
+                p["qhash"] = qhash
+                p["source"] = "bulkgen"
+                p["id"] = f"q-{os.urandom(4).hex()}"
+                rows.append(Question(id=p["id"], unit_id=unit.id,
+                                     difficulty=job.difficulty, type=p.get("type", "drill"), content=p))
+
+            # 문제 저장 + 진행 갱신을 한 번에 커밋 (크래시 후 재개해도 중복 저장 없음)
+            db.add_all(rows)
+            job.produced += len(rows)
+            job.duplicates += duplicates
+            job.rejected += rejected
+            if rows:
+                job.attempts = 0
+            else:
+                job.last_error = f"no new problems (dup {duplicates}, rejected {rejected})"
+            db.commit()
+
+            stats.inserted += len(rows)
+            stats.duplicates += duplicates
+            stats.rejected += rejected
+
+        job.status = "done"
+        db.commit()
+        stats.jobs_done += 1
+    finally:
+        db.close()
+
+
+async def _report_loop(stats: Stats, every: float):
+    while True:
+        await asyncio.sleep(every)
+        print(f"📈 {stats.line()}")
+
+
+async def run(args) -> Stats:
+    from .models import GenerationJob
+    from server.main import SessionLocal
+
+    difficulties = [int(d) for d in args.difficulties.split(",") if d.strip()]
+    with SessionLocal() as db:
+        added = expand_jobs(db, args.per_slot, difficulties, args.level)
+        _recover(db, args.retry_failed)
+        query = db.query(GenerationJob.id).filter(GenerationJob.status == "pending")
+        if args.level:
+            from .models import Chapter, Unit
+            query = query.join(Unit, GenerationJob.unit_id == Unit.id).join(Chapter, Unit.chapter_id == Chapter.id) \
+                .filter(Chapter.school_level == args.level)
+        job_ids = [jid for (jid,) in query.order_by(GenerationJob.id).all()]
+    if args.limit:
+        job_ids = job_ids[:args.limit]
+    print(f"🗂️ {added} jobs added/updated, {len(job_ids)} pending")
+
+    budget = RateBudget(args.rpm, args.tpm)
+    stats = Stats()
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def guarded(job_id):
+        async with sem:
+            await run_job(job_id, SessionLocal, budget, stats, args.batch)
+
+    reporter = asyncio.ensure_future(_report_loop(stats, args.report_every))
+    try:
+        await asyncio.gather(*(guarded(j) for j in job_ids))
+    finally:
+        reporter.cancel()
+    print(f"✅ Bulk generation finished: {stats.line()}")
+    return stats
+
+
+def status(args):
+    from .models import GenerationJob
+    from server.main import SessionLocal
+
+    with SessionLocal() as db:
+        jobs = db.query(GenerationJob).all()
+    if not jobs:
+        print("🗂️ No generation jobs yet (python -m server.bulkgen run)")
+        return
+    by_status: Dict[str, int] = {}
+    for job in jobs:
+        by_status[job.status] = by_status.get(job.status, 0) + 1
+    produced = sum(j.produced or 0 for j in jobs)
+    target = sum(j.target or 0 for j in jobs)
+    print(f"🗂️ {len(jobs)} jobs: " + ", ".join(f"{k} {v}" for k, v in sorted(by_status.items())))
+    print(f"   problems {produced}/{target} ({produced / target * 100 if target else 0:.1f}%), "
+          f"dup {sum(j.duplicates or 0 for j in jobs)}, rejected {sum(j.rejected or 0 for j in jobs)}")
+    for job in jobs:
+        if job.status == "failed":
+            print(f"   ❌ {job.id}: {job.last_error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="문제 은행 대량 생성")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="작업 펼치기 + 실행 (중단된 작업 재개)")
+    p.add_argument("--per-slot", type=int, default=30, help="단원×난이도별 목표 문제 수")
+    p.add_argument("--difficulties", default="1,2,3")
+    p.add_argument("--level", choices=["elementary", "middle", "high"])
+    p.add_argument("--batch", type=int, default=10, help="한 번에 생성할 문제 수")
+    p.add_argument("--concurrency", type=int, default=4, help="동시에 실행할 작업 수")
+    p.add_argument("--rpm", type=float, default=300, help="분당 요청 예산 (0: 제한 없음)")
+    p.add_argument("--tpm", type=float, default=150000, help="분당 토큰 예산 (0: 제한 없음)")
+    p.add_argument("--limit", type=int, default=0, help="이번 실행에서 처리할 최대 작업 수")
+    p.add_argument("--retry-failed", action="store_true")
+    p.add_argument("--report-every", type=float, default=30)
+    p.set_defaults(func=lambda a: asyncio.run(run(a)))
+
+    p = sub.add_parser("status", help="작업 진행 현황")
+    p.set_defaults(func=status)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+LLM 호출 녹화/재생 (cassette)
+
+    LLM_CASSETTE_MODE=record LLM_CASSETTE_PATH=cassettes/llm.jsonl.gz   # 실제 API 호출 + 저장
+    LLM_CASSETTE_MODE=replay LLM_CASSETTE_PATH=cassettes/llm.jsonl.gz   # 네트워크 없이 재생
+    LLM_CASSETTE_TIMING=1   # 재생 시 녹화된 지연 시간 재현 (0: 즉시, 0.5: 절반 속도 등)
+
+녹화/재생 중에는 청크 분할을 사전값으로 고정 (관측된 지연에 따라 요청이 달라지지 않도록, server/chunking.py)
+
+    # 재생 모드로 생성 파이프라인(파싱/검증/저장)만 프로파일링
+    python -m server.cassette profile --cassette cassettes/llm.jsonl.gz --unit-id 7 --count 10 --repeat 20
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+# 지문 계산에 포함할 요청 필드 (timeout 등 전송 옵션은 제외)
+_FINGERPRINT_FIELDS = (
+    "model", "messages", "response_format", "temperature", "max_tokens",
+    "max_completion_tokens", "stream", "top_p", "seed",
+)
+
+
+class CassetteMiss(RuntimeError):
+    pass
+
+
+def cassette_mode() -> str:
+    return (os.getenv("LLM_CASSETTE_MODE") or "off").lower()
+
+
+def fingerprint(kwargs: Dict[str, Any]) -> str:
+    request = {k: kwargs[k] for k in _FINGERPRINT_FIELDS if k in kwargs and kwargs[k] is not None}
+    raw = json.dumps(request, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+class CassetteStore:
+    """
+    gzip 압축 JSONL 저장소. 한 줄 = 한 번의 호출 기록.
+    같은 지문이 여러 번 녹화되면 재생 시 순서대로 돌려준다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                self._entries.setdefault(entry["fp"], []).append(entry)
+
+    def __len__(self):
+        return sum(len(v) for v in self._entries.values())
+
+    def append(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._entries.setdefault(entry["fp"], []).append(entry)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # gzip 은 멤버 이어붙이기를 지원하므로 append 모드로 바로 추가
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line)
+
+    def next(self, fp: str) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._entries.get(fp)
+            if not entries:
+                raise CassetteMiss(f"No recorded LLM response for fingerprint {fp}")
+            idx = self._cursor.get(fp, 0)
+            self._cursor[fp] = idx + 1
+            return entries[idx % len(entries)]
+
+
+_stores: Dict[str, CassetteStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path: Optional[str] = None) -> CassetteStore:
+    path = path or os.getenv("LLM_CASSETTE_PATH") or "cassettes/llm.jsonl.gz"
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = CassetteStore(path)
+        return store
+
+
+def _timing_scale() -> float:
+    try:
+        return float(os.getenv("LLM_CASSETTE_TIMING", "0"))
+    except ValueError:
+        return 0.0
+
+
+# ==========================================
+# 클라이언트 래퍼 (client.chat.completions.create 인터페이스 유지)
+# ==========================================
+
+class _Completions:
+    def __init__(self, owner: "CassetteClient"):
+        self._owner = owner
+
+    async def create(self, **kwargs):
+        return await self._owner._create(**kwargs)
+
+
+class _Chat:
+    def __init__(self, owner: "CassetteClient"):
+        self.completions = _Completions(owner)
+
+
+class CassetteClient:
+    def __init__(self, mode: str, store: CassetteStore, inner=None):
+        self.mode = mode
+        self.store = store
+        self.inner = inner
+        self.api_key = getattr(inner, "api_key", None) or "cassette-replay"
+        self.chat = _Chat(self)
+
+    @property
+    def models(self):
+        # 녹화 모드는 실제 API 를 부르므로 업스트림 확인(모델 목록 조회)도 내부 클라이언트로. 재생 모드는 없음
+        if self.mode == "record" and self.inner is not None:
+            return getattr(self.inner, "models", None)
+        return None
+
+    def with_options(self, **options):
+        # 녹화 모드는 내부 클라이언트 옵션(max_retries 등)만 바꾸고, 재생 모드는 무시
+        if self.inner is None:
+            return self
+        return CassetteClient(self.mode, self.store, self.inner.with_options(**options))
+
+    async def _create(self, **kwargs):
+        fp = fingerprint(kwargs)
+        if self.mode == "replay":
+            return await self._replay(fp, kwargs)
+        return await self._record(fp, kwargs)
+
+    # ── 녹화 ──
+    async def _record(self, fp: str, kwargs: Dict[str, Any]):
+        start = time.perf_counter()
+        response = await self.inner.chat.completions.create(**kwargs)
+        if not kwargs.get("stream"):
+            self.store.append({
+                "fp": fp,
+                "model": kwargs.get("model"),
+                "latency": round(time.perf_counter() - start, 4),
+                "response": response.model_dump(mode="json", exclude_unset=True),
+            })
+            return response
+        return self._record_stream(fp, kwargs, response, start)
+
+    async def _record_stream(self, fp, kwargs, stream, start) -> AsyncIterator[Any]:
+        chunks = []
+        offsets = []
+        async for chunk in stream:
+            offsets.append(round(time.perf_counter() - start, 4))
+            chunks.append(chunk.model_dump(mode="json", exclude_unset=True))
+            yield chunk
+        self.store.append({
+            "fp": fp,
+            "model": kwargs.get("model"),
+            "latency": round(time.perf_counter() - start, 4),
+            "chunks": chunks,
+            "offsets": offsets,
+        })
+
+    # ── 재생 ──
+    async def _replay(self, fp: str, kwargs: Dict[str, Any]):
+        from openai.types.chat import ChatCompletion
+
+        entry = self.store.next(fp)
+        scale = _timing_scale()
+        if "chunks" in entry:
+            return self._replay_stream(entry, scale)
+        if scale > 0:
+            await asyncio.sleep(entry.get("latency", 0) * scale)
+        return ChatCompletion.model_validate(entry["response"])
+
+    async def _replay_stream(self, entry: Dict[str, Any], scale: float) -> AsyncIterator[Any]:
+        from openai.types.chat import ChatCompletionChunk
+
+        previous = 0.0
+        offsets = entry.get("offsets") or []
+        for i, data in enumerate(entry["chunks"]):
+            if scale > 0 and i < len(offsets):
+                await asyncio.sleep(max(0.0, offsets[i] - previous) * scale)
+                previous = offsets[i]
+            yield ChatCompletionChunk.model_validate(data)
+
+
+def wrap_client(inner=None):
+    """
+    LLM_CASSETTE_MODE 에 따라 클라이언트를 감싼다. off 면 그대로 반환.
+    """
+    mode = cassette_mode()
+    if mode not in ("record", "replay"):
+        return inner
+    return CassetteClient(mode, get_store(), inner)
+
+
+# ==========================================
+# 재생 기반 파이프라인 프로파일링 CLI
+# ==========================================
+
+def _profile(args):
+    os.environ["LLM_CASSETTE_MODE"] = "replay"
+    os.environ["LLM_CASSETTE_PATH"] = args.cassette
+    os.environ.setdefault("LLM_CASSETTE_TIMING", "0")
+    os.environ.setdefault("OPENAI_API_KEY", "sk-cassette")
+    # 반복 실행이 캐시/문제 은행에서 끝나지 않고 매번 LLM 경로를 타도록
+    os.environ["WORKSHEET_COALESCE"] = "0"
+    os.environ["WORKSHEET_BANK_FIRST"] = "0"
+
+    import cProfile
+    import pstats
+
+    # 엔드포인트 코루틴을 같은 스레드의 이벤트 루프에서 직접 실행해야 cProfile 에 잡힌다
+    from fastapi import Response
+
+    from server.main import GenerateRequest, SessionLocal, generate_worksheet
+
+    req = GenerateRequest(userId="cassette-profile", count=args.count, unitId=args.unit_id)
+
+    async def run_once():
+        db = SessionLocal()
+        try:
+            return await generate_worksheet(req, Response(), db)
+        finally:
+            db.close()
+
+    async def run_all():
+        await run_once()  # 워밍업 (임포트/커넥션 비용 제외)
+        profiler = cProfile.Profile()
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            profiler.enable()
+            await run_once()
+            profiler.disable()
+            timings.append(time.perf_counter() - start)
+        return profiler, timings
+
+    profiler, timings = asyncio.run(run_all())
+    timings.sort()
+    print(f"⏱️ {args.repeat} runs: p50={timings[len(timings) // 2] * 1000:.2f}ms "
+          f"min={timings[0] * 1000:.2f}ms max={timings[-1] * 1000:.2f}ms")
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(args.top)
+
+
+def _stats(args):
+    store = CassetteStore(args.cassette)
+    models: Dict[str, int] = {}
+    streams = 0
+    for entries in store._entries.values():
+        for e in entries:
+            models[e.get("model") or "?"] = models.get(e.get("model") or "?", 0) + 1
+            streams += "chunks" in e
+    print(f"📼 {args.cassette}: {len(store)} recordings, {len(store._entries)} fingerprints, {streams} streamed")
+    for model, n in sorted(models.items()):
+        print(f"   {model}: {n}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM cassette 도구")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("stats", help="cassette 내용 요약")
+    p.add_argument("--cassette", required=True)
+    p.set_defaults(func=_stats)
+
+    p = sub.add_parser("profile", help="재생 모드로 /api/daily-worksheet/generate 프로파일링")
+    p.add_argument("--cassette", required=True)
+    p.add_argument("--unit-id", type=int, required=True)
+    p.add_argument("--count", type=int, default=10)
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--top", type=int, default=25)
+    p.set_defaults(func=_profile)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
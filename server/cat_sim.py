@@ -0,0 +1,322 @@
+"""
+난이도 조절(CAT) 정책 시뮬레이터 — 가상 학생 집단으로 정책 비교
+
+    python -m server.cat_sim --students 100000 --days 90
+    python -m server.cat_sim --policy level_shift --policy "target:p=0.7" --policy "ratio:hi=0.85,lo=0.55"
+
+- 학생마다 단원별 잠재 실력 θ (로지트). 난이도 d 문제를 맞힐 확률 = sigmoid(θ - b[d])
+- 매일 학습지 한 장: 정책이 (단원, 난이도) 칸을 정하고, 풀이 결과로 실력이 오른다
+  (맞힐 확률이 0.5 근처인 문제에서 가장 많이 배움, 연습하지 않은 실력은 조금씩 잊음)
+- 정책은 학생이 실제로 보인 결과만 보고 결정한다 (θ 는 모름)
+- 결과: 학습 향상(θ 증가), 정답률, 좌절/지루함 비율, LLM 생성 문제 수
+
+기준 정책은 운영 코드와 같은 값을 쓴다 (시작할 때 운영 함수와 결과가 같은지 확인):
+- fixed       : build_daily_plan 그대로 (복습 20% 쉬움, 현행 60% 보통, 도전 20% 어려움)
+- level_shift : + adjust_difficulty_level (전날 정답률 0.8 이상 한 단계 위, 0.5 미만 한 단계 아래)
+- ratio       : ai_worksheet_generator.adjust_difficulty (최근 5회 평균 0.8 / 0.6 기준 비율)
+후보 정책:
+- target      : 학생×단원 실력 추정(Elo)으로 예상 정답률이 p 에 가장 가까운 난이도, 복습은 가장 약한 단원
+"""
+import argparse
+import asyncio
+import json
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import procedural
+
+# 난이도 1/2/3 문제의 어려움 (로지트)
+ITEM_DIFFICULTY = np.array([-1.0, 0.0, 1.0], dtype=np.float32)
+# 기본 단원: 중2 (식의 계산, 부등식)
+DEFAULT_TOPICS = ["단항식의 계산", "다항식의 계산", "일차부등식", "연립일차방정식"]
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class Population:
+    """
+    가상 학생 집단 (학생 수 S × 단원 수 U)
+    """
+
+    def __init__(self, students: int, topics: List[str], rng: np.random.Generator,
+                 spread: float = 1.0, unit_spread: float = 0.5):
+        self.S, self.U = students, len(topics)
+        self.topics = topics
+        ability = rng.normal(0.0, spread, (students, 1))
+        self.theta0 = (ability + rng.normal(0.0, unit_spread, (students, self.U))).astype(np.float32)
+        self.theta = self.theta0.copy()
+        # 정책이 볼 수 있는 관찰 기록
+        self.est = np.zeros((students, self.U), dtype=np.float32)   # Elo 실력 추정
+        self.acc_hist = np.full((students, 5), np.nan, dtype=np.float32)  # 최근 5회 학습지 정답률
+        self.last_acc = np.full(students, np.nan, dtype=np.float32)
+
+
+# ==========================================
+# 정책: (집단, 학습지 문제 수, rng, 파라미터) → (단원 번호[S,N], 난이도[S,N])
+# ==========================================
+
+def _slot_roles(n: int) -> np.ndarray:
+    """
+    build_daily_plan 과 같은 칸 배치 (0: 복습, 1: 현행, 2: 도전)
+    """
+    review = max(1, int(n * 0.2))
+    current = max(1, int(n * 0.6))
+    roles = [0] * review + [1] * current
+    roles += [2] * max(0, n - len(roles))
+    return np.array(roles[:n])
+
+
+def _pick_topics(pop: Population, rng: np.random.Generator) -> np.ndarray:
+    # pick_topics: 학년 단원 중 최대 3개를 무작위로 (복습, 현행, 도전)
+    picks = np.argsort(rng.random((pop.S, pop.U)), axis=1)[:, :3]
+    if pop.U < 3:
+        picks = np.concatenate([picks, np.repeat(picks[:, -1:], 3 - pop.U, axis=1)], axis=1)
+    return picks
+
+
+def policy_fixed(pop, n, rng, params):
+    roles = _slot_roles(n)
+    units = _pick_topics(pop, rng)[:, roles]
+    diffs = np.broadcast_to(np.array([1, 2, 3])[roles], (pop.S, n)).copy()
+    return units, diffs
+
+
+def level_change(accuracy: np.ndarray, hi: float = 0.8, lo: float = 0.5) -> np.ndarray:
+    """
+    adjust_difficulty_level 의 level_change 를 배열로 (기록 없음 = 0)
+    """
+    change = np.zeros(accuracy.shape, dtype=np.int64)
+    change[accuracy >= hi] = 1
+    change[accuracy < lo] = -1
+    return change
+
+
+def policy_level_shift(pop, n, rng, params):
+    units, diffs = policy_fixed(pop, n, rng, params)
+    shift = level_change(pop.last_acc, params.get("hi", 0.8), params.get("lo", 0.5))
+    return units, np.clip(diffs + shift[:, None], 1, 3)
+
+
+def difficulty_ratio(accuracy: np.ndarray, hi: float = 0.8, lo: float = 0.6) -> np.ndarray:
+    """
+    ai_worksheet_generator.adjust_difficulty 의 (easy, medium, hard) 비율을 배열로 [S, 3]
+    """
+    ratio = np.tile(np.array([0.2, 0.6, 0.2]), (accuracy.shape[0], 1))
+    ratio[accuracy >= hi] = [0.1, 0.4, 0.5]
+    ratio[accuracy < lo] = [0.5, 0.4, 0.1]
+    return ratio
+
+
+def policy_ratio(pop, n, rng, params):
+    roles = _slot_roles(n)
+    units = _pick_topics(pop, rng)[:, roles]
+    # 기록이 없으면 정답률 0.7 (표준 비율)로 시작
+    recent = np.nanmean(np.where(np.isnan(pop.acc_hist).all(axis=1, keepdims=True), 0.7, pop.acc_hist), axis=1)
+    ratio = difficulty_ratio(recent, params.get("hi", 0.8), params.get("lo", 0.6))
+    u = rng.random((pop.S, n))
+    cdf = np.cumsum(ratio, axis=1)
+    current = 1 + (u > cdf[:, :1]).astype(np.int64) + (u > cdf[:, 1:2])
+    # 복습: 쉬움/보통 반반, 도전: 어려움
+    review = np.where(rng.random((pop.S, n)) > 0.5, 2, 1)
+    diffs = np.where(roles == 0, review, np.where(roles == 2, 3, current))
+    return units, diffs
+
+
+def policy_target(pop, n, rng, params):
+    target = params.get("p", 0.7)
+    roles = _slot_roles(n)
+    picks = _pick_topics(pop, rng)
+    # 복습 칸은 추정 실력이 가장 낮은 단원
+    picks[:, 0] = np.argmin(pop.est + rng.random(pop.est.shape) * 1e-3, axis=1)
+    units = picks[:, roles]
+    # 단원별로 한 번만 계산 [S, U] → 칸으로 펼침
+    expected = _sigmoid(pop.est[:, :, None] - ITEM_DIFFICULTY[None, None, :])
+    best = 1 + np.argmin(np.abs(expected - target), axis=2)
+    diffs = np.take_along_axis(best, units, axis=1)
+    # 도전 칸은 한 단계 위
+    diffs = np.where(roles == 2, np.minimum(3, diffs + 1), diffs)
+    return units, diffs
+
+
+POLICIES: Dict[str, Callable[..., Tuple[np.ndarray, np.ndarray]]] = {
+    "fixed": policy_fixed,
+    "level_shift": policy_level_shift,
+    "ratio": policy_ratio,
+    "target": policy_target,
+}
+DEFAULT_POLICIES = ["fixed", "level_shift", "ratio", "target:p=0.6", "target:p=0.7", "target:p=0.8"]
+
+
+def parse_policy(spec: str) -> Tuple[str, Dict[str, float]]:
+    """
+    "target:p=0.7" → ("target", {"p": 0.7})
+    """
+    name, _, rest = spec.partition(":")
+    if name not in POLICIES:
+        raise ValueError(f"Unknown policy {name!r} (choose from {', '.join(POLICIES)})")
+    params = {}
+    for part in filter(None, rest.split(",")):
+        key, _, value = part.partition("=")
+        params[key.strip()] = float(value)
+    return name, params
+
+
+def check_production_parity():
+    """
+    기준 정책의 임계값이 운영 함수와 같은지 확인 (운영 코드가 바뀌면 여기서 바로 드러남)
+    """
+    from ai_worksheet_generator import UserProfile, adjust_difficulty
+    from .ai_engine import adjust_difficulty_level
+
+    grid = np.round(np.linspace(0, 1, 101), 2)
+    ours = difficulty_ratio(grid)
+    changes = level_change(grid)
+    for i, acc in enumerate(grid):
+        ratio = adjust_difficulty(UserProfile("sim", 0, float(acc)))
+        if not np.allclose(ours[i], [ratio["easy"], ratio["medium"], ratio["hard"]]):
+            raise AssertionError(f"ratio policy differs from adjust_difficulty at accuracy {acc}")
+        level = asyncio.run(adjust_difficulty_level("sim", float(acc), None))
+        if changes[i] != level["level_change"]:
+            raise AssertionError(f"level_shift policy differs from adjust_difficulty_level at accuracy {acc}")
+
+
+# ==========================================
+# 시뮬레이션
+# ==========================================
+
+def simulate(policy: str, students: int = 100_000, days: int = 90, worksheet_size: int = 10,
+             topics: Optional[List[str]] = None, seed: int = 0, learning_rate: float = 0.006,
+             forgetting: float = 0.003, elo_k: float = 0.3, class_size: int = 30) -> Dict[str, Any]:
+    """
+    한 정책으로 days 일 동안 시뮬레이션. 같은 seed 면 같은 학생 집단에서 시작한다.
+    """
+    name, params = parse_policy(policy)
+    topics = topics or DEFAULT_TOPICS
+    rng = np.random.default_rng(seed)
+    pop = Population(students, topics, rng)
+    # 학생 집단은 정책과 무관하게 같게, 이후 무작위성은 정책별로
+    rng = np.random.default_rng([seed, zlib.crc32(policy.encode())])
+    U, n = pop.U, worksheet_size
+    rows = np.arange(students)[:, None]
+    has_template = np.array([procedural.supports(t) for t in topics])
+
+    correct_total = 0
+    frustrated = bored = 0
+    llm_request = llm_first = llm_shared = 0
+    start = time.perf_counter()
+    for _ in range(days):
+        units, diffs = POLICIES[name](pop, n, rng, params)
+        b = ITEM_DIFFICULTY[diffs - 1]
+        p = _sigmoid(pop.theta[rows, units] - b)
+        correct = rng.random(p.shape, dtype=np.float32) < p
+
+        # 학습: 맞힐 확률 0.5 근처에서 가장 크게 (최대 learning_rate), 연습 안 한 만큼 망각
+        flat = (rows * U + units).ravel()
+        gain = np.bincount(flat, weights=(4 * learning_rate * p * (1 - p)).ravel(), minlength=students * U)
+        pop.theta += gain.reshape(students, U).astype(np.float32)
+        pop.theta -= forgetting * (pop.theta - pop.theta0)
+
+        # 정책이 볼 수 있는 관찰 갱신 (Elo 추정, 정답률 기록)
+        est = pop.est[rows, units]
+        delta = elo_k * (correct - _sigmoid(est - b))
+        pop.est += np.bincount(flat, weights=delta.ravel(), minlength=students * U).reshape(students, U).astype(np.float32)
+        acc = correct.mean(axis=1).astype(np.float32)
+        pop.last_acc = acc
+        pop.acc_hist = np.roll(pop.acc_hist, 1, axis=1)
+        pop.acc_hist[:, 0] = acc
+
+        correct_total += int(correct.sum())
+        frustrated += int((acc < 0.5).sum())
+        bored += int((acc >= 0.9).sum())
+
+        # LLM 생성 수: 요청마다 생성 / 템플릿 없는 단원만 / 반 단위로 (단원, 난이도) 칸 공유
+        llm_request += students * n
+        llm_first += int((~has_template[units]).sum())
+        slots = _count_slots(units, diffs, U)
+        classes, tail = divmod(students, class_size)
+        shared = slots[:classes * class_size].reshape(classes, class_size, slots.shape[1]).max(axis=1)
+        if tail:
+            # 인원이 모자란 마지막 반도 한 반으로 집계
+            shared = np.vstack([shared, slots[classes * class_size:].max(axis=0, keepdims=True)])
+        shared = shared * np.repeat(~has_template, 3)[None, :]
+        llm_shared += int(shared.sum())
+
+    served = students * days * n
+    gain = pop.theta - pop.theta0
+    final_p = _sigmoid(pop.theta - ITEM_DIFFICULTY[1])
+    return {
+        "policy": policy,
+        "students": students,
+        "days": days,
+        "seconds": round(time.perf_counter() - start, 2),
+        "learning_gain": round(float(gain.mean()), 4),
+        "gain_p10": round(float(np.percentile(gain.mean(axis=1), 10)), 4),
+        "accuracy": round(correct_total / served, 4),
+        "mastery": round(float((final_p.mean(axis=1) >= 0.8).mean()), 4),
+        "frustrated_days": round(frustrated / (students * days), 4),
+        "bored_days": round(bored / (students * days), 4),
+        "llm_per_request": llm_request,
+        "llm_procedural_first": llm_first,
+        "llm_class_shared": llm_shared,
+    }
+
+
+def _count_slots(units: np.ndarray, diffs: np.ndarray, U: int) -> np.ndarray:
+    # 학생 × (단원, 난이도) 칸별 문제 수 [S, U*3]
+    S = units.shape[0]
+    flat = (np.arange(S)[:, None] * (U * 3) + units * 3 + diffs - 1).ravel()
+    return np.bincount(flat, minlength=S * U * 3).reshape(S, U * 3)
+
+
+def print_report(results: List[Dict[str, Any]]):
+    base = results[0]
+    header = (f"{'policy':<22}{'gain':>8}{'p10':>8}{'acc':>7}{'mastery':>9}{'frustr':>8}{'bored':>7}"
+              f"{'LLM/req':>11}{'LLM/first':>11}{'LLM/class':>11}{'sec':>7}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['policy']:<22}{r['learning_gain']:>8.3f}{r['gain_p10']:>8.3f}{r['accuracy']:>7.1%}{r['mastery']:>9.1%}"
+              f"{r['frustrated_days']:>8.1%}{r['bored_days']:>7.1%}"
+              f"{r['llm_per_request']:>11,}{r['llm_procedural_first']:>11,}{r['llm_class_shared']:>11,}{r['seconds']:>7}")
+    print(f"\n📈 gain = 평균 실력 증가 (로지트), p10 = 하위 10% 학생의 증가, 기준: {base['policy']}. "
+          "LLM/req: 요청마다 생성, LLM/first: WORKSHEET_PROCEDURAL=first, LLM/class: 반 단위 칸 공유 + 절차적 생성")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="난이도 조절 정책 시뮬레이터")
+    parser.add_argument("--policy", action="append", help="예: fixed, level_shift:hi=0.85, ratio, target:p=0.7 (여러 번 지정)")
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--worksheet-size", type=int, default=10)
+    parser.add_argument("--topics", help="쉼표로 구분한 단원명 (기본: 중2 단원)")
+    parser.add_argument("--class-size", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--learning-rate", type=float, default=0.006)
+    parser.add_argument("--forgetting", type=float, default=0.003)
+    parser.add_argument("--skip-parity", action="store_true", help="운영 함수와 임계값 비교 생략")
+    parser.add_argument("--json", dest="json_out", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    if not args.skip_parity:
+        check_production_parity()
+    topics = [t.strip() for t in args.topics.split(",")] if args.topics else None
+    results = []
+    for spec in args.policy or DEFAULT_POLICIES:
+        result = simulate(spec, args.students, args.days, args.worksheet_size, topics, args.seed,
+                          args.learning_rate, args.forgetting, class_size=args.class_size)
+        print(f"✅ {spec}: {result['seconds']}s")
+        results.append(result)
+    print()
+    print_report(results)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cassette import cassette_mode
+from .metrics import CHUNK_PLAN, CHUNK_MODEL
+
+# ==========================================
+# 적응형 청크 분할
+# - (school_level, grade, require_visual) 별로 "청크 크기 n → 지연 시간" 직선 모델을 최근 호출로 학습
+#     latency(n) ≈ a + b·n   (a: 고정 비용, b: 문제당 생성 시간)
+# - 병렬 청크 k 개의 예상 소요 시간 = a + b·ceil(N/k) + σ·sqrt(2·ln k)   (k 개 중 가장 느린 것)
+#     + (k·P + N·T)·60/TPM   (P: 호출마다 반복되는 프롬프트 토큰, T: 문제당 출력 토큰 → 분당 토큰 예산을 쓰는 시간)
+# - 현재 레이트리밋 여유(동시 청크 허용량, 최근 1분 토큰 예산 잔량) 안에서 예상 시간이 최소인 k 선택
+# - LLM cassette 녹화/재생 중에는 사전값과 최대 허용량으로만 결정 (재생 때 녹화와 같은 청크 요청이 나가도록)
+# ==========================================
+
+MAX_INFLIGHT_CHUNKS = int(os.getenv("MAX_INFLIGHT_CHUNKS", "16"))
+MAX_CHUNK_SIZE = int(os.getenv("MAX_CHUNK_SIZE", "6"))
+_SAMPLES_PER_KEY = 100
+_PRIOR_WEIGHT = 5  # 관측이 이만큼 쌓이면 사전값과 반반
+_RECOVER_AFTER = 10.0  # 429 없이 이 시간(초)이 지나면 동시 허용량 1 증가
+# 분당 토큰 예산 (0: 토큰 비용/여유 계산 안 함)
+CHUNK_TPM = float(os.getenv("CHUNK_TPM", "150000"))
+# 관측이 없을 때 호출당 프롬프트 토큰, 문제당 출력 토큰
+_PRIOR_PROMPT_TOKENS = float(os.getenv("CHUNK_PROMPT_TOKENS", "1500"))
+_PRIOR_TOKENS_PER_PROBLEM = 350.0
+
+PlanKey = Tuple[str, int, bool]
+
+
+def _prior(key: PlanKey) -> Tuple[float, float, float]:
+    """
+    관측이 없을 때의 (a, b, σ) 사전값. 고등/시각 자료 문제는 문제당 생성 시간이 더 길다.
+    """
+    school_level, _, visual = key
+    a, b = 2.5, 3.5
+    if school_level == "high":
+        b += 1.5
+    if visual:
+        b += 2.0
+    return a, b, 0.25 * (a + 3 * b)
+
+
+class _KeyModel:
+    def __init__(self):
+        self.samples = deque(maxlen=_SAMPLES_PER_KEY)  # (n, latency, completion_tokens, prompt_tokens)
+
+    def fit(self, key: PlanKey) -> Tuple[float, float, float]:
+        prior_a, prior_b, prior_sd = _prior(key)
+        samples = list(self.samples)
+        m = len(samples)
+        if m == 0:
+            return prior_a, prior_b, prior_sd
+
+        mean_n = sum(s[0] for s in samples) / m
+        mean_t = sum(s[1] for s in samples) / m
+        var_n = sum((s[0] - mean_n) ** 2 for s in samples) / m
+        if var_n > 1e-9:
+            cov = sum((s[0] - mean_n) * (s[1] - mean_t) for s in samples) / m
+            b = cov / var_n
+            a = mean_t - b * mean_n
+            resid = [s[1] - (a + b * s[0]) for s in samples]
+        else:
+            # 한 가지 크기만 관측됨 (choose 가 같은 계획을 반복하면 보통 이 경우) → 기울기는 사전값, 절편만 맞춤
+            # 흩어짐은 그 크기의 평균 주변으로만 계산 (사전 기울기와 안 맞는 만큼이 σ 로 가지 않도록)
+            b = prior_b
+            a = mean_t - b * mean_n
+            resid = [s[1] - mean_t for s in samples]
+        if a < 0:
+            # 사전 기울기로는 설명 못 할 만큼 빠름 → 절편 0 으로 두고 관측 평균을 지나도록 기울기를 줄임
+            a, b = 0.0, mean_t / max(mean_n, 1e-9)
+        sd = math.sqrt(sum(r * r for r in resid) / m) if m > 1 else prior_sd
+
+        w = m / (m + _PRIOR_WEIGHT)
+        a = max(0.2, w * a + (1 - w) * prior_a)
+        b = max(0.1, w * b + (1 - w) * prior_b)
+        sd = w * sd + (1 - w) * prior_sd
+        return a, b, max(sd, 0.05 * mean_t)
+
+    def tokens_per_problem(self) -> Optional[float]:
+        pairs = [(n, tok) for n, _, tok, _ in self.samples if tok]
+        if not pairs:
+            return None
+        return sum(tok for _, tok in pairs) / sum(n for n, _ in pairs)
+
+    def prompt_tokens(self) -> Optional[float]:
+        counts = [tok for _, _, _, tok in self.samples if tok]
+        if not counts:
+            return None
+        return sum(counts) / len(counts)
+
+
+class ChunkPlanner:
+    def __init__(self, max_inflight: int = MAX_INFLIGHT_CHUNKS, max_chunk_size: int = MAX_CHUNK_SIZE):
+        self.max_inflight = max_inflight
+        self.max_chunk_size = max_chunk_size
+        self._models: Dict[PlanKey, _KeyModel] = {}
+        self._lock = threading.Lock()
+        self._inflight = 0
+        # AIMD: 429 가 나면 허용량 절반, 이후 조용하면 서서히 회복
+        self._allowed = float(max_inflight)
+        self._last_adjust = time.monotonic()
+        self.tpm = CHUNK_TPM
+        self._spent: deque = deque()  # (시각, 토큰) 최근 1분
+
+    @staticmethod
+    def key_for(plan: List[Dict[str, Any]], school_level: str, grade: int) -> PlanKey:
+        visual = any(item.get("require_visual") for item in plan)
+        return (school_level or "", int(grade or 0), visual)
+
+    # ── 관측 ──
+    def observe(self, key: PlanKey, size: int, latency: float, completion_tokens: int = 0, prompt_tokens: int = 0):
+        with self._lock:
+            self._models.setdefault(key, _KeyModel()).samples.append((size, latency, completion_tokens, prompt_tokens))
+
+    def spend(self, tokens: int):
+        """
+        호출 하나가 쓴 토큰 (프롬프트 + 출력). 최근 1분 합계가 토큰 여유 계산에 쓰인다.
+        """
+        if tokens <= 0:
+            return
+        with self._lock:
+            self._spent.append((time.monotonic(), tokens))
+
+    def note_rate_limited(self):
+        with self._lock:
+            self._allowed = max(1.0, self._allowed / 2)
+            self._last_adjust = time.monotonic()
+
+    def acquire(self):
+        with self._lock:
+            self._inflight += 1
+
+    def release(self):
+        with self._lock:
+            self._inflight = max(0, self._inflight - 1)
+
+    def headroom(self) -> int:
+        with self._lock:
+            now = time.monotonic()
+            steps = int((now - self._last_adjust) / _RECOVER_AFTER)
+            if steps > 0 and self._allowed < self.max_inflight:
+                self._allowed = min(float(self.max_inflight), self._allowed + steps)
+                self._last_adjust = now
+            return max(1, int(self._allowed) - self._inflight)
+
+    def token_headroom(self) -> float:
+        """
+        최근 1분 동안 남은 토큰 예산 (tpm 이 0 이면 무한)
+        """
+        if self.tpm <= 0:
+            return float("inf")
+        with self._lock:
+            cutoff = time.monotonic() - 60.0
+            while self._spent and self._spent[0][0] < cutoff:
+                self._spent.popleft()
+            used = sum(tok for _, tok in self._spent)
+        return max(0.0, self.tpm - used)
+
+    def estimate(self, key: PlanKey) -> Tuple[float, float, float]:
+        with self._lock:
+            model = self._models.get(key)
+        return model.fit(key) if model else _prior(key)
+
+    def estimate_tokens(self, key: PlanKey) -> Tuple[float, float]:
+        """
+        (호출당 프롬프트 토큰, 문제당 출력 토큰). 관측이 없으면 사전값.
+        """
+        with self._lock:
+            model = self._models.get(key)
+        prompt = model.prompt_tokens() if model else None
+        per_problem = model.tokens_per_problem() if model else None
+        return prompt or _PRIOR_PROMPT_TOKENS, per_problem or _PRIOR_TOKENS_PER_PROBLEM
+
+    # ── 분할 결정 ──
+    @staticmethod
+    def pinned() -> bool:
+        # 녹화된 지연/동시 요청 수는 재생 때마다 달라짐 → 관측을 쓰면 청크 분할(요청 지문)이 바뀌어 재생 실패
+        return cassette_mode() in ("record", "replay")
+
+    def choose(self, plan: List[Dict[str, Any]], school_level: str, grade: int) -> Dict[str, Any]:
+        total = len(plan)
+        key = self.key_for(plan, school_level, grade)
+        pinned = self.pinned()
+        if pinned:
+            a, b, sd = _prior(key)
+            prompt_tokens, tokens_per_problem = _PRIOR_PROMPT_TOKENS, _PRIOR_TOKENS_PER_PROBLEM
+        else:
+            a, b, sd = self.estimate(key)
+            prompt_tokens, tokens_per_problem = self.estimate_tokens(key)
+        if total == 0:
+            return {"key": key, "chunks": 0, "size": 0, "expected_seconds": 0.0}
+
+        min_k = max(1, math.ceil(total / self.max_chunk_size))
+        max_k = max(min_k, min(total, self.max_inflight if pinned else self.headroom()))
+        # 남은 토큰 예산으로 감당할 수 있는 청크 수까지만 (청크마다 프롬프트가 반복됨)
+        budget = float("inf") if pinned else self.token_headroom()
+        spare = budget - total * tokens_per_problem
+        if spare != float("inf"):
+            max_k = max(min_k, min(max_k, int(spare // prompt_tokens)))
+        seconds_per_token = 60.0 / self.tpm if self.tpm > 0 else 0.0
+        best_k, best_t = min_k, float("inf")
+        for k in range(min_k, max_k + 1):
+            size = math.ceil(total / k)
+            expected = a + b * size + (sd * math.sqrt(2 * math.log(k)) if k > 1 else 0.0)
+            expected += (k * prompt_tokens + total * tokens_per_problem) * seconds_per_token
+            # 같은 시간이면 청크 수가 적은 쪽 (시스템 프롬프트 반복 토큰 절약)
+            if expected < best_t - 1e-6:
+                best_k, best_t = k, expected
+
+        size = math.ceil(total / best_k)
+        level, g, visual = key
+        labels = {"school_level": level, "grade": g, "visual": str(visual).lower()}
+        CHUNK_PLAN.set(best_k, kind="chunks", **labels)
+        CHUNK_PLAN.set(size, kind="size", **labels)
+        CHUNK_PLAN.set(round(best_t, 3), kind="expected_seconds", **labels)
+        CHUNK_MODEL.set(round(a, 3), param="fixed_seconds", **labels)
+        CHUNK_MODEL.set(round(b, 3), param="seconds_per_problem", **labels)
+        CHUNK_MODEL.set(round(prompt_tokens, 1), param="prompt_tokens", **labels)
+        CHUNK_MODEL.set(round(tokens_per_problem, 1), param="tokens_per_problem", **labels)
+        return {"key": key, "chunks": best_k, "size": size, "expected_seconds": best_t}
+
+    @staticmethod
+    def split(plan: List[Dict[str, Any]], chunks: int) -> List[List[Dict[str, Any]]]:
+        """
+        크기 차이가 최대 1 이 되도록 균등 분할
+        """
+        if chunks <= 1:
+            return [list(plan)] if plan else []
+        base, extra = divmod(len(plan), chunks)
+        result, start = [], 0
+        for i in range(chunks):
+            end = start + base + (1 if i < extra else 0)
+            if end > start:
+                result.append(plan[start:end])
+            start = end
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            keys = list(self._models.keys())
+        result = {}
+        for key in keys:
+            a, b, sd = self.estimate(key)
+            with self._lock:
+                model = self._models[key]
+                samples = len(model.samples)
+            result["/".join(str(k) for k in key)] = {
+                "fixed_seconds": round(a, 3),
+                "seconds_per_problem": round(b, 3),
+                "sd": round(sd, 3),
+                "samples": samples,
+                "tokens_per_problem": model.tokens_per_problem(),
+                "prompt_tokens": model.prompt_tokens(),
+            }
+        return result
+
+
+planner = ChunkPlanner()
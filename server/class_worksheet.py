@@ -0,0 +1,262 @@
+import asyncio
+import hashlib
+import os
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, joinedload
+
+from . import coalesce, question_bank
+from .ai_engine import build_daily_plan, generate_problems_detailed, pick_topics
+from .breaker import breaker
+from .metrics import CLASS_WORKSHEET_PROBLEMS
+from .models import Chapter, Question, Unit, User
+from .tracing import span
+from .validation import VISUAL_KEYWORDS
+
+# ==========================================
+# 반 단위 학습지
+# - 학생 전체를 한 번에 계획 (사용자/단원은 IN 조회 한 번씩)
+# - 학생별 계획을 (학교급, 학년, 주제, 난이도, 유형, 시각자료) 칸으로 합쳐서
+#   칸마다 "가장 많이 필요한 학생" 수만큼만 생성 → 같은 칸의 학생은 같은 문제 묶음을 순서만 달리해서 받음
+# - 학교급/학년별로 생성 호출 1회, 문제가 완성될 때마다 진행 이벤트를 흘려보냄
+# ==========================================
+
+SlotKey = Tuple[str, int, str, int, str, bool]  # (학교급, 학년, 주제, 난이도, 유형, 시각자료)
+
+
+def _slot_key(school_level: str, grade: int, item: Dict[str, Any]) -> SlotKey:
+    return (
+        school_level, int(grade), str(item.get("topic", "")).strip(),
+        int(item.get("difficulty", 2) or 2), str(item.get("type", "drill")), bool(item.get("require_visual")),
+    )
+
+
+def _slot_id(key: SlotKey) -> str:
+    return hashlib.sha1("\x1f".join(map(str, key)).encode("utf-8")).hexdigest()[:12]
+
+
+class ClassPlan:
+    """
+    학생별 계획 + 합친 칸 목록
+    """
+
+    def __init__(self):
+        self.students: Dict[str, Dict[str, Any]] = {}       # userId -> {school_level, grade, plan}
+        self.need: Dict[SlotKey, int] = {}                  # 칸 -> 한 학생이 가장 많이 필요로 하는 수
+        self.unit_of: Dict[SlotKey, Optional[int]] = {}     # 칸 -> 단원 ID (문제 저장/은행 조회용)
+
+    def add(self, user_id: str, school_level: str, grade: int, plan: List[Dict[str, Any]], unit_ids: Dict[str, int]):
+        self.students[user_id] = {"school_level": school_level, "grade": grade, "plan": plan}
+        counts: Dict[SlotKey, int] = {}
+        for item in plan:
+            key = _slot_key(school_level, grade, item)
+            counts[key] = counts.get(key, 0) + 1
+            self.unit_of.setdefault(key, unit_ids.get(key[2]))
+        for key, n in counts.items():
+            self.need[key] = max(self.need.get(key, 0), n)
+
+    def student_slots(self, user_id: str) -> Dict[SlotKey, int]:
+        s = self.students[user_id]
+        counts: Dict[SlotKey, int] = {}
+        for item in s["plan"]:
+            key = _slot_key(s["school_level"], s["grade"], item)
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    @property
+    def requested(self) -> int:
+        return sum(len(s["plan"]) for s in self.students.values())
+
+    @property
+    def distinct(self) -> int:
+        return sum(self.need.values())
+
+
+def plan_class(db: Session, student_ids: List[str], count: int = 10, school_level: Optional[str] = None,
+               grade: Optional[int] = None, unit_id: Optional[int] = None) -> ClassPlan:
+    """
+    plan_daily_worksheet 와 같은 규칙으로 학생 전체를 계획. 학생 수와 무관하게 조회는 몇 번으로 끝난다.
+    단원을 지정하면 모든 학생이 같은 단원 문제를 받는다. 없는 단원이면 LookupError.
+    """
+    result = ClassPlan()
+    student_ids = list(dict.fromkeys(s for s in student_ids if s))
+
+    if unit_id:
+        unit = db.query(Unit).options(joinedload(Unit.chapter)).filter(Unit.id == unit_id).first()
+        if not unit:
+            raise LookupError("Unit not found")
+        level = school_level or (unit.chapter.school_level if unit.chapter else "elementary")
+        g = grade or (unit.chapter.grade if unit.chapter else 3)
+        require_visual = any(k in unit.name for k in VISUAL_KEYWORDS)
+        plan = [{"topic": unit.name, "difficulty": 2, "type": "drill", "require_visual": require_visual}
+                for _ in range(count)]
+        for sid in student_ids:
+            result.add(sid, level, g, plan, {unit.name: unit.id})
+        return result
+
+    # 1. 학교급/학년 (요청 값 > 사용자 설정 > 기본값) — 사용자는 IN 조회 한 번
+    users = {}
+    if not school_level or not grade:
+        users = {u.id: u for u in db.query(User).filter(User.id.in_(student_ids)).all()}
+    levels: Dict[str, Tuple[str, int]] = {}
+    for sid in student_ids:
+        user = users.get(sid)
+        levels[sid] = (
+            school_level or (user.school_level if user else None) or "elementary",
+            grade or (user.grade if user else None) or 3,
+        )
+
+    # 2. 필요한 학년들의 단원 목록도 한 번에
+    wanted = set(levels.values())
+    units_by_grade: Dict[Tuple[str, int], List[Unit]] = {k: [] for k in wanted}
+    rows = db.query(Unit, Chapter.school_level, Chapter.grade).join(Chapter, Unit.chapter_id == Chapter.id).filter(
+        Chapter.school_level.in_({lv for lv, _ in wanted}),
+        Chapter.grade.in_({g for _, g in wanted}),
+    ).all()
+    for unit, lv, g in rows:
+        if (lv, g) in units_by_grade:
+            units_by_grade[(lv, g)].append(unit)
+
+    # 3. 학생별 주제 선택 + 계획
+    for sid in student_ids:
+        lv, g = levels[sid]
+        units = units_by_grade[(lv, g)]
+        plan = build_daily_plan(pick_topics(units), count)
+        result.add(sid, lv, g, plan, {u.name: u.id for u in units})
+    return result
+
+
+async def run_class(plan: ClassPlan, session_factory: Callable[[], Session]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    칸별로 은행 → 생성 순서로 채우고 진행 이벤트를 순서대로 내보낸다.
+        planned  : 학생 수, 학생별 문제 합계, 실제로 만들 문제 수
+        progress : 문제가 하나 준비될 때마다 (ready/total)
+        student  : 한 학생의 칸이 모두 끝나면 그 학생 학습지 (missing: 못 채운 문제 수)
+        done     : 전체 요약
+    """
+    pools: Dict[SlotKey, List[Dict[str, Any]]] = {key: [] for key in plan.need}
+    finished: set = set()
+    pending_students = {sid: plan.student_slots(sid) for sid in plan.students}
+    queue: asyncio.Queue = asyncio.Queue()
+    total = plan.distinct
+    tally = {"ready": 0, "bank": 0, "generated": 0}
+
+    CLASS_WORKSHEET_PROBLEMS.inc(plan.requested, source="requested")
+    yield {"event": "planned", "students": len(plan.students), "requested": plan.requested,
+           "slots": len(plan.need), "total": total}
+
+    def assign(user_id: str) -> Dict[str, Any]:
+        problems, missing = [], 0
+        for key, n in pending_students[user_id].items():
+            got = coalesce.assign(pools[key], user_id, _slot_id(key))[:n]
+            problems.extend(got)
+            missing += n - len(got)
+        return {"event": "student", "userId": user_id, "missing": missing,
+                "problems": coalesce.assign(problems, user_id, "class")}
+
+    def slot_done(key: SlotKey):
+        # 이 칸을 마지막으로 기다리던 학생은 바로 학습지 전달
+        finished.add(key)
+        for sid in [s for s, slots in pending_students.items() if all(k in finished for k in slots)]:
+            queue.put_nowait(assign(sid))
+            del pending_students[sid]
+
+    # 1. 은행에 충분히 쌓인 칸은 생성 없이 바로 채움 (LLM 브레이커가 열려 있으면 은행에 있는 만큼이라도)
+    degraded = breaker.is_open()
+    with session_factory() as db:
+        for key, n in plan.need.items():
+            unit_id = plan.unit_of.get(key)
+            if not unit_id:
+                continue
+            if degraded:
+                banked = question_bank.draw_plan(db, [{"topic": key[2], "difficulty": key[3]}] * n, key[0], key[1], unit_id)
+            else:
+                banked = question_bank.draw(db, unit_id, key[3], n)
+            if banked:
+                pools[key] = banked
+                tally["ready"] += len(banked)
+                tally["bank"] += len(banked)
+        db.commit()
+    if tally["bank"]:
+        CLASS_WORKSHEET_PROBLEMS.inc(tally["bank"], source="bank")
+        yield {"event": "progress", "ready": tally["ready"], "total": total, "source": "bank"}
+    for key in [k for k, pool in pools.items() if pool]:
+        slot_done(key)
+    while not queue.empty():
+        yield queue.get_nowait()
+
+    # 2. 남은 칸은 학교급/학년별로 모아 생성 1회씩
+    groups: Dict[Tuple[str, int], List[SlotKey]] = {}
+    for key in plan.need:
+        if key not in finished:
+            groups.setdefault((key[0], key[1]), []).append(key)
+
+    async def generate_group(school_level: str, grade: int, keys: List[SlotKey]):
+        items, slot_of = [], {}
+        for key in keys:
+            for _ in range(plan.need[key]):
+                item = {"topic": key[2], "difficulty": key[3], "type": key[4]}
+                if key[5]:
+                    item["require_visual"] = True
+                slot_of[id(item)] = key
+                items.append(item)
+        remaining = {key: plan.need[key] for key in keys}
+
+        def save_problem(p, item):
+            key = slot_of.get(id(item))
+            if key is None:
+                return
+            p["id"] = f"q-{os.urandom(4).hex()}"
+            rows.append(Question(
+                id=p["id"], unit_id=plan.unit_of.get(key),
+                difficulty=key[3], type=p.get("type", key[4]), content=p,
+            ))
+            pools[key].append(p)
+            tally["ready"] += 1
+            tally["generated"] += 1
+            queue.put_nowait({"event": "progress", "ready": tally["ready"], "total": total, "topic": key[2]})
+            remaining[key] -= 1
+            if remaining[key] == 0:
+                slot_done(key)
+
+        try:
+            with span("class_generate", school_level=school_level, grade=grade, problems=len(items)):
+                await generate_problems_detailed(items, school_level=school_level, grade=grade, on_problem=save_problem)
+        except Exception as e:
+            print(f"❌ Class worksheet generation failed ({school_level} {grade}): {type(e).__name__}: {e}")
+        finally:
+            # 끝내 못 채운 칸도 닫아서 기다리던 학생에게 있는 만큼 전달
+            for key in keys:
+                if key not in finished:
+                    slot_done(key)
+
+    async def generate_all():
+        await asyncio.gather(*(generate_group(lv, g, keys) for (lv, g), keys in groups.items()))
+        # 학교급/학년 그룹이 동시에 쓰면 SQLite 쓰기 잠금이 겹치므로 저장은 끝에 한 트랜잭션으로
+        if rows:
+            with session_factory() as db, span("db_commit", rows=len(rows)):
+                db.add_all(rows)
+                question_bank.mark_served(db, [r.id for r in rows])
+                db.commit()
+
+    rows: List[Question] = []
+    waiter = asyncio.ensure_future(generate_all())
+    try:
+        while not (waiter.done() and queue.empty()):
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+            else:
+                getter.cancel()
+    finally:
+        if not waiter.done():
+            # 클라이언트가 끊겨도 생성/저장은 끝까지 진행 (다음 요청에서 은행으로 재사용)
+            print("⚠️ Class worksheet stream closed early; generation continues in background")
+    if tally["generated"]:
+        CLASS_WORKSHEET_PROBLEMS.inc(tally["generated"], source="generated")
+    for sid in list(pending_students):
+        yield assign(sid)
+
+    yield {"event": "done", "students": len(plan.students), "requested": plan.requested, "total": total,
+           "ready": tally["ready"], "bank": tally["bank"], "generated": tally["generated"]}
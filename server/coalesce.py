@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .metrics import WORKSHEET_CACHE, WORKSHEET_COALESCE
+from .shared_cache import cache as shared_cache
+
+# ==========================================
+# 동일 학습지 요청 합치기 (single-flight)
+# - 한 반 학생들이 같은 단원/문항 수를 몇 초 안에 요청하면 생성은 한 번만 하고 결과를 나눠 씀
+# - 키: 정규화한 계획 (단원, 학교급, 학년, 주제/난이도/유형 구성)
+# - 학생마다 문제 순서는 사용자 ID 기준으로 섞어서 전달
+# - 끝난 결과는 TTL 캐시에 잠깐 보관 (워커 공유 캐시가 켜져 있으면 거기에, 아니면 메모리 LRU. 둘 다 같은 바이트 상한)
+#   생성 진행 중(single-flight) 합치기는 워커 프로세스 안에서만
+# ==========================================
+
+WORKSHEET_COALESCE_ENABLED = os.getenv("WORKSHEET_COALESCE", "1") != "0"
+WORKSHEET_CACHE_TTL = float(os.getenv("WORKSHEET_CACHE_TTL", "120"))
+WORKSHEET_CACHE_MAX_BYTES = int(os.getenv("WORKSHEET_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+
+def plan_key(plan: List[Dict[str, Any]], school_level: str, grade: int, unit_id: Optional[int] = None) -> str:
+    """
+    계획 항목 순서와 무관한 키. (주제, 난이도, 유형, 시각자료) 구성이 같으면 같은 학습지로 본다.
+    """
+    mix: Dict[Tuple, int] = {}
+    for item in plan:
+        slot = (
+            str(item.get("topic", "")).strip(),
+            int(item.get("difficulty", 2) or 2),
+            str(item.get("type", "drill")),
+            bool(item.get("require_visual")),
+        )
+        mix[slot] = mix.get(slot, 0) + 1
+    raw = json.dumps(
+        [unit_id, school_level or "", int(grade or 0), sorted([list(k) + [n] for k, n in mix.items()])],
+        ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def assign(problems: List[Dict[str, Any]], user_id: str, key: str) -> List[Dict[str, Any]]:
+    """
+    사용자별 고정 셔플 (같은 학생이 다시 요청하면 같은 순서)
+    """
+    shuffled = list(problems)
+    seed = hashlib.sha1(f"{user_id}:{key}".encode("utf-8")).hexdigest()
+    random.Random(seed).shuffle(shuffled)
+    return shuffled
+
+
+class WorksheetCoalescer:
+    def __init__(self, ttl: float = WORKSHEET_CACHE_TTL, max_bytes: int = WORKSHEET_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._cache: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()  # key -> (만료 시각, 크기, 결과)
+        self._bytes = 0
+
+    # ── 결과 캐시 ──
+    async def _get_cached(self, key: str) -> Optional[Any]:
+        if shared_cache.enabled:
+            return await shared_cache.aget("worksheet", key)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires, _, value = entry
+        if expires < time.monotonic():
+            self._evict(key)
+            return None
+        self._cache.move_to_end(key)
+        return value
+
+    def _evict(self, key: str):
+        entry = self._cache.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    async def _put(self, key: str, value: Any):
+        if self.ttl <= 0:
+            return
+        size = len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if shared_cache.enabled:
+            await asyncio.to_thread(self._put_shared, key, value)
+            return
+        self._evict(key)
+        self._cache[key] = (time.monotonic() + self.ttl, size, value)
+        self._bytes += size
+        # 만료된 것부터, 그래도 넘치면 가장 오래 안 쓴 것부터 제거
+        now = time.monotonic()
+        for k in [k for k, (expires, _, _) in self._cache.items() if expires < now]:
+            self._evict(k)
+        while self._bytes > self.max_bytes and self._cache:
+            self._evict(next(iter(self._cache)))
+        self._report()
+
+    def _put_shared(self, key: str, value: Any):
+        shared_cache.set("worksheet", key, value, self.ttl, max_bytes=self.max_bytes)
+        self._report()
+
+    def _usage(self) -> Tuple[int, int]:
+        if shared_cache.enabled:
+            usage = shared_cache.usage("worksheet")
+            return usage["entries"], usage["bytes"]
+        return len(self._cache), self._bytes
+
+    def _report(self):
+        entries, size = self._usage()
+        WORKSHEET_CACHE.set(entries, kind="entries")
+        WORKSHEET_CACHE.set(size, kind="bytes")
+
+    def invalidate(self, key: Optional[str] = None):
+        if shared_cache.enabled:
+            if key is None:
+                shared_cache.invalidate("worksheet")
+            else:
+                shared_cache.delete("worksheet", key)
+        if key is None:
+            self._cache.clear()
+            self._bytes = 0
+        else:
+            self._evict(key)
+        self._report()
+
+    # ── single-flight ──
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]], cacheable: Callable[[Any], bool] = lambda _: True) -> Tuple[Any, str]:
+        """
+        같은 키의 생성이 진행 중이면 그 결과를 기다리고, 아니면 직접 생성.
+        반환: (결과, 역할) — 역할은 leader | joined | cached
+        """
+        if not WORKSHEET_COALESCE_ENABLED:
+            return await factory(), "leader"
+
+        cached = await self._get_cached(key)
+        if cached is not None:
+            WORKSHEET_COALESCE.inc(outcome="cached")
+            return cached, "cached"
+
+        future = self._inflight.get(key)
+        if future is not None:
+            WORKSHEET_COALESCE.inc(outcome="joined")
+            # 기다리던 요청 하나가 취소돼도 공유 생성은 계속 진행
+            return await asyncio.shield(future), "joined"
+
+        WORKSHEET_COALESCE.inc(outcome="leader")
+        future = asyncio.ensure_future(factory())
+        self._inflight[key] = future
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._inflight.pop(key, None)
+            else:
+                # 리더 요청만 취소된 경우: 생성이 끝나면 정리
+                future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        if cacheable(result):
+            await self._put(key, result)
+        return result, "leader"
+
+    def snapshot(self) -> Dict[str, Any]:
+        entries, size = self._usage()
+        return {
+            "inflight": len(self._inflight),
+            "cached": entries,
+            "cached_bytes": size,
+            "shared": shared_cache.enabled,
+            "ttl": self.ttl,
+            "max_bytes": self.max_bytes,
+        }
+
+
+coalescer = WorksheetCoalescer()
@@ -0,0 +1,169 @@
+"""
+빠른 JSON 직렬화 (orjson, 없으면 표준 json)
+
+- LLM 응답 파싱, Question.content 저장/로드, 공유 캐시 값, 학습지 응답 렌더링에 사용
+- 학습지 문제는 생성 시 validate_problem 으로 이미 검증됨 → 응답 때 Pydantic 모델을 다시 만들지 않고
+  ProblemResponse 와 같은 필드의 dict 를 바로 bytes 로 직렬화
+
+    python -m server.fastjson --bench      # 학습지 1장당 CPU 시간/할당량 비교 (기존 경로 vs 빠른 경로)
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # 선택 의존성
+    orjson = None
+
+# orjson.JSONDecodeError 는 json.JSONDecodeError 의 하위 클래스 → 호출하는 쪽은 json.JSONDecodeError 만 잡으면 됨
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    UTF-8 bytes (한글은 이스케이프하지 않음). 알 수 없는 타입은 str 로.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def dumps_str(obj: Any) -> str:
+    # SQLAlchemy JSON 컬럼 / SQLite TEXT 용
+    return dumps(obj).decode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# ==========================================
+# 학습지 응답
+# ==========================================
+
+def problem_payload(p: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    main.to_problem_response 와 같은 필드/변환, Pydantic 모델 없이
+    """
+    try:
+        difficulty = int(p["difficulty"])
+    except (KeyError, TypeError, ValueError):
+        difficulty = 2
+    return {
+        "id": p.get("id"),
+        "topic": p.get("topic", ""),
+        "difficulty": difficulty,
+        "type": p.get("type", "drill"),
+        "question": p["question"],
+        "options": [str(o) for o in p["options"]],
+        "answer": str(p["answer"]),
+        "explanation": p.get("explanation", ""),
+    }
+
+
+def render_problems(problems: Iterable[Dict[str, Any]], response: Optional[Response] = None) -> FastJSONResponse:
+    """
+    학습지 응답. 엔드포인트에서 Response 를 직접 반환하면 주입된 response 의 헤더가 합쳐지지 않으므로 복사한다.
+    """
+    headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"} if response else None
+    return FastJSONResponse([problem_payload(p) for p in problems], headers=headers)
+
+
+# ==========================================
+# 마이크로 벤치마크
+# ==========================================
+
+def _sample_worksheet(n: int = 10) -> List[Dict[str, Any]]:
+    from . import procedural
+
+    problems = procedural.generate("삼각형의 넓이", 2, n, seed=0)
+    for p in problems:
+        # LLM 이 그리는 도형 크기 (수 KB) 에 맞춤
+        p["svg"] = p["svg"].replace("</svg>", "<!--" + "x" * 2500 + "--></svg>")
+    return problems
+
+
+def _measure(fn: Callable[[], Any], rounds: int) -> Dict[str, float]:
+    fn()
+    start = time.process_time()
+    for _ in range(rounds):
+        fn()
+    cpu = (time.process_time() - start) / rounds
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"cpu_us": round(cpu * 1e6, 1), "peak_kb": round(peak / 1024, 1)}
+
+
+def bench(rounds: int = 2000):
+    import os
+
+    from pydantic import TypeAdapter
+
+    # 기존 경로(main.to_problem_response)를 그대로 재기 위해 main 을 불러옴 → 실제 DB 대신 메모리 DB
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    os.environ.setdefault("SHARED_CACHE", "0")
+
+    from .main import ProblemResponse, to_problem_response
+    from .stream_json import ProblemStreamParser
+
+    problems = _sample_worksheet()
+    llm_text = json.dumps({"problems": problems}, ensure_ascii=False)
+    chunks = [llm_text[i:i + 40] for i in range(0, len(llm_text), 40)]
+    stored = [json.dumps(p) for p in problems]
+    stored_fast = [dumps_str(p) for p in problems]
+    adapter = TypeAdapter(List[ProblemResponse])
+
+    def parse_stream():
+        parser = ProblemStreamParser()
+        for c in chunks:
+            parser.feed(c)
+
+    cases = {
+        # 응답: 모델 생성 + FastAPI 직렬화 (TypeAdapter.dump_json, 표준 json) vs dict → orjson
+        "render: pydantic models + dump_json": lambda: adapter.dump_json([to_problem_response(p) for p in problems]),
+        "render: pydantic models + json.dumps": lambda: json.dumps([to_problem_response(p).model_dump() for p in problems]).encode(),
+        "render: payload dict + fastjson": lambda: dumps([problem_payload(p) for p in problems]),
+        # Question.content 저장/로드 (SQLAlchemy JSON 컬럼 기본값 vs fastjson)
+        "content: json.dumps": lambda: [json.dumps(p) for p in problems],
+        "content: fastjson.dumps_str": lambda: [dumps_str(p) for p in problems],
+        "content: json.loads": lambda: [json.loads(s) for s in stored],
+        "content: fastjson.loads": lambda: [loads(s) for s in stored_fast],
+        # LLM 스트림 파싱 (40자 조각)
+        "llm: stream parser": parse_stream,
+    }
+    print(f"⚙️ orjson: {'yes' if orjson is not None else 'no (stdlib json)'}, worksheet = {len(problems)} problems, "
+          f"{len(llm_text) / 1024:.1f} KB, {rounds} rounds")
+    for name, fn in cases.items():
+        r = _measure(fn, rounds)
+        print(f"   {name:<40}{r['cpu_us']:>10} µs{r['peak_kb']:>10} KB peak")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 직렬화 마이크로 벤치마크")
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+    if args.bench:
+        bench(args.rounds)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+OpenAI 호환 로컬 스텁 서버 (부하 테스트용, 실제 API 쿼터를 쓰지 않음)
+
+    python -m server.llm_stub --port 8100 --latency lognormal:2.0,0.5 --error-rate 0.02 --rate-limit-rate 0.05
+
+백엔드는 OPENAI_BASE_URL=http://localhost:8100/v1 로 실행하면 이 서버로 요청을 보낸다.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+# ==========================================
+# 지연 시간 분포
+# ==========================================
+
+class LatencyModel:
+    """
+    "fixed:1.5" | "uniform:0.5,3" | "lognormal:<median 초>,<sigma>" 형식의 지연 분포
+    """
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, _, args = spec.partition(":")
+        self.kind = kind
+        self.args = [float(a) for a in args.split(",") if a]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency spec: {spec}")
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.args[0] if self.args else 0.0
+        if self.kind == "uniform":
+            return random.uniform(self.args[0], self.args[1])
+        median, sigma = self.args[0], (self.args[1] if len(self.args) > 1 else 0.5)
+        return random.lognormvariate(math.log(max(median, 1e-6)), sigma)
+
+
+class StubConfig:
+    def __init__(
+        self,
+        latency: str = "fixed:0",
+        per_problem_latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        stream_chunk_chars: int = 24,
+        cached_ratio: float = 0.8,
+    ):
+        self.latency = LatencyModel(latency)
+        self.per_problem_latency = per_problem_latency  # 문제 1개당 추가 생성 시간
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.stream_chunk_chars = stream_chunk_chars
+        self.cached_ratio = cached_ratio  # 프롬프트 토큰 중 캐시 적중 비율 (프리픽스 캐시 흉내)
+
+
+# ==========================================
+# 고정 응답 페이로드
+# ==========================================
+
+_RECT_SVG = (
+    '<svg viewBox="0 0 300 250" xmlns="http://www.w3.org/2000/svg">'
+    '<rect x="70" y="60" width="160" height="120" fill="none" stroke="#000" stroke-width="2"/></svg>'
+)
+
+
+def _extract_plan(user_text: str) -> List[Dict[str, Any]]:
+    start = user_text.find("[")
+    if start >= 0:
+        try:
+            plan = json.loads(user_text[start:])
+            if isinstance(plan, list):
+                return plan
+        except json.JSONDecodeError:
+            pass
+    m = re.search(r"총 (\d+)개", user_text)
+    count = int(m.group(1)) if m else 3
+    return [{"topic": "수와 연산", "difficulty": 2, "type": "drill"}] * count
+
+
+def canned_problem(item: Dict[str, Any], index: int) -> Dict[str, Any]:
+    a, b = 3 + index % 7, 4 + index % 5
+    answer = str(a * b)
+    visual = bool(item.get("require_visual"))
+    return {
+        "topic": item.get("topic", "수와 연산"),
+        "difficulty": item.get("difficulty", 2),
+        "type": item.get("type", "drill"),
+        "question": f"가로가 {a}cm, 세로가 {b}cm인 직사각형 모양 화단의 넓이는 몇 cm²인가요?",
+        "svg": _RECT_SVG if visual else "",
+        "options": [str(a * b - a), answer, str(2 * (a + b)), str(a * b + b)],
+        "answer": answer,
+        "explanation": f"1단계: 직사각형의 넓이는 (가로)×(세로)입니다.\n2단계: {a}×{b}={answer}\n3단계: 답은 {answer}cm²입니다.",
+    }
+
+
+def build_reply(messages: List[Dict[str, Any]], json_mode: bool) -> Dict[str, Any]:
+    system_text = "\n".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+    user_text = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+
+    if json_mode and "출제 위원" in system_text:
+        plan = _extract_plan(user_text)
+        problems = [canned_problem(item, i) for i, item in enumerate(plan)]
+        return {"content": json.dumps({"problems": problems}, ensure_ascii=False), "problems": len(problems)}
+    if json_mode:
+        analysis = {
+            "error_type": "계산 실수",
+            "reasoning": "곱셈 과정에서 받아올림을 빠뜨렸습니다.",
+            "advice": "곱셈 후 자리값을 한 번 더 확인해 보세요.",
+            "feedback": "곱셈 후 자리값을 한 번 더 확인해 보세요.",
+            "severity": 2,
+        }
+        return {"content": json.dumps(analysis, ensure_ascii=False), "problems": 0}
+    if "쉬운 문장" in system_text or "이해하기 쉬운" in system_text:
+        text = user_text.replace("문제:", "").strip()
+        return {"content": f"{text} 천천히 같이 생각해 볼까요?", "problems": 0}
+    return {"content": "좋은 질문이에요! 😊 먼저 문제에서 주어진 조건을 하나씩 적어 볼까요? 그 다음 $x$ 를 무엇으로 두면 좋을지 생각해 봐요.", "problems": 0}
+
+
+def _usage(messages: List[Dict[str, Any]], content: str, cached_ratio: float) -> Dict[str, Any]:
+    prompt_chars = sum(len(m.get("content") or "") for m in messages)
+    prompt_tokens = max(1, prompt_chars // 2)
+    completion_tokens = max(1, len(content) // 2)
+    # OpenAI 프리픽스 캐시는 1024 토큰 이상, 128 토큰 단위로 적중
+    cached = int(prompt_tokens * cached_ratio) // 128 * 128 if prompt_tokens >= 1024 else 0
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached},
+    }
+
+
+# ==========================================
+# 앱
+# ==========================================
+
+def create_app(config: Optional[StubConfig] = None) -> FastAPI:
+    config = config or StubConfig()
+    app = FastAPI()
+    app.state.config = config
+    app.state.requests = 0
+
+    @app.get("/v1/models")
+    def list_models():
+        return {"object": "list", "data": [{"id": m, "object": "model"} for m in ("gpt-4o-mini", "gpt-4o", "o1-preview")]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        cfg: StubConfig = app.state.config
+
+        roll = random.random()
+        if roll < cfg.rate_limit_rate:
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": "1"},
+                content={"error": {"message": "Rate limit reached (stub)", "type": "requests", "code": "rate_limit_exceeded"}},
+            )
+        if roll < cfg.rate_limit_rate + cfg.error_rate:
+            await asyncio.sleep(cfg.latency.sample() * 0.1)
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Internal error (stub)", "type": "server_error", "code": None}},
+            )
+
+        messages = body.get("messages", [])
+        model = body.get("model", "gpt-4o-mini")
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        reply = build_reply(messages, json_mode)
+        content = reply["content"]
+        total_latency = cfg.latency.sample() + cfg.per_problem_latency * reply["problems"]
+        completion_id = f"chatcmpl-stub-{os.urandom(6).hex()}"
+        created = int(time.time())
+        usage = _usage(messages, content, cfg.cached_ratio)
+
+        if not body.get("stream"):
+            await asyncio.sleep(total_latency)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        step = max(1, cfg.stream_chunk_chars)
+        pieces = [content[i:i + step] for i in range(0, len(content), step)] or [""]
+        # 첫 토큰까지 30%, 나머지를 조각마다 균등 분배
+        first_delay = total_latency * 0.3
+        per_piece = (total_latency - first_delay) / len(pieces)
+
+        def chunk(delta: Dict[str, Any], finish: Optional[str] = None, usage_obj=None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            if usage_obj is not None:
+                payload["choices"] = []
+                payload["usage"] = usage_obj
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        async def event_stream():
+            await asyncio.sleep(first_delay)
+            yield chunk({"role": "assistant", "content": ""})
+            for piece in pieces:
+                yield chunk({"content": piece})
+                if per_piece > 0:
+                    await asyncio.sleep(per_piece)
+            yield chunk({}, finish="stop")
+            if include_usage:
+                yield chunk({}, usage_obj=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 호환 스텁 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", default="lognormal:1.5,0.4", help="fixed:S | uniform:A,B | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--per-problem-latency", type=float, default=0.8)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--stream-chunk-chars", type=int, default=24)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = StubConfig(
+        latency=args.latency,
+        per_problem_latency=args.per_problem_latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        stream_chunk_chars=args.stream_chunk_chars,
+    )
+    print(f"🧪 OpenAI stub listening on http://{args.host}:{args.port}/v1")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+백엔드 부하 테스트 드라이버
+
+    # 1) 스텁 LLM 서버
+    python -m server.llm_stub --port 8100
+    # 2) 백엔드 (스텁으로 연결)
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=sk-stub python server/main.py
+    # 3) 부하 발생
+    python -m server.loadtest --base-url http://127.0.0.1:8000 --concurrency 30 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+# 교실 사용 패턴 기준 기본 트래픽 비율
+DEFAULT_MIX = {"generate": 2, "submit": 4, "analyze": 3, "rewrite": 1, "chat": 2}
+
+SAMPLE_QUESTIONS = [
+    ("가로가 8cm, 세로가 5cm인 직사각형의 넓이는?", "40", "13"),
+    ("어떤 수에 7을 곱했더니 56이 되었습니다. 어떤 수는?", "8", "49"),
+    ("2x + 3 = 11 일 때 x 의 값은?", "4", "7"),
+    ("12와 18의 최대공약수는?", "6", "36"),
+]
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.first_byte: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def ok(self, name: str, seconds: float, ttfb: Optional[float] = None):
+        self.latencies[name].append(seconds)
+        if ttfb is not None:
+            self.first_byte[name].append(ttfb)
+
+    def fail(self, name: str, reason: str):
+        self.errors[name][reason] += 1
+
+    def report(self, wall_seconds: float) -> Dict[str, Any]:
+        result = {"wall_seconds": round(wall_seconds, 2), "scenarios": {}}
+        total_ok = total_err = 0
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies.get(name, []))
+            errors = dict(self.errors.get(name, {}))
+            n_err = sum(errors.values())
+            total_ok += len(values)
+            total_err += n_err
+            row = {
+                "ok": len(values),
+                "errors": errors,
+                "rps": round(len(values) / wall_seconds, 2) if wall_seconds else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p90_ms": round(percentile(values, 90) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1) if values else 0.0,
+            }
+            ttfb = sorted(self.first_byte.get(name, []))
+            if ttfb:
+                row["ttfb_p50_ms"] = round(percentile(ttfb, 50) * 1000, 1)
+                row["ttfb_p95_ms"] = round(percentile(ttfb, 95) * 1000, 1)
+            result["scenarios"][name] = row
+        result["total_ok"] = total_ok
+        result["total_errors"] = total_err
+        result["throughput_rps"] = round(total_ok / wall_seconds, 2) if wall_seconds else 0.0
+        return result
+
+
+class Scenarios:
+    def __init__(self, client: httpx.AsyncClient, unit_ids: List[int], users: int, worksheet_size: int):
+        self.client = client
+        self.unit_ids = unit_ids
+        self.users = users
+        self.worksheet_size = worksheet_size
+
+    def _user(self) -> str:
+        return f"load-user-{random.randrange(self.users)}"
+
+    async def generate(self):
+        body: Dict[str, Any] = {"userId": self._user(), "count": self.worksheet_size}
+        if self.unit_ids and random.random() < 0.7:
+            body["unitId"] = random.choice(self.unit_ids)
+        return await self.client.post("/api/daily-worksheet/generate", json=body)
+
+    async def submit(self):
+        body = {"userId": self._user(), "accuracy": round(random.random(), 2)}
+        return await self.client.post("/api/daily-worksheet/submit", json=body)
+
+    async def analyze(self):
+        question, correct, wrong = random.choice(SAMPLE_QUESTIONS)
+        body = {
+            "userId": self._user(),
+            "problemId": f"q-load-{random.randrange(1000)}",
+            "userAnswer": wrong,
+            "correctAnswer": correct,
+            "questionText": question,
+        }
+        return await self.client.post("/api/analyze-error", json=body)
+
+    async def rewrite(self):
+        question, _, _ = random.choice(SAMPLE_QUESTIONS)
+        return await self.client.post("/api/rewrite-problem", json={"questionText": question})
+
+    async def chat(self):
+        question, _, _ = random.choice(SAMPLE_QUESTIONS)
+        body = {
+            "messages": [{"role": "user", "content": "이 문제 어떻게 시작해야 할지 모르겠어요."}],
+            "problemContext": question,
+        }
+        start = time.perf_counter()
+        ttfb = None
+        async with self.client.stream("POST", "/api/chat", json=body) as response:
+            async for piece in response.aiter_text():
+                if ttfb is None and piece:
+                    ttfb = time.perf_counter() - start
+        response.ttfb = ttfb
+        return response
+
+
+async def _load_unit_ids(client: httpx.AsyncClient) -> List[int]:
+    unit_ids: List[int] = []
+    for level, grade in (("elementary", 3), ("elementary", 5), ("middle", 1), ("high", 1)):
+        try:
+            r = await client.get(f"/api/curriculum/{level}/{grade}")
+            for chapter in r.json():
+                unit_ids.extend(u["id"] for u in chapter.get("units", []))
+        except (httpx.HTTPError, ValueError):
+            continue
+    return unit_ids
+
+
+async def run_load(
+    base_url: str,
+    mix: Dict[str, float],
+    concurrency: int = 20,
+    duration: Optional[float] = 30.0,
+    total_requests: Optional[int] = None,
+    users: int = 200,
+    worksheet_size: int = 10,
+    timeout: float = 180.0,
+) -> Dict[str, Any]:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        unit_ids = await _load_unit_ids(client)
+        scenarios = Scenarios(client, unit_ids, users, worksheet_size)
+        names = [n for n, w in mix.items() if w > 0]
+        weights = [mix[n] for n in names]
+        fns: Dict[str, Callable] = {n: getattr(scenarios, n) for n in names}
+
+        issued = 0
+        deadline = time.perf_counter() + duration if duration else None
+
+        def next_name() -> Optional[str]:
+            nonlocal issued
+            if total_requests is not None and issued >= total_requests:
+                return None
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            issued += 1
+            return random.choices(names, weights)[0]
+
+        async def worker():
+            while True:
+                name = next_name()
+                if name is None:
+                    return
+                start = time.perf_counter()
+                try:
+                    response = await fns[name]()
+                except httpx.HTTPError as e:
+                    recorder.fail(name, type(e).__name__)
+                    continue
+                elapsed = time.perf_counter() - start
+                if response.status_code >= 400:
+                    recorder.fail(name, str(response.status_code))
+                else:
+                    recorder.ok(name, elapsed, getattr(response, "ttfb", None))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+    return recorder.report(wall)
+
+
+def parse_mix(spec: Optional[str]) -> Dict[str, float]:
+    if not spec:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown scenario: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n📊 Load test finished in {report['wall_seconds']}s — "
+          f"{report['total_ok']} ok / {report['total_errors']} errors, {report['throughput_rps']} req/s")
+    header = f"{'scenario':<10}{'ok':>7}{'err':>6}{'rps':>8}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, row in report["scenarios"].items():
+        n_err = sum(row["errors"].values())
+        print(f"{name:<10}{row['ok']:>7}{n_err:>6}{row['rps']:>8}{row['p50_ms']:>9}{row['p90_ms']:>9}"
+              f"{row['p95_ms']:>9}{row['p99_ms']:>9}{row['max_ms']:>9}")
+        if "ttfb_p50_ms" in row:
+            print(f"{'':<10}  first byte p50={row['ttfb_p50_ms']}ms p95={row['ttfb_p95_ms']}ms")
+        if row["errors"]:
+            print(f"{'':<10}  errors: {row['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MathDaily 백엔드 부하 테스트")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mix", help="예: generate=2,submit=4,analyze=3,rewrite=1,chat=2")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="초 단위 (--requests 지정 시 무시)")
+    parser.add_argument("--requests", type=int, help="총 요청 수")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--worksheet-size", type=int, default=10)
+    parser.add_argument("--json", dest="json_out", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(
+        args.base_url,
+        parse_mix(args.mix),
+        concurrency=args.concurrency,
+        duration=None if args.requests else args.duration,
+        total_requests=args.requests,
+        users=args.users,
+        worksheet_size=args.worksheet_size,
+    ))
+    print_report(report)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
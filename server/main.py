@@ -1,15 +1,20 @@
-from fastapi import FastAPI, HTTPException, Depends, Body
+from fastapi import FastAPI, HTTPException, Depends, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import List, Optional, Dict, Any
 import os
 import sys
 import json
+import time
 import asyncio
+from datetime import date as date_cls
+from urllib.parse import quote
+
+_IMPORT_STARTED = time.perf_counter()
 
 # 현재 디렉토리 루트 추가
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -20,13 +25,22 @@ from server.models import Base, User, Question, UserKnowledge, WeaknessLog, Chap
 from server.ai_engine import (
     plan_daily_worksheet, 
     generate_problems_with_gpt, 
+    generate_problems_detailed,
     adjust_difficulty_level, 
     analyze_error,
     rewrite_problem,
     TUTOR_SYSTEM_PROMPT,
-    get_openai_client 
+    get_openai_client,
+    probe_upstream
 )
 from server.curriculum_data import seed_curriculum
+from server import class_worksheet, coalesce, fastjson, metrics, procedural, question_bank, rollups, search, serve, tracing, variants, weakness
+from server.metrics import track_llm, track_stage
+from server.tracing import span
+from server.model_router import router
+from server.breaker import CircuitOpenError, breaker
+from server.shared_cache import cache as shared_cache, local as local_cache
+from server.validation import VISUAL_KEYWORDS
 
 import openai 
 from openai import RateLimitError, AuthenticationError
@@ -48,13 +62,39 @@ connect_args = {}
 if DATABASE_URL.startswith("sqlite"):
     connect_args["check_same_thread"] = False
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+# Question.content 등 JSON 컬럼은 orjson 으로 (없으면 표준 json)
+engine = create_engine(DATABASE_URL, connect_args=connect_args,
+                       json_serializer=fastjson.dumps_str, json_deserializer=fastjson.loads)
+metrics.instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base.metadata.create_all(bind=engine)
-
-with SessionLocal() as db:
-    seed_curriculum(db)
+if DATABASE_URL.startswith("sqlite") and serve.worker_count() > 1:
+    # 멀티 워커: 읽기가 다른 워커의 쓰기를 기다리지 않도록 WAL, 쓰기 충돌은 잠깐 대기
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=10000")
+        cursor.close()
+
+def bootstrap():
+    bootstrap_started = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+    search.ensure_search_index(engine)
+    with SessionLocal() as db:
+        seed_curriculum(db)
+    # 시드로 단원이 바뀌었을 수 있으므로 워커 공유 커리큘럼 캐시 비움
+    shared_cache.invalidate("curriculum")
+    STARTUP["bootstrap_s"] = round(time.perf_counter() - bootstrap_started, 3)
+
+# 시작 단계별 소요 시간 (/healthz 로 런처에 보고)
+STARTUP: Dict[str, Any] = {"pid": os.getpid(), "bootstrap_s": None}
+
+# 멀티 워커면 한 워커만 실행 (server/serve.py)
+serve.run_once("bootstrap", bootstrap)
+STARTUP["import_s"] = round(time.perf_counter() - _IMPORT_STARTED, 3)
+STARTUP["ready_at"] = time.time()
 
 app = FastAPI()
 
@@ -67,6 +107,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 요청 지연 시간 수집 (라우트 템플릿 단위로 집계 → 라벨 폭증 방지)
+# + 샘플된 요청은 루트 span 생성 (X-Trace: 1 헤더로 강제 샘플 가능)
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    force_trace = request.headers.get("x-trace") == "1"
+    with tracing.start_trace(f"{request.method} {request.url.path}", force=force_trace) as root:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            if root is not None:
+                response.headers["X-Trace-Id"] = root.trace.trace_id
+            return response
+        finally:
+            route = request.scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            if root is not None:
+                root.set(endpoint=endpoint, status=status)
+            metrics.HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=request.method, endpoint=endpoint, status=status
+            )
+
 # Dependency
 def get_db():
     db = SessionLocal()
@@ -83,7 +147,22 @@ class GenerateRequest(BaseModel):
     schoolLevel: Optional[str] = None
     grade: Optional[int] = None
 
+class ClassWorksheetRequest(BaseModel):
+    studentIds: List[str]
+    count: int = 10
+    unitId: Optional[int] = None
+    schoolLevel: Optional[str] = None
+    grade: Optional[int] = None
+
+class SimilarRequest(BaseModel):
+    problemId: Optional[str] = None
+    problem: Optional[Dict[str, Any]] = None   # 은행에 없는 문제 (화면에 있는 문제 그대로)
+    count: int = 3
+    schoolLevel: Optional[str] = None
+    grade: Optional[int] = None
+
 class ProblemResponse(BaseModel):
+    id: Optional[str] = None            # 은행에 저장된 문제 ID (제출/오답 분석의 problemId)
     topic: str
     difficulty: int
     type: str 
@@ -92,9 +171,47 @@ class ProblemResponse(BaseModel):
     answer: str
     explanation: str
 
+
+def to_problem_response(p: Dict[str, Any]) -> ProblemResponse:
+    difficulty_val = 2
+    try:
+        difficulty_val = int(p['difficulty'])
+    except:
+        pass
+    return ProblemResponse(
+        id=p.get('id'),
+        topic=p.get('topic', ''),
+        difficulty=difficulty_val,
+        type=p.get('type', 'drill'),
+        question=p['question'],
+        options=p['options'],
+        answer=str(p['answer']),
+        explanation=p.get('explanation', '')
+    )
+
+class SubmitResponseItem(BaseModel):
+    problemId: Optional[str] = None
+    isCorrect: bool
+    timeSpentSec: Optional[int] = None
+
 class SubmitRequest(BaseModel):
     userId: str
     accuracy: float 
+    # 통계 롤업용 (선택)
+    unitId: Optional[int] = None
+    date: Optional[str] = None          # 사용자 기준 날짜 "2026-02-14" (없으면 서버 기준 오늘)
+    totalCount: Optional[int] = None
+    correctCount: Optional[int] = None
+    topics: List[str] = []
+    responses: List[SubmitResponseItem] = []
+
+    @field_validator("date")
+    @classmethod
+    def _iso_date(cls, value: Optional[str]) -> Optional[str]:
+        # 롤업의 날짜 키/마지막 학습일 비교가 문자열 순서라 YYYY-MM-DD 로 정규화
+        if value is None:
+            return None
+        return date_cls.fromisoformat(value.strip()).isoformat()
 
 class AnalyzeRequest(BaseModel):
     userId: str
@@ -126,9 +243,17 @@ class ChapterDto(BaseModel):
 
 # ── API 엔드포인트 ──
 
+CURRICULUM_CACHE_TTL = float(os.getenv("CURRICULUM_CACHE_TTL", "3600"))
+
 @app.get("/api/curriculum/{school_level}/{grade}", response_model=List[ChapterDto])
 def get_curriculum(school_level: str, grade: int, db: Session = Depends(get_db)):
     print(f"📡 API Request: GET /api/curriculum/{school_level}/{grade}")
+
+    # 커리큘럼은 시드/가져오기 때만 바뀜 → 워커 공유 캐시 (바뀔 때 "curriculum" 무효화)
+    cache_key = f"{school_level}:{grade}"
+    cached = shared_cache.get("curriculum", cache_key)
+    if cached is not None:
+        return cached
     
     chapters = db.query(Chapter).options(joinedload(Chapter.units)).filter(
         Chapter.school_level == school_level,
@@ -142,10 +267,11 @@ def get_curriculum(school_level: str, grade: int, db: Session = Depends(get_db))
         units_dto = [UnitDto(id=u.id, name=u.name) for u in c.units]
         result.append(ChapterDto(id=c.id, name=c.name, units=units_dto))
     
+    shared_cache.set("curriculum", cache_key, [r.dict() for r in result], CURRICULUM_CACHE_TTL)
     return result
 
 @app.post("/api/daily-worksheet/generate", response_model=List[ProblemResponse])
-async def generate_worksheet(req: GenerateRequest, db: Session = Depends(get_db)):
+async def generate_worksheet(req: GenerateRequest, response: Response, db: Session = Depends(get_db)):
     try:
         # 1. 학교급/학년 결정 우선순위
         #    1순위: API 직접 요청 값 (req.schoolLevel, req.grade)
@@ -171,8 +297,7 @@ async def generate_worksheet(req: GenerateRequest, db: Session = Depends(get_db)
                 grade = unit.chapter.grade
 
             # 도형 관련 단원이면 시각 자료 요청 힌트 추가
-            visual_keywords = ["도형", "삼각형", "사각형", "원", "각", "기하", "선분", "직선", "함수", "그래프"]
-            require_visual = any(k in unit.name for k in visual_keywords)
+            require_visual = any(k in unit.name for k in VISUAL_KEYWORDS)
             
             plan = [{
                 "topic": unit.name, 
@@ -192,47 +317,140 @@ async def generate_worksheet(req: GenerateRequest, db: Session = Depends(get_db)
             if not school_level: school_level = "elementary"
             if not grade: grade = 3
 
-            plan = await plan_daily_worksheet(req.userId, db, req.count, school_level=school_level, grade=grade)
+            with span("plan"), track_stage("plan"):
+                plan = await plan_daily_worksheet(req.userId, db, req.count, school_level=school_level, grade=grade)
         
         print(f"📍 Final target level: {school_level} {grade}")
+
+        def procedural_fill(items, mode):
+            # 템플릿이 있는 단원은 LLM 없이 바로 생성 (server/procedural.py). 나머지 항목은 그대로 돌려줌
+            if procedural.PROCEDURAL_MODE == "off" or not items:
+                return [], items
+            with span("procedural", slots=len(items)), track_stage("procedural"):
+                result = procedural.generate_plan(items)
+            if result["problems"]:
+                metrics.PROCEDURAL_PROBLEMS.inc(len(result["problems"]), mode=mode)
+            return result["problems"], result["missing"]
+
+        def serve_degraded():
+            # LLM 업스트림 장애(브레이커 열림): 절차적 생성 + 은행에 있는 만큼 바로 제공, 없으면 503
+            generated, rest = procedural_fill(plan, "degraded")
+            banked = generated + question_bank.draw_plan(db, rest, school_level, grade, req.unitId)
+            db.commit()
+            if not banked:
+                raise HTTPException(status_code=503, detail="AI generation is temporarily unavailable")
+            metrics.WORKSHEETS.inc(outcome="degraded")
+            response.headers["X-Worksheet-Source"] = "degraded"
+            if len(banked) < len(plan):
+                response.headers["X-Worksheet-Missing"] = str(len(plan) - len(banked))
+            print(f"🔌 Degraded worksheet: {len(generated)} procedural + {len(banked) - len(generated)} bank / {len(plan)} problems")
+            return fastjson.render_problems(coalesce.assign(banked, req.userId, "degraded"), response)
+
+        if breaker.is_open():
+            return serve_degraded()
+
+        # 야간 대량 생성으로 은행이 충분히 채워진 단원은 LLM 호출 없이 바로 제공
+        if req.unitId:
+            banked = question_bank.draw(db, req.unitId, plan[0]["difficulty"] if plan else 2, req.count, user_id=req.userId)
+            if banked:
+                db.commit()
+                response.headers["X-Worksheet-Source"] = "bank"
+                return fastjson.render_problems(banked, response)
+
+        # WORKSHEET_PROCEDURAL=first: 템플릿이 있는 단원은 먼저 절차적으로 만들고 나머지만 LLM 으로
+        instant = []
+        llm_plan = plan
+        if procedural.PROCEDURAL_MODE == "first":
+            instant, llm_plan = procedural_fill(plan, "first")
+            if not llm_plan:
+                metrics.WORKSHEETS.inc(outcome="procedural")
+                response.headers["X-Worksheet-Source"] = "procedural"
+                return fastjson.render_problems(coalesce.assign(instant, req.userId, "procedural"), response)
         
         # 2. GPT 문제 생성 (학교급, 학년 전달)
-        problems_data = await generate_problems_with_gpt(plan, school_level=school_level, grade=grade)
+        #    스트림에서 문제가 하나 완성될 때마다 검증을 거쳐 바로 저장 (나머지 문제 생성과 겹침)
+        #    일부 청크가 끝내 실패해도 생성된 문제는 반환하고, 누락 수는 헤더로 알려준다
+        #    같은 계획의 요청이 동시에 들어오면 생성/저장은 한 번만 하고 결과를 공유
+        key = coalesce.plan_key(llm_plan, school_level, grade, req.unitId)
+
+        async def generate_and_save():
+            # 리더 요청이 끊겨도 생성/저장은 이어지므로 요청 세션(db)이 아니라 전용 세션으로 저장
+            stored = []
+            gen_db = SessionLocal()
+
+            def save_problem(p, item):
+                difficulty_val = 2
+                try:
+                    difficulty_val = int(p['difficulty'])
+                except:
+                    pass
+
+                # 학습지 응답에도 ID 가 실리도록 content 에 함께 저장
+                p["id"] = f"q-{os.urandom(4).hex()}"
+                new_q = Question(
+                    id=p["id"],
+                    # topic 컬럼 삭제됨 -> content JSON에 포함되어 있음
+                    unit_id=req.unitId if req.unitId else None, # 선택된 단원이 있으면 연결
+                    difficulty=difficulty_val,
+                    type=p.get('type', 'drill'),
+                    content=p 
+                )
+                gen_db.add(new_q)
+                with span("db_flush", rows=1):
+                    gen_db.flush()
+                stored.append(p)
+
+            try:
+                generation = await generate_problems_detailed(llm_plan, school_level=school_level, grade=grade, on_problem=save_problem)
+                if stored:
+                    with span("db_commit"), track_stage("db_commit"):
+                        gen_db.commit()
+            finally:
+                gen_db.close()
+            return {"problems": stored, "missing": generation["missing"]}
+
+        # 기다리는 동안 DB 커넥션을 붙잡지 않도록 읽기 트랜잭션 종료
+        db.commit()
+        # 누락 없이 끝난 학습지만 캐시 (부분 결과는 다음 요청에서 다시 생성)
+        try:
+            generation, role = await coalesce.coalescer.run(
+                key, generate_and_save, cacheable=lambda g: bool(g["problems"]) and not g["missing"]
+            )
+        except CircuitOpenError:
+            return serve_degraded()
+        # 리더/합류/캐시 모두 받은 학생 기준으로 제공 기록 (다음 은행 추첨에서 최근에 받은 문제 제외)
+        served = [p["id"] for p in generation["problems"] if p.get("id")]
+        if served:
+            question_bank.mark_served(db, served)
+            question_bank.mark_served_to(db, req.userId, served)
+            db.commit()
+        response.headers["X-Worksheet-Source"] = role
+        problems_data = instant + generation["problems"]
+        missing = generation["missing"]
+        # WORKSHEET_PROCEDURAL=fallback: LLM 이 끝내 못 만든 칸을 절차적 생성으로 채움 (저장하지 않음)
+        if missing and procedural.PROCEDURAL_MODE == "fallback":
+            filled, missing = procedural_fill(missing, "fallback")
+            problems_data = problems_data + filled
+        if len(problems_data) > len(generation["problems"]):
+            response.headers["X-Worksheet-Procedural"] = str(len(problems_data) - len(generation["problems"]))
         
         if not problems_data:
             print("🚨 GPT generated empty data or failed.")
             raise HTTPException(status_code=500, detail="GPT Generation Failed (Empty Response)")
-        
-        saved_problems = []
-        for p in problems_data:
-            difficulty_val = 2
-            try:
-                difficulty_val = int(p['difficulty'])
-            except:
-                pass
-
-            new_q = Question(
-                id=f"q-{os.urandom(4).hex()}",
-                # topic 컬럼 삭제됨 -> content JSON에 포함되어 있음
-                unit_id=req.unitId if req.unitId else None, # 선택된 단원이 있으면 연결
-                difficulty=difficulty_val,
-                type=p['type'],
-                content=p 
+
+        if missing:
+            print(f"⚠️ Partial worksheet: {len(problems_data)}/{len(plan)} problems")
+            response.headers["X-Worksheet-Missing"] = str(len(missing))
+            response.headers["X-Worksheet-Missing-Topics"] = quote(
+                json.dumps([m.get("topic") for m in missing], ensure_ascii=False)
             )
-            db.add(new_q)
-            saved_problems.append(ProblemResponse(
-                topic=p['topic'],
-                difficulty=difficulty_val,
-                type=p['type'],
-                question=p['question'],
-                options=p['options'],
-                answer=str(p['answer']),
-                explanation=p.get('explanation', '')
-            ))
-            
-        db.commit()
-        return saved_problems
 
+        # 학생마다 문제 순서를 다르게 (같은 학생은 항상 같은 순서)
+        # 문제는 생성할 때 검증됨 → 응답 모델을 다시 검증하지 않고 바로 직렬화 (response_model 은 문서용)
+        return fastjson.render_problems(coalesce.assign(problems_data, req.userId, key), response)
+
+    except HTTPException:
+        raise
     except RateLimitError as e:
         print(f"🚨 429 Error: {e}")
         raise HTTPException(status_code=429, detail="OpenAI API Quota Exceeded")
@@ -243,11 +461,130 @@ async def generate_worksheet(req: GenerateRequest, db: Session = Depends(get_db)
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/worksheets/class")
+def generate_class_worksheets(req: ClassWorksheetRequest, db: Session = Depends(get_db)):
+    """
+    반 전체 학습지. 학생별로 계획한 뒤 겹치는 (주제, 난이도) 칸은 한 번만 생성해서 나눠 준다.
+    응답은 NDJSON 진행 이벤트 (planned → progress… / student… → done)
+    """
+    if not req.studentIds:
+        raise HTTPException(status_code=400, detail="studentIds is empty")
+    try:
+        with span("plan", students=len(req.studentIds)), track_stage("plan"):
+            plan = class_worksheet.plan_class(db, req.studentIds, req.count, req.schoolLevel, req.grade, req.unitId)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    print(f"🏫 Class worksheet: {len(plan.students)} students, {plan.requested} problems requested, "
+          f"{plan.distinct} to prepare ({len(plan.need)} slots)")
+
+    async def event_stream():
+        # 스트리밍 중에는 요청 세션 대신 별도 세션으로 저장
+        async for event in class_worksheet.run_class(plan, SessionLocal):
+            if event["event"] == "student":
+                event["problems"] = [fastjson.problem_payload(p) for p in event["problems"]]
+            yield fastjson.dumps(event) + b"\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
 @app.post("/api/daily-worksheet/submit")
 async def submit_worksheet(req: SubmitRequest, db: Session = Depends(get_db)):
     result = await adjust_difficulty_level(req.userId, req.accuracy, db)
+    # 달력/점수 추이용 롤업 증분 갱신
+    with track_stage("rollup"):
+        recorded = rollups.record_submission(
+            db, req.userId,
+            responses=[r.dict() for r in req.responses],
+            unit_id=req.unitId, day=req.date,
+            total_count=req.totalCount, correct_count=req.correctCount, topics=req.topics,
+        )
+        if recorded is not None:
+            # 단원 문제를 계속 맞히면 그 단원의 취약점은 해결 처리
+            weakness.apply_results(db, req.userId, recorded.unit_results)
+            db.commit()
     return result
 
+@app.get("/api/stats/{user_id}")
+def get_user_stats(user_id: str, start: Optional[str] = None, end: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    일별/단원별 학습 통계 (예: ?start=2026-02-01&end=2026-02-28, 기본: 최근 30일)
+    """
+    return rollups.get_stats(db, user_id, start, end)
+
+@app.get("/api/weaknesses/{user_id}")
+def get_user_weaknesses(user_id: str, top: int = 5, db: Session = Depends(get_db)):
+    """
+    미해결 취약점 상위 k 개 (감쇠 점수 순, 취약점 색인에서 바로 조회)
+    """
+    return weakness.top_weaknesses(db, user_id, top)
+
+@app.post("/api/similar-problems", response_model=List[ProblemResponse])
+async def similar_problems(req: SimilarRequest, response: Response, db: Session = Depends(get_db)):
+    """
+    문제 하나와 비슷한 문제 count 개.
+    수치만 바꾼 변형 (server/variants.py, LLM 없이 1ms 미만) → 같은 단원 절차적 생성 → LLM 순으로 시도
+    """
+    count = max(1, min(req.count, 10))
+    q = db.get(Question, req.problemId) if req.problemId else None
+    content = q.content if q is not None else req.problem
+    if not isinstance(content, dict) or not content.get("question"):
+        raise HTTPException(status_code=404, detail="Problem not found")
+    topic = content.get("topic", "")
+    try:
+        difficulty = int(content.get("difficulty", 2))
+    except (TypeError, ValueError):
+        difficulty = 2
+
+    problems, source = [], "variant"
+    try:
+        with span("variants", count=count), track_stage("variants"):
+            problems = variants.generate(content, count)
+    except variants.TemplateError as e:
+        print(f"🧬 No numeric variant ({e}), falling back")
+
+    if not problems and procedural.PROCEDURAL_MODE != "off" and procedural.supports(topic):
+        with span("procedural", slots=count), track_stage("procedural"):
+            problems, source = procedural.generate(topic, difficulty, count), "procedural"
+
+    if not problems:
+        if breaker.is_open():
+            raise HTTPException(status_code=503, detail="AI generation is temporarily unavailable")
+        school_level, grade = req.schoolLevel, req.grade
+        unit = db.query(Unit).options(joinedload(Unit.chapter)).filter(Unit.id == q.unit_id).first() if q is not None and q.unit_id else None
+        if unit is not None and unit.chapter:
+            school_level = school_level or unit.chapter.school_level
+            grade = grade or unit.chapter.grade
+        plan = [{
+            "topic": topic,
+            "difficulty": difficulty,
+            "type": content.get("type", "drill"),
+            "require_visual": bool(content.get("svg")),
+        } for _ in range(count)]
+
+        def save_problem(p, item):
+            p["id"] = f"q-{os.urandom(4).hex()}"
+            new_q = Question(id=p["id"], unit_id=unit.id if unit is not None else None,
+                             difficulty=difficulty, type=p.get("type", "drill"), content=p)
+            db.add(new_q)
+            db.flush()
+            question_bank.mark_served(db, [new_q.id])
+
+        db.commit()
+        try:
+            generation = await generate_problems_detailed(plan, school_level=school_level or "elementary",
+                                                          grade=grade or 3, on_problem=save_problem)
+        except CircuitOpenError:
+            raise HTTPException(status_code=503, detail="AI generation is temporarily unavailable")
+        db.commit()
+        problems, source = generation["problems"], "llm"
+        if not problems:
+            raise HTTPException(status_code=500, detail="GPT Generation Failed (Empty Response)")
+
+    metrics.SIMILAR_PROBLEMS.inc(len(problems), source=source)
+    response.headers["X-Similar-Source"] = source
+    if len(problems) < count:
+        response.headers["X-Similar-Missing"] = str(count - len(problems))
+    return fastjson.render_problems(problems, response)
+
 @app.post("/api/analyze-error")
 async def analyze_wrong_answer_endpoint(req: AnalyzeRequest, db: Session = Depends(get_db)):
     try:
@@ -287,48 +624,146 @@ async def chat_endpoint(req: ChatRequest):
 
             client = get_openai_client()
             
-            stream = await client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                stream=True,
-                temperature=0.3
-            )
-            async for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+            model = router.cascade("chat")[0].value
+            start = time.perf_counter()
+            first_token = True
+            with breaker.guard(), track_llm("chat", model):
+                stream = await client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    stream=True,
+                    temperature=0.3
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if first_token:
+                            first_token = False
+                            metrics.LLM_SECONDS.observe(
+                                time.perf_counter() - start, task="chat_first_token", model=model
+                            )
+                        yield chunk.choices[0].delta.content
 
         except Exception as e:
             yield f"[Error: {str(e)}]"
 
     return StreamingResponse(stream_generator(), media_type="text/plain")
 
+@app.get("/api/questions/search")
+def search_questions_endpoint(q: str, unitId: Optional[int] = None, difficulty: Optional[int] = None,
+                              type: Optional[str] = None, limit: int = 20, offset: int = 0,
+                              db: Session = Depends(get_db)):
+    """
+    저장된 문제 전문 검색 (예: ?q=피타고라스&difficulty=2)
+    """
+    limit = max(1, min(limit, 100))
+    with track_stage("search"):
+        return search.search_questions(db, q, unit_id=unitId, difficulty=difficulty, qtype=type,
+                                       limit=limit, offset=max(0, offset))
+
+@app.get("/healthz")
+def healthz(db: Session = Depends(get_db)):
+    """
+    준비 상태 확인 (런처/로드밸런서용). GPT 는 호출하지 않고 DB 연결만 확인.
+    """
+    try:
+        db.execute(text("SELECT 1"))
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "error": str(e)})
+    # LLM 장애는 준비 상태에 영향 없음 (은행으로 계속 서비스) → degraded 로만 표시
+    return {"status": "ok", "degraded": breaker.is_open(), "uptime_s": round(time.time() - STARTUP["ready_at"], 3),
+            "startup": STARTUP, "llm": breaker.snapshot()}
+
 @app.get("/api/check-ai")
-async def check_ai_status():
+async def check_ai_status(deep: bool = False):
     """
     OpenAI 연결 상태를 확인하는 진단용 엔드포인트
+    기본: 브레이커 상태 + 모델 목록 조회 (토큰 사용 없음), deep=true 면 실제 완성 요청
     """
+    if breaker.is_open():
+        return {
+            "status": "ERROR",
+            "message": "LLM circuit breaker is open",
+            "breaker": breaker.snapshot(),
+            "detail": "OpenAI 장애로 AI 호출을 잠시 멈췄습니다. 학습지는 문제 은행에서 제공됩니다."
+        }
     try:
         client = get_openai_client()
-        # 간단한 테스트 요청
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": "1+1 is?"}],
-            max_tokens=10
-        )
-        answer = response.choices[0].message.content
+        answer = None
+        if deep:
+            # 간단한 테스트 요청
+            model = router.cascade("check")[0].value
+            with breaker.guard(), track_llm("check", model):
+                response = await client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": "1+1 is?"}],
+                    max_tokens=10
+                )
+            answer = response.choices[0].message.content
+        else:
+            await probe_upstream()
         return {
             "status": "OK",
             "message": "OpenAI Connection Successful!",
             "ai_response": answer,
-            "api_key_preview": client.api_key[:10] + "..." if client.api_key else "None"
+            "breaker": breaker.snapshot(),
+            "api_key_preview": client.api_key[:10] + "..." if getattr(client, "api_key", None) else "None"
         }
     except Exception as e:
         return {
             "status": "ERROR",
             "message": str(e),
+            "breaker": breaker.snapshot(),
             "detail": "백엔드에서 OpenAI 연결에 실패했습니다."
         }
 
+@app.get("/api/debug/router")
+def router_stats():
+    """
+    모델 캐스케이드 현황 (모델별 채택/에스컬레이션 비율, 비용, 지연)
+    """
+    return router.snapshot()
+
+@app.get("/api/debug/worksheet-cache")
+def worksheet_cache_stats():
+    return coalesce.coalescer.snapshot()
+
+@app.get("/api/debug/shared-cache")
+def shared_cache_stats():
+    return shared_cache.snapshot()
+
+@app.post("/api/debug/shared-cache/invalidate")
+def invalidate_shared_cache(ns: Optional[str] = None):
+    shared_cache.invalidate(ns)
+    local_cache.invalidate(ns)
+    if ns is None:
+        coalesce.coalescer.invalidate()
+    return {"invalidated": ns or "all"}
+
+@app.get("/api/debug/traces")
+def list_traces(limit: int = 50):
+    return tracing.recent_traces(limit)
+
+@app.get("/api/debug/traces/{trace_id}")
+def get_trace(trace_id: str, format: str = "chrome"):
+    """
+    링 버퍼에 남아 있는 트레이스 조회 (format=chrome | otlp)
+    chrome 포맷은 chrome://tracing 또는 ui.perfetto.dev 에 그대로 열 수 있다.
+    """
+    trace = tracing.get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found (expired or not sampled)")
+    try:
+        return tracing.render_trace(trace, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """
+    Prometheus 텍스트 포맷 메트릭
+    """
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,323 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# ==========================================
+# 경량 Prometheus 메트릭 (외부 의존성 없음)
+# - Counter / Gauge / Histogram 만 지원
+# - /metrics 엔드포인트에서 render() 결과를 text/plain 으로 반환
+# ==========================================
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 초 단위 기본 버킷 (DB 쿼리 ~ GPT 호출까지 포괄)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 60.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        return self._values.get(key, 0.0)
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # label → [bucket counts..., +Inf count], sum
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[idx] += 1
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels) -> Tuple[List[int], float]:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            return list(self._counts.get(key, [])), self._sums.get(key, 0.0)
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v), self._sums[k]) for k, v in self._counts.items())
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            label_str = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ── HTTP ──
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "mathdaily_http_request_duration_seconds", "HTTP request latency by endpoint",
+    ("method", "endpoint", "status"),
+))
+
+# ── LLM ──
+# task: generate_chunk, analyze, rewrite, chat_first_token, chat, check
+LLM_SECONDS = REGISTRY.register(Histogram(
+    "mathdaily_llm_request_duration_seconds", "LLM call latency by task", ("task", "model"),
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "mathdaily_llm_tokens_total", "LLM tokens by task and kind (prompt, completion, cached)", ("task", "kind"),
+))
+LLM_ERRORS = REGISTRY.register(Counter(
+    "mathdaily_llm_errors_total", "LLM call failures by task and error class", ("task", "error"),
+))
+LLM_RETRIES = REGISTRY.register(Counter(
+    "mathdaily_llm_retries_total", "LLM call retries by task", ("task",),
+))
+LLM_COST = REGISTRY.register(Counter(
+    "mathdaily_llm_cost_usd_total", "Estimated LLM spend in USD from token usage", ("model", "task"),
+))
+ROUTER_PROBLEMS = REGISTRY.register(Counter(
+    "mathdaily_router_problems_total", "Cascade outcomes per model (accepted, escalated, rejected)", ("task", "model", "outcome"),
+))
+LLM_HEDGES = REGISTRY.register(Counter(
+    "mathdaily_llm_hedges_total", "Hedged duplicate LLM requests (launched, primary_won, hedge_won)", ("task", "outcome"),
+))
+# ── 서킷 브레이커 (0: closed, 1: half_open, 2: open) ──
+LLM_BREAKER_STATE = REGISTRY.register(Gauge(
+    "mathdaily_llm_breaker_state", "LLM circuit breaker state (0 closed, 1 half_open, 2 open)", ("name",),
+))
+LLM_BREAKER_TRANSITIONS = REGISTRY.register(Counter(
+    "mathdaily_llm_breaker_transitions_total", "LLM circuit breaker state changes", ("name", "state"),
+))
+
+# ── 학습지 생성 결과 (complete: 요청 수 모두 생성, partial: 일부 누락, failed: 0개, degraded: 브레이커 열림 → 은행,
+#    procedural: LLM 호출 없이 절차적 생성만으로 완성) ──
+WORKSHEETS = REGISTRY.register(Counter(
+    "mathdaily_worksheets_total", "Generated worksheets by completeness", ("outcome",),
+))
+MISSING_SLOTS = REGISTRY.register(Counter(
+    "mathdaily_worksheet_missing_slots_total", "Plan slots that could not be generated",
+))
+
+# ── 동일 학습지 요청 합치기 (leader: 직접 생성, joined: 진행 중 생성 공유, cached: 결과 캐시) ──
+WORKSHEET_COALESCE = REGISTRY.register(Counter(
+    "mathdaily_worksheet_coalesce_total", "Worksheet requests by single-flight role", ("outcome",),
+))
+WORKSHEET_CACHE = REGISTRY.register(Gauge(
+    "mathdaily_worksheet_cache", "Worksheet result cache size", ("kind",),
+))
+
+# ── 반 단위 학습지 (requested: 학생별 필요 문제 합계, generated/bank: 실제로 만든/은행에서 꺼낸 문제) ──
+CLASS_WORKSHEET_PROBLEMS = REGISTRY.register(Counter(
+    "mathdaily_class_worksheet_problems_total", "Class worksheet problems by source", ("source",),
+))
+
+# ── 절차적 생성 문제 (first: LLM 보다 먼저, fallback: LLM 누락 칸 채움, degraded: 브레이커 열림) ──
+PROCEDURAL_PROBLEMS = REGISTRY.register(Counter(
+    "mathdaily_procedural_problems_total", "Problems generated by the procedural engine", ("mode",),
+))
+
+# ── 유사 문제 (variant: 수치만 바꾼 변형, procedural: 같은 단원 템플릿, llm: GPT) ──
+SIMILAR_PROBLEMS = REGISTRY.register(Counter(
+    "mathdaily_similar_problems_total", "Similar problems served by source", ("source",),
+))
+
+# ── 적응형 청크 분할 (server/chunking.py) ──
+CHUNK_PLAN = REGISTRY.register(Gauge(
+    "mathdaily_chunk_plan", "Last chosen chunk plan (chunks, size, expected_seconds)",
+    ("school_level", "grade", "visual", "kind"),
+))
+CHUNK_MODEL = REGISTRY.register(Gauge(
+    "mathdaily_chunk_latency_model", "Learned chunk latency model latency = a + b * size",
+    ("school_level", "grade", "visual", "param"),
+))
+
+# ── 파이프라인 단계 (plan, JSON 파싱, SVG 대체 생성, DB 커밋 등) ──
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "mathdaily_stage_duration_seconds", "Pipeline stage latency", ("stage",),
+))
+
+# ── DB ──
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+    "mathdaily_db_query_duration_seconds", "SQL statement latency by statement type", ("operation",),
+    buckets=DB_BUCKETS,
+))
+DB_ERRORS = REGISTRY.register(Counter(
+    "mathdaily_db_errors_total", "SQL statement failures", ("operation",),
+))
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+def observe_usage(task: str, usage) -> None:
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+    LLM_TOKENS.inc(prompt_tokens, task=task, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, task=task, kind="completion")
+    if cached_tokens:
+        LLM_TOKENS.inc(cached_tokens, task=task, kind="cached")
+
+
+def observe_llm_error(task: str, error: BaseException) -> None:
+    LLM_ERRORS.inc(task=task, error=type(error).__name__)
+
+
+@contextmanager
+def track_llm(task: str, model: str = ""):
+    """
+    LLM 호출 구간의 지연 시간과 실패를 함께 기록 (예외는 그대로 전파)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        observe_llm_error(task, e)
+        raise
+    finally:
+        LLM_SECONDS.observe(time.perf_counter() - start, task=task, model=model)
+
+
+def track_stage(stage: str):
+    return STAGE_SECONDS.time(stage=stage)
+
+
+# ==========================================
+# SQLAlchemy 이벤트 기반 쿼리 타이밍
+# ==========================================
+
+def _statement_operation(statement: str) -> str:
+    head = statement.lstrip()[:10].split(None, 1)
+    return head[0].upper() if head else "OTHER"
+
+
+def instrument_engine(engine) -> None:
+    """
+    엔진에 before/after_cursor_execute 이벤트를 걸어 쿼리 시간을 수집한다.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts: Optional[list] = conn.info.get("_query_start")
+        if starts:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - starts.pop(), operation=_statement_operation(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None:
+            starts = conn.info.get("_query_start")
+            if starts:
+                starts.pop()
+        DB_ERRORS.inc(operation=_statement_operation(exception_context.statement or ""))
@@ -0,0 +1,161 @@
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from .ai_service import ModelType
+from .metrics import LLM_COST, ROUTER_PROBLEMS
+from .resilience import LatencyTracker
+
+# ==========================================
+# 모델 캐스케이드 라우터
+# - 태스크/난이도/지연 예산에 따라 시도할 모델 순서를 정함 (기본: FAST → SMART)
+# - FAST 결과 중 로컬 검증(JSON, 보기-정답 일치, 도형 SVG)에 실패한 문제만 상위 모델로 재요청
+# - 모델별 지연, 비용, 에스컬레이션 비율을 기록
+# ==========================================
+
+# USD / 1M tokens (input, cached input, output)
+MODEL_PRICES = {
+    ModelType.FAST: (0.15, 0.075, 0.60),
+    ModelType.SMART: (2.50, 1.25, 10.00),
+    ModelType.REASONING: (15.00, 7.50, 60.00),
+}
+
+# 태스크별 기본 캐스케이드
+TASK_CASCADES = {
+    "generate": [ModelType.FAST, ModelType.SMART],
+    "analyze": [ModelType.FAST, ModelType.SMART],
+    "rewrite": [ModelType.FAST],
+    "chat": [ModelType.FAST],
+    "check": [ModelType.FAST],
+}
+
+# 태스크별 지연 예산(초). 예상 지연 합이 예산을 넘는 상위 모델은 캐스케이드에서 제외
+LATENCY_BUDGETS = {
+    "generate": float(os.getenv("ROUTER_GENERATE_BUDGET", "45")),
+    "analyze": float(os.getenv("ROUTER_ANALYZE_BUDGET", "30")),
+}
+
+# 관측 전 예상 지연(초)
+_DEFAULT_LATENCY = {
+    ModelType.FAST: 8.0,
+    ModelType.SMART: 15.0,
+    ModelType.REASONING: 40.0,
+}
+
+# (태스크, 난이도) 에스컬레이션 비율이 이 값을 넘으면 FAST 를 건너뛰고 바로 상위 모델 사용
+SKIP_FAST_RATE = float(os.getenv("ROUTER_SKIP_FAST_RATE", "0.6"))
+_OUTCOME_WINDOW = 50
+_MIN_OUTCOMES = 20
+
+
+def _parse_cascade(value: Optional[str]) -> Optional[List[ModelType]]:
+    # 예: ROUTER_CASCADE=FAST,SMART
+    if not value:
+        return None
+    return [ModelType[name.strip().upper()] for name in value.split(",") if name.strip()]
+
+
+class ModelRouter:
+    def __init__(self):
+        self._latency: Dict[Tuple[str, ModelType], LatencyTracker] = {}
+        self._outcomes: Dict[Tuple[str, int], deque] = {}
+        self._totals: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._cost: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._override = _parse_cascade(os.getenv("ROUTER_CASCADE"))
+
+    def _tracker(self, task: str, model: ModelType) -> LatencyTracker:
+        with self._lock:
+            tracker = self._latency.get((task, model))
+            if tracker is None:
+                tracker = self._latency[(task, model)] = LatencyTracker()
+            return tracker
+
+    def expected_latency(self, task: str, model: ModelType, q: float = 0.9) -> float:
+        return self._tracker(task, model).percentile(q, _DEFAULT_LATENCY[model], min_samples=10)
+
+    def escalation_rate(self, task: str, difficulty: int) -> Optional[float]:
+        with self._lock:
+            window = self._outcomes.get((task, difficulty))
+            if not window or len(window) < _MIN_OUTCOMES:
+                return None
+            return sum(window) / len(window)
+
+    def _base_cascade(self, task: str) -> List[ModelType]:
+        models = TASK_CASCADES.get(task, [ModelType.FAST])
+        # ROUTER_CASCADE 는 검증 기반 에스컬레이션이 있는 태스크에만 적용
+        if len(models) > 1 and self._override:
+            return list(self._override)
+        return list(models)
+
+    def cascade(self, task: str, difficulty: int = 2, budget: Optional[float] = None) -> List[ModelType]:
+        models = self._base_cascade(task)
+        if len(models) == 1:
+            return models
+
+        rate = self.escalation_rate(task, difficulty)
+        if rate is not None and rate > SKIP_FAST_RATE:
+            models = models[1:]
+
+        budget = budget if budget is not None else LATENCY_BUDGETS.get(task)
+        if budget is None:
+            return models
+        chosen, spent = [], 0.0
+        for model in models:
+            spent += self.expected_latency(task, model)
+            if chosen and spent > budget:
+                break
+            chosen.append(model)
+        return chosen
+
+    # ── 기록 ──
+    def record_call(self, task: str, model: ModelType, latency: float, usage: Any = None) -> float:
+        self._tracker(task, model).add(latency)
+        if usage is None:
+            return 0.0
+        price_in, price_cached, price_out = MODEL_PRICES.get(model, MODEL_PRICES[ModelType.FAST])
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+        cost = ((prompt_tokens - cached) * price_in + cached * price_cached + completion_tokens * price_out) / 1_000_000
+        LLM_COST.inc(cost, model=model.value, task=task)
+        with self._lock:
+            self._cost[model.value] = self._cost.get(model.value, 0.0) + cost
+        return cost
+
+    def record_outcome(self, task: str, difficulty: int, model: ModelType, accepted: int = 0, escalated: int = 0, rejected: int = 0):
+        for outcome, n in (("accepted", accepted), ("escalated", escalated), ("rejected", rejected)):
+            if n:
+                ROUTER_PROBLEMS.inc(n, task=task, model=model.value, outcome=outcome)
+        with self._lock:
+            totals = self._totals.setdefault((task, model.value), {"accepted": 0, "escalated": 0, "rejected": 0})
+            totals["accepted"] += accepted
+            totals["escalated"] += escalated
+            totals["rejected"] += rejected
+            # 에스컬레이션 비율 창은 캐스케이드 첫 단계 결과로만 계산
+            if model == self._base_cascade(task)[0]:
+                window = self._outcomes.setdefault((task, difficulty), deque(maxlen=_OUTCOME_WINDOW))
+                window.extend([0] * accepted + [1] * (escalated + rejected))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = {f"{task}/{model}": dict(v) for (task, model), v in self._totals.items()}
+            cost = {k: round(v, 6) for k, v in self._cost.items()}
+            latency_keys = list(self._latency.keys())
+        for key, v in totals.items():
+            n = v["accepted"] + v["escalated"] + v["rejected"]
+            v["escalation_rate"] = round((v["escalated"] + v["rejected"]) / n, 4) if n else 0.0
+        latency = {
+            f"{task}/{model.value}": {
+                "p50": round(self._tracker(task, model).percentile(0.5, 0.0, min_samples=1), 3),
+                "p90": round(self._tracker(task, model).percentile(0.9, 0.0, min_samples=1), 3),
+                "samples": len(self._tracker(task, model)),
+            }
+            for task, model in latency_keys
+        }
+        return {"outcomes": totals, "cost_usd": cost, "latency": latency}
+
+
+router = ModelRouter()
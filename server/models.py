@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, Boolean, ForeignKey, Text, JSON
+from sqlalchemy import Column, String, Integer, Float, DateTime, Boolean, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -59,3 +59,95 @@ class WeaknessLog(Base):
     ai_advice = Column(String)
     severity = Column(Integer, default=1)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+class QuestionStat(Base):
+    # 문제별 제공/풀이 횟수 (보존 정책 server/retention.py 의 근거)
+    __tablename__ = 'question_stats'
+    question_id = Column(String, primary_key=True)
+    served_count = Column(Integer, default=0)      # 학습지로 나간 횟수 (생성 직후 제공 포함)
+    attempts = Column(Integer, default=0)          # 제출된 풀이 수
+    correct = Column(Integer, default=0)
+    last_served_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class UserServedQuestion(Base):
+    # 학생별로 은행에서 받은 문제 (server/question_bank.py 가 최근에 준 문제를 다시 뽑지 않도록)
+    __tablename__ = 'user_served_questions'
+    user_id = Column(String, primary_key=True)
+    question_id = Column(String, primary_key=True)
+    served_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+# ── 야간 대량 생성 작업 (server/bulkgen.py) ──
+
+class GenerationJob(Base):
+    __tablename__ = 'generation_jobs'
+    id = Column(String, primary_key=True)          # "{unit_id}:{difficulty}"
+    unit_id = Column(Integer, ForeignKey('units.id'))
+    difficulty = Column(Integer)
+    target = Column(Integer)                       # 목표 문제 수
+    produced = Column(Integer, default=0)          # 검증 후 저장된 문제 수
+    duplicates = Column(Integer, default=0)
+    rejected = Column(Integer, default=0)
+    attempts = Column(Integer, default=0)
+    status = Column(String, default='pending')     # pending, running, done, failed
+    last_error = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# ── 제출 기록 / 통계 롤업 (server/rollups.py) ──
+
+class Submission(Base):
+    __tablename__ = 'submissions'
+    id = Column(String, primary_key=True)
+    user_id = Column(String, index=True)
+    day = Column(String, index=True)               # 사용자 기준 날짜 "2026-02-14"
+    unit_id = Column(Integer, nullable=True)
+    total_count = Column(Integer, default=0)
+    answered_count = Column(Integer, default=0)
+    correct_count = Column(Integer, default=0)
+    time_spent_sec = Column(Integer, default=0)
+    topics = Column(JSON)                          # ["분수의 나눗셈", ...]
+    unit_results = Column(JSON)                    # {"12": [시도, 정답], ...}
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class UserDailyStat(Base):
+    __tablename__ = 'user_daily_stats'
+    user_id = Column(String, primary_key=True)
+    day = Column(String, primary_key=True)
+    worksheets = Column(Integer, default=0)
+    total_count = Column(Integer, default=0)
+    answered_count = Column(Integer, default=0)
+    correct_count = Column(Integer, default=0)
+    time_spent_sec = Column(Integer, default=0)
+    topics = Column(JSON)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class UserUnitStat(Base):
+    __tablename__ = 'user_unit_stats'
+    user_id = Column(String, primary_key=True)
+    unit_id = Column(Integer, primary_key=True)
+    attempts = Column(Integer, default=0)
+    correct = Column(Integer, default=0)
+    last_day = Column(String)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# ── 취약점 색인 (server/weakness.py) ──
+
+class UserWeakness(Base):
+    __tablename__ = 'user_weaknesses'
+    user_id = Column(String, primary_key=True)
+    unit_id = Column(Integer, primary_key=True)    # 단원을 모르는 문제는 0
+    error_type = Column(String, primary_key=True)  # 정규화된 유형 (CALCULATION_ERROR 등)
+    topic = Column(String)                         # 단원명 또는 문제의 topic
+    weight = Column(Float, default=0.0)            # 감쇠 점수 × 2^(경과/반감기) — 시간이 지나도 순서가 바뀌지 않음
+    count = Column(Integer, default=0)
+    severity_sum = Column(Integer, default=0)
+    correct_streak = Column(Integer, default=0)    # 마지막 오답 이후 연속 정답 수
+    resolved = Column(Boolean, default=False)
+    last_problem_id = Column(String)
+    last_advice = Column(String)
+    last_seen_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    __table_args__ = (
+        # 상위 k 개 = (user_id, resolved) 범위에서 weight 역순으로 k 행만 읽음
+        Index('ix_user_weaknesses_rank', 'user_id', 'resolved', 'weight'),
+    )
@@ -0,0 +1,1007 @@
+"""
+절차적(파라미터) 문제 생성기 — LLM 없이 0초, 0원
+
+- 단원별 템플릿: 파라미터를 NumPy 로 한 번에 뽑고 정답도 배열 연산으로 계산
+- 오답 보기는 "학생이 자주 하는 실수" 규칙으로 만든다 (받아올림 누락, 둘레/넓이 혼동, 부호 실수 …)
+- 도형 단원은 문제 수치에 맞춘 SVG 를 같이 생성
+
+    python -m server.procedural --bench 20000       # 초당 생성 수 측정 + 전수 검증
+    python -m server.procedural --topic "6~9단" -n 3
+"""
+import argparse
+import os
+import time
+from math import gcd
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# off: 사용 안 함 | fallback: LLM 장애/누락 칸만 채움 | first: 지원 단원은 LLM 보다 먼저 사용
+PROCEDURAL_MODE = os.getenv("WORKSHEET_PROCEDURAL", "fallback")
+
+# SVG 스타일 (ai_engine.generate_fallback_svg 와 동일한 색)
+_STROKE = "#334155"
+_FILL = "#f8fafc"
+_TEXT = "#0f172a"
+_DIM = "#64748b"
+_ACCENT = "#2563eb"
+
+Template = Callable[[np.random.Generator, int, int], List[Dict[str, Any]]]
+TEMPLATES: Dict[str, Template] = {}
+# 단원명이 아닌 주제(대단원명, 예전 데모 주제)도 템플릿으로 연결
+ALIASES: Dict[str, str] = {}
+
+
+def template(*names: str, aliases: Sequence[str] = ()):
+    def register(fn: Template) -> Template:
+        for name in names:
+            TEMPLATES[name] = fn
+        for alias in aliases:
+            ALIASES[alias] = names[0]
+        return fn
+    return register
+
+
+# ==========================================
+# 공통 도우미
+# ==========================================
+
+def _frac(num: int, den: int) -> str:
+    """
+    기약분수 문자열 (정수면 정수, 음수 부호는 앞에)
+    """
+    num, den = int(num), int(den)
+    if den < 0:
+        num, den = -num, -den
+    g = gcd(num, den) or 1
+    num, den = num // g, den // g
+    return str(num) if den == 1 else f"{num}/{den}"
+
+
+def _choices(answer: str, candidates: Sequence[Any], fallback: Callable[[int], Any]) -> List[str]:
+    """
+    정답과 다르고 서로 겹치지 않는 오답 3개. 규칙 기반 후보가 모자라면 fallback(k) 로 채운다.
+    """
+    out: List[str] = []
+    seen = {answer}
+    for c in candidates:
+        c = str(c)
+        if c not in seen:
+            seen.add(c)
+            out.append(c)
+            if len(out) == 3:
+                return out
+    k = 1
+    while len(out) < 3:
+        c = str(fallback(k))
+        k += 1
+        if c not in seen:
+            seen.add(c)
+            out.append(c)
+    return out
+
+
+def _numeric_fallback(answer: int) -> Callable[[int], int]:
+    # 정답 근처 값 (1, -1, 2, -2 …), 음수가 안 되는 답은 양수만
+    def fallback(k: int) -> int:
+        step = (k + 1) // 2
+        value = answer + step if k % 2 else answer - step
+        return value if value >= 0 or answer < 0 else answer + k
+    return fallback
+
+
+def _problem(topic: str, difficulty: int, question: str, answer: str, distractors: List[str],
+             explanation: str, order: np.ndarray, svg: Optional[str] = None, unit: str = "") -> Dict[str, Any]:
+    options = [answer] + distractors
+    options = [options[i] + unit for i in order]
+    p = {
+        "topic": topic,
+        "difficulty": int(difficulty),
+        "type": "drill",
+        "question": question,
+        "options": options,
+        "answer": answer + unit,
+        "explanation": explanation,
+        "source": "procedural",
+    }
+    if svg:
+        p["svg"] = svg
+    return p
+
+
+def _orders(rng: np.random.Generator, n: int) -> np.ndarray:
+    # 문제마다 보기 순서 (정답 위치 무작위)
+    return np.argsort(rng.random((n, 4)), axis=1)
+
+
+def _svg(body: str) -> str:
+    return f'<svg viewBox="0 0 300 250" xmlns="http://www.w3.org/2000/svg">{body}</svg>'
+
+
+def _label(x: float, y: float, text: str, color: str = _TEXT, size: int = 14) -> str:
+    return (f'<text x="{x:.0f}" y="{y:.0f}" font-family="sans-serif" font-weight="bold" font-size="{size}" '
+            f'text-anchor="middle" fill="{color}">{text}</text>')
+
+
+def _rect_svg(w_val: int, h_val: int, unit: str = "cm") -> str:
+    scale = 180 / max(w_val, h_val)
+    w, h = max(40, w_val * scale), max(40, h_val * scale)
+    x, y = 150 - w / 2, 125 - h / 2
+    return _svg(
+        f'<rect x="{x:.0f}" y="{y:.0f}" width="{w:.0f}" height="{h:.0f}" fill="{_FILL}" stroke="{_STROKE}" stroke-width="2.5"/>'
+        + _label(150, y - 10, f"{w_val}{unit}") + _label(x - 25, 130, f"{h_val}{unit}")
+    )
+
+
+def _triangle_svg(base: int, height: int, unit: str = "cm") -> str:
+    scale = 180 / max(base, height)
+    b, h = max(60, base * scale), max(50, height * scale)
+    x0, y0 = 150 - b / 2, 125 + h / 2
+    apex_x = x0 + b * 0.35
+    return _svg(
+        f'<polygon points="{x0:.0f},{y0:.0f} {x0 + b:.0f},{y0:.0f} {apex_x:.0f},{y0 - h:.0f}" '
+        f'fill="{_FILL}" stroke="{_STROKE}" stroke-width="2.5"/>'
+        f'<line x1="{apex_x:.0f}" y1="{y0 - h:.0f}" x2="{apex_x:.0f}" y2="{y0:.0f}" stroke="{_DIM}" stroke-width="1.5" stroke-dasharray="4,3"/>'
+        f'<path d="M{apex_x:.0f},{y0 - 10:.0f} L{apex_x + 10:.0f},{y0 - 10:.0f} L{apex_x + 10:.0f},{y0:.0f}" fill="none" stroke="{_DIM}" stroke-width="1"/>'
+        + _label(150, y0 + 20, f"{base}{unit}") + _label(apex_x - 22, y0 - h / 2, f"{height}{unit}", _DIM)
+    )
+
+
+def _angle_triangle_svg(a: int, b: int) -> str:
+    # 두 각을 실제 크기대로 그린 삼각형 (세 번째 각은 ?)
+    ra, rb = np.radians(a), np.radians(b)
+    base = 200.0
+    # 사인법칙으로 꼭짓점 위치
+    c_len = base * np.sin(rb) / np.sin(np.pi - ra - rb)
+    ax, ay = 50.0, 200.0
+    bx, by = ax + base, ay
+    cx, cy = ax + c_len * np.cos(ra), ay - c_len * np.sin(ra)
+    # 화면 밖으로 나가지 않게 높이 제한
+    if cy < 25:
+        k = (ay - 25) / (ay - cy)
+        cy = ay - (ay - cy) * k
+    return _svg(
+        f'<polygon points="{ax:.0f},{ay:.0f} {bx:.0f},{by:.0f} {cx:.0f},{cy:.0f}" fill="{_FILL}" stroke="{_STROKE}" stroke-width="2.5"/>'
+        + _label(ax + 28, ay - 8, f"{a}°", _ACCENT, 13) + _label(bx - 28, by - 8, f"{b}°", _ACCENT, 13)
+        + _label(cx, cy + 24, "?", _ACCENT, 15)
+    )
+
+
+def _dots_svg(rows: int, cols: int) -> str:
+    gap = min(200 / max(cols, 1), 170 / max(rows, 1), 26)
+    x0 = 150 - gap * (cols - 1) / 2
+    y0 = 125 - gap * (rows - 1) / 2
+    dots = "".join(
+        f'<circle cx="{x0 + c * gap:.0f}" cy="{y0 + r * gap:.0f}" r="{gap * 0.32:.1f}" fill="{_ACCENT}"/>'
+        for r in range(rows) for c in range(cols)
+    )
+    return _svg(dots)
+
+
+def _ratio_bar_svg(a: int, b: int, total: int) -> str:
+    w = 240
+    wa = w * a / (a + b)
+    return _svg(
+        f'<rect x="30" y="100" width="{wa:.0f}" height="50" fill="#dbeafe" stroke="{_STROKE}" stroke-width="2"/>'
+        f'<rect x="{30 + wa:.0f}" y="100" width="{w - wa:.0f}" height="50" fill="#fef3c7" stroke="{_STROKE}" stroke-width="2"/>'
+        + _label(30 + wa / 2, 131, str(a)) + _label(30 + wa + (w - wa) / 2, 131, str(b))
+        + _label(150, 85, f"전체 {total}", _DIM)
+    )
+
+
+def _line_svg(x1: int, y1: int, x2: int, y2: int) -> str:
+    # 좌표평면 위 두 점
+    def px(x):
+        return 150 + x * 12
+
+    def py(y):
+        return 125 - y * 12
+    return _svg(
+        f'<line x1="20" y1="125" x2="280" y2="125" stroke="{_DIM}" stroke-width="1"/>'
+        f'<line x1="150" y1="10" x2="150" y2="240" stroke="{_DIM}" stroke-width="1"/>'
+        f'<line x1="{px(x1):.0f}" y1="{py(y1):.0f}" x2="{px(x2):.0f}" y2="{py(y2):.0f}" stroke="{_ACCENT}" stroke-width="2.5"/>'
+        f'<circle cx="{px(x1):.0f}" cy="{py(y1):.0f}" r="4" fill="{_STROKE}"/>'
+        f'<circle cx="{px(x2):.0f}" cy="{py(y2):.0f}" r="4" fill="{_STROKE}"/>'
+        + _label(px(x1), py(y1) - 10, f"({x1}, {y1})", _TEXT, 12)
+        + _label(px(x2), py(y2) - 10, f"({x2}, {y2})", _TEXT, 12)
+    )
+
+
+# ==========================================
+# 초등
+# ==========================================
+
+@template("모으기와 가르기", "덧셈식과 뺄셈식", aliases=["덧셈과 뺄셈(1)", "9까지의 수"])
+def _small_add_sub(rng, n, difficulty):
+    top = 9 if difficulty <= 1 else 18
+    a = rng.integers(1, top, n)
+    b = rng.integers(1, top, n)
+    sub = rng.random(n) < 0.5
+    hi, lo = np.maximum(a, b), np.minimum(a, b)
+    ans = np.where(sub, hi - lo, a + b)
+    orders = _orders(rng, n)
+    out = []
+    for i in range(n):
+        if sub[i]:
+            q = f"{hi[i]} - {lo[i]} 은 얼마일까요?"
+            wrong = [hi[i] + lo[i], ans[i] + 1, ans[i] - 1]
+            exp = f"{hi[i]}에서 {lo[i]}만큼 거꾸로 세면 {ans[i]}입니다."
+        else:
+            q = f"{a[i]} + {b[i]} 은 얼마일까요?"
+            wrong = [abs(a[i] - b[i]), ans[i] + 1, ans[i] - 1]
+            exp = f"{a[i]}에서 {b[i]}만큼 이어 세면 {ans[i]}입니다."
+        out.append(_problem("", difficulty, q, str(ans[i]), _choices(str(ans[i]), wrong, _numeric_fallback(int(ans[i]))), exp, orders[i]))
+    return out
+
+
+@template("세 자리 수의 덧셈", aliases=["덧셈과 뺄셈(심화)"])
+def _add3(rng, n, difficulty):
+    lo, hi = (100, 500) if difficulty <= 1 else (100, 900)
+    a = rng.integers(lo, hi, n)
+    b = rng.integers(lo, min(hi, 999) - 0, n)
+    b = np.minimum(b, 999 - a + (difficulty >= 3) * 500)
+    b = np.maximum(b, 101)
+    ans = a + b
+    # 받아올림을 빼먹은 답: 자리별 합의 일의 자리만
+    no_carry = (a % 10 + b % 10) % 10 + ((a // 10 % 10 + b // 10 % 10) % 10) * 10 + (a // 100 + b // 100) * 100
+    orders = _orders(rng, n)
+    return [
+        _problem("", difficulty, f"{a[i]} + {b[i]} 을 계산하세요.", str(ans[i]),
+                 _choices(str(ans[i]), [no_carry[i], ans[i] + 10, ans[i] - 10, ans[i] + 100], _numeric_fallback(int(ans[i]))),
+                 f"일의 자리부터 더하고, 10이 넘으면 윗자리로 받아올림합니다. {a[i]} + {b[i]} = {ans[i]}", orders[i])
+        for i in range(n)
+    ]
+
+
+@template("세 자리 수의 뺄셈")
+def _sub3(rng, n, difficulty):
+    a = rng.integers(300, 1000, n)
+    b = rng.integers(100, 300 if difficulty <= 1 else 900, n)
+    a, b = np.maximum(a, b), np.minimum(a, b)
+    b = np.where(a == b, b - 1, b)
+    ans = a - b
+    # 받아내림을 빼먹은 답: 자리별로 큰 수에서 작은 수를 뺌
+    no_borrow = abs(a % 10 - b % 10) + abs(a // 10 % 10 - b // 10 % 10) * 10 + (a // 100 - b // 100) * 100
+    orders = _orders(rng, n)
+    return [
+        _problem("", difficulty, f"{a[i]} - {b[i]} 을 계산하세요.", str(ans[i]),
+                 _choices(str(ans[i]), [no_borrow[i], ans[i] + 10, ans[i] - 10, ans[i] + 100], _numeric_fallback(int(ans[i]))),
+                 f"일의 자리부터 빼고, 뺄 수 없으면 윗자리에서 10을 받아내림합니다. {a[i]} - {b[i]} = {ans[i]}", orders[i])
+        for i in range(n)
+    ]
+
+
+def _times_table(lo: int, hi: int):
+    def generate(rng, n, difficulty):
+        a = rng.integers(lo, hi + 1, n)
+        b = rng.integers(2, 10, n)
+        ans = a * b
+        orders = _orders(rng, n)
+        out = []
+        for i in range(n):
+            if difficulty >= 3:
+                q = f"□ × {b[i]} = {ans[i]} 일 때, □ 에 알맞은 수는?"
+                answer = str(a[i])
+                wrong = [a[i] + 1, a[i] - 1, ans[i] - b[i], b[i]]
+                exp = f"{b[i]}단에서 곱이 {ans[i]}인 수를 찾으면 {a[i]} × {b[i]} = {ans[i]} 이므로 □ = {a[i]}입니다."
+            else:
+                q = f"{a[i]} × {b[i]} 는 얼마일까요?"
+                answer = str(ans[i])
+                wrong = [a[i] * (b[i] + 1), a[i] * (b[i] - 1), a[i] + b[i], (a[i] + 1) * b[i]]
+                exp = f"{a[i]}를 {b[i]}번 더하면 {ans[i]}입니다. ({a[i]}단: {a[i]} × {b[i]} = {ans[i]})"
+            svg = _dots_svg(int(b[i]), int(a[i])) if difficulty <= 1 else None
+            out.append(_problem("", difficulty, q, answer, _choices(answer, wrong, _numeric_fallback(int(answer))), exp, orders[i], svg))
+        return out
+    return generate
+
+
+template("2~5단", aliases=["곱셈구구"])(_times_table(2, 5))
+template("6~9단")(_times_table(6, 9))
+
+
+@template("나눗셈")
+def _division(rng, n, difficulty):
+    d = rng.integers(2, 10, n)
+    q = rng.integers(2, 10 if difficulty <= 2 else 30, n)
+    r = np.where(difficulty >= 2, rng.integers(0, d), 0)
+    a = d * q + r
+    orders = _orders(rng, n)
+    out = []
+    for i in range(n):
+        if r[i]:
+            answer = f"몫 {q[i]}, 나머지 {r[i]}"
+            wrong = [f"몫 {q[i] + 1}, 나머지 {r[i]}", f"몫 {q[i]}, 나머지 {d[i]}", f"몫 {r[i]}, 나머지 {q[i]}",
+                     f"몫 {q[i] - 1}, 나머지 {r[i] + d[i]}"]
+            fallback = lambda k, i=i: f"몫 {q[i] + k + 1}, 나머지 {r[i]}"
+        else:
+            answer = str(q[i])
+            wrong = [q[i] + 1, q[i] - 1, a[i] - d[i], d[i]]
+            fallback = _numeric_fallback(int(q[i]))
+        exp = f"{d[i]} × {q[i]} = {d[i] * q[i]} 이고 {a[i]} - {d[i] * q[i]} = {r[i]} 이므로 몫은 {q[i]}, 나머지는 {r[i]}입니다."
+        out.append(_problem("", difficulty, f"{a[i]} ÷ {d[i]} 를 계산하세요.", answer, _choices(answer, wrong, fallback), exp, orders[i]))
+    return out
+
+
+@template("약수와 배수 찾기", aliases=["약수와 배수"])
+def _divisors(rng, n, difficulty):
+    table = np.array([12, 16, 18, 20, 24, 28, 30, 36, 40, 42, 45, 48, 54, 56, 60, 72, 84, 90, 96, 100])
+    m = table[rng.integers(0, len(table) if difficulty >= 2 else 8, n)]
+    # 약수 개수 (작은 수라 직접 셈, 배열 연산)
+    ks = np.arange(1, 101)
+    counts = ((m[:, None] % ks[None, :]) == 0) & (ks[None, :] <= m[:, None])
+    count = counts.sum(axis=1)
+    orders = _orders(rng, n)
+    out = []
+    for i in range(n):
+        divs = [int(k) for k in ks[counts[i]]]
+        answer = str(count[i])
+        # 흔한 실수: 1 과 자기 자신 빼먹기, 절반만 세기
+        wrong = [count[i] - 2, count[i] - 1, count[i] // 2, count[i] + 1]
+        exp = f"{m[i]}의 약수는 {', '.join(map(str, divs))} 이므로 모두 {count[i]}개입니다. 1과 자기 자신도 약수입니다."
+        out.append(_problem("", difficulty, f"{m[i]}의 약수는 모두 몇 개일까요?", answer,
+                            _choices(answer, wrong, _numeric_fallback(int(count[i]))), exp, orders[i], unit=""))
+    return out
+
+
+@template("최대공약수와 최소공배수")
+def _gcd_lcm(rng, n, difficulty):
+    g = rng.integers(2, 7 if difficulty <= 1 else 13, n)
+    x = rng.integers(2, 8, n)
+    y = rng.integers(2, 8, n)
+    y = np.where(np.gcd(x, y) != 1, y + 1, y)
+    y = np.where(np.gcd(x, y) != 1, 1, y)
+    y = np.where(x == y, y + 1, y)
+    a, b = g * x, g * y
+    G = np.gcd(a, b)
+    L = np.lcm(a, b)
+    want_lcm = rng.random(n) < 0.5
+    orders = _orders(rng, n)
+    out = []
+    for i in range(n):
+        if want_lcm[i]:
+            answer, q = str(L[i]), f"두 수 {a[i]}, {b[i]}의 최소공배수를 구하세요."
+            wrong = [a[i] * b[i], G[i], L[i] * 2, max(a[i], b[i])]
+        else:
+            answer, q = str(G[i]), f"두 수 {a[i]}, {b[i]}의 최대공약수를 구하세요."
+            wrong = [L[i], min(a[i], b[i]), G[i] * 2, max(1, G[i] // 2)]
+        exp = (f"{a[i]} = {G[i]} × {a[i] // G[i]}, {b[i]} = {G[i]} × {b[i] // G[i]} 이므로 "
+               f"최대공약수는 {G[i]}, 최소공배수는 {G[i]} × {a[i] // G[i]} × {b[i] // G[i]} = {L[i]}입니다.")
+        out.append(_problem("", difficulty, q, answer, _choices(answer, wrong, _numeric_fallback(int(answer))), exp, orders[i]))
+    return out
+
+
+@template("사각형의 넓이", "직각삼각형과 직사각행", aliases=["다각형의 둘레와 넓이"])
+def _rect_area(rng, n, difficulty):
+    w = rng.integers(3, 13 if difficulty <= 1 else 25, n)
+    h = rng.integers(2, 10 if difficulty <= 1 else 20, n)
+    h = np.where(h == w, h + 1, h)
+    area = w * h
+    perim = 2 * (w + h)
+    want_perim = (rng.random(n) < 0.3) & (difficulty >= 2)
+    orders = _orders(rng, n)
+    out = []
+    for i in range(n):
+        if want_perim[i]:
+            answer, unit = str(perim[i]), "cm"
+            q = f"가로 {w[i]}cm, 세로 {h[i]}cm 인 직사각형의 둘레는 몇 cm 일까요?"
+            wrong = [area[i], w[i] + h[i], perim[i] + 2]
+            exp = f"둘레 = (가로 + 세로) × 2 = ({w[i]} + {h[i]}) × 2 = {perim[i]}cm"
+        else:
+            answer, unit = str(area[i]), "cm²"
+            q = f"가로 {w[i]}cm, 세로 {h[i]}cm 인 직사각형의 넓이는 몇 cm² 일까요?"
+            # 둘레와 혼동, 가로+세로, 절반
+            wrong = [perim[i], w[i] + h[i], area[i] // 2, area[i] + w[i]]
+            exp = f"직사각형의 넓이 = 가로 × 세로 = {w[i]} × {h[i]} = {area[i]}cm²"
+        out.append(_problem("", difficulty, q, answer, _choices(answer, wrong, _numeric_fallback(int(answer))),
+                            exp, orders[i], _rect_svg(int(w[i]), int(h[i])), unit))
+    return out
+
+
+@template("삼각형의 넓이")
+def _triangle_area(rng, n, difficulty):
+    b = rng.integers(2, 12 if difficulty <= 1 else 24, n)
+    h = rng.integers(3, 15 if difficulty <= 1 else 25, n)
+    b = np.where((b * h) % 2 == 1, b + 1, b)
+    area = b * h // 2
+    orders = _orders(rng, n)
+    return [
+        _problem("", difficulty, f"밑변이 {b[i]}cm, 높이가 {h[i]}cm 인 삼각형의 넓이는 몇 cm² 일까요?", str(area[i]),
+                 # 2 로 나누는 것을 잊음, 밑변+높이, 반으로 한 번 더 나눔
+                 _choices(str(area[i]), [b[i] * h[i], b[i] + h[i], area[i] // 2, area[i] + b[i]], _numeric_fallback(int(area[i]))),
+                 f"삼각형의 넓이 = 밑변 × 높이 ÷ 2 = {b[i]} × {h[i]} ÷ 2 = {area[i]}cm²",
+                 orders[i], _triangle_svg(int(b[i]), int(h[i])), "cm²")
+        for i in range(n)
+    ]
+
+
+@template("삼각형의 내각의 합", "각의 크기", aliases=["각도", "도형의 각도"])
+def _triangle_angles(rng, n, difficulty):
+    a = rng.integers(25, 95, n)
+    b = rng.integers(25, 95, n)
+    over = a + b >= 160
+    b = np.where(over, 160 - a, b)
+    b = np.maximum(b, 15)
+    if difficulty <= 1:
+        a, b = (a // 5) * 5, (b // 5) * 5
+    c = 180 - a - b
+    orders = _orders(rng, n)
+    return [
+        _problem("", difficulty, f"삼각형의 두 각이 {a[i]}°, {b[i]}° 일 때, 나머지 한 각의 크기는 몇 도일까요?", str(c[i]),
+                 # 360 에서 뺌(사각형과 혼동), 두 각의 합, 90 에서 뺌
+                 _choices(str(c[i]), [360 - a[i] - b[i], a[i] + b[i], abs(90 - a[i] - b[i]) or c[i] + 10, c[i] + 10],
+                          _numeric_fallback(int(c[i]))),
+                 f"삼각형의 세 각의 합은 180° 이므로 180 - {a[i]} - {b[i]} = {c[i]}° 입니다.",
+                 orders[i], _angle_triangle_svg(int(a[i]), int(b[i])), "°")
+        for i in range(n)
+    ]
+
+
+@template("(분수) ÷ (자연수)", aliases=["분수의 나눗셈", "분수"])
+def _frac_div_int(rng, n, difficulty):
+    k = rng.integers(2, 6 if difficulty <= 1 else 10, n)
+    if difficulty <= 1:
+        # 분자가 나누어떨어지는 진분수
+        num = rng.integers(1, 4, n) * k
+        den = num + rng.integers(1, 8, n)
+    else:
+        den = rng.integers(2, 10, n)
+        num = rng.integers(1, den)
+    orders = _orders(rng, n)
+    out = []
+    for i in range(n):
+        answer = _frac(num[i], den[i] * k[i])
+        # 분자에 곱함, 분모에만 더함, 역수
+        wrong = [_frac(num[i] * k[i], den[i]), _frac(num[i], den[i] + k[i]), _frac(den[i] * k[i], num[i])]
+        exp = (f"{num[i]}/{den[i]} ÷ {k[i]} = {num[i]}/{den[i]} × 1/{k[i]} = {num[i]}/{den[i] * k[i]}"
+               + (f" = {answer}" if answer != f"{num[i]}/{den[i] * k[i]}" else ""))
+        out.append(_problem("", difficulty, f"{num[i]}/{den[i]} ÷ {k[i]} 을 기약분수로 나타내세요.", answer,
+                            _choices(answer, wrong, lambda j, i=i: _frac(num[i] + j, den[i] * k[i])), exp, orders[i]))
+    return out
+
+
+@template("(분수) ÷ (분수)", aliases=["분수 나눗셈"])
+def _frac_div_frac(rng, n, difficulty):
+    # 쉬움: 한 자리 작은 수, 어려움: 분모가 두 자리까지
+    hi = 6 if difficulty <= 1 else (10 if difficulty == 2 else 16)
+    b, d = rng.integers(2, hi, n), rng.integers(2, hi, n)
+    if difficulty <= 2:
+        # 진분수끼리
+        a, c = rng.integers(1, b), rng.integers(1, d)
+    else:
+        a, c = rng.integers(1, hi - 1, n), rng.integers(1, hi - 1, n)
+    orders = _orders(rng, n)
+    out = []
+    for i in range(n):
+        answer = _frac(a[i] * d[i], b[i] * c[i])
+        # 뒤집지 않고 곱함, 앞 분수를 뒤집음, 분자끼리/분모끼리 나눔
+        wrong = [_frac(a[i] * c[i], b[i] * d[i]), _frac(b[i] * c[i], a[i] * d[i]), _frac(b[i] * d[i], a[i] * c[i])]
+        exp = f"나누는 분수를 뒤집어 곱합니다: {a[i]}/{b[i]} × {d[i]}/{c[i]} = {a[i] * d[i]}/{b[i] * c[i]}"
+        if answer != f"{a[i] * d[i]}/{b[i] * c[i]}":
+            exp += f" = {answer}"
+        out.append(_problem("", difficulty, f"{a[i]}/{b[i]} ÷ {c[i]}/{d[i]} 를 기약분수로 나타내세요.", answer,
+                            _choices(answer, wrong, lambda j, i=i: _frac(a[i] * d[i] + j * c[i], b[i] * c[i])), exp, orders[i]))
+    return out
+
+
+@template("분수 덧셈")
+def _frac_add(rng, n, difficulty):
+    # 진분수끼리 (쉬움: 분모가 같음)
+    b = rng.integers(2, 10, n)
+    d = b if difficulty <= 1 else rng.integers(2, 10, n)
+    a = rng.integers(1, b)
+    c = rng.integers(1, d)
+    orders = _orders(rng, n)
+    out = []
+    for i in range(n):
+        answer = _frac(a[i] * d[i] + c[i] * b[i], b[i] * d[i])
+        # 분자끼리, 분모끼리 더함
+        wrong = [_frac(a[i] + c[i], b[i] + d[i]), _frac(a[i] + c[i], b[i] * d[i]), _frac(a[i] * c[i], b[i] * d[i])]
+        if b[i] == d[i]:
+            exp = f"분모가 같으므로 분자끼리 더합니다: {a[i]}/{b[i]} + {c[i]}/{d[i]} = {a[i] + c[i]}/{b[i]}"
+            raw = f"{a[i] + c[i]}/{b[i]}"
+        else:
+            exp = f"통분해서 더합니다: {a[i]}/{b[i]} + {c[i]}/{d[i]} = {a[i] * d[i] + c[i] * b[i]}/{b[i] * d[i]}"
+            raw = f"{a[i] * d[i] + c[i] * b[i]}/{b[i] * d[i]}"
+        if answer != raw:
+            exp += f" = {answer}"
+        out.append(_problem("", difficulty, f"{a[i]}/{b[i]} + {c[i]}/{d[i]} 를 기약분수로 나타내세요.", answer,
+                            _choices(answer, wrong, lambda j, i=i: _frac(a[i] * d[i] + c[i] * b[i] + j, b[i] * d[i])), exp, orders[i]))
+    return out
+
+
+@template("소수의 곱셈")
+def _decimal_mul(rng, n, difficulty):
+    a = rng.integers(1, 10, n) * 10 + rng.integers(1, 10, n)
+    # 쉬움: (소수) × (자연수), 그 외: (소수 한 자리) × (소수 한 자리)
+    if difficulty <= 1:
+        b = rng.integers(2, 10, n)
+        places_b = np.zeros(n, dtype=int)
+    else:
+        b = rng.integers(1, 10, n) * 10 + rng.integers(1, 10, n)
+        places_b = np.ones(n, dtype=int)
+    orders = _orders(rng, n)
+    out = []
+    for i in range(n):
+        x = a[i] / 10
+        y = b[i] / (10 ** places_b[i])
+        places = 1 + places_b[i]
+        prod = a[i] * b[i]
+
+        def fmt(v, p):
+            s = f"{v / 10 ** p:.{p}f}".rstrip("0").rstrip(".")
+            return s
+        answer = fmt(prod, places)
+        # 소수점 위치 실수
+        wrong = [fmt(prod, places + 1), fmt(prod, max(0, places - 1)), fmt(prod + 10 ** max(0, places - 1), places)]
+        exp = f"{a[i]} × {b[i]} = {prod} 이고, 소수점 아래 자리 수가 모두 {places}개이므로 {answer}입니다."
+        out.append(_problem("", difficulty, f"{x:g} × {y:g} 를 계산하세요.", answer,
+                            _choices(answer, wrong, lambda j, i=i, p=places, prod=prod: fmt(prod + j, p)), exp, orders[i]))
+    return out
+
+
+@template("비례배분 활용", aliases=["비례식과 비례배분", "비례배분"])
+def _proportional(rng, n, difficulty):
+    a = rng.integers(1, 6, n)
+    b = rng.integers(1, 6, n)
+    b = np.where(a == b, b + 1, b)
+    unit = rng.integers(2, 20 if difficulty <= 1 else 60, n) * (10 if difficulty >= 2 else 1)
+    total = (a + b) * unit
+    share = a * unit
+    names = ["사탕", "구슬", "색종이", "쿠키"]
+    picks = rng.integers(0, len(names), n)
+    orders = _orders(rng, n)
+    return [
+        _problem("", difficulty,
+                 f"{names[picks[i]]} {total[i]}개를 형과 동생이 {a[i]} : {b[i]} 로 나누어 가지려고 합니다. 형은 몇 개를 가지게 될까요?",
+                 str(share[i]),
+                 # 동생 몫, 전체를 비의 앞 항으로만 나눔, 반씩
+                 _choices(str(share[i]), [b[i] * unit[i], total[i] // a[i] if total[i] % a[i] == 0 else total[i] // 2 + 1,
+                                          total[i] // 2, share[i] + unit[i]], _numeric_fallback(int(share[i]))),
+                 f"형의 몫 = 전체 × {a[i]}/({a[i]}+{b[i]}) = {total[i]} × {a[i]}/{a[i] + b[i]} = {share[i]}개",
+                 orders[i], _ratio_bar_svg(int(a[i]), int(b[i]), int(total[i])), "개")
+        for i in range(n)
+    ]
+
+
+@template("비의 성질")
+def _ratio_equiv(rng, n, difficulty):
+    a = rng.integers(1, 10, n)
+    b = rng.integers(1, 10, n)
+    b = np.where(a == b, b + 1, b)
+    k = rng.integers(2, 6 if difficulty <= 1 else 13, n)
+    orders = _orders(rng, n)
+    return [
+        _problem("", difficulty, f"{a[i]} : {b[i]} = {a[i] * k[i]} : □ 일 때, □ 에 알맞은 수는?", str(b[i] * k[i]),
+                 # 같은 수를 더함, 앞 항만 보고 곱함, 뒤 항 그대로
+                 _choices(str(b[i] * k[i]), [b[i] + a[i] * k[i] - a[i], a[i] * k[i] * k[i], b[i] * (k[i] + 1), b[i]],
+                          _numeric_fallback(int(b[i] * k[i]))),
+                 f"비의 전항과 후항에 0이 아닌 같은 수를 곱해도 비율은 같습니다. "
+                 f"{a[i]} × {k[i]} = {a[i] * k[i]} 이므로 □ = {b[i]} × {k[i]} = {b[i] * k[i]}",
+                 orders[i])
+        for i in range(n)
+    ]
+
+
+# ==========================================
+# 중등
+# ==========================================
+
+@template("소인수분해", aliases=["수와 연산"])
+def _prime_factorization(rng, n, difficulty):
+    primes = np.array([2, 3, 5, 7])
+    exps = rng.integers(0, 4 if difficulty >= 2 else 3, (n, 4))
+    exps[:, 0] = np.maximum(exps[:, 0], 1)
+    exps[:, 3] = np.where(rng.random(n) < (0.3 if difficulty >= 2 else 0.0), 1, 0)
+    values = np.prod(primes[None, :] ** exps, axis=1)
+    orders = _orders(rng, n)
+
+    def fmt(e):
+        parts = []
+        for p, k in zip(primes, e):
+            if k == 1:
+                parts.append(str(p))
+            elif k > 1:
+                parts.append(f"{p}^{k}")
+        return " × ".join(parts)
+    out = []
+    for i in range(n):
+        e = exps[i]
+        answer = fmt(e)
+        # 지수 하나씩 틀림, 합성수 포함
+        wrong = []
+        for j in range(4):
+            if e[j] > 0:
+                alt = e.copy()
+                alt[j] += 1
+                wrong.append(fmt(alt))
+                if e[j] > 1:
+                    alt = e.copy()
+                    alt[j] -= 1
+                    wrong.append(fmt(alt))
+        out.append(_problem("", difficulty, f"{values[i]}을 소인수분해한 것으로 옳은 것은?", answer,
+                            _choices(answer, wrong, lambda k, e=e: fmt(np.array([e[0] + k, e[1], e[2], e[3]]))),
+                            f"{values[i]}을 가장 작은 소수부터 차례로 나누면 {answer} 입니다.", orders[i]))
+    return out
+
+
+@template("정수와 유리수")
+def _integers(rng, n, difficulty):
+    a = rng.integers(-20, 21, n)
+    b = rng.integers(-20, 21, n)
+    b = np.where(b == 0, -7, b)
+    op = rng.integers(0, 3 if difficulty >= 2 else 2, n)
+    orders = _orders(rng, n)
+    out = []
+    for i in range(n):
+        sb = f"({b[i]})" if b[i] < 0 else str(b[i])
+        sa = f"({a[i]})" if a[i] < 0 else str(a[i])
+        if op[i] == 0:
+            ans, q = a[i] + b[i], f"{sa} + {sb}"
+            wrong = [a[i] - b[i], -(a[i] + b[i]), abs(a[i]) + abs(b[i])]
+            if (a[i] < 0) == (b[i] < 0) or a[i] == 0:
+                exp = f"{q} = {ans} (부호가 같은 두 수의 합: 절댓값끼리 더하고 공통 부호를 붙입니다.)"
+            else:
+                exp = (f"{q} = {ans} (부호가 다른 두 수의 합: 절댓값이 큰 수에서 작은 수를 빼고 "
+                       f"절댓값이 큰 수의 부호를 붙입니다.)")
+        elif op[i] == 1:
+            ans, q = a[i] - b[i], f"{sa} - {sb}"
+            wrong = [a[i] + b[i], -(a[i] - b[i]), abs(a[i]) - abs(b[i])]
+            if b[i] < 0:
+                exp = f"{q} = {sa} + {-b[i]} = {ans} (음수를 빼는 것은 양수를 더하는 것과 같습니다.)"
+            else:
+                exp = f"{q} = {sa} + (-{b[i]}) = {ans} (빼는 수의 부호를 바꾸어 더합니다.)"
+        else:
+            ans, q = a[i] * b[i], f"{sa} × {sb}"
+            wrong = [-(a[i] * b[i]), a[i] + b[i], abs(a[i] * b[i]) + 1]
+            sign = "+" if (a[i] < 0) == (b[i] < 0) else "-"
+            exp = (f"{q} = {ans} (두 수의 부호가 {'같으면' if sign == '+' else '다르면'} {sign}, "
+                   f"절댓값의 곱 {abs(a[i])} × {abs(b[i])} = {abs(a[i] * b[i])})")
+        out.append(_problem("", difficulty, f"{q} 를 계산하세요.", str(ans),
+                            _choices(str(ans), wrong, _numeric_fallback(int(ans))), exp, orders[i]))
+    return out
+
+
+@template("일차방정식", "문자의 사용", aliases=["문자와 식"])
+def _linear_equation(rng, n, difficulty):
+    a = rng.integers(2, 10, n) * np.where((rng.random(n) < 0.3) & (difficulty >= 2), -1, 1)
+    x = rng.integers(-9 if difficulty >= 2 else 1, 13, n)
+    b = rng.integers(-15, 16, n)
+    c = a * x + b
+    orders = _orders(rng, n)
+    out = []
+    for i in range(n):
+        bs = f"+ {b[i]}" if b[i] >= 0 else f"- {-b[i]}"
+        answer = f"x = {x[i]}"
+        # 이항할 때 부호를 안 바꿈, 나누지 않고 뺌, 부호 반대
+        wrong = [f"x = {_frac(c[i] + b[i], a[i])}", f"x = {c[i] - b[i] - a[i]}", f"x = {-x[i]}" if x[i] else "x = 1"]
+        exp = f"{a[i]}x {bs} = {c[i]} → {a[i]}x = {c[i] - b[i]} → x = {x[i]}"
+        out.append(_problem("", difficulty, f"일차방정식 {a[i]}x {bs} = {c[i]} 의 해를 구하세요.", answer,
+                            _choices(answer, wrong, lambda k, i=i: f"x = {x[i] + k}"), exp, orders[i]))
+    return out
+
+
+@template("일차부등식", aliases=["부등식"])
+def _linear_inequality(rng, n, difficulty):
+    # 쉬움: 양수 계수·양의 해, 보통: 음수 계수 절반, 어려움: 큰 수·음수 계수 위주
+    negative = 0.0 if difficulty <= 1 else (0.5 if difficulty == 2 else 0.7)
+    a = rng.integers(2, 8 if difficulty <= 2 else 13, n) * np.where(rng.random(n) < negative, -1, 1)
+    k = rng.integers(1, 10, n) if difficulty <= 1 else rng.integers(-6 if difficulty == 2 else -12, 10 if difficulty == 2 else 13, n)
+    b = rng.integers(0, 11, n) if difficulty <= 1 else rng.integers(-10 if difficulty == 2 else -20, 11 if difficulty == 2 else 21, n)
+    c = a * k + b
+    orders = _orders(rng, n)
+    out = []
+    for i in range(n):
+        bs = f"+ {b[i]}" if b[i] >= 0 else f"- {-b[i]}"
+        sign = ">" if a[i] > 0 else "<"
+        flip = "<" if sign == ">" else ">"
+        answer = f"x {sign} {k[i]}"
+        # 음수로 나눌 때 부등호 방향을 안 바꿈 / 이항 부호 실수
+        wrong = [f"x {flip} {k[i]}", f"x {sign} {-k[i]}" if k[i] else f"x {sign} 1", f"x {sign} {_frac(c[i] + b[i], a[i])}"]
+        exp = (f"{a[i]}x {bs} > {c[i]} → {a[i]}x > {c[i] - b[i]}"
+               + (" → 음수로 나누면 부등호 방향이 바뀝니다" if a[i] < 0 else "") + f" → {answer}")
+        out.append(_problem("", difficulty, f"일차부등식 {a[i]}x {bs} > {c[i]} 의 해는?", answer,
+                            _choices(answer, wrong, lambda j, i=i, s=sign: f"x {s} {k[i] + j}"), exp, orders[i]))
+    return out
+
+
+@template("인수분해")
+def _factoring(rng, n, difficulty):
+    # 쉬움: 두 수 모두 양수(한 자리), 어려움: 절댓값 15 까지
+    if difficulty <= 1:
+        p, q = rng.integers(1, 7, n), rng.integers(1, 7, n)
+    else:
+        r = 9 if difficulty == 2 else 15
+        p, q = rng.integers(-r, r + 1, n), rng.integers(-r, r + 1, n)
+    p = np.where(p == 0, 3, p)
+    q = np.where(q == 0, -2, q)
+    s, m = p + q, p * q
+    orders = _orders(rng, n)
+
+    def term(v):
+        return f"+ {v}" if v >= 0 else f"- {-v}"
+
+    def fac(u, v):
+        return f"(x {term(u)})(x {term(v)})"
+    out = []
+    for i in range(n):
+        poly = f"x² {term(s[i])}x {term(m[i])}".replace("+ 1x", "+ x").replace("- 1x", "- x").replace(" + 0x", "")
+        answer = fac(p[i], q[i])
+        wrong = [fac(-p[i], -q[i]), fac(p[i], -q[i]), fac(-p[i], q[i]), fac(s[i], m[i] if m[i] != q[i] else m[i] + 1)]
+        out.append(_problem("", difficulty, f"{poly} 를 인수분해하세요.", answer,
+                            _choices(answer, wrong, lambda k, i=i: fac(p[i] + k, q[i])),
+                            f"곱이 {m[i]}, 합이 {s[i]}인 두 수는 {p[i]}, {q[i]} 이므로 {answer} 입니다.", orders[i]))
+    return out
+
+
+@template("이차방정식의 해", "이차방정식", aliases=["이차방정식과 이차함수"])
+def _quadratic_roots(rng, n, difficulty):
+    # 쉬움: 양의 작은 해, 어려움: 절댓값 15 까지
+    if difficulty <= 1:
+        p, q = rng.integers(1, 8, n), rng.integers(1, 8, n)
+    else:
+        r = 9 if difficulty == 2 else 15
+        p, q = rng.integers(-r, r + 1, n), rng.integers(-r, r + 1, n)
+    q = np.where(q == p, q + 1, q)
+    s, m = p + q, p * q
+    lo, hi = np.minimum(p, q), np.maximum(p, q)
+    orders = _orders(rng, n)
+
+    def term(v):
+        return f"+ {v}" if v >= 0 else f"- {-v}"
+    out = []
+    for i in range(n):
+        poly = f"x² {term(-s[i])}x {term(m[i])} = 0".replace(" + 0x", "").replace(" - 0x", "")
+        poly = poly.replace("+ 1x", "+ x").replace("- 1x", "- x")
+        answer = f"x = {lo[i]} 또는 x = {hi[i]}"
+        # 부호를 반대로, 계수를 그대로 해로
+        wrong = [f"x = {-hi[i]} 또는 x = {-lo[i]}", f"x = {min(s[i], m[i])} 또는 x = {max(s[i], m[i])}",
+                 f"x = {lo[i]} 또는 x = {-hi[i]}" if hi[i] != 0 else f"x = {lo[i] - 1} 또는 x = {hi[i]}",
+                 f"x = {-lo[i]} 또는 x = {hi[i]}"]
+        exp = f"{poly[:-4]} = (x {term(-p[i])})(x {term(-q[i])}) 이므로 해는 x = {lo[i]} 또는 x = {hi[i]} 입니다."
+        out.append(_problem("", difficulty, f"이차방정식 {poly} 의 해를 구하세요.", answer,
+                            _choices(answer, wrong, lambda k, i=i: f"x = {lo[i] - k} 또는 x = {hi[i] + k}"), exp, orders[i]))
+    return out
+
+
+@template("제곱근과 실수", aliases=["실수와 그 연산"])
+def _square_roots(rng, n, difficulty):
+    r = rng.integers(2, 16 if difficulty >= 2 else 10, n)
+    k = rng.integers(2, 6, n)
+    with_coef = (rng.random(n) < 0.5) & (difficulty >= 2)
+    orders = _orders(rng, n)
+    out = []
+    for i in range(n):
+        if with_coef[i]:
+            inner = r[i] * r[i] * k[i]
+            answer = f"{r[i]}√{k[i]}"
+            wrong = [f"{k[i]}√{r[i]}", f"{r[i] * r[i]}√{k[i]}", f"{r[i]}√{k[i] * r[i]}"]
+            q = f"√{inner} 를 a√b 꼴로 나타내면?"
+            exp = f"√{inner} = √({r[i]}² × {k[i]}) = {r[i]}√{k[i]}"
+            fallback = lambda j, i=i: f"{r[i] + j}√{k[i]}"
+        else:
+            sq = r[i] * r[i]
+            answer = f"±{r[i]}"
+            wrong = [str(r[i]), f"±{sq // 2}", f"±{r[i] + 1}", str(-r[i])]
+            q = f"{sq}의 제곱근은?"
+            exp = f"제곱해서 {sq}이 되는 수는 {r[i]}와 -{r[i]} 두 개입니다."
+            fallback = lambda j, i=i: f"±{r[i] + j + 1}"
+        out.append(_problem("", difficulty, q, answer, _choices(answer, wrong, fallback), exp, orders[i]))
+    return out
+
+
+# ==========================================
+# 고등
+# ==========================================
+
+@template("직선의 방정식", "평면좌표", aliases=["도형의 방정식"])
+def _line_slope(rng, n, difficulty):
+    # 쉬움: 오른쪽 위로 가는 정수 기울기, 보통: 정수 기울기, 어려움: 분수 기울기
+    x1 = rng.integers(-8, 5 if difficulty <= 1 else 9, n)
+    y1 = rng.integers(-9, -2, n) if difficulty <= 1 else rng.integers(-8, 9, n)
+    dx = rng.integers(2 if difficulty >= 3 else 1, 5, n) * (1 if difficulty <= 1 else np.where(rng.random(n) < 0.5, -1, 1))
+    x2 = np.clip(x1 + dx, -9, 9)
+    x2 = np.where(x2 == x1, x1 - dx, x2)
+    if difficulty >= 3:
+        rise = rng.integers(-7, 8, n)
+        rise = np.where(rise % (x2 - x1) == 0, rise + 1, rise)
+    else:
+        rise = (rng.integers(1, 4, n) if difficulty <= 1 else rng.integers(-3, 4, n)) * (x2 - x1)
+    y2 = np.where(np.abs(y1 + rise) <= 9, y1 + rise, y1 - rise)
+    y2 = np.clip(y2, -9, 9)
+    orders = _orders(rng, n)
+    out = []
+    for i in range(n):
+        answer = _frac(y2[i] - y1[i], x2[i] - x1[i])
+        # 기울기 역수, 부호 반대, x 증가량/ y 증가량 혼동
+        wrong = [_frac(x2[i] - x1[i], y2[i] - y1[i]) if y2[i] != y1[i] else "1", _frac(-(y2[i] - y1[i]), x2[i] - x1[i]),
+                 _frac(y2[i] + y1[i], x2[i] + x1[i]) if x2[i] + x1[i] else "2"]
+        exp = f"기울기 = (y 증가량)/(x 증가량) = ({y2[i]} - ({y1[i]}))/({x2[i]} - ({x1[i]})) = {answer}"
+        out.append(_problem("", difficulty, f"두 점 ({x1[i]}, {y1[i]}), ({x2[i]}, {y2[i]}) 을 지나는 직선의 기울기는?", answer,
+                            _choices(answer, wrong, lambda k, i=i: _frac(y2[i] - y1[i] + k, x2[i] - x1[i])),
+                            exp, orders[i], _line_svg(int(x1[i]), int(y1[i]), int(x2[i]), int(y2[i]))))
+    return out
+
+
+@template("경우의 수", aliases=["확률과 통계"])
+def _counting(rng, n, difficulty):
+    total = rng.integers(4, 9 if difficulty <= 2 else 12, n)
+    pick = rng.integers(2, 4, n)
+    ordered = rng.random(n) < 0.5
+    # nPr, nCr 을 배열로 계산
+    perm = np.ones(n, dtype=np.int64)
+    for j in range(3):
+        perm = np.where(j < pick, perm * (total - j), perm)
+    fact = np.where(pick == 2, 2, 6)
+    comb = perm // fact
+    orders = _orders(rng, n)
+    out = []
+    for i in range(n):
+        if ordered[i]:
+            answer = str(perm[i])
+            roles = "회장, 부회장, 서기를" if pick[i] == 3 else "회장, 부회장을"
+            q = f"{total[i]}명의 학생 중에서 {roles} 한 명씩 뽑는 경우의 수는?"
+            wrong = [comb[i], total[i] ** pick[i], total[i] * pick[i]]
+            exp = f"순서가 있으므로 {total[i]}P{pick[i]} = {answer}"
+        else:
+            answer = str(comb[i])
+            q = f"{total[i]}명의 학생 중에서 대표 {pick[i]}명을 뽑는 경우의 수는?"
+            wrong = [perm[i], total[i] * pick[i], comb[i] * 2]
+            exp = f"순서가 없으므로 {total[i]}C{pick[i]} = {perm[i]} ÷ {fact[i]} = {answer}"
+        out.append(_problem("", difficulty, q, answer, _choices(answer, wrong, _numeric_fallback(int(answer))), exp, orders[i]))
+    return out
+
+
+@template("수열", aliases=["수학 I"])
+def _arithmetic_sequence(rng, n, difficulty):
+    a1 = rng.integers(-10, 20, n)
+    d = rng.integers(-5, 8, n)
+    d = np.where(d == 0, 3, d)
+    k = rng.integers(8, 30 if difficulty >= 2 else 15, n)
+    ak = a1 + (k - 1) * d
+    orders = _orders(rng, n)
+    return [
+        _problem("", difficulty, f"첫째항이 {a1[i]}, 공차가 {d[i]}인 등차수열의 제{k[i]}항은?", str(ak[i]),
+                 # (n-1) 대신 n 을 곱함, 공차를 빼먹음
+                 _choices(str(ak[i]), [a1[i] + k[i] * d[i], a1[i] + (k[i] - 2) * d[i], k[i] * d[i]], _numeric_fallback(int(ak[i]))),
+                 f"aₙ = a₁ + (n - 1)d = {a1[i]} + ({k[i]} - 1) × ({d[i]}) = {ak[i]}", orders[i])
+        for i in range(n)
+    ]
+
+
+@template("다항함수의 미분법", aliases=["수학 II"])
+def _derivative_at(rng, n, difficulty):
+    a = rng.integers(1, 6, n) * np.where(rng.random(n) < 0.3, -1, 1)
+    b = rng.integers(-6, 7, n)
+    c = rng.integers(-9, 10, n)
+    x0 = rng.integers(-3, 4, n)
+    cubic = (rng.random(n) < 0.5) & (difficulty >= 2)
+    orders = _orders(rng, n)
+
+    def term(v, s):
+        if v == 0:
+            return ""
+        sign = "+ " if v > 0 else "- "
+        coef = "" if abs(v) == 1 and s else str(abs(v))
+        return f" {sign}{coef}{s}"
+    out = []
+    for i in range(n):
+        if cubic[i]:
+            f = f"{'' if a[i] == 1 else '-' if a[i] == -1 else a[i]}x³{term(b[i], 'x')}{term(c[i], '')}"
+            ans = 3 * a[i] * x0[i] ** 2 + b[i]
+            wrong = [a[i] * x0[i] ** 3 + b[i] * x0[i] + c[i], a[i] * x0[i] ** 2 + b[i], 3 * a[i] * x0[i] + b[i]]
+            exp = f"f'(x) = {3 * a[i]}x²{term(b[i], '')} 이므로 f'({x0[i]}) = {ans}"
+        else:
+            f = f"{'' if a[i] == 1 else '-' if a[i] == -1 else a[i]}x²{term(b[i], 'x')}{term(c[i], '')}"
+            ans = 2 * a[i] * x0[i] + b[i]
+            wrong = [a[i] * x0[i] ** 2 + b[i] * x0[i] + c[i], a[i] * x0[i] + b[i], 2 * a[i] * x0[i] + b[i] + c[i]]
+            exp = f"f'(x) = {2 * a[i]}x{term(b[i], '')} 이므로 f'({x0[i]}) = {ans}"
+        out.append(_problem("", difficulty, f"f(x) = {f.strip()} 일 때, f'({x0[i]}) 의 값은?", str(ans),
+                            _choices(str(ans), wrong, _numeric_fallback(int(ans))), exp, orders[i]))
+    return out
+
+
+# ==========================================
+# 공개 API
+# ==========================================
+
+def resolve(topic: str) -> Optional[str]:
+    """
+    주제 → 템플릿 이름 (단원명 → 별칭). 없으면 None.
+    부분 일치는 하지 않는다 ("수열의 극한" 에 등차수열 문제가 나가지 않도록).
+    """
+    topic = (topic or "").strip()
+    if topic in TEMPLATES:
+        return topic
+    return ALIASES.get(topic)
+
+
+def supports(topic: str) -> bool:
+    return resolve(topic) is not None
+
+
+def generate(topic: str, difficulty: int = 2, count: int = 1, seed: Optional[int] = None,
+             rng: Optional[np.random.Generator] = None) -> List[Dict[str, Any]]:
+    """
+    한 주제의 문제 count 개. 지원하지 않는 주제면 KeyError.
+    """
+    name = resolve(topic)
+    if name is None:
+        raise KeyError(f"No procedural template for {topic!r}")
+    rng = rng or np.random.default_rng(seed)
+    difficulty = int(min(3, max(1, int(difficulty or 2))))
+    problems = TEMPLATES[name](rng, int(count), difficulty)
+    for p in problems:
+        p["topic"] = topic
+    return problems
+
+
+def generate_plan(plan: List[Dict[str, Any]], seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    계획 항목을 (주제, 난이도) 별로 묶어 한 번에 생성.
+    반환 형식은 ai_engine.generate_problems_detailed 와 같음 ({"problems", "missing"}), 순서는 계획 순서.
+    """
+    rng = np.random.default_rng(seed)
+    groups: Dict[Tuple[str, int], List[int]] = {}
+    missing = []
+    for idx, item in enumerate(plan):
+        topic = str(item.get("topic", "")).strip()
+        if not supports(topic):
+            missing.append(item)
+            continue
+        groups.setdefault((topic, int(item.get("difficulty", 2) or 2)), []).append(idx)
+
+    slots: List[Optional[Dict[str, Any]]] = [None] * len(plan)
+    for (topic, difficulty), idxs in groups.items():
+        for idx, p in zip(idxs, generate(topic, difficulty, len(idxs), rng=rng)):
+            p["type"] = plan[idx].get("type", p["type"])
+            if plan[idx].get("require_visual") and not p.get("svg"):
+                from .ai_engine import generate_fallback_svg
+                p["svg"] = generate_fallback_svg(topic, p["question"])
+            slots[idx] = p
+    return {"problems": [p for p in slots if p is not None], "missing": missing}
+
+
+def _bench(count: int):
+    from .validation import validate_problem
+
+    rng = np.random.default_rng(0)
+    per = max(1, count // (len(set(TEMPLATES.values())) * 3))
+    total = invalid = 0
+    start = time.perf_counter()
+    produced = []
+    for name in TEMPLATES:
+        for difficulty in (1, 2, 3):
+            produced.extend(generate(name, difficulty, per, rng=rng))
+    elapsed = time.perf_counter() - start
+    for p in produced:
+        total += 1
+        if validate_problem(p):
+            invalid += 1
+            if invalid <= 5:
+                print(f"❌ {validate_problem(p)}: {p['topic']} {p['question']} {p['options']} {p['answer']}")
+    print(f"⚡ {total} problems in {elapsed:.3f}s ({total / elapsed:,.0f}/s), {len(TEMPLATES)} units, invalid {invalid}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="절차적 문제 생성기")
+    parser.add_argument("--topic", help="단원명 (예: 6~9단, 일차방정식)")
+    parser.add_argument("--difficulty", type=int, default=2)
+    parser.add_argument("-n", type=int, default=3)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--bench", type=int, default=0, help="전체 단원으로 N 개 생성 + 검증")
+    args = parser.parse_args()
+
+    if args.bench:
+        _bench(args.bench)
+        return
+    if not args.topic:
+        print("지원 단원: " + ", ".join(sorted(TEMPLATES)))
+        return
+    import json
+    for p in generate(args.topic, args.difficulty, args.n, seed=args.seed):
+        p.pop("svg", None)
+        print(json.dumps(p, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from .metrics import observe_usage
+
+# ==========================================
+# 프롬프트 레지스트리
+# - (school_level, grade, task) 별 시스템 프롬프트를 미리 컴파일해 둠
+# - 공통(불변) 부분을 앞에, 학년 등 가변 부분을 뒤에 배치 → OpenAI 프롬프트 프리픽스 캐시 적중
+# - 프롬프트 문구를 바꾸면 반드시 PROMPT_VERSIONS 를 올릴 것 (분석/재작성 결과 캐시 키에 반영됨)
+# ==========================================
+
+PROMPT_VERSIONS = {
+    "generate": "gen-v2",
+    "analyze": "analyze-v2",
+    "rewrite": "rewrite-v2",
+    "tutor": "tutor-v1",
+}
+
+SCHOOL_GRADES = {
+    "elementary": range(1, 7),
+    "middle": range(1, 4),
+    "high": range(1, 4),
+}
+
+# ── 문제 생성 (공통 프리픽스) ──
+_GENERATE_PREFIX = """
+당신은 대한민국 '최상위권 수학' 전문 출제 위원입니다.
+
+단순 연산이나 너무 쉬운 문제는 **절대 출제하지 마세요.**
+학생이 문제를 읽고 **논리적으로 추론(Reasoning)하고, 조건을 분석해야만** 풀 수 있는 고품질 문제를 만들어야 합니다.
+
+[학년 준수]
+- 맨 아래 [대상 학년]에 명시된 학년의 교과 과정을 철저히 준수하세요.
+- 고등학생에게 초등 수준의 덧셈/뺄셈 문제를 내면 **해고**됩니다.
+- 유치한 문제는 🚫절대 금지🚫입니다.
+
+[출제 지침]
+1. **복합 사고력(Multi-step Reasoning)**: 한 번의 계산으로 끝나는 문제가 아니라, 2단계 이상의 사고가 필요한 문제를 내세요.
+2. **실생활 응용 & 문해력**: 텍스트를 읽고 식을 세우는 능력을 평가하세요.
+3. **오답 유도(Distractors)**: 보기는 단순한 숫자의 나열이 아니라, 학생이 흔히 범하는 실수(계산 실수, 조건 누락)를 반영한 매력적인 오답으로 구성하세요.
+4. **상세한 해설(Step-by-Step Explanation)**: 해설(`explanation`)은 단순히 정답을 알려주는 것이 아니라, 어떤 개념을 사용해야 하는지부터 시작하여 정답을 도출하는 논리적 단계를 1, 2, 3단계로 나누어 구체적으로 작성하세요. 학생이 교사와 함께 공부하는 느낌을 받도록 친절하게 서술하세요.
+5. **객관식 4지선다**: 모든 문제는 반드시 4개의 보기(`options`)를 포함해야 합니다. 정답 1개 + 오답 3개로 구성하세요.
+
+[해설 지침] 모든 문제의 해설(explanation)은 정답에 이르는 과정을 단계별(Step-by-step)로 상세하게 설명하세요. 단순히 수식만 나열하지 말고, 어떤 개념이 적용되었는지와 풀이의 논리적 흐름을 초심자도 이해할 수 있도록 친절하고 구체적으로 작성해야 합니다.
+
+[수학 기호 규칙 (절대 준수)]
+- **거듭제곱**: `^` 기호를 절대 사용하지 마세요. 반드시 유니코드 상첨자를 사용하세요: ² ³ ⁴ ⁵ ⁶ ⁷ ⁸ ⁹
+  - 예시: x² (O), x^2 (X), 2³ (O), 2^3 (X)
+- **곱셈**: `*` 대신 `×` 를 사용하세요.
+- **나눗셈**: `/` 대신 `÷` 를 사용할 수 있습니다 (분수 표현 제외).
+- 문제, 보기, 정답, 해설 모든 필드에 동일하게 유니코드 기호를 적용하세요.
+
+[SVG 생성 지침 (절대 준수)]
+1. **모든 도형, 기하 문제**는 반드시 `svg` 필드에 시각 자료 코드를 포함해야 합니다. (선택 아님)
+   - `<svg viewBox="0 0 300 250" ...>` 태그로 시작하고 닫아야 합니다.
+   - 배경색은 투명, 선 색은 검정(#000) 또는 파랑(#3b82f6) 등을 사용하세요.
+2. 기하 문제가 아니어서 그림이 필요 없다면 `svg`: "" (빈 문자열)로 남기세요.
+3. "삼각형", "사각형", "원", "그래프", "함수" 등의 단어가 문제에 나오면 무조건 그리세요.
+
+[JSON 형식]
+{
+  "problems": [
+    {
+      "topic": "주제",
+      "difficulty": 1,
+      "type": "drill",
+      "question": "문제 지문",
+      "svg": "<svg ...>...</svg>",
+      "options": ["오답", "오답", "정답", "오답"],
+      "answer": "정답",
+      "explanation": "해설"
+    }
+  ]
+}
+""".strip()
+
+# ── 오답 분석 / 문장 다듬기 (변수는 user 메시지로 분리) ──
+_ANALYZE_PROMPT = """
+학생이 수학 문제를 틀렸습니다. 사용자 메시지로 문제, 정답, 학생 답이 주어집니다.
+
+이 오답의 원인을 분석해주세요. (단순 계산 실수, 개념 부족, 문제 해석 오류 등)
+그리고 학생에게 줄 맞춤형 조언을 한 문장으로 작성해주세요.
+응답은 JSON 형식으로 주세요: {"error_type": "...", "reasoning": "...", "advice": "..."}
+""".strip()
+
+_REWRITE_PROMPT = """
+사용자 메시지로 주어지는 수학 문제를 '초등학생이 이해하기 쉬운 문장'으로 바꿔주세요.
+수치는 절대 바꾸지 마세요. 문체만 친절하게 바꾸세요.
+바뀐 문제 문장만 출력하세요.
+""".strip()
+
+TUTOR_SYSTEM_PROMPT = """
+당신은 친절하고 지혜로운 AI 수학 선생님입니다.
+학생이 모르는 것을 물어볼 때, 정답을 바로 알려주지 말고 소크라테스 문답법으로 스스로 깨우치도록 유도하세요.
+설명은 쉽고 간결하게, 이모지를 적절히 사용하여 친근하게 대화하세요.
+수식은 LaTeX 형식($...$)을 사용하세요.
+"""
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    task: str
+    version: str
+    text: str
+    fingerprint: str  # 프롬프트 본문 해시 (문구가 바뀌면 달라짐)
+
+    def system_message(self) -> Dict[str, str]:
+        return {"role": "system", "content": self.text}
+
+
+def grade_profile(school_level: Optional[str], grade: Optional[int]) -> Tuple[str, str]:
+    """
+    학교급/학년 → (학년 표시 문자열, 주요 토픽 예시)
+    """
+    if school_level == "elementary":
+        return f"초등학교 {grade}학년", "기초 연산, 도형의 기초, 분수/소수"
+    if school_level == "middle":
+        return f"중학교 {grade}학년", "방정식, 함수, 기하, 확률"
+    if school_level == "high":
+        # 고등학교 학년별 상세 교육과정 반영
+        if grade == 1:
+            return "고등학교 1학년 (공통수학1, 2)", "다항식, 방정식과 부등식, 도형의 방정식, 집합과 명제, 함수, 경우의 수"
+        if grade == 2:
+            return "고등학교 2학년 (수학I, 수학II)", "지수함수와 로그함수, 삼각함수, 수열, 함수의 극한과 연속, 미분, 적분"
+        if grade == 3:
+            return "고등학교 3학년 (미적분/확통/기하)", "수능 연계 심화 문제, 미적분, 확률과 통계, 공간도형"
+        return f"고등학교 {grade}학년", "고등 심화 수학"
+    return "학년 미상", "일반 상식 수학"
+
+
+def _compile(task: str, school_level: Optional[str], grade: Optional[int]) -> CompiledPrompt:
+    if task == "generate":
+        user_grade_level, level_desc = grade_profile(school_level, grade)
+        # 가변 부분(학년)은 반드시 맨 끝에 둔다
+        text = (
+            f"{_GENERATE_PREFIX}\n\n"
+            f"[대상 학년: {user_grade_level}]\n"
+            f"주요 토픽 예시: {level_desc}\n"
+            f"- 반드시 **[{user_grade_level}]** 수준에 맞춰 출제하세요."
+        )
+    elif task == "analyze":
+        text = _ANALYZE_PROMPT
+    elif task == "rewrite":
+        text = _REWRITE_PROMPT
+    elif task == "tutor":
+        text = TUTOR_SYSTEM_PROMPT
+    else:
+        raise ValueError(f"Unknown prompt task: {task}")
+
+    version = PROMPT_VERSIONS[task]
+    fingerprint = hashlib.sha1(f"{version}\n{text}".encode("utf-8")).hexdigest()[:12]
+    return CompiledPrompt(task=task, version=version, text=text, fingerprint=fingerprint)
+
+
+_registry: Dict[Tuple[str, Optional[str], Optional[int]], CompiledPrompt] = {}
+_registry_lock = threading.Lock()
+
+
+def _registry_key(task: str, school_level: Optional[str], grade: Optional[int]):
+    # 학년과 무관한 태스크는 하나의 프롬프트를 공유
+    if task != "generate":
+        return (task, None, None)
+    return (task, school_level, grade)
+
+
+def get_prompt(task: str, school_level: Optional[str] = None, grade: Optional[int] = None) -> CompiledPrompt:
+    key = _registry_key(task, school_level, grade)
+    prompt = _registry.get(key)
+    if prompt is None:
+        with _registry_lock:
+            prompt = _registry.get(key)
+            if prompt is None:
+                prompt = _compile(task, key[1], key[2])
+                _registry[key] = prompt
+    return prompt
+
+
+def precompile_prompts():
+    for level, grades in SCHOOL_GRADES.items():
+        for g in grades:
+            get_prompt("generate", level, g)
+    for task in ("analyze", "rewrite", "tutor"):
+        get_prompt(task)
+
+
+precompile_prompts()
+
+
+# ==========================================
+# 프롬프트 캐시 사용량 (usage.prompt_tokens_details.cached_tokens → /metrics)
+# ==========================================
+
+def record_usage(prompt: CompiledPrompt, usage: Any) -> int:
+    """
+    응답의 usage 정보를 작업별 지표로 기록. 캐시된 토큰 수를 반환.
+    """
+    if usage is None:
+        return 0
+    observe_usage(prompt.task, usage)
+    details = getattr(usage, "prompt_tokens_details", None)
+    return (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
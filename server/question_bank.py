@@ -0,0 +1,214 @@
+import hashlib
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from .models import Question, QuestionStat, Unit, UserServedQuestion
+from .validation import normalize_answer
+
+# ==========================================
+# 저장된 문제 은행
+# - 야간 대량 생성(server/bulkgen.py)으로 채운 문제를 낮 시간 요청에 바로 제공
+# - 중복 판별용 문제 지문 해시
+# - 제공 횟수 기록 (question_stats, 보존 정책용). 커밋은 호출한 쪽에서
+# - 학생별 제공 기록 (user_served_questions) → 최근에 받은 문제는 다시 뽑지 않음
+# ==========================================
+
+WORKSHEET_BANK_FIRST = os.getenv("WORKSHEET_BANK_FIRST", "1") != "0"
+# 은행에 요청 수의 이 배수 이상 쌓여 있을 때만 은행에서 제공 (학생마다 다른 조합이 나오도록)
+WORKSHEET_BANK_MIN_RATIO = float(os.getenv("WORKSHEET_BANK_MIN_RATIO", "2"))
+# 이 기간 안에 받은 문제는 같은 학생에게 다시 주지 않음 (새 문제가 모자라면 오래전에 받은 것부터)
+WORKSHEET_BANK_REPEAT_DAYS = float(os.getenv("WORKSHEET_BANK_REPEAT_DAYS", "14"))
+
+
+def question_hash(content: Dict[str, Any]) -> str:
+    """
+    공백/보기 번호/보기 순서와 무관한 문제 지문 해시
+    """
+    question = "".join(str(content.get("question", "")).split())
+    options = sorted(normalize_answer(o) for o in (content.get("options") or []))
+    raw = question + "\x1f" + "\x1f".join(options)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def known_hashes(db: Session, unit_id: Optional[int]) -> set:
+    rows = db.query(Question.content).filter(Question.unit_id == unit_id).all()
+    return {(c or {}).get("qhash") or question_hash(c or {}) for (c,) in rows}
+
+
+def unit_ids_by_topic(db: Session, topics: Iterable[str]) -> Dict[str, int]:
+    """
+    주제(단원명) → 단원 ID. 같은 이름이 여러 학년에 있으면 먼저 만든 단원
+    """
+    names = {str(t).strip() for t in topics if t and str(t).strip()}
+    if not names:
+        return {}
+    by_name: Dict[str, int] = {}
+    for uid, name in db.query(Unit.id, Unit.name).filter(Unit.name.in_(names)).order_by(Unit.id.desc()):
+        by_name[name] = uid
+    return by_name
+
+
+def units_of(db: Session, problem_ids: Iterable[str]) -> Dict[str, Optional[int]]:
+    """
+    문제 ID → 단원 ID. 단원을 고르지 않고 만든 학습지 문제(unit_id 없음)는 content 의 주제로 찾음
+    """
+    ids = list(dict.fromkeys(i for i in problem_ids if i))
+    if not ids:
+        return {}
+    rows = db.query(Question.id, Question.unit_id, Question.content).filter(Question.id.in_(ids)).all()
+    units = {r.id: r.unit_id for r in rows}
+    topics = {r.id: str(r.content.get("topic", "")).strip()
+              for r in rows if r.unit_id is None and isinstance(r.content, dict)}
+    by_name = unit_ids_by_topic(db, topics.values())
+    for qid, topic in topics.items():
+        units[qid] = by_name.get(topic)
+    return units
+
+
+def mark_served(db: Session, ids: Iterable[str], at: Optional[datetime] = None):
+    """
+    학습지로 나간 문제의 제공 횟수 +1 (한 문장 다중 행 upsert)
+    """
+    ids = list(dict.fromkeys(i for i in ids if i))
+    if not ids:
+        return
+    at = at or datetime.utcnow()
+    table = QuestionStat.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values([
+            {"question_id": i, "served_count": 1, "attempts": 0, "correct": 0, "last_served_at": at, "updated_at": at}
+            for i in ids
+        ])
+        db.execute(stmt.on_conflict_do_update(index_elements=["question_id"], set_={
+            "served_count": table.c.served_count + 1,
+            "last_served_at": stmt.excluded.last_served_at,
+            "updated_at": stmt.excluded.updated_at,
+        }))
+        return
+    existing = {s.question_id: s for s in db.query(QuestionStat).filter(QuestionStat.question_id.in_(ids))}
+    for i in ids:
+        stat = existing.get(i)
+        if stat is None:
+            db.add(QuestionStat(question_id=i, served_count=1, attempts=0, correct=0, last_served_at=at))
+        else:
+            stat.served_count = (stat.served_count or 0) + 1
+            stat.last_served_at = at
+
+
+def mark_served_to(db: Session, user_id: str, ids: Iterable[str], at: Optional[datetime] = None):
+    """
+    학생별 제공 기록 갱신 (이미 있으면 served_at 만 새로)
+    """
+    ids = list(dict.fromkeys(i for i in ids if i))
+    if not user_id or not ids:
+        return
+    at = at or datetime.utcnow()
+    table = UserServedQuestion.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values([{"user_id": user_id, "question_id": i, "served_at": at} for i in ids])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["user_id", "question_id"], set_={"served_at": stmt.excluded.served_at},
+        ))
+        return
+    for i in ids:
+        db.merge(UserServedQuestion(user_id=user_id, question_id=i, served_at=at))
+
+
+def draw(db: Session, unit_id: int, difficulty: int, count: int,
+         user_id: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    단원/난이도가 맞는 저장 문제 중 count 개를 무작위로 뽑는다. 은행이 충분하지 않으면 None.
+    user_id 를 주면 그 학생이 WORKSHEET_BANK_REPEAT_DAYS 안에 받은 문제는 빼고 뽑는다.
+    """
+    if not WORKSHEET_BANK_FIRST or count <= 0:
+        return None
+    ids = [qid for (qid,) in db.query(Question.id).filter(
+        Question.unit_id == unit_id, Question.difficulty == difficulty
+    ).all()]
+    if len(ids) < max(count, count * WORKSHEET_BANK_MIN_RATIO):
+        return None
+    recent: Dict[str, datetime] = {}
+    if user_id:
+        cutoff = datetime.utcnow() - timedelta(days=WORKSHEET_BANK_REPEAT_DAYS)
+        recent = dict(db.query(UserServedQuestion.question_id, UserServedQuestion.served_at).filter(
+            UserServedQuestion.user_id == user_id, UserServedQuestion.served_at >= cutoff,
+        ).all())
+    fresh = [qid for qid in ids if qid not in recent]
+    if len(fresh) >= count:
+        chosen = random.sample(fresh, count)
+    else:
+        # 새 문제가 모자라면 오래전에 받은 문제부터 채움
+        seen = sorted((qid for qid in ids if qid in recent), key=lambda qid: recent[qid])
+        chosen = fresh + seen[:count - len(fresh)]
+        random.shuffle(chosen)
+    rows = db.query(Question).filter(Question.id.in_(chosen)).all()
+    served = [r.id for r in rows if r.content]
+    mark_served(db, served)
+    if user_id:
+        mark_served_to(db, user_id, served)
+    return [{**r.content, "id": r.id} for r in rows if r.content]
+
+
+def draw_plan(db: Session, plan: List[Dict[str, Any]], school_level: str, grade: int,
+              unit_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    LLM 을 쓸 수 없을 때(브레이커 열림) 계획을 은행에 있는 만큼 채운다. 최소 보유량(MIN_RATIO)은 따지지 않음.
+    주제(단원명)와 난이도가 맞는 문제 → 없으면 같은 단원의 다른 난이도 순으로 뽑는다.
+    """
+    from .models import Chapter
+
+    # 주제 → 단원 ID (해당 학년 단원 목록 한 번 조회)
+    units = {name: uid for uid, name in db.query(Unit.id, Unit.name).join(Chapter, Unit.chapter_id == Chapter.id).filter(
+        Chapter.school_level == school_level, Chapter.grade == grade
+    ).all()}
+
+    wanted: Dict[tuple, int] = {}
+    for item in plan:
+        uid = unit_id or units.get(str(item.get("topic", "")).strip())
+        if uid is None:
+            continue
+        key = (uid, int(item.get("difficulty", 2) or 2))
+        wanted[key] = wanted.get(key, 0) + 1
+    if not wanted:
+        return []
+
+    # 필요한 단원의 문제 ID/난이도만 한 번에 읽고 뽑은 것만 본문 조회
+    available: Dict[int, Dict[int, List[str]]] = {}
+    for qid, uid, difficulty in db.query(Question.id, Question.unit_id, Question.difficulty).filter(
+        Question.unit_id.in_({uid for uid, _ in wanted})
+    ).all():
+        available.setdefault(uid, {}).setdefault(difficulty or 2, []).append(qid)
+
+    chosen: List[str] = []
+    taken = set()
+    for (uid, difficulty), n in wanted.items():
+        by_difficulty = available.get(uid, {})
+        # 원하는 난이도부터, 그다음 가까운 난이도 순
+        for d in sorted(by_difficulty, key=lambda d: (abs(d - difficulty), d)):
+            ids = by_difficulty[d]
+            random.shuffle(ids)
+            take = [qid for qid in ids if qid not in taken][:n]
+            chosen.extend(take)
+            taken.update(take)
+            n -= len(take)
+            if n <= 0:
+                break
+    if not chosen:
+        return []
+    rows = {r.id: r.content for r in db.query(Question).filter(Question.id.in_(chosen)).all()}
+    mark_served(db, [qid for qid in chosen if rows.get(qid)])
+    return [{**rows[qid], "id": qid} for qid in chosen if rows.get(qid)]
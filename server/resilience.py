@@ -0,0 +1,102 @@
+import asyncio
+import random
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from .metrics import LLM_HEDGES
+
+# ==========================================
+# 재시도 / 헤지(hedged request) 공통 유틸
+# ==========================================
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """
+    최근 성공 호출의 지연 시간(초)을 보관하고 백분위수를 계산
+    """
+
+    def __init__(self, maxlen: int = 200):
+        self._samples = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, q: float, default: float, min_samples: int = 20) -> float:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return default
+            ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, max(0, int(q * len(ordered))))
+        return ordered[idx]
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    429 응답의 Retry-After 헤더 (없으면 None)
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0, error: Optional[BaseException] = None) -> float:
+    """
+    Full jitter 지수 백오프: U(0, min(cap, base * 2^attempt)), Retry-After 가 있으면 그 이상 대기
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    hinted = retry_after_seconds(error) if error is not None else None
+    if hinted is not None:
+        delay = max(delay, min(hinted, cap))
+    return delay
+
+
+async def hedged(factory: Callable[[], Awaitable[T]], hedge_after: Optional[float], task: str = "") -> T:
+    """
+    factory() 로 만든 요청이 hedge_after 초 안에 끝나지 않으면 동일 요청을 하나 더 보낸다.
+    먼저 성공한 결과를 쓰고 나머지는 취소. 둘 다 실패하면 마지막 예외를 올린다.
+    """
+    primary = asyncio.ensure_future(factory())
+    if hedge_after is None:
+        return await primary
+
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+    except asyncio.CancelledError:
+        primary.cancel()
+        raise
+    if done:
+        return primary.result()
+
+    LLM_HEDGES.inc(task=task, outcome="launched")
+    backup = asyncio.ensure_future(factory())
+    pending = {primary, backup}
+    last_error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.cancelled():
+                    continue
+                error = t.exception()
+                if error is None:
+                    LLM_HEDGES.inc(task=task, outcome="hedge_won" if t is backup else "primary_won")
+                    return t.result()
+                last_error = error
+    finally:
+        for t in pending:
+            t.cancel()
+    raise last_error if last_error is not None else asyncio.CancelledError()
@@ -0,0 +1,287 @@
+"""
+문제 은행 / 오답 로그 보존 정책 + SQLite 정리
+
+- questions
+    보존: 검증된 문제 — content.verified, 또는 학생 풀이 RETENTION_VERIFY_ATTEMPTS 회 이상에 정답률이 정상 범위
+    삭제: 한 번도 제공되지 않고 RETENTION_UNSERVED_DAYS 일 지난 문제
+    보관: 제공 기록(question_stats 행)이 아예 없는 문제 — 기록을 시작하기 전에 만든 문제라 제공 여부를 모름
+          → 삭제 대신 RETENTION_UNSERVED_DAYS 일 지나면 압축 파일로 옮김
+          (단원 × 난이도별로 최신 RETENTION_BANK_FLOOR 개는 남겨서 은행 우선 제공이 끊기지 않게)
+    보관: 마지막 제공 후 RETENTION_COLD_DAYS 일 지난 문제 → 압축 파일로 옮기고 삭제
+- weakness_logs: RETENTION_LOG_DAYS 일 지난 행 → 압축 파일로 옮기고 삭제 (취약점 색인에는 이미 반영됨)
+- user_served_questions: 재출제 제한 기간(WORKSHEET_BANK_REPEAT_DAYS) 지난 학생별 제공 기록 삭제
+- 보관 파일은 bankio 내보내기와 같은 형식/디렉터리 구조 → python -m server.bankio import --src archive 로 복원
+- SQLite: 증분 VACUUM (auto_vacuum=INCREMENTAL, 처음 한 번은 전환용 전체 VACUUM) + 표본 ANALYZE
+  VACUUM 은 쓰기 잠금을 잡으므로 사용량이 적은 시간에 실행
+
+    python -m server.retention run --dry-run       # 정책별 대상 행 수만 출력
+    python -m server.retention run                 # 정책 적용 + VACUUM/ANALYZE (야간 cron)
+    python -m server.retention run --every 24      # 24시간마다 반복 (cron 없이)
+    python -m server.retention maintain            # VACUUM/ANALYZE 만
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.engine import Engine
+
+from . import bankio
+from .models import Question, QuestionStat, UserServedQuestion, WeaknessLog
+from .question_bank import WORKSHEET_BANK_REPEAT_DAYS
+from .shared_cache import BASE_DIR
+
+RETENTION_UNSERVED_DAYS = int(os.getenv("RETENTION_UNSERVED_DAYS", "30"))
+RETENTION_COLD_DAYS = int(os.getenv("RETENTION_COLD_DAYS", "180"))
+RETENTION_LOG_DAYS = int(os.getenv("RETENTION_LOG_DAYS", "180"))
+RETENTION_BANK_FLOOR = int(os.getenv("RETENTION_BANK_FLOOR", "30"))          # bulkgen 기본 --per-slot
+RETENTION_VERIFY_ATTEMPTS = int(os.getenv("RETENTION_VERIFY_ATTEMPTS", "5"))
+# 이 범위를 벗어난 정답률은 정답 오류/지나치게 쉬운 문제일 수 있어 검증된 것으로 보지 않음
+RETENTION_VERIFY_ACCURACY = (0.15, 0.95)
+RETENTION_ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR") or os.path.join(BASE_DIR, "archive")
+VACUUM_MAX_PAGES = int(os.getenv("RETENTION_VACUUM_MAX_PAGES", "0"))          # 0: 빈 페이지 전부 반환
+ANALYZE_LIMIT = int(os.getenv("RETENTION_ANALYZE_LIMIT", "1000"))            # 색인당 표본 행 수
+
+DELETE_CHUNK = 500
+
+
+def is_verified(flagged: Any, attempts: Optional[int], correct: Optional[int]) -> bool:
+    if flagged:
+        return True
+    if not attempts or attempts < RETENTION_VERIFY_ATTEMPTS:
+        return False
+    lo, hi = RETENTION_VERIFY_ACCURACY
+    return lo <= (correct or 0) / attempts <= hi
+
+
+# ==========================================
+# 대상 선정
+# ==========================================
+
+def plan(engine: Engine, now: Optional[datetime] = None, unserved_days: int = RETENTION_UNSERVED_DAYS,
+         cold_days: int = RETENTION_COLD_DAYS, log_days: int = RETENTION_LOG_DAYS,
+         bank_floor: int = RETENTION_BANK_FLOOR) -> Dict[str, Any]:
+    """
+    {"drop": 삭제할 문제 id, "archive_questions": 보관할 문제 id, "archive_logs": 보관할 로그 id, "verified": 보존 수}
+    """
+    now = now or datetime.utcnow()
+    unserved_cutoff = now - timedelta(days=unserved_days)
+    cold_cutoff = now - timedelta(days=cold_days)
+    log_cutoff = now - timedelta(days=log_days)
+    q, s, w = Question.__table__, QuestionStat.__table__, WeaknessLog.__table__
+    # --database-url 로 다른 DB 를 정리할 때 제공 기록 테이블이 아직 없을 수 있음
+    s.create(bind=engine, checkfirst=True)
+
+    with engine.connect() as conn:
+        archive_logs = [i for (i,) in conn.execute(select(w.c.id).where(w.c.created_at < log_cutoff))]
+        # 남아 있는 오답 로그가 가리키는 문제는 건드리지 않음 (취약점 색인 재계산 때 단원을 찾아야 함)
+        referenced = {p for (p,) in conn.execute(
+            select(w.c.problem_id).where(w.c.created_at >= log_cutoff).distinct()
+        )}
+        rows = conn.execute(
+            # 본문 전체 대신 verified 표시만 읽음
+            select(q.c.id, q.c.unit_id, q.c.difficulty, q.c.created_at, q.c.content["verified"].as_boolean().label("flagged"),
+                   s.c.question_id.label("stat_id"), s.c.served_count, s.c.attempts, s.c.correct, s.c.last_served_at)
+            .select_from(q.outerjoin(s, s.c.question_id == q.c.id))
+            .order_by(q.c.created_at.desc())
+        ).all()
+
+    drop, archive_questions, verified = [], [], 0
+    slot_kept: Dict[tuple, int] = {}
+    for r in rows:
+        if is_verified(r.flagged, r.attempts, r.correct):
+            verified += 1
+            continue
+        if r.id in referenced:
+            continue
+        served = bool(r.served_count or r.attempts)
+        if not served:
+            # 최신 문제부터 보므로 칸별 처음 bank_floor 개는 나이와 상관없이 남음
+            slot = (r.unit_id, r.difficulty)
+            if slot_kept.get(slot, 0) < bank_floor or r.created_at is None or r.created_at >= unserved_cutoff:
+                slot_kept[slot] = slot_kept.get(slot, 0) + 1
+                continue
+            # 제공 기록이 없는 옛 문제는 안 나간 것인지 알 수 없으므로 되살릴 수 있게 보관
+            (archive_questions if r.stat_id is None else drop).append(r.id)
+        elif (r.last_served_at or r.created_at) and (r.last_served_at or r.created_at) < cold_cutoff:
+            archive_questions.append(r.id)
+    return {"drop": drop, "archive_questions": archive_questions, "archive_logs": archive_logs, "verified": verified}
+
+
+def _delete(engine: Engine, table, ids: List[str]):
+    # questions 삭제는 검색 색인 트리거도 함께 실행됨
+    for start in range(0, len(ids), DELETE_CHUNK):
+        chunk = ids[start:start + DELETE_CHUNK]
+        with engine.begin() as conn:
+            if table is Question.__table__:
+                conn.execute(delete(QuestionStat.__table__).where(QuestionStat.__table__.c.question_id.in_(chunk)))
+                conn.execute(delete(UserServedQuestion.__table__).where(UserServedQuestion.__table__.c.question_id.in_(chunk)))
+            conn.execute(delete(table).where(table.c.id.in_(chunk)))
+
+
+def apply(engine: Engine, targets: Dict[str, Any], archive_dir: str = RETENTION_ARCHIVE_DIR,
+          fmt: str = bankio.DEFAULT_FORMAT) -> Dict[str, Any]:
+    """
+    보관(파일 쓰기 → 삭제) 후 삭제. 파일을 다 쓴 뒤에 지우므로 중간에 멈춰도 행은 유실되지 않음.
+    """
+    report = {"dropped": 0, "archived": {}, "archive_bytes": 0}
+    served = UserServedQuestion.__table__
+    served.create(bind=engine, checkfirst=True)
+    for table, key, model in (("questions", "archive_questions", Question), ("weakness_logs", "archive_logs", WeaknessLog)):
+        ids = targets[key]
+        if not ids:
+            continue
+        n, size = bankio.archive_rows(engine, archive_dir, table, ids, fmt)
+        _delete(engine, model.__table__, ids)
+        report["archived"][table] = n
+        report["archive_bytes"] += size
+    if targets["drop"]:
+        _delete(engine, Question.__table__, targets["drop"])
+        report["dropped"] = len(targets["drop"])
+    cutoff = datetime.utcnow() - timedelta(days=WORKSHEET_BANK_REPEAT_DAYS)
+    with engine.begin() as conn:
+        report["served_pruned"] = conn.execute(delete(served).where(served.c.served_at < cutoff)).rowcount
+    return report
+
+
+# ==========================================
+# SQLite VACUUM / ANALYZE
+# ==========================================
+
+def _file_bytes(path: Optional[str]) -> int:
+    if not path or path == ":memory:":
+        return 0
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def maintain(engine: Engine, max_pages: int = VACUUM_MAX_PAGES, analyze_limit: int = ANALYZE_LIMIT) -> Dict[str, Any]:
+    """
+    빈 페이지 반환 + 통계 갱신. 반환: 파일 크기 전/후, 반환된 바이트, 단계별 소요 시간
+    """
+    if engine.dialect.name != "sqlite":
+        # Postgres: 파일 크기는 줄지 않지만 빈 공간 재사용 + 통계 갱신
+        start = time.perf_counter()
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for table in ("questions", "question_stats", "weakness_logs"):
+                conn.exec_driver_sql(f"VACUUM (ANALYZE) {table}")
+        return {"dialect": engine.dialect.name, "vacuum_s": round(time.perf_counter() - start, 3)}
+
+    path = engine.url.database
+    report: Dict[str, Any] = {"dialect": "sqlite", "before_bytes": _file_bytes(path)}
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        pragma = lambda name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+        page_size = pragma("page_size")
+        report["free_pages_before"] = pragma("freelist_count")
+
+        start = time.perf_counter()
+        if pragma("auto_vacuum") != 2:
+            # 증분 모드 전환은 전체 VACUUM 이 한 번 필요 (DB 크기만큼 임시 공간 사용)
+            conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
+            report["vacuum"] = "full (converted to incremental)"
+        else:
+            # sqlite3 의 execute 는 한 단계만 실행해서 페이지 하나만 반환됨 → executescript 로 끝까지
+            conn.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({max(0, max_pages)});")
+            report["vacuum"] = "incremental"
+        report["vacuum_s"] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        # 색인마다 표본만 읽는 ANALYZE (큰 테이블에서도 짧게 끝남)
+        conn.exec_driver_sql(f"PRAGMA analysis_limit={max(0, analyze_limit)}")
+        conn.exec_driver_sql("ANALYZE")
+        report["analyze_s"] = round(time.perf_counter() - start, 3)
+
+        if pragma("journal_mode") == "wal":
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        report["free_pages_after"] = pragma("freelist_count")
+        report["page_size"] = page_size
+    report["after_bytes"] = _file_bytes(path)
+    report["reclaimed_bytes"] = report["before_bytes"] - report["after_bytes"]
+    return report
+
+
+# ==========================================
+# CLI
+# ==========================================
+
+def run(engine: Engine, dry_run: bool = False, vacuum: bool = True, **policy) -> Dict[str, Any]:
+    start = time.perf_counter()
+    archive_dir = policy.pop("archive_dir", RETENTION_ARCHIVE_DIR)
+    fmt = policy.pop("fmt", bankio.DEFAULT_FORMAT)
+    targets = plan(engine, **policy)
+    report: Dict[str, Any] = {
+        "candidates": {k: (len(v) if isinstance(v, list) else v) for k, v in targets.items()},
+        "plan_s": round(time.perf_counter() - start, 3),
+    }
+    if dry_run:
+        return report
+    step = time.perf_counter()
+    report.update(apply(engine, targets, archive_dir, fmt))
+    report["apply_s"] = round(time.perf_counter() - step, 3)
+    if vacuum:
+        report["maintenance"] = maintain(engine)
+    report["total_s"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def _print_report(report: Dict[str, Any]):
+    c = report.get("candidates")
+    if c:
+        print(f"🧹 Retention: drop {c['drop']} unserved, archive {c['archive_questions']} cold questions / "
+              f"{c['archive_logs']} weakness logs, keep {c['verified']} verified ({report['plan_s']}s)")
+    if "dropped" in report:
+        print(f"   dropped {report['dropped']}, archived {report['archived'] or 0} "
+              f"({report['archive_bytes'] / 1024:.1f} KB), pruned {report['served_pruned']} served records in {report['apply_s']}s")
+    m = report.get("maintenance")
+    if m and m.get("dialect") == "sqlite":
+        print(f"💾 SQLite {m['vacuum']} vacuum {m['vacuum_s']}s, analyze {m['analyze_s']}s: "
+              f"{m['before_bytes'] / 1024:.1f} KB → {m['after_bytes'] / 1024:.1f} KB "
+              f"(reclaimed {m['reclaimed_bytes'] / 1024:.1f} KB, free pages {m['free_pages_before']} → {m['free_pages_after']})")
+    elif m:
+        print(f"💾 {m['dialect']} VACUUM (ANALYZE) {m['vacuum_s']}s")
+    if "total_s" in report:
+        print(f"✅ Done in {report['total_s']}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="문제 은행/오답 로그 보존 정책 + DB 정리")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="보존 정책 적용 후 VACUUM/ANALYZE")
+    p.add_argument("--dry-run", action="store_true", help="대상 행 수만 출력")
+    p.add_argument("--unserved-days", type=int, default=RETENTION_UNSERVED_DAYS)
+    p.add_argument("--cold-days", type=int, default=RETENTION_COLD_DAYS)
+    p.add_argument("--log-days", type=int, default=RETENTION_LOG_DAYS)
+    p.add_argument("--bank-floor", type=int, default=RETENTION_BANK_FLOOR)
+    p.add_argument("--archive-dir", default=RETENTION_ARCHIVE_DIR)
+    p.add_argument("--format", choices=bankio.FORMATS, default=bankio.DEFAULT_FORMAT)
+    p.add_argument("--no-vacuum", action="store_true")
+    p.add_argument("--every", type=float, help="N 시간마다 반복")
+    p.add_argument("--database-url", help="기본: 서버 설정(DATABASE_URL / mathdaily.db)")
+
+    p = sub.add_parser("maintain", help="VACUUM/ANALYZE 만")
+    p.add_argument("--max-pages", type=int, default=VACUUM_MAX_PAGES)
+    p.add_argument("--database-url", help="기본: 서버 설정(DATABASE_URL / mathdaily.db)")
+    args = parser.parse_args()
+
+    engine = bankio._engine(args.database_url)
+    if args.command == "maintain":
+        _print_report({"maintenance": maintain(engine, args.max_pages)})
+        return
+
+    while True:
+        report = run(
+            engine, dry_run=args.dry_run, vacuum=not args.no_vacuum,
+            unserved_days=args.unserved_days, cold_days=args.cold_days, log_days=args.log_days,
+            bank_floor=args.bank_floor, archive_dir=args.archive_dir, fmt=args.format,
+        )
+        _print_report(report)
+        if not args.every or args.dry_run:
+            break
+        time.sleep(args.every * 3600)
+
+
+if __name__ == "__main__":
+    main()
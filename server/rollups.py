@@ -0,0 +1,294 @@
+"""
+학습 통계 롤업 (달력/점수 추이용)
+
+- 제출할 때마다 submissions 에 원본 1행 + 롤업 테이블 증분 갱신
+    user_daily_stats : (사용자, 날짜) 별 학습지 수, 문제/응답/정답 수, 풀이 시간, 학습 주제
+    user_unit_stats  : (사용자, 단원) 별 시도/정답 수, 마지막 학습일
+    question_stats   : 문제별 풀이/정답 수 (은행에 있는 문제만)
+- /api/stats/{userId} 는 롤업 테이블 범위 조회만 수행
+
+    # 백필/복구: submissions 원본에서 롤업 전체(또는 한 사용자)를 다시 계산
+    python -m server.rollups rebuild [--user USER_ID]
+"""
+import argparse
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import question_bank
+from .models import QuestionStat, Submission, Unit, UserDailyStat, UserUnitStat
+
+# 날짜 경계 기준 시간대 (학생 기준 "오늘")
+ROLLUP_TZ = ZoneInfo(os.getenv("ROLLUP_TZ", "Asia/Seoul"))
+DEFAULT_RANGE_DAYS = 30
+
+
+def today() -> str:
+    return datetime.now(ROLLUP_TZ).date().isoformat()
+
+
+def _upsert_add(db: Session, model, keys: Dict[str, Any], values: Dict[str, Any], replace: Dict[str, Any] = None,
+                latest: Dict[str, Any] = None):
+    """
+    (keys) 행이 없으면 만들고, 있으면 values 를 더한다 (동시 제출에도 카운터 유실 없음)
+    replace 는 덮어쓰고, latest 는 기존 값과 비교해 큰 쪽을 남긴다 (늦게 도착한 지난 날짜 제출이 마지막 학습일을 되돌리지 않도록)
+    """
+    table = model.__table__
+    dialect = db.get_bind().dialect.name
+    row = {**keys, **values, **(replace or {}), **(latest or {}), "updated_at": datetime.utcnow()}
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(**row)
+        update = {k: table.c[k] + stmt.excluded[k] for k in values}
+        update.update({k: stmt.excluded[k] for k in (replace or {})})
+        if dialect == "postgresql":
+            update.update({k: func.greatest(table.c[k], stmt.excluded[k]) for k in (latest or {})})
+        else:
+            # SQLite 의 다중 인자 max() 는 NULL 이 하나라도 있으면 NULL
+            update.update({k: func.max(func.coalesce(table.c[k], stmt.excluded[k]), stmt.excluded[k]) for k in (latest or {})})
+        update["updated_at"] = stmt.excluded.updated_at
+        db.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=update))
+        return
+    existing = db.get(model, tuple(keys.values()))
+    if existing is None:
+        db.add(model(**row))
+    else:
+        for k, v in values.items():
+            setattr(existing, k, (getattr(existing, k) or 0) + v)
+        for k, v in (replace or {}).items():
+            setattr(existing, k, v)
+        for k, v in (latest or {}).items():
+            current = getattr(existing, k)
+            setattr(existing, k, v if current is None or v > current else current)
+
+
+def _merge_topics(db: Session, user_id: str, day: str, topics: Iterable[str]):
+    topics = [t for t in topics if t]
+    if not topics:
+        return
+    stat = db.get(UserDailyStat, (user_id, day), populate_existing=True)
+    if stat is None:
+        return
+    merged = list(stat.topics or [])
+    for t in topics:
+        if t not in merged:
+            merged.append(t)
+    if merged != (stat.topics or []):
+        stat.topics = merged
+
+
+def _apply(db: Session, sub: Submission):
+    _upsert_add(
+        db, UserDailyStat,
+        {"user_id": sub.user_id, "day": sub.day},
+        {
+            "worksheets": 1,
+            "total_count": sub.total_count or 0,
+            "answered_count": sub.answered_count or 0,
+            "correct_count": sub.correct_count or 0,
+            "time_spent_sec": sub.time_spent_sec or 0,
+        },
+    )
+    db.flush()
+    _merge_topics(db, sub.user_id, sub.day, sub.topics or [])
+    for unit_id, (attempts, correct) in (sub.unit_results or {}).items():
+        _upsert_add(
+            db, UserUnitStat,
+            {"user_id": sub.user_id, "unit_id": int(unit_id)},
+            {"attempts": attempts, "correct": correct},
+            latest={"last_day": sub.day},
+        )
+
+
+def record_submission(db: Session, user_id: str, responses: List[Dict[str, Any]] = None, unit_id: Optional[int] = None,
+                      day: Optional[str] = None, total_count: Optional[int] = None, correct_count: Optional[int] = None,
+                      topics: Optional[List[str]] = None) -> Optional[Submission]:
+    """
+    제출 1건 기록 + 롤업 증분 갱신 (커밋은 호출한 쪽에서)
+    responses: [{"problemId", "isCorrect", "timeSpentSec"}] — 있으면 문제별로 단원을 찾아 집계
+    """
+    responses = responses or []
+    day = day or today()
+
+    # 문제 ID → 단원 (한 번의 IN 조회, 단원 없이 저장된 문제는 주제로)
+    unit_of = question_bank.units_of(db, (r.get("problemId") for r in responses))
+
+    unit_results: Dict[str, List[int]] = {}
+    if responses:
+        answered = len(responses)
+        correct = sum(1 for r in responses if r.get("isCorrect"))
+        for r in responses:
+            uid = unit_of.get(r.get("problemId")) or unit_id
+            if uid is None:
+                continue
+            slot = unit_results.setdefault(str(uid), [0, 0])
+            slot[0] += 1
+            slot[1] += 1 if r.get("isCorrect") else 0
+        total = max(total_count or 0, answered)
+    elif total_count is not None:
+        answered = total = total_count
+        correct = correct_count or 0
+        if unit_id is not None:
+            unit_results[str(unit_id)] = [total, correct]
+    else:
+        # 개수 정보가 없는 제출(정답률만)은 롤업에 반영할 수 없음
+        return None
+
+    sub = Submission(
+        id=f"sub-{os.urandom(6).hex()}",
+        user_id=user_id,
+        day=day,
+        unit_id=unit_id,
+        total_count=total,
+        answered_count=answered,
+        correct_count=correct,
+        time_spent_sec=sum(int(r.get("timeSpentSec") or 0) for r in responses),
+        topics=list(dict.fromkeys(t for t in (topics or []) if t)),
+        unit_results=unit_results,
+    )
+    db.add(sub)
+    _apply(db, sub)
+    # 문제별 풀이 결과 (unit_of 에는 은행에 있는 문제 ID 만 들어 있음)
+    per_question: Dict[str, List[int]] = {}
+    for r in responses:
+        if r.get("problemId") in unit_of:
+            slot = per_question.setdefault(r["problemId"], [0, 0])
+            slot[0] += 1
+            slot[1] += 1 if r.get("isCorrect") else 0
+    for qid, (attempts, correct) in per_question.items():
+        _upsert_add(db, QuestionStat, {"question_id": qid}, {"attempts": attempts, "correct": correct})
+    return sub
+
+
+def get_stats(db: Session, user_id: str, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
+    end = end or today()
+    start = start or (date.fromisoformat(end) - timedelta(days=DEFAULT_RANGE_DAYS - 1)).isoformat()
+
+    days = (
+        db.query(UserDailyStat)
+        .filter(UserDailyStat.user_id == user_id, UserDailyStat.day >= start, UserDailyStat.day <= end)
+        .order_by(UserDailyStat.day)
+        .all()
+    )
+    units = (
+        db.query(UserUnitStat, Unit.name)
+        .outerjoin(Unit, Unit.id == UserUnitStat.unit_id)
+        .filter(UserUnitStat.user_id == user_id)
+        .order_by(UserUnitStat.last_day.desc())
+        .all()
+    )
+
+    day_rows = []
+    for d in days:
+        answered = d.answered_count or 0
+        day_rows.append({
+            "date": d.day,
+            "isCompleted": bool(d.worksheets) and answered >= (d.total_count or 0),
+            "score": round((d.correct_count or 0) / answered * 100) if answered else None,
+            "totalCount": d.total_count or 0,
+            "correctCount": d.correct_count or 0,
+            "answeredCount": answered,
+            "worksheets": d.worksheets or 0,
+            "timeSpentSec": d.time_spent_sec or 0,
+            "topics": d.topics or [],
+        })
+    unit_rows = [{
+        "unitId": u.unit_id,
+        "unitName": name,
+        "attempts": u.attempts or 0,
+        "correct": u.correct or 0,
+        "accuracy": round((u.correct or 0) / u.attempts, 4) if u.attempts else None,
+        "lastStudiedAt": u.last_day,
+    } for u, name in units]
+
+    answered = sum(d["answeredCount"] for d in day_rows)
+    correct = sum(d["correctCount"] for d in day_rows)
+    return {
+        "userId": user_id,
+        "from": start,
+        "to": end,
+        "days": day_rows,
+        "units": unit_rows,
+        "summary": {
+            "studyDays": len(day_rows),
+            "worksheets": sum(d["worksheets"] for d in day_rows),
+            "answered": answered,
+            "correct": correct,
+            "accuracy": round(correct / answered, 4) if answered else None,
+        },
+    }
+
+
+def rebuild(db: Session, user_id: Optional[str] = None) -> Tuple[int, int]:
+    """
+    submissions 원본에서 롤업 재계산. (일별 행 수, 단원별 행 수) 반환.
+    """
+    for model in (UserDailyStat, UserUnitStat):
+        q = db.query(model)
+        if user_id:
+            q = q.filter(model.user_id == user_id)
+        q.delete(synchronize_session=False)
+
+    # 일별 카운터는 GROUP BY 한 번으로 계산
+    q = db.query(
+        Submission.user_id, Submission.day, func.count(Submission.id),
+        func.sum(Submission.total_count), func.sum(Submission.answered_count),
+        func.sum(Submission.correct_count), func.sum(Submission.time_spent_sec),
+    ).group_by(Submission.user_id, Submission.day)
+    if user_id:
+        q = q.filter(Submission.user_id == user_id)
+    daily = {}
+    for uid, day, n, total, answered, correct, spent in q.all():
+        daily[(uid, day)] = UserDailyStat(
+            user_id=uid, day=day, worksheets=n, total_count=total or 0, answered_count=answered or 0,
+            correct_count=correct or 0, time_spent_sec=spent or 0, topics=[],
+        )
+
+    # 주제 목록/단원별 결과는 JSON 이라 한 번 훑으면서 합침
+    units: Dict[Tuple[str, int], UserUnitStat] = {}
+    q = db.query(Submission.user_id, Submission.day, Submission.topics, Submission.unit_results).order_by(Submission.created_at)
+    if user_id:
+        q = q.filter(Submission.user_id == user_id)
+    for uid, day, topics, unit_results in q.yield_per(1000):
+        stat = daily[(uid, day)]
+        for t in topics or []:
+            if t not in stat.topics:
+                stat.topics.append(t)
+        for unit_id, (attempts, correct) in (unit_results or {}).items():
+            u = units.get((uid, int(unit_id)))
+            if u is None:
+                u = units[(uid, int(unit_id))] = UserUnitStat(user_id=uid, unit_id=int(unit_id), attempts=0, correct=0)
+            u.attempts += attempts
+            u.correct += correct
+            if not u.last_day or day > u.last_day:
+                u.last_day = day
+
+    db.add_all(daily.values())
+    db.add_all(units.values())
+    db.commit()
+    return len(daily), len(units)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="학습 통계 롤업")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("rebuild", help="submissions 에서 롤업 다시 계산")
+    p.add_argument("--user", help="한 사용자만 다시 계산")
+    args = parser.parse_args()
+
+    from server.main import SessionLocal
+
+    with SessionLocal() as db:
+        days, units = rebuild(db, args.user)
+    print(f"✅ Rollups rebuilt: {days} user-days, {units} user-units")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import fastjson
+
+# ==========================================
+# 저장 문제 전문 검색
+# - SQLite: FTS5 trigram 토크나이저 (띄어쓰기/조사와 무관하게 한글 부분 문자열 검색)
+#   trigram 으로 못 찾는 1~2글자 검색어는 글자 bigram 을 unicode61 로 색인한 두 번째 FTS 테이블에서 MATCH
+#   questions 에 INSERT/UPDATE/DELETE 트리거를 걸어 두 색인을 항상 동기화
+# - Postgres: pg_trgm GIN 표현식 인덱스 + 1~2글자용 글자 unigram/bigram 배열 GIN 인덱스
+#   (인덱스 자체가 행과 함께 갱신되므로 트리거 불필요)
+# ==========================================
+
+# 검색 대상 텍스트: 단원명(topic) + 지문 + 보기 + 해설
+_SQLITE_BODY = """
+    coalesce(json_extract({row}.content, '$.topic'), '') || ' ' ||
+    coalesce(json_extract({row}.content, '$.question'), '') || ' ' ||
+    coalesce((SELECT group_concat(value, ' ') FROM json_each({row}.content, '$.options')), '') || ' ' ||
+    coalesce(json_extract({row}.content, '$.explanation'), '')
+"""
+
+# 검색 텍스트를 글자 bigram 으로 펼친 문자열 ("분수의 덧셈" → "분수 수의 의 덧셈 셈").
+# 트리거 안에서는 WITH RECURSIVE 를 못 쓰므로 번호 테이블(questions_fts_seq)과 조인해서 만든다.
+# unicode61 은 공백/기호를 구분자로 보므로 단어 끝 글자는 한 글자 토큰으로 남는다 → 1글자 검색은 접두어 MATCH
+_SQLITE_BIGRAMS = """
+    (SELECT group_concat(substr(t.b, s.n, 2), ' ')
+     FROM (SELECT {body} AS b) t JOIN questions_fts_seq s ON s.n <= length(t.b))
+"""
+# 이보다 긴 검색 텍스트의 뒷부분은 bigram 색인에 들어가지 않는다 (긴 검색어 trigram 색인은 전체)
+_BIGRAM_MAX_CHARS = 8192
+
+
+def _sqlite_bigrams(row: str) -> str:
+    return _SQLITE_BIGRAMS.format(body=_SQLITE_BODY.format(row=row))
+
+
+_SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(body, tokenize='trigram')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts_bi USING fts5(grams, tokenize='unicode61')",
+    "CREATE TABLE IF NOT EXISTS questions_fts_seq (n INTEGER PRIMARY KEY)",
+    f"""INSERT OR IGNORE INTO questions_fts_seq(n)
+        WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {_BIGRAM_MAX_CHARS})
+        SELECT n FROM seq""",
+    "DROP TRIGGER IF EXISTS questions_fts_ai",
+    "DROP TRIGGER IF EXISTS questions_fts_au",
+    "DROP TRIGGER IF EXISTS questions_fts_ad",
+    f"""CREATE TRIGGER questions_fts_ai AFTER INSERT ON questions BEGIN
+        INSERT INTO questions_fts(rowid, body) VALUES (new.rowid, {_SQLITE_BODY.format(row='new')});
+        INSERT INTO questions_fts_bi(rowid, grams) VALUES (new.rowid, {_sqlite_bigrams('new')});
+    END""",
+    f"""CREATE TRIGGER questions_fts_au AFTER UPDATE OF content ON questions BEGIN
+        DELETE FROM questions_fts WHERE rowid = old.rowid;
+        INSERT INTO questions_fts(rowid, body) VALUES (new.rowid, {_SQLITE_BODY.format(row='new')});
+        DELETE FROM questions_fts_bi WHERE rowid = old.rowid;
+        INSERT INTO questions_fts_bi(rowid, grams) VALUES (new.rowid, {_sqlite_bigrams('new')});
+    END""",
+    """CREATE TRIGGER questions_fts_ad AFTER DELETE ON questions BEGIN
+        DELETE FROM questions_fts WHERE rowid = old.rowid;
+        DELETE FROM questions_fts_bi WHERE rowid = old.rowid;
+    END""",
+]
+
+# json 타입 content 에서 검색 텍스트를 만드는 불변(immutable) 표현식 → 표현식 인덱스 가능
+_PG_BODY = (
+    "(coalesce({p}content->>'topic', '') || ' ' || coalesce({p}content->>'question', '') || ' ' || "
+    "coalesce({p}content->>'options', '') || ' ' || coalesce({p}content->>'explanation', ''))"
+)
+
+# 1~2글자 검색어용: 소문자로 바꾼 글자 unigram + bigram 배열 (GIN 으로 @> 조회)
+_PG_GRAMS = "questions_search_grams({body})"
+
+_PG_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS questions_search_trgm ON questions USING gin ({_PG_BODY.format(p='')} gin_trgm_ops)",
+    """CREATE OR REPLACE FUNCTION questions_search_grams(body text) RETURNS text[]
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT coalesce(array_agg(DISTINCT lower(substr(body, i, w))), ARRAY[]::text[])
+        FROM generate_series(1, length(body)) AS i, (VALUES (1), (2)) AS widths(w)
+    $$""",
+    f"CREATE INDEX IF NOT EXISTS questions_search_grams ON questions USING gin ({_PG_GRAMS.format(body=_PG_BODY.format(p=''))})",
+    "CREATE INDEX IF NOT EXISTS questions_unit_difficulty ON questions (unit_id, difficulty)",
+]
+
+# trigram 은 3글자 이상만 색인 조회 가능 → 더 짧은 검색어는 bigram 색인으로 처리
+_MIN_MATCH_CHARS = 3
+# 일치 문서가 이보다 많으면 bm25 점수 계산(일치 전체 정렬) 대신 최신순으로 바로 LIMIT
+_RANK_MAX_MATCHES = 2000
+
+
+def ensure_search_index(engine: Engine):
+    """
+    검색 색인/트리거 생성. SQLite 는 색인 행 수가 문제 수와 다르면 전체 재색인 (최초 도입 시 백필).
+    """
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            for ddl in _SQLITE_DDL:
+                conn.execute(text(ddl))
+            total = conn.execute(text("SELECT count(*) FROM questions")).scalar()
+            indexed = conn.execute(text("SELECT count(*) FROM questions_fts")).scalar()
+            if indexed != total:
+                conn.execute(text("DELETE FROM questions_fts"))
+                conn.execute(text(
+                    f"INSERT INTO questions_fts(rowid, body) SELECT q.rowid, {_SQLITE_BODY.format(row='q')} FROM questions q"
+                ))
+                print(f"🔎 Search index rebuilt: {total} questions")
+            indexed = conn.execute(text("SELECT count(*) FROM questions_fts_bi")).scalar()
+            if indexed != total:
+                conn.execute(text("DELETE FROM questions_fts_bi"))
+                conn.execute(text(
+                    f"INSERT INTO questions_fts_bi(rowid, grams) SELECT q.rowid, {_sqlite_bigrams('q')} FROM questions q"
+                ))
+                print(f"🔎 Short-term search index rebuilt: {total} questions")
+        elif dialect == "postgresql":
+            for ddl in _PG_DDL:
+                conn.execute(text(ddl))
+
+
+def _terms(query: str) -> List[str]:
+    return [t for t in query.split() if t]
+
+
+def _filters(unit_id: Optional[int], difficulty: Optional[int], qtype: Optional[str], params: Dict[str, Any]) -> str:
+    clauses = []
+    if unit_id is not None:
+        clauses.append("q.unit_id = :unit_id")
+        params["unit_id"] = unit_id
+    if difficulty is not None:
+        clauses.append("q.difficulty = :difficulty")
+        params["difficulty"] = difficulty
+    if qtype:
+        clauses.append("q.type = :qtype")
+        params["qtype"] = qtype
+    return "".join(f" AND {c}" for c in clauses)
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _bigram_query(term: str) -> Optional[str]:
+    """
+    1~2글자 검색어 → bigram 색인 MATCH 식. 공백/기호가 섞여 있으면 unicode61 토큰으로 못 찾으므로 None
+    """
+    if not term.isalnum():
+        return None
+    if len(term) == 1:
+        return f'"{term}"*'
+    return f'"{term}"'
+
+
+def search_questions(db: Session, query: str, unit_id: Optional[int] = None, difficulty: Optional[int] = None,
+                     qtype: Optional[str] = None, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    terms = _terms(query)
+    if not terms:
+        return []
+    params: Dict[str, Any] = {"limit": limit, "offset": offset}
+    where = _filters(unit_id, difficulty, qtype, params)
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        # 긴 검색어는 trigram FTS MATCH, 짧은 검색어는 bigram FTS MATCH (둘 다 색인 조회)
+        # 기호가 섞인 짧은 검색어만 원문에 LIKE (trigram 테이블의 3글자 미만 LIKE 는 결과가 비어 나옴)
+        long_terms = [t for t in terms if len(t) >= _MIN_MATCH_CHARS]
+        short_terms = [t for t in terms if len(t) < _MIN_MATCH_CHARS]
+        bigrams = [q for q in map(_bigram_query, short_terms) if q]
+        conds = []
+        if long_terms:
+            params["match"] = " AND ".join('"' + t.replace('"', '""') + '"' for t in long_terms)
+            conds.append("questions_fts MATCH :match")
+        if bigrams:
+            params["bigrams"] = " AND ".join(bigrams)
+            conds.append("questions_fts.rowid IN (SELECT rowid FROM questions_fts_bi WHERE questions_fts_bi MATCH :bigrams)")
+        for i, t in enumerate(t for t in short_terms if not _bigram_query(t)):
+            params[f"like{i}"] = f"%{_escape_like(t)}%"
+            conds.append(f"({_SQLITE_BODY.format(row='q')}) LIKE :like{i} ESCAPE '\\'")
+        rank = "questions_fts.rowid DESC"
+        if long_terms:
+            probe = db.execute(
+                text("SELECT count(*) FROM (SELECT rowid FROM questions_fts WHERE questions_fts MATCH :match LIMIT :cap)"),
+                {"match": params["match"], "cap": _RANK_MAX_MATCHES},
+            ).scalar()
+            if probe < _RANK_MAX_MATCHES:
+                rank = "bm25(questions_fts)"
+        sql = f"""
+            SELECT q.id, q.unit_id, q.difficulty, q.type, q.content, q.created_at
+            FROM questions_fts JOIN questions q ON q.rowid = questions_fts.rowid
+            WHERE {' AND '.join(conds)}{where}
+            ORDER BY {rank}
+            LIMIT :limit OFFSET :offset
+        """
+    elif dialect == "postgresql":
+        body = _PG_BODY.format(p="q.")
+        conds = []
+        grams = [t.lower() for t in terms if len(t) < _MIN_MATCH_CHARS]
+        if grams:
+            params["grams"] = grams
+            conds.append(f"{_PG_GRAMS.format(body=body)} @> CAST(:grams AS text[])")
+        for i, t in enumerate(t for t in terms if len(t) >= _MIN_MATCH_CHARS):
+            params[f"like{i}"] = f"%{_escape_like(t)}%"
+            conds.append(f"{body} ILIKE :like{i}")
+        params["query"] = query
+        sql = f"""
+            SELECT q.id, q.unit_id, q.difficulty, q.type, q.content, q.created_at
+            FROM questions q
+            WHERE {' AND '.join(conds)}{where}
+            ORDER BY similarity({body}, :query) DESC
+            LIMIT :limit OFFSET :offset
+        """
+    else:
+        raise RuntimeError(f"Search is not supported on {dialect}")
+
+    rows = db.execute(text(sql), params).mappings().all()
+    results = []
+    for r in rows:
+        content = r["content"]
+        if isinstance(content, str):
+            content = fastjson.loads(content)
+        content = content or {}
+        results.append({
+            "id": r["id"],
+            "unitId": r["unit_id"],
+            "difficulty": r["difficulty"],
+            "type": r["type"],
+            "topic": content.get("topic", ""),
+            "question": content.get("question", ""),
+            "options": content.get("options", []),
+            "answer": str(content.get("answer", "")),
+        })
+    return results
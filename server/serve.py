@@ -0,0 +1,117 @@
+"""
+운영용 멀티 워커 실행
+
+    python -m server.serve --workers 4 --port 8000
+
+- 워커 N 개 (uvicorn 멀티 프로세스). 기본값: CPU 코어 수
+- 시작 작업(테이블 생성, 검색 색인, 커리큘럼 시드)은 파일 잠금을 먼저 잡은 워커 하나만 실행하고
+  나머지 워커는 끝날 때까지 기다렸다가 건너뜀 (같은 실행 ID 안에서 한 번)
+- 워커 간에 나눠 쓰는 캐시는 server/shared_cache.py (SQLite 파일)
+"""
+import argparse
+import os
+import time
+import uuid
+from typing import Callable
+
+from .shared_cache import BASE_DIR
+
+BOOT_ID_ENV = "MATHDAILY_BOOT_ID"
+WORKERS_ENV = "MATHDAILY_WORKERS"
+LOCK_PATH = os.getenv("MATHDAILY_BOOTSTRAP_LOCK") or os.path.join(BASE_DIR, "mathdaily.bootstrap.lock")
+
+
+def worker_count() -> int:
+    return int(os.getenv(WORKERS_ENV, "1") or 1)
+
+
+class _FileLock:
+    """
+    프로세스 간 배타 잠금 (POSIX: flock, Windows: msvcrt)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = None
+
+    def __enter__(self):
+        self._fh = open(self.path, "a+")
+        if os.name == "nt":
+            import msvcrt
+            while True:
+                try:
+                    self._fh.seek(0)
+                    msvcrt.locking(self._fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK 은 10초 재시도 후 실패 → 계속 기다림
+                    continue
+        else:
+            import fcntl
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def read(self) -> str:
+        self._fh.seek(0)
+        return self._fh.read().strip()
+
+    def write(self, text: str):
+        self._fh.seek(0)
+        self._fh.truncate()
+        self._fh.write(text)
+        self._fh.flush()
+
+    def __exit__(self, *exc):
+        try:
+            if os.name == "nt":
+                import msvcrt
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._fh.close()
+
+
+def run_once(name: str, fn: Callable[[], None]) -> bool:
+    """
+    멀티 워커 실행이면 같은 실행 ID 안에서 fn 을 한 워커만 실행. 단일 프로세스면 그냥 실행.
+    이 워커가 실행했으면 True.
+    """
+    boot_id = os.getenv(BOOT_ID_ENV)
+    if not boot_id:
+        fn()
+        return True
+    marker = f"{name}:{boot_id}"
+    waited = time.perf_counter()
+    with _FileLock(LOCK_PATH) as lock:
+        if lock.read() == marker:
+            print(f"⏭️ [{os.getpid()}] {name} already done by another worker "
+                  f"(waited {time.perf_counter() - waited:.2f}s)")
+            return False
+        start = time.perf_counter()
+        fn()
+        lock.write(marker)
+        print(f"👑 [{os.getpid()}] {name} done in {time.perf_counter() - start:.2f}s")
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MathDaily 백엔드 멀티 워커 실행")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    # 워커들은 이 환경 변수를 물려받아 같은 실행으로 인식 (시작 작업 1회)
+    os.environ[BOOT_ID_ENV] = uuid.uuid4().hex
+    os.environ[WORKERS_ENV] = str(args.workers)
+    print(f"🚀 Serving with {args.workers} workers on {args.host}:{args.port}")
+    uvicorn.run("server.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
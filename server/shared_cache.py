@@ -0,0 +1,226 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from . import fastjson
+
+# ==========================================
+# 워커 프로세스 간 공유 캐시 (SQLite 파일, WAL)
+# - 멀티 워커(python -m server.serve)에서 커리큘럼/재작성/학습지 결과를 워커마다 따로 만들지 않도록
+# - 네임스페이스 단위 TTL + 무효화 (다른 프로세스에서 무효화해도 즉시 반영)
+# - 캐시 파일이 깨지거나 잠겨도 요청은 실패시키지 않고 캐시 없이 진행
+# - 기본(auto)은 워커가 2개 이상일 때만 켬. 1/0 으로 강제
+# - 이벤트 루프에서는 aget/aset (파일 잠금 대기가 루프를 막지 않도록 스레드에서 실행)
+# - 꺼져 있을 때(단일 프로세스) 결과 재사용이 필요한 곳은 LocalCache (프로세스 안 TTL + 개수 상한 LRU)
+# ==========================================
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHARED_CACHE_MODE = os.getenv("SHARED_CACHE", "auto")
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH") or os.path.join(BASE_DIR, "mathdaily_cache.db")
+# 이만큼 set 할 때마다 만료된 행 정리
+_PRUNE_EVERY = 500
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", "2000"))
+
+
+class LocalCache:
+    """
+    프로세스 안 TTL 캐시 (공유 캐시와 같은 ns/key 인터페이스, 가장 오래 안 쓴 것부터 제거)
+    """
+
+    def __init__(self, max_entries: int = LOCAL_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()  # (ns, key) -> (만료 시각, 값)
+        self._lock = threading.Lock()
+
+    def get(self, ns: str, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get((ns, key))
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[(ns, key)]
+                return None
+            self._entries.move_to_end((ns, key))
+            return entry[1]
+
+    def set(self, ns: str, key: str, value: Any, ttl: float):
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries.pop((ns, key), None)
+            self._entries[(ns, key)] = (time.monotonic() + ttl, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, ns: Optional[str] = None):
+        with self._lock:
+            if ns is None:
+                self._entries.clear()
+            else:
+                for k in [k for k in self._entries if k[0] == ns]:
+                    del self._entries[k]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _default_enabled() -> bool:
+    mode = os.getenv("SHARED_CACHE", SHARED_CACHE_MODE)
+    if mode == "auto":
+        from .serve import worker_count
+        return worker_count() > 1
+    return mode != "0"
+
+
+class SharedCache:
+    def __init__(self, path: str = SHARED_CACHE_PATH, enabled: Optional[bool] = None):
+        self.path = path
+        self._enabled = enabled
+        self._local = threading.local()  # 스레드별 연결 (sync 엔드포인트는 스레드풀에서 실행)
+        self._sets = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        # 워커 수는 serve 가 환경 변수로 넘겨주므로 처음 쓸 때 결정
+        if self._enabled is None:
+            self._enabled = _default_enabled()
+        return self._enabled
+
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        if not self.enabled:
+            return None
+        conn = getattr(self._local, "conn", None)
+        # fork 된 워커는 부모 연결을 물려받지 않고 새로 연결
+        if conn is not None and getattr(self._local, "pid", None) == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires REAL NOT NULL,"
+            " PRIMARY KEY (ns, key)) WITHOUT ROWID"
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(self, ns: str, key: str) -> Optional[Any]:
+        try:
+            conn = self._conn()
+            if conn is None:
+                return None
+            row = conn.execute("SELECT value, expires FROM cache WHERE ns = ? AND key = ?", (ns, key)).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Shared cache read failed: {e}")
+            return None
+        if row is None or row[1] < time.time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return fastjson.loads(row[0])
+
+    def set(self, ns: str, key: str, value: Any, ttl: float, max_bytes: Optional[int] = None):
+        """
+        max_bytes 를 주면 네임스페이스 전체 크기를 그 아래로 유지 (만료된 것, 오래된 것부터 삭제)
+        """
+        if ttl <= 0:
+            return
+        try:
+            conn = self._conn()
+            if conn is None:
+                return
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (ns, key, value, expires) VALUES (?, ?, ?, ?)",
+                (ns, key, fastjson.dumps_str(value), time.time() + ttl),
+            )
+            if max_bytes is not None:
+                self._trim(conn, ns, max_bytes)
+            self._sets += 1
+            if self._sets % _PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM cache WHERE expires < ?", (time.time(),))
+        except sqlite3.Error as e:
+            print(f"⚠️ Shared cache write failed: {e}")
+
+    def _trim(self, conn: sqlite3.Connection, ns: str, max_bytes: int):
+        conn.execute("DELETE FROM cache WHERE ns = ? AND expires < ?", (ns, time.time()))
+        # 만료가 늦은(=최근에 넣은) 것부터 누적해서 상한을 넘는 행 삭제
+        conn.execute(
+            "DELETE FROM cache WHERE ns = ? AND key IN ("
+            " SELECT key FROM (SELECT key, sum(length(CAST(value AS BLOB)))"
+            "  OVER (ORDER BY expires DESC, key ROWS UNBOUNDED PRECEDING) AS running"
+            "  FROM cache WHERE ns = ?) WHERE running > ?)",
+            (ns, ns, max_bytes),
+        )
+
+    def usage(self, ns: str) -> Dict[str, int]:
+        """
+        네임스페이스의 살아 있는 항목 수와 바이트 수
+        """
+        try:
+            conn = self._conn()
+            if conn is None:
+                return {"entries": 0, "bytes": 0}
+            n, size = conn.execute(
+                "SELECT count(*), sum(length(CAST(value AS BLOB))) FROM cache WHERE ns = ? AND expires >= ?",
+                (ns, time.time()),
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Shared cache read failed: {e}")
+            return {"entries": 0, "bytes": 0}
+        return {"entries": n, "bytes": size or 0}
+
+    async def aget(self, ns: str, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self.get, ns, key)
+
+    async def aset(self, ns: str, key: str, value: Any, ttl: float, max_bytes: Optional[int] = None):
+        if not self.enabled:
+            return
+        await asyncio.to_thread(self.set, ns, key, value, ttl, max_bytes)
+
+    def delete(self, ns: str, key: str):
+        self._execute("DELETE FROM cache WHERE ns = ? AND key = ?", (ns, key))
+
+    def invalidate(self, ns: Optional[str] = None):
+        """
+        네임스페이스 전체(또는 캐시 전체) 삭제. 모든 워커에 바로 반영된다.
+        """
+        if ns is None:
+            self._execute("DELETE FROM cache", ())
+        else:
+            self._execute("DELETE FROM cache WHERE ns = ?", (ns,))
+
+    def _execute(self, sql: str, params: tuple):
+        try:
+            conn = self._conn()
+            if conn is not None:
+                conn.execute(sql, params)
+        except sqlite3.Error as e:
+            print(f"⚠️ Shared cache write failed: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"enabled": self.enabled, "path": self.path, "pid": os.getpid(),
+                                 "hits": self.hits, "misses": self.misses, "namespaces": {}}
+        try:
+            conn = self._conn()
+            if conn is not None:
+                now = time.time()
+                for ns, n, size in conn.execute(
+                    "SELECT ns, count(*), sum(length(CAST(value AS BLOB))) FROM cache WHERE expires >= ? GROUP BY ns", (now,)
+                ):
+                    stats["namespaces"][ns] = {"entries": n, "bytes": size or 0}
+        except sqlite3.Error as e:
+            stats["error"] = str(e)
+        return stats
+
+
+cache = SharedCache()
+local = LocalCache()
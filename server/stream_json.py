@@ -0,0 +1,134 @@
+import re
+from typing import Any, Dict, List
+
+from . import fastjson
+
+# ==========================================
+# 스트리밍 응답 증분 JSON 파서
+# - {"problems": [ {...}, {...}, ... ]} 형태의 응답을 토큰 단위로 받아서
+#   배열 안의 객체가 닫히는 순간 바로 꺼내 준다
+# - 앞뒤의 ```json 펜스나 잡담은 무시, 뒤쪽이 잘리거나 깨져도 이미 닫힌 객체는 유지
+# ==========================================
+
+_SPECIAL = re.compile(r'["{}\[\]]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class ProblemStreamParser:
+    def __init__(self, key: str = "problems"):
+        self._key = f'"{key}"'
+        self._buf = ""
+        self._pos = 0           # 다음에 검사할 위치
+        self._in_array = False  # key 다음의 '[' 를 찾았는지
+        self._done = False      # 배열이 닫혔음
+        self._start = -1        # 현재 객체 시작 위치
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.count = 0          # 지금까지 닫힌 객체 수 (깨진 것 포함)
+        self.errors = 0         # 닫혔지만 파싱 실패한 객체 수
+
+    def feed(self, text: str) -> List[Any]:
+        """
+        새 텍스트 조각을 넣고, 이번에 완성된 객체 목록을 반환.
+        닫혔지만 깨진 객체는 None 으로 자리를 채워서 배열 내 순서(계획 항목과의 대응)를 유지
+        """
+        if self._done or not text:
+            return []
+        self._buf += text
+        if not self._in_array and not self._find_array():
+            return []
+
+        found = []
+        buf = self._buf
+        i = self._pos
+        n = len(buf)
+        # 한 글자씩 보지 않고 구조 문자(따옴표/괄호, 문자열 안에서는 따옴표/역슬래시)로 바로 건너뜀
+        # (SVG 처럼 긴 문자열 값도 정규식 한 번으로 통과)
+        while i < n:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                m = _STRING_SPECIAL.search(buf, i)
+                if m is None:
+                    i = n
+                    break
+                i = m.start()
+                if buf[i] == "\\":
+                    self._escape = True
+                else:
+                    self._in_string = False
+                i += 1
+                continue
+            m = _SPECIAL.search(buf, i)
+            if m is None:
+                i = n
+                break
+            i = m.start()
+            ch = buf[i]
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 0 and ch == "{":
+                    self._start = i
+                self._depth += 1
+            else:
+                if self._depth == 0:
+                    if ch == "]":
+                        self._done = True
+                        i += 1
+                        break
+                else:
+                    self._depth -= 1
+                    if self._depth == 0 and self._start >= 0:
+                        found.append(self._decode(buf[self._start:i + 1]))
+                        self._start = -1
+            i += 1
+
+        # 이미 처리한 앞부분은 버려서 버퍼가 계속 커지지 않게 함
+        cut = self._start if self._start >= 0 else i
+        self._buf = buf[cut:]
+        self._pos = i - cut
+        if self._start >= 0:
+            self._start = 0
+        return found
+
+    def _find_array(self) -> bool:
+        idx = self._buf.find(self._key)
+        if idx < 0:
+            # key 가 조각 경계에 걸칠 수 있으므로 끝부분만 남김
+            self._buf = self._buf[-len(self._key):]
+            return False
+        bracket = self._buf.find("[", idx + len(self._key))
+        if bracket < 0:
+            self._buf = self._buf[idx:]
+            return False
+        self._in_array = True
+        self._buf = self._buf[bracket + 1:]
+        self._pos = 0
+        return True
+
+    def _decode(self, raw: str) -> Any:
+        try:
+            obj = fastjson.loads(raw)
+        except fastjson.JSONDecodeError:
+            obj = None
+            self.errors += 1
+        self.count += 1
+        return obj
+
+    @property
+    def truncated(self) -> bool:
+        """
+        스트림이 끝났는데 배열이 닫히지 않았거나 객체가 중간에 끊김
+        """
+        return not self._done or self._start >= 0
+
+
+def parse_problems(text: str) -> List[Dict[str, Any]]:
+    """
+    전체 응답 문자열에서 완성된 문제 객체만 추출 (비스트리밍 응답용)
+    """
+    return [p for p in ProblemStreamParser().feed(text) if p is not None]
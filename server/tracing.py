@@ -0,0 +1,324 @@
+import asyncio
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# ==========================================
+# 경량 요청 트레이싱
+# - contextvars 로 현재 span 을 추적 → asyncio.gather 로 만든 태스크에도 부모가 자동 전파
+# - 요청 단위 샘플링 (TRACE_SAMPLE_RATE), 미샘플 요청은 span() 이 거의 비용 없이 통과
+# - 완료된 트레이스는 링 버퍼에 보관, Chrome trace / OTLP-JSON 으로 내보내기
+# - 파일 저장(TRACE_EXPORT_DIR)은 백그라운드 스레드에서 (이벤트 루프에서 파일 쓰기 안 함, 밀리면 버림)
+# ==========================================
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+TRACE_EXPORT_DIR = os.getenv("TRACE_EXPORT_DIR")  # 설정 시 완료된 트레이스를 파일로 저장
+TRACE_EXPORT_FORMAT = os.getenv("TRACE_EXPORT_FORMAT", "chrome")  # chrome | otlp
+TRACE_EXPORT_QUEUE = int(os.getenv("TRACE_EXPORT_QUEUE", "1000"))  # 저장 대기 트레이스 상한
+
+# perf_counter_ns → unix epoch ns 변환용 기준값
+_EPOCH_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attrs", "lane", "status")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attrs: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.attrs = attrs
+        self.lane = trace.lane_for_current_task()
+        self.status = "ok"
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class Trace:
+    def __init__(self, name: str):
+        self.trace_id = os.urandom(16).hex()
+        self.name = name
+        self.spans: List[Span] = []
+        self.events: List[Dict[str, Any]] = []
+        self._lanes: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def lane_for_current_task(self) -> int:
+        # Chrome trace 의 tid 로 쓸 레인 번호 (asyncio 태스크마다 별도 레인)
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = id(task) if task is not None else threading.get_ident()
+        with self._lock:
+            lane = self._lanes.get(key)
+            if lane is None:
+                lane = self._lanes[key] = len(self._lanes) + 1
+            return lane
+
+    def add_span(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def add_event(self, name: str, attrs: Dict[str, Any]):
+        with self._lock:
+            self.events.append({
+                "name": name,
+                "ts_ns": time.perf_counter_ns(),
+                "lane": self.lane_for_current_task(),
+                "attrs": attrs,
+            })
+
+    @property
+    def duration_ms(self) -> float:
+        finished = [s for s in self.spans if s.end_ns is not None]
+        if not finished:
+            return 0.0
+        start = min(s.start_ns for s in finished)
+        end = max(s.end_ns for s in finished)
+        return (end - start) / 1e6
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("mathdaily_span", default=None)
+
+_buffer: "OrderedDict[str, Trace]" = OrderedDict()
+_buffer_lock = threading.Lock()
+
+
+def _store(trace: Trace):
+    with _buffer_lock:
+        _buffer[trace.trace_id] = trace
+        while len(_buffer) > TRACE_BUFFER_SIZE:
+            _buffer.popitem(last=False)
+    if TRACE_EXPORT_DIR:
+        _enqueue_export(trace)
+
+
+_export_queue: "queue.Queue[Trace]" = queue.Queue(maxsize=TRACE_EXPORT_QUEUE)
+_export_thread: Optional[threading.Thread] = None
+_export_dropped = 0
+
+
+def _enqueue_export(trace: Trace):
+    global _export_thread, _export_dropped
+    if _export_thread is None:
+        with _buffer_lock:
+            if _export_thread is None:
+                _export_thread = threading.Thread(target=_export_worker, name="trace-export", daemon=True)
+                _export_thread.start()
+    try:
+        _export_queue.put_nowait(trace)
+    except queue.Full:
+        _export_dropped += 1
+        if _export_dropped % 100 == 1:
+            print(f"⚠️ Trace export queue full, dropped {_export_dropped} traces")
+
+
+def _export_worker():
+    while True:
+        trace = _export_queue.get()
+        try:
+            export_trace(trace, TRACE_EXPORT_DIR, TRACE_EXPORT_FORMAT)
+        except OSError as e:
+            print(f"⚠️ Trace export failed: {e}")
+        finally:
+            _export_queue.task_done()
+
+
+def flush_exports():
+    """
+    대기 중인 트레이스 파일 저장이 끝날 때까지 대기 (종료/테스트용)
+    """
+    _export_queue.join()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace.trace_id if span is not None else None
+
+
+@contextmanager
+def start_trace(name: str, force: bool = False, **attrs):
+    """
+    루트 span 시작. 샘플링에서 빠지면 None 을 yield 하고 하위 span 도 모두 무시된다.
+    """
+    if not force and random.random() >= TRACE_SAMPLE_RATE:
+        yield None
+        return
+    trace = Trace(name)
+    root = Span(trace, name, None, dict(attrs))
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException:
+        root.status = "error"
+        raise
+    finally:
+        root.end_ns = time.perf_counter_ns()
+        trace.add_span(root)
+        _current_span.reset(token)
+        _store(trace)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    s = Span(parent.trace, name, parent.span_id, attrs)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.status = "error"
+        s.attrs["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        s.end_ns = time.perf_counter_ns()
+        parent.trace.add_span(s)
+        _current_span.reset(token)
+
+
+def event(name: str, **attrs):
+    """
+    순간 이벤트 기록 (핫 루프의 print 대체). 샘플되지 않은 요청에서는 아무것도 하지 않음.
+    """
+    parent = _current_span.get()
+    if parent is not None:
+        parent.trace.add_event(name, attrs)
+
+
+def get_trace(trace_id: str) -> Optional[Trace]:
+    with _buffer_lock:
+        return _buffer.get(trace_id)
+
+
+def recent_traces(limit: int = 50) -> List[Dict[str, Any]]:
+    with _buffer_lock:
+        traces = list(_buffer.values())[-limit:]
+    return [
+        {
+            "traceId": t.trace_id,
+            "name": t.name,
+            "spans": len(t.spans),
+            "durationMs": round(t.duration_ms, 3),
+        }
+        for t in reversed(traces)
+    ]
+
+
+# ==========================================
+# 내보내기 (chrome://tracing, Perfetto / OTLP-JSON)
+# ==========================================
+
+def _json_safe(value: Any):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def to_chrome_trace(trace: Trace) -> Dict[str, Any]:
+    events = []
+    for s in trace.spans:
+        if s.end_ns is None:
+            continue
+        args = {k: _json_safe(v) for k, v in s.attrs.items()}
+        args["status"] = s.status
+        events.append({
+            "name": s.name,
+            "ph": "X",
+            "ts": (s.start_ns + _EPOCH_OFFSET_NS) / 1000,
+            "dur": (s.end_ns - s.start_ns) / 1000,
+            "pid": 1,
+            "tid": s.lane,
+            "args": args,
+        })
+    for e in trace.events:
+        events.append({
+            "name": e["name"],
+            "ph": "i",
+            "s": "t",
+            "ts": (e["ts_ns"] + _EPOCH_OFFSET_NS) / 1000,
+            "pid": 1,
+            "tid": e["lane"],
+            "args": {k: _json_safe(v) for k, v in e["attrs"].items()},
+        })
+    events.sort(key=lambda ev: ev["ts"])
+    return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"traceId": trace.trace_id}}
+
+
+def _otlp_attributes(attrs: Dict[str, Any]) -> List[Dict[str, Any]]:
+    result = []
+    for k, v in attrs.items():
+        if isinstance(v, bool):
+            value = {"boolValue": v}
+        elif isinstance(v, int):
+            value = {"intValue": str(v)}
+        elif isinstance(v, float):
+            value = {"doubleValue": v}
+        else:
+            value = {"stringValue": str(v)}
+        result.append({"key": k, "value": value})
+    return result
+
+
+def to_otlp_json(trace: Trace) -> Dict[str, Any]:
+    spans = []
+    for s in trace.spans:
+        if s.end_ns is None:
+            continue
+        span_events = [
+            {
+                "timeUnixNano": str(e["ts_ns"] + _EPOCH_OFFSET_NS),
+                "name": e["name"],
+                "attributes": _otlp_attributes(e["attrs"]),
+            }
+            for e in trace.events if s.parent_id is None
+        ]
+        spans.append({
+            "traceId": trace.trace_id,
+            "spanId": s.span_id,
+            "parentSpanId": s.parent_id or "",
+            "name": s.name,
+            "kind": 1,
+            "startTimeUnixNano": str(s.start_ns + _EPOCH_OFFSET_NS),
+            "endTimeUnixNano": str(s.end_ns + _EPOCH_OFFSET_NS),
+            "attributes": _otlp_attributes(s.attrs),
+            "events": span_events,
+            "status": {"code": 2 if s.status == "error" else 1},
+        })
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": "mathdaily-server"})},
+            "scopeSpans": [{"scope": {"name": "server.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+def render_trace(trace: Trace, fmt: str = "chrome") -> Dict[str, Any]:
+    if fmt == "otlp":
+        return to_otlp_json(trace)
+    if fmt == "chrome":
+        return to_chrome_trace(trace)
+    raise ValueError(f"Unknown trace format: {fmt}")
+
+
+def export_trace(trace: Trace, directory: str, fmt: str = "chrome") -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"trace-{trace.trace_id}.{fmt}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(render_trace(trace, fmt), f, ensure_ascii=False)
+    return path
@@ -0,0 +1,74 @@
+import re
+from typing import Any, Dict, List, Optional
+
+# ==========================================
+# 생성 문제 로컬 검증 (LLM 호출 없이)
+# - 빈 리스트면 통과, 아니면 문제 코드 목록 반환
+# ==========================================
+
+REQUIRED_FIELDS = ("question", "options", "answer")
+
+# 도형/그래프 관련 단어 → 시각 자료(SVG) 필수
+VISUAL_KEYWORDS = ["도형", "삼각형", "사각형", "원", "각", "기하", "선분", "직선", "함수", "그래프"]
+
+# 이 문제 코드들은 백엔드에서 고칠 수 있음 (SVG 는 generate_fallback_svg 로 대체)
+# 단, 시각 자료가 필수인 항목은 대체 SVG 가 문제와 맞지 않으므로 상위 모델로 다시 요청
+REPAIRABLE_ISSUES = {"missing_svg", "bad_svg"}
+
+# "1.5" 같은 소수는 건드리지 않도록 "1." 은 뒤에 공백이 있을 때만 번호로 취급
+_LABEL_RE = re.compile(r"^\s*(?:[①②③④⑤]|\(?[1-5]\)|[A-Ea-e][).]|[1-5]\.(?=\s))\s*")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_answer(value: Any) -> str:
+    """
+    보기 번호(①, 1), A.)와 공백을 제거해서 비교용 문자열로 변환
+    """
+    text = _LABEL_RE.sub("", str(value))
+    return _SPACE_RE.sub("", text)
+
+
+def requires_visual(problem: Dict[str, Any], item: Optional[Dict[str, Any]] = None) -> bool:
+    # 지문 검사는 단원명보다 좁은 단어만 사용 ("원"은 화폐 단위와 겹침)
+    if item and item.get("require_visual"):
+        return True
+    text = f"{problem.get('topic', '')} {problem.get('question', '')}"
+    return any(k in text for k in ("삼각형", "사각형", "직사각형", "그래프", "좌표"))
+
+
+def validate_problem(problem: Any, item: Optional[Dict[str, Any]] = None) -> List[str]:
+    if not isinstance(problem, dict):
+        return ["not_object"]
+
+    issues = []
+    for field in REQUIRED_FIELDS:
+        if not problem.get(field):
+            issues.append(f"missing_{field}")
+
+    options = problem.get("options")
+    if options is not None:
+        if not isinstance(options, list) or len(options) != 4:
+            issues.append("options_count")
+        elif len({normalize_answer(o) for o in options}) != len(options):
+            issues.append("duplicate_options")
+        elif problem.get("answer") is not None:
+            answer = normalize_answer(problem["answer"])
+            if answer not in {normalize_answer(o) for o in options}:
+                issues.append("answer_not_in_options")
+
+    svg = problem.get("svg") or ""
+    if not isinstance(svg, str):
+        issues.append("bad_svg")
+    elif svg.strip():
+        if "<svg" not in svg or "</svg>" not in svg:
+            issues.append("bad_svg")
+    elif requires_visual(problem, item):
+        issues.append("missing_svg")
+
+    return issues
+
+
+def is_repairable(issues: List[str], item: Optional[Dict[str, Any]] = None) -> bool:
+    if item and item.get("require_visual"):
+        return False
+    return all(i in REPAIRABLE_ISSUES for i in issues)
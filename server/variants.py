@@ -0,0 +1,719 @@
+"""
+유사 문제 로컬 생성 (수치만 바꾼 변형) — "AI 유사 문제" 에서 GPT 호출 대신
+
+문제 1개 → 템플릿 (한 번 분석해서 캐시)
+  1) 지문의 수(정수, 소수, 분수, 4,600 같은 천 단위 구분)를 파라미터로
+  2) 파라미터와 상수 2 로 만든 식(사칙연산, 제곱, 제곱근, 피연산자 3개 + 바깥 ÷2/×2/√) 중 정답과 값이 같은 식을 찾음
+     식에 쓴 수가 풀이에 모두 나와야 하고, 풀이에 나온 중간값/연산 기호가 많은 식을 고름.
+     같은 점수의 후보가 다른 수치에서 다른 답을 내면 실패
+  3) 풀이/보기/SVG 글자의 수를 역할(파라미터, 중간값, 정답, 정답과의 차이)에 연결. 연결 못 하는 수가 있으면 실패
+변형 1개 (밀리초 미만)
+  파라미터를 같은 자릿수/소수 자릿수/대소 관계로 다시 뽑음 → 식으로 정답·중간값 재계산 →
+  정수/소수 자릿수/부호가 원래와 같을 때만 채택 → 글자 치환(조사 포함) → validate_problem
+
+템플릿을 만들 수 없으면 TemplateError → 호출한 쪽에서 절차적 생성 / LLM 으로
+
+    python -m server.variants --bench             # 은행 문제 템플릿 성공률, 분석/변형 시간
+    python -m server.variants --id q-1234 -n 3
+"""
+import argparse
+import random
+import re
+import time
+from collections import OrderedDict
+from fractions import Fraction
+from math import gcd, isqrt
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .validation import normalize_answer, validate_problem
+
+MAX_PARAMS = 6
+MAX_ATTEMPTS = 256
+_CACHE_SIZE = 4096
+
+# 앞이 영문/숫자/^ 이면 변수 이름이나 지수 (x2, x^2), 4,600 은 천 단위 구분
+_NUM_RE = re.compile(r"(?<![A-Za-z0-9_.^/,])(\d{1,3}(?:,\d{3})+(?!\d)|\d+)(?:\.(\d+))?(?:/(\d+))?(?![\d])")
+# 이런 말이 바로 붙은 수는 값이 아니라 번호 (1단계, 2번째, 3학년, 풀이의 "1. ")
+_FIXED_SUFFIX = re.compile(r"\s*(?:단계|번째|학년|월)")
+_STEP_MARK = re.compile(r"(?:^|[.:\n]\s*)$")
+_SVG_TEXT_RE = re.compile(r"(<text\b[^>]*>)(.*?)(</text>)", re.S)
+# 숫자를 읽었을 때 받침 유무 (영 일 이 삼 사 오 육 칠 팔 구), 로/으로 는 ㄹ 받침이면 로
+_FINAL = {"0": "ㅇ", "1": "ㄹ", "3": "ㅁ", "6": "ㄱ", "7": "ㄹ", "8": "ㄹ"}
+_PARTICLES = {"을": ("을", "를"), "를": ("을", "를"), "은": ("은", "는"), "는": ("은", "는"),
+              "이": ("이", "가"), "가": ("이", "가"), "과": ("과", "와"), "와": ("과", "와")}
+# 조사 뒤에 공백/문장부호가 와야 조사 ("5이다", "3과일" 은 건드리지 않음)
+_PARTICLE_RE = re.compile(r"(으로|로|[을를은는이가과와])(?=[\s.,!?)]|$)")
+# 풀이에 적힌 연산 기호/말 (분수의 / 는 수 토큰을 지운 뒤에 남은 것만)
+_OP_SYMBOLS = {
+    "+": ("+", "더하", "더해", "더한"),
+    "-": ("-", "−", "빼", "뺀"),
+    "*": ("×", "*", "곱"),
+    "/": ("÷", "/", "나누", "나눈", "나눠"),
+    "sq": ("²", "^", "제곱"),
+    "sqrt": ("√", "루트", "제곱근"),
+}
+
+
+class TemplateError(ValueError):
+    """
+    수치만 바꿔서는 유사 문제를 만들 수 없음 (정답 식을 못 찾음, 풀이와 정답 불일치 등)
+    """
+
+
+class _Num(NamedTuple):
+    start: int
+    end: int
+    value: Fraction
+    kind: str          # int | dec | frac
+    places: int
+    sep: bool
+    fixed: bool
+
+
+def _tokens(text: str) -> List[_Num]:
+    out = []
+    for m in _NUM_RE.finditer(text or ""):
+        whole, dec, den = m.group(1), m.group(2), m.group(3)
+        digits = whole.replace(",", "")
+        if den:
+            if int(den) == 0:
+                continue
+            value, kind, places = Fraction(int(digits), int(den)), "frac", 0
+        elif dec:
+            value, kind, places = Fraction(f"{digits}.{dec}"), "dec", len(dec)
+        else:
+            value, kind, places = Fraction(int(digits)), "int", 0
+        fixed = bool(_FIXED_SUFFIX.match(text, m.end())) or (
+            kind == "int" and text.startswith(". ", m.end()) and bool(_STEP_MARK.search(text, 0, m.start())))
+        out.append(_Num(m.start(), m.end(), value, kind, places, "," in whole, fixed))
+    return out
+
+
+def _format(value: Fraction, like: _Num) -> Optional[str]:
+    """
+    원래 토큰과 같은 형태로. 형태가 안 맞으면 (정수 자리에 분수 등) None
+    """
+    if like.kind == "frac":
+        if value.denominator == 1:
+            return str(value.numerator)
+        return f"{value.numerator}/{value.denominator}"
+    if like.kind == "int":
+        if value.denominator != 1:
+            return None
+        return f"{value.numerator:,}" if like.sep else str(value.numerator)
+    scaled = value * 10 ** like.places
+    if scaled.denominator != 1:
+        return None
+    return f"{float(value):.{like.places}f}" if like.places <= 6 else None
+
+
+def _fix_particle(text: str, pos: int, number: str) -> str:
+    """
+    바뀐 수 바로 뒤의 조사를 받침에 맞춤 (8를 → 8을, 3로 → 3으로)
+    """
+    digits = number.replace(",", "").split("/")[0]
+    stripped = digits.rstrip("0")
+    if "." in digits or not stripped:
+        last = digits[-1]
+        final = _FINAL.get(last)
+    elif len(stripped) < len(digits):
+        final = "ㅂ"                       # 십, 백, 천, 만 … 모두 받침 있음
+    else:
+        final = _FINAL.get(stripped[-1])
+    m = _PARTICLE_RE.match(text, pos)
+    if not m:
+        return text
+    word = m.group(1)
+    if word in ("으로", "로"):
+        wanted = "으로" if final and final != "ㄹ" else "로"
+    else:
+        with_final, without = _PARTICLES[word]
+        wanted = with_final if final else without
+    return text[:pos] + wanted + text[m.end():]
+
+
+def _replace(text: str, edits: List[Tuple[int, int, str]]) -> str:
+    # 뒤에서부터 바꿔야 앞쪽 위치가 유지됨
+    for start, end, new in sorted(edits, reverse=True):
+        old = text[start:end]
+        text = text[:start] + new + text[end:]
+        if new != old:
+            text = _fix_particle(text, start + len(new), new)
+    return text
+
+
+# ==========================================
+# 식 탐색
+# ==========================================
+# 노드: ("v", i) 파라미터 | ("c", 값) 상수 | ("sq", a) | ("sqrt", a) | (연산자, a, b)
+
+def _sqrt(x: Optional[Fraction]) -> Optional[Fraction]:
+    if x is None or x < 0:
+        return None
+    n, d = isqrt(x.numerator), isqrt(x.denominator)
+    if n * n != x.numerator or d * d != x.denominator:
+        return None
+    return Fraction(n, d)
+
+
+def _eval(node, values: List[Fraction], inner: Optional[List[Fraction]] = None) -> Optional[Fraction]:
+    """
+    식 값 (정확한 분수). inner 를 주면 중간값을 후위 순서로 모음
+    """
+    op = node[0]
+    if op == "v":
+        return values[node[1]]
+    if op == "c":
+        return node[1]
+    a = _eval(node[1], values, inner)
+    if a is None:
+        return None
+    if op in ("sq", "sqrt"):
+        result = a * a if op == "sq" else _sqrt(a)
+    else:
+        b = _eval(node[2], values, inner)
+        if b is None:
+            return None
+        if op == "+":
+            result = a + b
+        elif op == "-":
+            result = a - b
+        elif op == "*":
+            result = a * b
+        else:
+            result = a / b if b != 0 else None
+    if inner is not None and result is not None:
+        inner.append(result)
+    return result
+
+
+def _size(node) -> int:
+    if node[0] in ("v", "c"):
+        return 1
+    return 1 + sum(_size(n) for n in node[1:])
+
+
+def _render(node) -> str:
+    op = node[0]
+    if op == "v":
+        return f"p{node[1]}"
+    if op == "c":
+        return str(node[1])
+    if op == "sq":
+        return f"{_render(node[1])}²"
+    if op == "sqrt":
+        return f"√({_render(node[1])})"
+    return f"({_render(node[1])} {op} {_render(node[2])})"
+
+
+def _search(values: List[Fraction], consts: List[Fraction], target: Fraction) -> List[Any]:
+    """
+    값이 target 인 식 (파라미터는 한 번씩만, 피연산자 3개까지 + 바깥 ÷c/×c/√)
+    """
+    # (노드, 값, 사용한 파라미터 비트)
+    l1 = [(("v", i), v, 1 << i) for i, v in enumerate(values)]
+    for node, v, used in list(l1):
+        l1.append((("sq", node), v * v, used))
+        r = _sqrt(v)
+        if r is not None and r != v:
+            l1.append((("sqrt", node), r, used))
+    # 상수는 식 하나에 한 번만 (((a + 2) + 2) ÷ 2 같은 끼워 맞추기 방지)
+    l1 += [(("c", c), c, 1 << (len(values) + k)) for k, c in enumerate(consts)]
+    params = (1 << len(values)) - 1
+
+    l2 = []
+    for i, (a, va, ua) in enumerate(l1):
+        for j, (b, vb, ub) in enumerate(l1):
+            if i == j or ua & ub or not (ua | ub) & params:
+                continue
+            if i < j:
+                l2.append((("+", a, b), va + vb, ua | ub))
+                l2.append((("*", a, b), va * vb, ua | ub))
+            l2.append((("-", a, b), va - vb, ua | ub))
+            if vb != 0:
+                l2.append((("/", a, b), va / vb, ua | ub))
+    for node, v, used in list(l2):
+        r = _sqrt(v)
+        if r is not None and r != v:
+            l2.append((("sqrt", node), r, used))
+
+    by_value: Dict[Fraction, List[Tuple[Any, int]]] = {}
+    for node, v, used in l1:
+        by_value.setdefault(v, []).append((node, used))
+
+    def find(t: Fraction) -> List[Any]:
+        found = [node for node, v, _ in l2 if v == t]
+        for x, vx, ux in l2:
+            # x ○ y = t 를 만족하는 y 를 값으로 찾음
+            wanted = [("+", t - vx, False), ("-", vx - t, False), ("-", t + vx, True)]
+            if vx != 0:
+                wanted += [("*", t / vx, False), ("/", t * vx, True)]
+            if t != 0:
+                wanted.append(("/", vx / t, False))
+            for op, vy, y_first in wanted:
+                for y, uy in by_value.get(vy, ()):
+                    if ux & uy:
+                        continue
+                    found.append((op, y, x) if y_first else (op, x, y))
+        return found
+
+    results = find(target)
+    for c in consts:
+        results += [("/", n, ("c", c)) for n in find(target * c) if not _has_const(n)]
+        results += [("*", n, ("c", c)) for n in find(target / c) if not _has_const(n)]
+    if target > 0:
+        results += [("sqrt", n) for n in find(target * target)]
+    unique = {}
+    for node in results:
+        unique.setdefault(_render(node), node)
+    return list(unique.values())
+
+
+def _has_const(node) -> bool:
+    return any(leaf[0] == "c" for leaf in _leaves(node))
+
+
+def _shown_inner(node) -> List[Any]:
+    """
+    풀이에 보통 적히는 중간 노드 (루트, 파라미터의 제곱/제곱근 제외)
+    """
+    out = []
+
+    def walk(n, root):
+        if n[0] in ("v", "c"):
+            return
+        for child in n[1:]:
+            walk(child, False)
+        if not root and not (n[0] in ("sq", "sqrt") and n[1][0] == "v"):
+            out.append(n)
+    walk(node, True)
+    return out
+
+
+def _ops(node) -> List[str]:
+    if node[0] in ("v", "c"):
+        return []
+    return [node[0]] + [op for n in node[1:] for op in _ops(n)]
+
+
+# ==========================================
+# 템플릿
+# ==========================================
+
+class VariantTemplate:
+    def __init__(self, content: Dict[str, Any]):
+        self.content = content
+        question = str(content.get("question") or "")
+        options = content.get("options") or []
+        answer = str(content.get("answer") or "")
+        if not question or not isinstance(options, list) or len(options) != 4 or not answer:
+            raise TemplateError("not a multiple-choice problem")
+        if validate_problem(content):
+            raise TemplateError("stored problem does not validate")
+
+        # 정답: 수 하나 + 앞뒤 글자 ("30cm²", "x > 5")
+        tokens = [t for t in _tokens(answer) if not t.fixed]
+        if len(tokens) != 1:
+            raise TemplateError("answer is not a single number")
+        self.answer_token = tokens[0]
+        A = self.answer_token.value
+
+        # 파라미터: 지문의 수 (같은 값은 같은 파라미터, 0/1 과 번호는 고정)
+        self.q_tokens = _tokens(question)
+        values: List[Fraction] = []
+        self.var_like: List[_Num] = []
+        self.q_roles: List[Optional[int]] = []
+        for t in self.q_tokens:
+            if t.fixed or t.value in (0, 1):
+                self.q_roles.append(None)
+                continue
+            if t.value not in values:
+                values.append(t.value)
+                self.var_like.append(t)
+            self.q_roles.append(values.index(t.value))
+        if not values:
+            raise TemplateError("no numbers in question")
+        if len(values) > MAX_PARAMS:
+            raise TemplateError("too many numbers in question")
+        self.values = values
+        consts = [Fraction(2)] + ([Fraction(100)] if "%" in question else [])
+        self.consts = [c for c in consts if c not in values]
+
+        # 정답 식: 풀이에 나온 중간값 → 연산 기호 → 사용한 파라미터가 많은 식 → 짧은 식 순
+        explanation = str(content.get("explanation") or "")
+        e_tokens = [t for t in _tokens(explanation) if not t.fixed]
+        shown = {t.value for t in e_tokens}
+        symbols = _NUM_RE.sub(" ", explanation)
+        if e_tokens and A not in shown:
+            raise TemplateError("explanation does not reach the answer")
+        # 풀이가 수를 써서 계산하면 식에 쓴 파라미터/상수가 모두 풀이에 나와야 함 (우연히 맞은 식 거르기)
+        scored = []
+        for node in _search(values, self.consts, A):
+            inner = [_eval(n, values) for n in _shown_inner(node)]
+            if A in inner:
+                continue                # ((a × b) × 2) ÷ 2 같은 돌아가는 식
+            shown_ops = [any(w in symbols for w in _OP_SYMBOLS[op]) for op in _ops(node)]
+            if not all(ok for op, ok in zip(_ops(node), shown_ops) if op in ("sq", "sqrt")):
+                continue                # 풀이에 제곱/제곱근이 없으면 우연히 맞은 식
+            present = sum(1 for v in inner if v in shown and v not in values and v not in self.consts)
+            if e_tokens and any((values[leaf[1]] if leaf[0] == "v" else leaf[1]) not in shown for leaf in _leaves(node)):
+                continue
+            ops = sum(1 if ok else -1 for ok in shown_ops)
+            used = len({n[1] for n in _leaves(node) if n[0] == "v"})
+            scored.append(((-present, -ops, -used, _size(node)), node))
+        if not scored:
+            raise TemplateError("no formula reproduces the answer")
+        scored.sort(key=lambda s: s[0])
+        best = scored[0][0]
+        contenders = [node for score, node in scored if score == best]
+        self.formula = scored[0][1]
+        self.used = sorted({n[1] for n in _leaves(self.formula) if n[0] == "v"})
+        self.has_sqrt = "sqrt" in _ops(self.formula)
+        if len(contenders) > 1:
+            self._check_unambiguous(contenders)
+
+        # 원래 수치에서의 중간값 (후위 순서, 마지막이 정답)
+        inner: List[Fraction] = []
+        _eval(self.formula, values, inner)
+        self.inner = inner
+
+        # 값 → 역할. 한 값이 서로 다르게 바뀔 역할 두 개에 걸리면 어느 쪽인지 알 수 없으므로 실패
+        roles: Dict[Fraction, set] = {}
+        for i, v in enumerate(values):
+            roles.setdefault(v, set()).add(("v", i) if i in self.used else ("k",))
+        for c in self.consts:
+            if any(n == ("c", c) for n in _leaves(self.formula)):
+                roles.setdefault(c, set()).add(("k",))
+        for i, v in enumerate(inner[:-1]):
+            roles.setdefault(v, set()).add(("n", i))
+        roles.setdefault(A, set()).add(("a",))
+        for v in (Fraction(0), Fraction(1)):
+            roles.setdefault(v, {("k",)})
+        self.roles = roles
+
+        self.e_edits = self._bind(e_tokens, "explanation")
+        self.option_parts = []
+        for o in options:
+            ts = [t for t in _tokens(str(o)) if not t.fixed]
+            if len(ts) != 1:
+                raise TemplateError("option is not a single number")
+            self.option_parts.append((str(o), ts[0], ts[0].value - A))
+        self.max_den = max(t.value.denominator for _, t, _ in self.option_parts)
+        self.answer_index = [normalize_answer(o) for o in options].index(normalize_answer(answer))
+
+        svg = content.get("svg") or ""
+        self.svg_edits = None
+        if svg.strip():
+            try:
+                self.svg_edits = [
+                    (m.start(2) + t.start, m.start(2) + t.end, t, role)
+                    for m in _SVG_TEXT_RE.finditer(svg)
+                    for t, role in self._bind(_tokens(m.group(2)), "svg")
+                ]
+            except TemplateError:
+                self.svg_edits = None      # 글자를 못 맞추면 변형마다 새로 그림
+
+        # 대소 관계: 사용하는 파라미터의 원래 순서를 유지
+        self.order = sorted(self.used, key=lambda i: values[i])
+
+    def _bind(self, tokens: List[_Num], where: str) -> List[Tuple[_Num, Any]]:
+        out = []
+        for t in tokens:
+            roles = self.roles.get(t.value)
+            if not roles:
+                raise TemplateError(f"{where} has a number not derived from the question: {t.value}")
+            moving = {r for r in roles if r[0] != "k"}
+            if len(moving) > 1 or (moving and len(roles) > 1):
+                raise TemplateError(f"{where} number has more than one role: {t.value}")
+            out.append((t, next(iter(moving)) if moving else ("k",)))
+        return out
+
+    def _check_unambiguous(self, contenders: List[Any]):
+        rng = random.Random(0)
+        for _ in range(8):
+            values = self._sample_values(rng)
+            results = {_eval(node, values) for node in contenders}
+            if len(results) > 1:
+                raise TemplateError("several formulas fit the answer")
+
+    # ── 파라미터 다시 뽑기 ──
+    def _sample_one(self, rng: random.Random, like: _Num) -> Fraction:
+        v = like.value
+        if like.kind == "frac":
+            den = v.denominator
+            for _ in range(20):
+                num = rng.randint(1, den - 1) if v < 1 else rng.randint(den + 1, 3 * den - 1)
+                if gcd(num, den) == 1:
+                    return Fraction(num, den)
+            return v
+        scaled = int(v * 10 ** like.places)
+        zeros = 0
+        if like.kind == "int":
+            while scaled % 10 == 0 and scaled >= 100 and zeros < len(str(scaled)) - 2:
+                scaled //= 10
+                zeros += 1
+        digits = len(str(scaled))
+        lo = 2 if digits == 1 else 10 ** (digits - 1)
+        new = rng.randint(lo, 10 ** digits - 1)
+        if like.kind == "dec" and new % 10 == 0:
+            new += rng.randint(1, 9)       # 2.5 → 3.0 처럼 끝자리 0 은 피함
+        return Fraction(new * 10 ** zeros, 10 ** like.places)
+
+    def _sample_values(self, rng: random.Random) -> List[Fraction]:
+        values = list(self.values)
+        for i in getattr(self, "used", range(len(values))):
+            values[i] = self._sample_one(rng, self.var_like[i])
+        return values
+
+    def _sample_scaled(self, rng: random.Random) -> Optional[List[Fraction]]:
+        """
+        파라미터 전체에 같은 비율을 곱함. 제곱근 식은 따로 뽑으면 거의 나누어떨어지지 않음 (12, 5 → 24, 10)
+        """
+        k = Fraction(rng.randint(1, 6), rng.randint(1, 4))
+        if k == 1:
+            return None
+        values = list(self.values)
+        for i in self.used:
+            like = self.var_like[i]
+            v = values[i] * k
+            if like.kind == "frac" or (v * 10 ** like.places).denominator != 1 or v < 2:
+                return None
+            values[i] = v
+        return values
+
+    def sample(self, rng: random.Random) -> Optional[Dict[str, Any]]:
+        """
+        변형 1개. 조건(형태/부호/대소 관계/검증)을 못 맞춘 수치면 None
+        """
+        if self.has_sqrt and rng.random() < 0.5:
+            values = self._sample_scaled(rng)
+            if values is None:
+                return None
+        else:
+            values = self._sample_values(rng)
+        if all(values[i] == self.values[i] for i in self.used):
+            return None
+        ordered = [values[i] for i in self.order]
+        if any(a >= b for a, b in zip(ordered, ordered[1:])):
+            return None
+        inner: List[Fraction] = []
+        if _eval(self.formula, values, inner) is None or len(inner) != len(self.inner):
+            return None
+        for new, old in zip(inner, self.inner):
+            if (new > 0) != (old > 0) or (new < 0) != (old < 0):
+                return None
+        A = inner[-1]
+        old_answer = self.answer_token.value
+        if A.denominator == 1 and old_answer.denominator == 1 and len(str(abs(A))) != len(str(abs(old_answer))):
+            return None                    # 288 → 14 처럼 자릿수가 바뀌면 난이도가 달라짐
+        if A == old_answer:
+            return None
+
+        def value_of(role, like: _Num) -> Optional[str]:
+            kind = role[0]
+            if kind == "k":
+                return None
+            if kind == "v":
+                return _format(values[role[1]], like)
+            return _format(inner[role[1]] if kind == "n" else A, like)
+
+        def edits(pairs) -> Optional[List[Tuple[int, int, str]]]:
+            out = []
+            for t, role in pairs:
+                if role[0] == "k":
+                    continue
+                text = value_of(role, t)
+                if text is None:
+                    return None
+                out.append((t.start, t.end, text))
+            return out
+
+        q_pairs = [(t, ("v", r) if r is not None and r in self.used else ("k",)) for t, r in zip(self.q_tokens, self.q_roles)]
+        q_edits, e_edits = edits(q_pairs), edits(self.e_edits)
+        answer = _format(A, self.answer_token)
+        if q_edits is None or e_edits is None or answer is None:
+            return None
+        t = self.answer_token
+        answer = str(self.content["answer"])[:t.start] + answer + str(self.content["answer"])[t.end:]
+
+        options = []
+        for text, tok, delta in self.option_parts:
+            new_value = A + delta
+            if (new_value > 0) != (tok.value > 0) or (new_value < 0) != (tok.value < 0):
+                return None
+            if new_value.denominator > max(self.max_den, A.denominator):
+                return None                # 분수 보기가 217/120 처럼 되지 않게
+            rendered = _format(new_value, tok)
+            if rendered is None:
+                return None
+            options.append(text[:tok.start] + rendered + text[tok.end:])
+        options[self.answer_index] = answer
+        if len({normalize_answer(o) for o in options}) != 4:
+            return None
+
+        p = {k: v for k, v in self.content.items() if k not in ("id", "qhash", "cache_key", "svg")}
+        p["question"] = _replace(str(self.content["question"]), q_edits)
+        p["explanation"] = _replace(str(self.content.get("explanation") or ""), e_edits)
+        p["answer"] = answer
+        rng.shuffle(options)
+        p["options"] = options
+        p["source"] = "variant"
+
+        svg = self.content.get("svg") or ""
+        if svg.strip():
+            svg_edits = edits([(t._replace(start=s, end=e), role) for s, e, t, role in self.svg_edits]) if self.svg_edits is not None else None
+            if svg_edits is not None:
+                p["svg"] = _replace(svg, svg_edits)
+            else:
+                from .ai_engine import generate_fallback_svg
+                p["svg"] = generate_fallback_svg(str(p.get("topic", "")), p["question"])
+        if validate_problem(p):
+            return None
+        return p
+
+
+def _leaves(node) -> List[Any]:
+    if node[0] in ("v", "c"):
+        return [node]
+    return [leaf for child in node[1:] for leaf in _leaves(child)]
+
+
+# ==========================================
+# 공개 API
+# ==========================================
+
+_cache: "OrderedDict[str, Any]" = OrderedDict()
+
+
+def compile_template(content: Dict[str, Any]) -> VariantTemplate:
+    """
+    문제 → 템플릿 (같은 문제는 캐시, 실패도 캐시). 만들 수 없으면 TemplateError
+    """
+    from .question_bank import question_hash
+
+    key = content.get("qhash") or question_hash(content)
+    cached = _cache.get(key)
+    if cached is None:
+        try:
+            cached = VariantTemplate(content)
+            cached.key = key
+        except TemplateError as e:
+            cached = e
+        _cache[key] = cached
+        if len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    else:
+        _cache.move_to_end(key)
+    if isinstance(cached, TemplateError):
+        raise cached
+    return cached
+
+
+def generate(content: Dict[str, Any], count: int = 3, seed: Optional[int] = None,
+             max_attempts: int = MAX_ATTEMPTS) -> List[Dict[str, Any]]:
+    """
+    수치만 바꾼 유사 문제 count 개 (서로 다른 지문). 하나도 못 만들면 TemplateError
+    """
+    tpl = compile_template(content)
+    rng = random.Random(seed)
+    out, seen = [], {normalize_answer(content.get("question", ""))}
+    for _ in range(max_attempts * max(1, count)):
+        p = tpl.sample(rng)
+        if p is None or normalize_answer(p["question"]) in seen:
+            continue
+        seen.add(normalize_answer(p["question"]))
+        out.append(p)
+        if len(out) >= count:
+            break
+    if not out:
+        # 조건이 너무 빡빡한 템플릿 (자릿수를 지키며 나누어떨어지는 수가 거의 없음) → 다음부터 바로 실패
+        err = TemplateError("no valid variant within attempt budget")
+        _cache[tpl.key] = err
+        raise err
+    return out
+
+
+def describe(content: Dict[str, Any]) -> str:
+    tpl = compile_template(content)
+    params = ", ".join(f"p{i}={tpl.values[i]}" for i in tpl.used)
+    return f"answer = {_render(tpl.formula)}  ({params})"
+
+
+def _bench(limit: int):
+    import os
+
+    from sqlalchemy import create_engine, select
+
+    from .models import Question
+
+    url = os.getenv("DATABASE_URL") or "sqlite:///" + os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mathdaily.db")
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        rows = [c for (c,) in conn.execute(select(Question.content).limit(limit)) if isinstance(c, dict)]
+    reasons: Dict[str, int] = {}
+    ok, produced = [], 0
+    start = time.perf_counter()
+    for c in rows:
+        try:
+            ok.append(compile_template(c))
+        except TemplateError as e:
+            reason = str(e).split(":")[0]
+            reasons[reason] = reasons.get(reason, 0) + 1
+    compile_s = time.perf_counter() - start
+    from . import ai_engine  # noqa: F401  SVG 대체 그림용 import 를 측정에서 뺌
+
+    rng = random.Random(0)
+    timings, attempts = [], 0
+    for tpl in ok:
+        start = time.perf_counter()
+        for _ in range(MAX_ATTEMPTS):
+            attempts += 1
+            if tpl.sample(rng) is not None:
+                timings.append(time.perf_counter() - start)
+                break
+    timings.sort()
+    print(f"🧬 {len(ok)}/{len(rows)} problems templated, compile {compile_s / max(1, len(rows)) * 1000:.2f} ms/problem")
+    if timings:
+        median, p90 = timings[len(timings) // 2], timings[int(len(timings) * 0.9)]
+        print(f"   variants: {len(timings)}/{len(ok)} templates, median {median * 1e6:.0f} µs, p90 {p90 * 1e6:.0f} µs "
+              f"per variant ({attempts / len(ok):.1f} samples/template)")
+    for reason, n in sorted(reasons.items(), key=lambda kv: -kv[1]):
+        print(f"   ✗ {n:>4}  {reason}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="유사 문제 로컬 생성")
+    parser.add_argument("--id", help="문제 ID (questions.id)")
+    parser.add_argument("-n", type=int, default=3)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--bench", action="store_true", help="은행 문제 전체로 성공률/속도 측정")
+    parser.add_argument("--limit", type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.bench:
+        _bench(args.limit)
+        return
+    if not args.id:
+        parser.print_help()
+        return
+    import json
+
+    from server.main import SessionLocal
+    from server.models import Question
+
+    with SessionLocal() as db:
+        q = db.get(Question, args.id)
+    if q is None:
+        raise SystemExit(f"❌ Question not found: {args.id}")
+    print(f"📐 {q.content.get('question')}  → {q.content.get('answer')}")
+    try:
+        print(f"   {describe(q.content)}")
+        for p in generate(q.content, args.n, args.seed):
+            p.pop("svg", None)
+            print(json.dumps(p, ensure_ascii=False))
+    except TemplateError as e:
+        print(f"❌ {e}")
+
+
+if __name__ == "__main__":
+    main()
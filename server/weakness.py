@@ -0,0 +1,275 @@
+"""
+취약점 색인 (WeaknessCard / 복습 문제 선택용)
+
+- weakness_logs 는 오답 분석 원본 (추가만, 색인 없음, error_type 은 자유 문장)
+- user_weaknesses 는 (사용자, 단원, 정규화된 오류 유형) 별 집계 1행
+    오답 분석 저장 시 : 감쇠 점수에 심각도를 더함, 연속 정답 수 0 으로
+    학습지 제출 시    : 단원 문제를 모두 맞히면 연속 정답 수 증가 → RESOLVE_STREAK 이상이면 해결 처리
+- /api/weaknesses/{userId}?top=k 는 (user_id, resolved, weight) 색인에서 k 행만 읽음
+
+감쇠: 점수는 반감기마다 절반. 모든 행이 같은 속도로 줄어들기 때문에
+weight = 점수 × 2^((t - EPOCH) / 반감기) 로 저장하면 시간이 지나도 행 사이 순서가 그대로이고,
+새 오답은 심각도 × 2^((지금 - EPOCH) / 반감기) 를 더하기만 하면 됨 (동시 저장에도 유실 없음)
+
+    # 백필/복구: weakness_logs + submissions 를 시간순으로 다시 적용
+    python -m server.weakness rebuild [--user USER_ID]
+"""
+import argparse
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from . import question_bank
+from .models import Question, Submission, Unit, UserWeakness, WeaknessLog
+from .rollups import _upsert_add
+
+WEAKNESS_HALF_LIFE_DAYS = float(os.getenv("WEAKNESS_HALF_LIFE_DAYS", "14"))
+RESOLVE_STREAK = int(os.getenv("WEAKNESS_RESOLVE_STREAK", "3"))   # 이만큼 연속으로 맞히면 해결
+TOP_MAX = 50
+NO_UNIT = 0
+
+# weight 기준 시각. 반감기 14일이면 2^(경과일/14) 가 float 범위를 넘기까지 약 39년
+EPOCH = datetime(2026, 1, 1)
+
+# 자유 문장 → WeaknessCard 의 유형 코드 (앞에 있는 규칙이 우선)
+ERROR_TYPES = (
+    "CALCULATION_ERROR", "CONCEPT_GAP", "MISREAD", "TIME_PRESSURE",
+    "CARELESS", "FORMULA_ERROR", "PROCESS_ERROR", "OTHER",
+)
+_ERROR_TYPE_RULES = [
+    ("FORMULA_ERROR", re.compile(r"공식|formula", re.I)),
+    ("CALCULATION_ERROR", re.compile(r"계산|연산|calcul|arithmetic", re.I)),
+    ("CONCEPT_GAP", re.compile(r"개념|원리|정의|concept", re.I)),
+    ("MISREAD", re.compile(r"해석|읽|오독|이해|조건|misread|interpret", re.I)),
+    ("TIME_PRESSURE", re.compile(r"시간|time", re.I)),
+    ("CARELESS", re.compile(r"부주의|실수|착각|찍|careless|guess", re.I)),
+    ("PROCESS_ERROR", re.compile(r"과정|풀이|절차|단계|process|step", re.I)),
+]
+
+
+def normalize_error_type(value: Any) -> str:
+    """
+    "단순 계산 실수" → CALCULATION_ERROR, "[개념 부족]" → CONCEPT_GAP, 알 수 없으면 OTHER
+    """
+    text_value = str(value or "").strip().strip("[]").strip()
+    if text_value.upper() in ERROR_TYPES:
+        return text_value.upper()
+    for code, pattern in _ERROR_TYPE_RULES:
+        if pattern.search(text_value):
+            return code
+    return "OTHER"
+
+
+def _scale(at: datetime) -> float:
+    return 2.0 ** ((at - EPOCH).total_seconds() / (WEAKNESS_HALF_LIFE_DAYS * 86400))
+
+
+def current_score(weight: float, now: Optional[datetime] = None) -> float:
+    return (weight or 0.0) / _scale(now or datetime.utcnow())
+
+
+def _problem_unit(db: Session, problem_id: Optional[str]) -> Tuple[int, Optional[str]]:
+    """
+    문제 ID → (단원 ID, 표시용 주제). 은행에 없는 문제는 (0, None)
+    """
+    q = db.get(Question, problem_id) if problem_id else None
+    if q is None:
+        return NO_UNIT, None
+    topic = (q.content or {}).get("topic") if isinstance(q.content, dict) else None
+    unit_id = q.unit_id
+    if unit_id is None:
+        # 단원을 고르지 않고 만든 학습지 문제 → 주제(단원명)로 찾아야 제출 결과로 해결 처리됨
+        unit_id = question_bank.unit_ids_by_topic(db, [topic]).get(str(topic or "").strip())
+    elif not topic:
+        unit = db.get(Unit, unit_id)
+        topic = unit.name if unit else None
+    return unit_id or NO_UNIT, topic
+
+
+# ==========================================
+# 증분 갱신 (커밋은 호출한 쪽에서)
+# ==========================================
+
+def record(db: Session, user_id: str, problem_id: Optional[str], error_type: Any, severity: int = 1,
+           advice: Optional[str] = None, at: Optional[datetime] = None) -> Tuple[int, str]:
+    """
+    오답 분석 1건 반영. (단원 ID, 정규화된 유형) 반환.
+    """
+    at = at or datetime.utcnow()
+    unit_id, topic = _problem_unit(db, problem_id)
+    code = normalize_error_type(error_type)
+    severity = max(1, int(severity or 1))
+    _upsert_add(
+        db, UserWeakness,
+        {"user_id": user_id, "unit_id": unit_id, "error_type": code},
+        {"weight": severity * _scale(at), "count": 1, "severity_sum": severity},
+        replace={
+            "topic": topic or "기타", "correct_streak": 0, "resolved": False,
+            "last_problem_id": problem_id, "last_advice": advice, "last_seen_at": at,
+        },
+    )
+    return unit_id, code
+
+
+def apply_results(db: Session, user_id: str, unit_results: Dict[str, List[int]]) -> int:
+    """
+    제출 결과 {"단원 ID": [시도, 정답]} 반영. 해결 처리된 행 수 반환.
+    단원 문제를 모두 맞히면 연속 정답 수를 늘리고, 하나라도 틀리면 0 으로 되돌림.
+    """
+    resolved = 0
+    now = datetime.utcnow()
+    for unit_id, (attempts, correct) in (unit_results or {}).items():
+        if not attempts:
+            continue
+        q = db.query(UserWeakness).filter(
+            UserWeakness.user_id == user_id,
+            UserWeakness.unit_id == int(unit_id),
+            UserWeakness.resolved.is_(False),
+        )
+        if correct < attempts:
+            q.update({"correct_streak": 0, "updated_at": now}, synchronize_session=False)
+            continue
+        streak = UserWeakness.correct_streak + correct
+        resolved += q.filter(streak >= RESOLVE_STREAK).count()
+        q.update({
+            "correct_streak": streak,
+            "resolved": case((streak >= RESOLVE_STREAK, True), else_=False),
+            "updated_at": now,
+        }, synchronize_session=False)
+    return resolved
+
+
+# ==========================================
+# 조회
+# ==========================================
+
+def top_weaknesses(db: Session, user_id: str, k: int = 5) -> Dict[str, Any]:
+    k = max(1, min(int(k), TOP_MAX))
+    now = datetime.utcnow()
+    rows = (
+        db.query(UserWeakness)
+        .filter(UserWeakness.user_id == user_id, UserWeakness.resolved.is_(False))
+        .order_by(UserWeakness.weight.desc())
+        .limit(k)
+        .all()
+    )
+    total = (
+        db.query(func.count())
+        .select_from(UserWeakness)
+        .filter(UserWeakness.user_id == user_id, UserWeakness.resolved.is_(False))
+        .scalar()
+    )
+    return {
+        "userId": user_id,
+        "totalUnresolved": total or 0,
+        "topWeaknesses": [{
+            "unitId": w.unit_id or None,
+            "topic": w.topic,
+            "errorType": w.error_type,
+            "errorTypes": [w.error_type],
+            "score": round(current_score(w.weight, now), 3),
+            "count": w.count or 0,
+            "avgSeverity": round((w.severity_sum or 0) / w.count, 2) if w.count else 0,
+            "correctStreak": w.correct_streak or 0,
+            "lastSeenAt": w.last_seen_at.isoformat() if w.last_seen_at else None,
+            "advice": w.last_advice,
+        } for w in rows],
+    }
+
+
+# ==========================================
+# 백필 / 복구
+# ==========================================
+
+def rebuild(db: Session, user_id: Optional[str] = None) -> int:
+    """
+    weakness_logs 와 submissions 를 시간순으로 다시 적용. 색인 행 수 반환.
+    """
+    q = db.query(UserWeakness)
+    if user_id:
+        q = q.filter(UserWeakness.user_id == user_id)
+    q.delete(synchronize_session=False)
+
+    unit_names = dict(db.query(Unit.id, Unit.name).all())
+    unit_by_topic = question_bank.unit_ids_by_topic(db, unit_names.values())
+    logs = (
+        db.query(WeaknessLog.created_at, WeaknessLog.user_id, WeaknessLog.problem_id, WeaknessLog.error_type,
+                 WeaknessLog.severity, WeaknessLog.ai_advice, Question.unit_id, Question.content)
+        .outerjoin(Question, Question.id == WeaknessLog.problem_id)
+    )
+    subs = db.query(Submission.created_at, Submission.user_id, Submission.unit_results)
+    if user_id:
+        logs = logs.filter(WeaknessLog.user_id == user_id)
+        subs = subs.filter(Submission.user_id == user_id)
+
+    # (시각, 종류, ...) — 같은 시각이면 오답 분석을 먼저
+    events = [(at or EPOCH, 0, row) for at, *row in logs.yield_per(1000)]
+    events += [(at or EPOCH, 1, row) for at, *row in subs.yield_per(1000)]
+    events.sort(key=lambda e: (e[0], e[1]))
+
+    index: Dict[Tuple[str, int, str], UserWeakness] = {}
+    by_unit: Dict[Tuple[str, int], List[UserWeakness]] = {}
+    for at, kind, row in events:
+        if kind == 0:
+            uid, problem_id, error_type, severity, advice, unit_id, content = row
+            topic = content.get("topic") if isinstance(content, dict) else None
+            if unit_id is None:
+                unit_id = unit_by_topic.get(str(topic or "").strip())
+            key = (uid, unit_id or NO_UNIT, normalize_error_type(error_type))
+            w = index.get(key)
+            if w is None:
+                w = index[key] = UserWeakness(user_id=key[0], unit_id=key[1], error_type=key[2],
+                                              weight=0.0, count=0, severity_sum=0)
+                by_unit.setdefault(key[:2], []).append(w)
+            severity = max(1, int(severity or 1))
+            w.weight += severity * _scale(at)
+            w.count += 1
+            w.severity_sum += severity
+            w.topic = topic or unit_names.get(unit_id) or "기타"
+            w.correct_streak, w.resolved = 0, False
+            w.last_problem_id, w.last_advice, w.last_seen_at = problem_id, advice, at
+            continue
+        uid, unit_results = row
+        for unit_id, (attempts, correct) in (unit_results or {}).items():
+            if not attempts:
+                continue
+            for w in by_unit.get((uid, int(unit_id)), []):
+                if w.resolved:
+                    continue
+                w.correct_streak = w.correct_streak + correct if correct >= attempts else 0
+                w.resolved = w.correct_streak >= RESOLVE_STREAK
+
+    db.add_all(index.values())
+    db.commit()
+    return len(index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="취약점 색인")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("rebuild", help="weakness_logs + submissions 에서 색인 다시 계산")
+    p.add_argument("--user", help="한 사용자만 다시 계산")
+    p = sub.add_parser("top", help="사용자의 상위 취약점 출력")
+    p.add_argument("user")
+    p.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    from server.main import SessionLocal
+
+    with SessionLocal() as db:
+        if args.command == "rebuild":
+            rows = rebuild(db, args.user)
+            print(f"✅ Weakness index rebuilt: {rows} rows")
+            return
+        result = top_weaknesses(db, args.user, args.k)
+    print(f"🎯 {result['userId']}: {result['totalUnresolved']} unresolved")
+    for w in result["topWeaknesses"]:
+        print(f"   {w['score']:>7.2f}  {w['topic']} / {w['errorType']} (×{w['count']}, streak {w['correctStreak']})")
+
+
+if __name__ == "__main__":
+    main()
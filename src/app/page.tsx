@@ -144,7 +144,7 @@ export default function Home() {
       const data = await response.json();
 
       const mappedProblems = data.map((p: any, idx: number) => ({
-        id: `p-${Date.now()}-${idx}`,
+        id: p.id ?? `p-${Date.now()}-${idx}`, // 은행 문제 ID (제출/오답 분석 시 단원 매칭)
         orderNum: idx + 1,
         question: p.question,
         answer: p.answer,
@@ -251,7 +251,7 @@ export default function Home() {
       const data = await response.json();
 
       const mappedProblems = data.map((p: any, idx: number) => ({
-        id: `similar-${Date.now()}-${idx}`,
+        id: p.id ?? `similar-${Date.now()}-${idx}`,
         orderNum: idx + 1,
         question: p.question,
         answer: p.answer,
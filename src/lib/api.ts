@@ -125,6 +125,7 @@ export async function fetchAIWorksheet(
 
         // API 응답을 ProblemData 형식으로 변환
         return data.map((p: any) => ({
+            id: p.id ?? undefined,
             question: p.question,
             answer: p.answer,
             topic: p.topic,
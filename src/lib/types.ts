@@ -26,6 +26,7 @@ export interface Chapter {
 }
 
 export interface ProblemData {
+    id?: string; // (선택) 은행에 저장된 문제 ID
     question: string;
     answer: string;
     topic: string;
@@ -18,6 +18,15 @@ echo.
 echo Installing completed or warnings ignored.
 
 echo.
+:: 인자로 워커 수를 주면 운영 모드 (예: start_backend.bat 4)
+if not "%~1"=="" (
+    echo Running production server with %~1 workers...
+    cd ..
+    python -m server.serve --workers %~1 --port 8000
+    pause
+    exit /b
+)
+
 echo Running Fastapi server...
 python -m uvicorn main:app --reload --host 0.0.0.0 --port 8000
 if %errorlevel% neq 0 (
@@ -0,0 +1,24 @@
+"""
+오답 분석 upsert: 같은 (학생, 단원, 유형) 행은 합치고 심각도는 큰 쪽을 유지한다
+"""
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from server import ai_service
+
+
+def _record(response_id, severity):
+    return {"userId": "u-1", "responseId": response_id, "topic": "분수의 나눗셈",
+            "analysis": {"error_type": "계산 실수", "severity": severity, "feedback": response_id}}
+
+
+def test_upsert_keeps_the_higher_severity(tmp_path):
+    factory = sessionmaker(bind=create_engine(f"sqlite:///{tmp_path / 'logs.db'}"))
+    assert ai_service.save_analyses([_record("r-1", 4)], session_factory=factory) == 1
+    assert ai_service.save_analyses([_record("r-2", 2)], session_factory=factory) == 1
+    with factory() as db:
+        row = db.query(ai_service.WeaknessLog).one()
+        assert (row.repeatCount, row.severity, row.description) == (2, 4, "r-2")
+    ai_service.save_analyses([_record("r-3", 5)], session_factory=factory)
+    with factory() as db:
+        assert db.query(ai_service.WeaknessLog.severity).scalar() == 5
@@ -0,0 +1,47 @@
+"""
+공유 캐시가 꺼진 단일 프로세스에서도 캐시된 분석/재작성은 브레이커가 열려 있을 때 그대로 제공된다
+"""
+import asyncio
+
+from server import ai_engine
+from server.shared_cache import cache as shared_cache, local as local_cache
+
+
+def test_cached_results_survive_open_breaker_without_shared_cache(monkeypatch):
+    monkeypatch.setattr(type(shared_cache), "enabled", property(lambda self: False))
+    monkeypatch.setattr(ai_engine.weakness, "record", lambda *args, **kwargs: None)
+    local_cache.invalidate()
+    calls = []
+
+    async def analyze(prompt, user_message):
+        calls.append("analyze")
+        return {"error_type": "부호 실수", "reasoning": "-", "advice": "부호를 확인하세요"}
+
+    class Client:
+        class chat:
+            class completions:
+                @staticmethod
+                async def create(**kwargs):
+                    calls.append("rewrite")
+                    message = type("M", (), {"content": "바꾼 지문"})
+                    return type("R", (), {"choices": [type("C", (), {"message": message})], "usage": None})
+
+    class Db:
+        def add(self, row): pass
+        def commit(self): pass
+
+    monkeypatch.setattr(ai_engine, "_analyze_with_cascade", analyze)
+    args = ("u-1", "p-1", "3", "-3", "x + 3 = 0 의 해는?", Db())
+    first = asyncio.run(ai_engine.analyze_error(*args))
+
+    monkeypatch.setattr(ai_engine.breaker, "is_open", lambda: True)
+    assert asyncio.run(ai_engine.analyze_error(*args)) == first
+    assert calls == ["analyze"]
+
+    monkeypatch.setattr(ai_engine.breaker, "is_open", lambda: False)
+    monkeypatch.setattr(ai_engine, "get_openai_client", lambda: Client)
+    assert asyncio.run(ai_engine.rewrite_problem("원문")) == "바꾼 지문"
+    monkeypatch.setattr(ai_engine.breaker, "is_open", lambda: True)
+    assert asyncio.run(ai_engine.rewrite_problem("원문")) == "바꾼 지문"
+    assert calls == ["analyze", "rewrite"]
+    local_cache.invalidate()
@@ -0,0 +1,50 @@
+"""
+내보내기 → 빈 DB 가져오기: 대상 DB 에 없는 단원도 유지되고, 같은 시각에 늦게 들어온 행도 증분 내보내기에 포함된다
+"""
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from server import bankio
+from server.models import Base, Chapter, Question, Unit
+
+
+def _question(qid, unit_id, created_at):
+    return Question(id=qid, unit_id=unit_id, difficulty=2, type="drill", created_at=created_at,
+                    content={"topic": "원의 방정식", "question": qid, "options": ["1", "2", "3", "4"], "answer": "1"})
+
+
+def test_round_trip_keeps_units_missing_from_target(tmp_path):
+    src = create_engine(f"sqlite:///{tmp_path / 'src.db'}")
+    Base.metadata.create_all(src)
+    at = datetime(2026, 3, 1, 9, 0, 0)
+    with Session(src) as db:
+        chapter = Chapter(school_level="high", grade=1, name="도형의 방정식 (개정)")
+        db.add(chapter)
+        db.flush()
+        unit = Unit(chapter_id=chapter.id, name="원의 방정식 (심화)")
+        db.add(unit)
+        db.flush()
+        unit_id = unit.id
+        db.add_all([_question("q-1", unit_id, at), _question("q-2", unit_id, at)])
+        db.commit()
+
+    out = str(tmp_path / "exports")
+    assert bankio.export_tables(src, out, "jsonl.gz") == {"questions": 2, "weakness_logs": 0}
+    # 워터마크와 같은 시각에 늦게 커밋된 행 + 같은 초에 다시 내보내도 파일이 덮어써지지 않음
+    with Session(src) as db:
+        db.add(_question("q-3", unit_id, at))
+        db.commit()
+    assert bankio.export_tables(src, out, "jsonl.gz") == {"questions": 1, "weakness_logs": 0}
+    assert len(bankio._part_files(out, "questions")) == 2
+
+    dst = create_engine(f"sqlite:///{tmp_path / 'dst.db'}")
+    counts = bankio.import_tables(dst, out)
+    assert counts["questions"] == 3
+    assert counts["units_created"] == 1
+    assert "unmapped" not in counts
+    with Session(dst) as db:
+        rows = db.query(Question.id, Unit.name, Chapter.name, Chapter.school_level, Chapter.grade) \
+            .join(Unit, Question.unit_id == Unit.id).join(Chapter, Unit.chapter_id == Chapter.id).order_by(Question.id).all()
+    assert rows == [(f"q-{i}", "원의 방정식 (심화)", "도형의 방정식 (개정)", "high", 1) for i in (1, 2, 3)]
@@ -0,0 +1,41 @@
+"""
+cassette 녹화/재생: 청크 분할은 관측된 지연과 무관하고, 녹화 중 업스트림 확인은 실제 클라이언트로 간다
+"""
+import asyncio
+
+from server import cassette
+from server.chunking import ChunkPlanner
+
+PLAN = [{"topic": "일차방정식", "difficulty": 2}] * 10
+KEY = ("middle", 1, False)
+
+
+def test_planner_is_pinned_while_recording_or_replaying(monkeypatch):
+    learned = ChunkPlanner()
+    for _ in range(50):
+        learned.observe(KEY, 5, 0.01)
+    learned.spend(140000)
+
+    monkeypatch.setenv("LLM_CASSETTE_MODE", "off")
+    assert learned.choose(PLAN, *KEY[:2]) != ChunkPlanner().choose(PLAN, *KEY[:2])
+    for mode in ("record", "replay"):
+        monkeypatch.setenv("LLM_CASSETTE_MODE", mode)
+        assert learned.choose(PLAN, *KEY[:2]) == ChunkPlanner().choose(PLAN, *KEY[:2])
+
+
+def test_models_are_forwarded_only_when_recording(tmp_path):
+    class Models:
+        async def list(self):
+            return ["gpt-4o-mini"]
+
+    class Inner:
+        api_key = "sk-test"
+        models = Models()
+
+        def with_options(self, **options):
+            return self
+
+    store = cassette.CassetteStore(str(tmp_path / "llm.jsonl.gz"))
+    recording = cassette.CassetteClient("record", store, Inner())
+    assert asyncio.run(recording.with_options(max_retries=0).models.list()) == ["gpt-4o-mini"]
+    assert cassette.CassetteClient("replay", store).models is None
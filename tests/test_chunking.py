@@ -0,0 +1,36 @@
+"""
+청크 지연 모델: 한 가지 크기만 관측돼도 빠른 업스트림을 더 느리게 예측하지 않는다
+"""
+import pytest
+
+from server.chunking import ChunkPlanner, _KeyModel, _prior
+
+PLAN = [{"topic": "일차방정식", "difficulty": 2}] * 10
+KEY = ("middle", 1, False)
+
+
+def _planner(latency, samples, size=5):
+    planner = ChunkPlanner()
+    for _ in range(samples):
+        planner.observe(KEY, size, latency)
+    return planner
+
+
+def test_fit_single_size_keeps_slope_and_measures_spread_around_mean():
+    model = _KeyModel()
+    for latency in (19.0, 20.0, 21.0) * 10:
+        model.samples.append((5, latency, 0, 0))
+    a, b, sd = model.fit(KEY)
+    prior_a, prior_b, prior_sd = _prior(KEY)
+    w = 30 / 35
+    # 크기 5 평균 20초를 지나는 직선, 흩어짐은 평균 주변 편차(≈0.82)와 사전값의 혼합
+    assert b == pytest.approx(prior_b)
+    assert a + b * 5 == pytest.approx(w * 20 + (1 - w) * (prior_a + prior_b * 5))
+    assert sd == pytest.approx(w * (2 / 3) ** 0.5 + (1 - w) * prior_sd)
+
+
+def test_faster_upstream_never_predicts_slower():
+    prior = ChunkPlanner().choose(PLAN, *KEY[:2])["expected_seconds"]
+    expected = [_planner(latency, 5).choose(PLAN, *KEY[:2])["expected_seconds"] for latency in (0.001, 9.5, 20.0)]
+    assert expected == sorted(expected)
+    assert _planner(0.01, 30).choose(PLAN, *KEY[:2])["expected_seconds"] < prior
@@ -0,0 +1,47 @@
+"""
+청크 재시도: 스트림 중간에 끊긴 시도에서 이미 넘겨준 문제는 다시 요청/저장하지 않는다
+"""
+import asyncio
+
+from server import ai_engine
+
+
+def _problem(n):
+    return {
+        "topic": "덧셈", "difficulty": 2, "type": "drill",
+        "question": f"{n} + 1 은 얼마인가요?",
+        "options": [str(n + 1), str(n + 2), str(n + 3), str(n + 4)],
+        "answer": str(n + 1),
+        "explanation": f"{n} + 1 = {n + 1}",
+        "svg": "<svg xmlns=\"http://www.w3.org/2000/svg\"></svg>",
+    }
+
+
+def test_retry_skips_slots_delivered_before_stream_failure(monkeypatch):
+    plan = [{"topic": "덧셈", "difficulty": 2, "type": "drill", "require_visual": False} for _ in range(3)]
+    requests = []
+
+    async def fake_call_chunk(items, prompt, school_level, grade, plan_key=None, model=None, on_item=None):
+        requests.append(len(items))
+        if len(requests) == 1:
+            on_item(0, _problem(0))            # 첫 문제를 넘긴 뒤 스트림이 끊김
+            raise TimeoutError("stream dropped")
+        offset = 3 - len(items)
+        for j in range(len(items)):
+            on_item(j, _problem(offset + j))
+        return [None] * len(items)
+
+    monkeypatch.setattr(ai_engine, "_call_chunk", fake_call_chunk)
+    monkeypatch.setattr(ai_engine, "backoff_delay", lambda *a, **k: 0)
+    monkeypatch.setattr(ai_engine, "HEDGE_PERCENTILE", 0)
+
+    delivered = []
+    problems, missing, error = asyncio.run(ai_engine._generate_chunk(
+        plan, ai_engine.get_prompt("generate", "elementary", 3), "elementary", 3,
+        on_problem=lambda p, item: delivered.append(p["question"]),
+    ))
+
+    assert requests[:2] == [3, 2]
+    assert delivered == [_problem(n)["question"] for n in range(3)]
+    assert [p["question"] for p in problems] == delivered
+    assert missing == [] and error is None
@@ -0,0 +1,35 @@
+"""
+보존 정책: 제공 기록이 없는 옛 문제는 삭제하지 않고 보관한다
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from server import retention
+from server.models import Base, Question, QuestionStat
+
+
+def _question(qid, created_at):
+    return Question(id=qid, unit_id=1, difficulty=2, type="drill", created_at=created_at,
+                    content={"question": qid, "options": ["1", "2", "3", "4"], "answer": "1"})
+
+
+def test_legacy_rows_without_stats_are_archived_not_dropped(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bank.db'}")
+    Base.metadata.create_all(engine)
+    old = datetime.utcnow() - timedelta(days=365)
+    with Session(engine) as db:
+        db.add_all([_question("q-legacy", old), _question("q-unserved", old), _question("q-new", datetime.utcnow())])
+        # 기록을 시작한 뒤 만든 문제: 통계 행은 있지만 한 번도 나가지 않음
+        db.add(QuestionStat(question_id="q-unserved", served_count=0, attempts=0, correct=0))
+        db.commit()
+
+    targets = retention.plan(engine, bank_floor=0)
+    assert targets["drop"] == ["q-unserved"]
+    assert targets["archive_questions"] == ["q-legacy"]
+
+    report = retention.apply(engine, targets, archive_dir=str(tmp_path / "archive"))
+    assert report["archived"] == {"questions": 1}
+    with Session(engine) as db:
+        assert [q.id for q in db.query(Question)] == ["q-new"]
@@ -0,0 +1,25 @@
+"""
+트레이스 파일 저장은 요청을 처리하는 스레드(이벤트 루프)가 아니라 백그라운드 스레드에서 한다
+"""
+import threading
+
+from server import tracing
+
+
+def test_export_runs_off_the_request_thread(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_EXPORT_DIR", str(tmp_path))
+    writers = []
+    export_trace = tracing.export_trace
+
+    def record_thread(trace, directory, fmt="chrome"):
+        writers.append(threading.current_thread().name)
+        return export_trace(trace, directory, fmt)
+
+    monkeypatch.setattr(tracing, "export_trace", record_thread)
+    with tracing.start_trace("GET /api/test", force=True) as root:
+        with tracing.span("db_commit"):
+            pass
+    tracing.flush_exports()
+
+    assert writers == ["trace-export"]
+    assert (tmp_path / f"trace-{root.trace.trace_id}.chrome.json").exists()
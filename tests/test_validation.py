@@ -0,0 +1,23 @@
+"""
+SVG 검증: 시각 자료 필수 항목은 대체 SVG 로 넘기지 않고, 문자열이 아닌 svg 도 예외 없이 걸러낸다
+"""
+from server.ai_engine import _repair_svg
+from server.validation import is_repairable, validate_problem
+
+PROBLEM = {"topic": "직선의 방정식", "question": "기울기가 2 인 직선은?", "options": ["1", "2", "3", "4"], "answer": "2"}
+
+
+def test_svg_issues_escalate_only_when_visual_is_required():
+    visual = {"topic": "직선의 방정식", "require_visual": True}
+    issues = validate_problem(dict(PROBLEM), visual)
+    assert issues == ["missing_svg"]
+    assert not is_repairable(issues, visual)
+    assert is_repairable(issues)
+    assert is_repairable(validate_problem({**PROBLEM, "svg": "<p>"}), {"topic": "직선의 방정식"})
+
+
+def test_non_string_svg_is_bad_not_an_error():
+    p = {**PROBLEM, "svg": {"width": 100}}
+    assert validate_problem(p) == ["bad_svg"]
+    _repair_svg(p)
+    assert isinstance(p["svg"], str)
@@ -0,0 +1,42 @@
+"""
+학습지 응답의 문제 ID 로 오답 분석/제출이 같은 단원에 모이고, 연속 정답이면 취약점이 해결된다
+"""
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from server import fastjson, question_bank, rollups, weakness
+from server.models import Base, Chapter, Question, Unit, UserWeakness, WeaknessLog
+
+
+def test_problem_without_unit_resolves_by_topic(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bank.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        chapter = Chapter(school_level="middle", grade=1, name="문자와 식")
+        db.add(chapter)
+        db.flush()
+        unit = Unit(chapter_id=chapter.id, name="일차방정식")
+        db.add(unit)
+        db.flush()
+        unit_id = unit.id
+        # 단원을 고르지 않은 학습지에서 저장된 문제 (unit_id 없음)
+        content = {"id": "q-1", "topic": "일차방정식", "difficulty": 2, "question": "x + 3 = 0", "options": ["-3", "3", "0", "1"], "answer": "-3"}
+        db.add(Question(id="q-1", unit_id=None, difficulty=2, type="drill", content=content))
+        db.commit()
+
+        assert fastjson.problem_payload(content)["id"] == "q-1"
+        assert question_bank.units_of(db, ["q-1", "q-missing"]) == {"q-1": unit_id}
+
+        assert weakness.record(db, "u-1", "q-1", "계산 실수", severity=2) == (unit_id, "CALCULATION_ERROR")
+        for _ in range(weakness.RESOLVE_STREAK):
+            sub = rollups.record_submission(db, "u-1", responses=[{"problemId": "q-1", "isCorrect": True}])
+            assert sub.unit_results == {str(unit_id): [1, 1]}
+            weakness.apply_results(db, "u-1", sub.unit_results)
+        db.commit()
+        row = db.query(UserWeakness).one()
+        assert (row.unit_id, row.resolved) == (unit_id, True)
+
+        db.add(WeaknessLog(id="log-1", user_id="u-1", problem_id="q-1", user_answer="3", error_type="계산 실수", severity=2))
+        db.commit()
+        assert weakness.rebuild(db, "u-1") == 1
+        assert db.query(UserWeakness.unit_id).scalar() == unit_id